@@ -0,0 +1,323 @@
+"""
+Offline Replay Benchmark
+Runs recorded tickets through build_react_graph() with every upstream call
+(Freshdesk, Gemini, Pinecone, attachments, Drive/Sheets) served from replay
+cassettes, and reports throughput, p50/p95/p99 latency, a per-node
+breakdown and each ticket's critical path (time saved by parallel graph
+branches) tagged with the git commit - so runs can be compared across commits.
+
+Record a corpus first (live credentials; the run is real, including Freshdesk updates):
+    python Local_Testing/benchmark_replay.py record 101 102 103
+    python test_workflow_manual.py 45 --record          # same, one ticket
+
+Benchmark:
+    python Local_Testing/benchmark_replay.py run                              # all cassettes
+    python Local_Testing/benchmark_replay.py run --concurrency 8 --repeat 3
+    python Local_Testing/benchmark_replay.py run --latency-scale 0            # CPU-only
+    python Local_Testing/benchmark_replay.py run --fixed-latency-ms 200
+    python Local_Testing/benchmark_replay.py run --output bench.json --compare baseline.json
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.config.settings import settings
+from Local_Testing.latency_stats import latency_stats
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger("benchmark_replay")
+logger.setLevel(logging.INFO)
+
+
+def _initial_state(ticket_id: str) -> Dict[str, Any]:
+    return {
+        "ticket_id": ticket_id,
+        "audit_events": [],
+        "react_iterations": [],
+        "react_total_iterations": 0,
+        "react_status": "pending",
+        "gathered_documents": [],
+        "gathered_images": [],
+        "gathered_past_tickets": [],
+    }
+
+
+def _init_services():
+    """Startup caches (product sheet, policy doc) - served from _global.json when replaying."""
+    from app.services.product_catalog_cache import init_product_cache
+    from app.services.policy_service import init_policy_service
+    for name, init in (("product cache", init_product_cache), ("policy service", init_policy_service)):
+        try:
+            init()
+        except Exception as e:
+            logger.warning(f"⚠️ {name} init failed: {e}")
+
+
+def _git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+
+
+# ---------------------------------------------------------------------
+# RECORD
+# ---------------------------------------------------------------------
+def record(args):
+    from app.graph.graph_builder_react import build_react_graph
+    from app.utils.replay import cassette_scope
+
+    settings.replay_mode = "record"
+    if args.dir:
+        settings.replay_dir = args.dir
+
+    _init_services()
+    graph = build_react_graph()
+
+    for ticket_id in args.ticket_ids:
+        logger.info(f"📼 Recording ticket #{ticket_id}...")
+        start = time.perf_counter()
+        try:
+            with cassette_scope(ticket_id) as cassette:
+                graph.invoke(_initial_state(ticket_id))
+            logger.info(f"✅ #{ticket_id}: {len(cassette.interactions)} calls in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"❌ #{ticket_id} failed: {e}")
+
+
+# ---------------------------------------------------------------------
+# RUN (replay)
+# ---------------------------------------------------------------------
+def _run_one(graph, ticket_id: str) -> Dict[str, Any]:
+    from app.utils.replay import cassette_scope
+    from app.utils.tracing import start_trace, critical_path
+
+    result = {"ticket_id": ticket_id, "ok": False, "latency": 0.0, "path": None, "nodes": {}, "replay": {}}
+    try:
+        with cassette_scope(ticket_id) as cassette:
+            start = time.perf_counter()
+            with start_trace("benchmark_replay", ticket_id=ticket_id) as root:
+                final_state = graph.invoke(_initial_state(ticket_id))
+            result["latency"] = time.perf_counter() - start
+            if final_state.get("skip_workflow_applied"):
+                result["path"] = "skip"
+            elif final_state.get("react_status") == "lite":
+                result["path"] = "lite"
+            else:
+                result["path"] = "full"
+            result["iterations"] = final_state.get("react_total_iterations")
+            result["stop_reason"] = final_state.get("react_stop_reason")
+            result["stop_saved_seconds"] = final_state.get("react_stop_saved_seconds") or 0.0
+            result["ok"] = True
+        result["replay"] = dict(cassette.stats)
+        spans = root.trace_spans()
+        result["critical_path"] = critical_path(spans)
+        for s in spans:
+            if s["name"].startswith("node."):
+                node = s["name"][len("node."):]
+                result["nodes"][node] = result["nodes"].get(node, 0.0) + s["duration_seconds"]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _lite_coverage(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    agent_runs = [r for r in results if r["path"] in ("lite", "full")]
+    lite = sum(1 for r in agent_runs if r["path"] == "lite")
+    return {
+        "agent_runs": len(agent_runs),
+        "lite": lite,
+        "full": len(agent_runs) - lite,
+        "lite_fraction": round(lite / len(agent_runs), 3) if agent_runs else 0.0,
+    }
+
+
+def _react_loop_stats(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    agent_runs = [r for r in results if r.get("iterations") is not None and r["path"] != "skip"]
+    distribution: Dict[str, int] = {}
+    stop_reasons: Dict[str, int] = {}
+    for r in agent_runs:
+        distribution[str(r["iterations"])] = distribution.get(str(r["iterations"]), 0) + 1
+        reason = r.get("stop_reason") or "unknown"
+        stop_reasons[reason] = stop_reasons.get(reason, 0) + 1
+    saved = [r["stop_saved_seconds"] for r in agent_runs if r.get("stop_saved_seconds")]
+    return {
+        "iterations": latency_stats([float(r["iterations"]) for r in agent_runs]),
+        "iteration_distribution": dict(sorted(distribution.items(), key=lambda kv: int(kv[0]))),
+        "stop_reasons": stop_reasons,
+        "estimated_saved_seconds": {"total": round(sum(saved), 3), "per_policy_stop": latency_stats(saved)},
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    from app.graph.graph_builder_react import build_react_graph
+    from app.utils.replay import list_cassettes
+    from app.services.doc_answer_cache import get_doc_answer_cache
+    from app.clients.llm_client import get_router_stats
+    from app.clients.llm_response_cache import get_llm_response_cache
+
+    settings.replay_mode = "replay"
+    settings.replay_latency_scale = args.latency_scale
+    settings.replay_fixed_latency_ms = args.fixed_latency_ms
+    settings.tracing_enabled = True  # per-node breakdown comes from the trace
+    settings.tracing_exporter = "none"
+    settings.enable_centralized_logging = False
+    settings.doc_cache_enabled = not args.no_doc_cache
+    settings.llm_cache_enabled = args.llm_cache  # Off by default: hits would carry over between benchmark runs
+    settings.near_dup_enabled = False  # Every replayed ticket must run the full pipeline
+    if args.dir:
+        settings.replay_dir = args.dir
+
+    ticket_ids = args.tickets or list_cassettes()
+    if not ticket_ids:
+        logger.error(f"No cassettes in {settings.replay_dir} - record some tickets first")
+        sys.exit(1)
+
+    _init_services()
+    graph = build_react_graph()
+
+    jobs = [tid for _ in range(args.repeat) for tid in ticket_ids]
+    for tid in ticket_ids[:args.warmup]:
+        _run_one(graph, tid)
+
+    logger.info(f"🏁 Replaying {len(jobs)} runs ({len(ticket_ids)} tickets x {args.repeat}) at concurrency {args.concurrency}")
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda tid: _run_one(graph, tid), jobs))
+    wall = time.perf_counter() - wall_start
+
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+
+    per_node: Dict[str, List[float]] = {}
+    for r in ok:
+        for node, seconds in r["nodes"].items():
+            per_node.setdefault(node, []).append(seconds)
+
+    replay_totals: Dict[str, int] = {}
+    for r in results:
+        for key, value in r["replay"].items():
+            replay_totals[key] = replay_totals.get(key, 0) + value
+
+    return {
+        "git": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "tickets": ticket_ids,
+            "repeat": args.repeat,
+            "concurrency": args.concurrency,
+            "latency_scale": args.latency_scale,
+            "fixed_latency_ms": args.fixed_latency_ms,
+        },
+        "runs": len(results),
+        "failures": len(failed),
+        "errors": [{"ticket_id": r["ticket_id"], "error": r.get("error")} for r in failed[:10]],
+        "wall_seconds": round(wall, 3),
+        "throughput_tickets_per_sec": round(len(ok) / wall, 3) if wall > 0 else 0.0,
+        "latency_seconds": latency_stats([r["latency"] for r in ok]),
+        # Skip path = PO / auto-reply / already processed; lite = fixed lookups; full = ReACT loop
+        "latency_by_path": {
+            path: latency_stats([r["latency"] for r in ok if r["path"] == path])
+            for path in ("skip", "lite", "full")
+            if any(r["path"] == path for r in ok)
+        },
+        # Of the tickets that reached the agent, how many the lite path answered
+        "lite_coverage": _lite_coverage(ok),
+        # Iteration-count distribution and why the loop ended (policy stops vs finish_tool vs limit)
+        "react_loop": _react_loop_stats(ok),
+        "nodes": {
+            node: latency_stats(values)
+            for node, values in sorted(per_node.items(), key=lambda kv: -sum(kv[1]))
+        },
+        # Per-ticket critical path: wall time vs the sum of node times (gap = parallel branches)
+        "critical_path": {
+            "parallel_saving_seconds": latency_stats([r["critical_path"]["parallel_saving_seconds"] for r in ok]),
+            "per_ticket": {
+                r["ticket_id"]: r["critical_path"] for r in ok
+            },
+        },
+        "replay": replay_totals,
+        # Hits across --repeat runs are expected; compare hit rate on a corpus of distinct tickets
+        "doc_cache": get_doc_answer_cache().stats(),
+        # Per task:tier latency and escalation rate (cost needs live usage data - 0 under replay)
+        "model_router": get_router_stats(),
+        "llm_cache": get_llm_response_cache().stats(),
+    }
+
+
+def _print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]):
+    print(f"\n📊 vs baseline {baseline.get('git', {}).get('commit', '?')}:")
+    rows = [("throughput", report["throughput_tickets_per_sec"], baseline.get("throughput_tickets_per_sec", 0))]
+    rows.append(("iters p50", report.get("react_loop", {}).get("iterations", {}).get("p50", 0.0), baseline.get("react_loop", {}).get("iterations", {}).get("p50", 0.0)))
+    rows.append(("lite frac", report.get("lite_coverage", {}).get("lite_fraction", 0.0), baseline.get("lite_coverage", {}).get("lite_fraction", 0.0)))
+    for key in ("p50", "p95", "p99"):
+        rows.append((key, report["latency_seconds"][key], baseline.get("latency_seconds", {}).get(key, 0)))
+    for path, stats in report.get("latency_by_path", {}).items():
+        before = baseline.get("latency_by_path", {}).get(path, {})
+        for key in ("p50", "p95"):
+            rows.append((f"{path} {key}", stats[key], before.get(key, 0)))
+    for name, current, before in rows:
+        delta = ((current - before) / before * 100) if before else 0.0
+        print(f"   {name:<11} {before:>9.3f} -> {current:>9.3f}  ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record tickets / replay them offline as a benchmark")
+    parser.add_argument("--dir", help=f"Cassette directory (default: REPLAY_DIR={settings.replay_dir})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Run tickets live and record every upstream call")
+    rec.add_argument("ticket_ids", nargs="+")
+
+    bench = sub.add_parser("run", help="Replay recorded tickets and report latency")
+    bench.add_argument("--tickets", nargs="*", help="Ticket ids (default: every cassette)")
+    bench.add_argument("--concurrency", type=int, default=1)
+    bench.add_argument("--repeat", type=int, default=1)
+    bench.add_argument("--warmup", type=int, default=1, help="Untimed runs before measuring")
+    bench.add_argument("--latency-scale", type=float, default=1.0, help="Recorded latency multiplier (0 = no I/O wait)")
+    bench.add_argument("--fixed-latency-ms", type=float, default=None, help="Fixed latency per upstream call")
+    bench.add_argument("--output", help="Write the JSON report here")
+    bench.add_argument("--compare", help="Baseline JSON report to diff against")
+    bench.add_argument("--no-doc-cache", action="store_true", help="Disable the document search answer cache")
+    bench.add_argument("--llm-cache", action="store_true", help="Enable the LLM response cache (measures reprocessing)")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args)
+        return
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"📁 Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            _print_comparison(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
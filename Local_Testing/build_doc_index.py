@@ -0,0 +1,84 @@
+"""
+Build / Refresh the Local Product Document Index
+Downloads the spec sheets, install manuals and parts diagrams linked from the
+product catalog manifest and indexes them page by page (BM25, optional dense
+vectors) into PRODUCT_DOC_INDEX_DIR for document_search_tool.
+
+Re-runs are incremental: only new or changed documents are downloaded and
+extracted; documents no longer linked from the catalog are dropped.
+
+Usage:
+    python Local_Testing/build_doc_index.py                    # incremental
+    python Local_Testing/build_doc_index.py --full             # rebuild from scratch
+    python Local_Testing/build_doc_index.py --dense            # also embed pages (embed_text)
+    python Local_Testing/build_doc_index.py --models 100.1170 HS6270   # add/refresh only these models' documents
+    python Local_Testing/build_doc_index.py --query "cartridge part number" --model 100.1170
+"""
+
+import sys
+import os
+import argparse
+import json
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.config.settings import settings
+from app.services.product_catalog import ensure_catalog_loaded
+from app.services.product_doc_index import ProductDocIndex
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local product document index")
+    parser.add_argument("--dest", default=settings.product_doc_index_dir, help="Index directory")
+    parser.add_argument("--full", action="store_true", help="Re-download and re-index every document")
+    parser.add_argument("--dense", action="store_true", help="Embed new/changed pages for hybrid search")
+    parser.add_argument("--models", nargs="*", help="Only index documents of these models (testing)")
+    parser.add_argument("--query", help="Search the index instead of building it")
+    parser.add_argument("--model", help="Model scope for --query")
+    args = parser.parse_args()
+    if args.full and args.models:
+        parser.error("--full rebuilds the whole index; use --models without --full")
+
+    index = ProductDocIndex(args.dest)
+
+    if args.query:
+        for hit in index.search(args.query, model_number=args.model, group_number=args.model):
+            print(json.dumps({k: hit[k] for k in ("doc_type", "page", "bm25", "coverage", "url")}))
+            print(f"    {hit['text'][:200]!r}")
+        return
+
+    catalog = ensure_catalog_loaded()
+    products = catalog.products
+    if not products:
+        logger.error("Product catalog is empty - is data/metadata_manifest.json present?")
+        sys.exit(1)
+    if args.models:
+        wanted = {m.upper() for m in args.models}
+        products = [p for p in products if p["model_no"].upper() in wanted or p.get("group_number", "").upper() in wanted]
+        logger.info(f"Restricting to {len(products)} product(s) for {sorted(wanted)}")
+
+    mode = "full" if args.full else "incremental"
+    logger.info(f"Indexing documents for {len(products)} products ({mode}) -> {args.dest}")
+    counts = index.build(
+        products,
+        full=args.full,
+        dense=args.dense,
+        prune=not args.models,  # A partial build must not drop the other models' documents
+        progress=lambda n, total: logger.info(f"  {n}/{total} documents") if n % 100 == 0 or n == total else None
+    )
+    logger.info(f"✅ {counts} - {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
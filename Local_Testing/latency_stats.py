@@ -0,0 +1,30 @@
+"""
+Latency summaries shared by the Local_Testing benchmark / load-test scripts
+(benchmark_replay.py, load_test_webhook.py), so their reports stay comparable.
+"""
+
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_stats(values: List[float]) -> Dict[str, float]:
+    """count / mean / min / p50 / p95 / p99 / max, rounded to 0.1 ms."""
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else 0.0,
+        "min": round(min(values), 4) if values else 0.0,
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4) if values else 0.0,
+    }
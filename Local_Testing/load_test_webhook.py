@@ -0,0 +1,423 @@
+"""
+Webhook Load Test
+Drives POST /webhook with the three payload shapes freshdesk_webhook() parses,
+in steady / burst / slow-drip / duplicate-storm patterns, and reports:
+- acceptance latency (client side, per HTTP status / outcome)
+- queueing delay and completion latency (server side, from /debug/ingest-stats)
+- memory (RSS) and thread growth over the run
+- dedup correctness (duplicates that leaked through the 30s window)
+
+Target either a running server (--url) or start one in-process (--serve):
+    --serve stub     graph replaced by a sleep of --stub-ms (+/- --stub-jitter-ms)
+    --serve replay   real graph with REPLAY_MODE=replay (ticket ids = recorded cassettes)
+
+Usage:
+    python Local_Testing/load_test_webhook.py --serve stub --scenario steady --rate 20 --duration 60
+    python Local_Testing/load_test_webhook.py --serve stub --scenario burst --burst-size 200
+    python Local_Testing/load_test_webhook.py --serve replay --scenario steady drip --output load.json
+    python Local_Testing/load_test_webhook.py --url http://localhost:8080 --scenario duplicates
+
+Ingest stats are per process: run the target with --workers 1 for exact
+completion timings (acceptance latency is measured client side regardless).
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import httpx
+from Local_Testing.latency_stats import latency_stats
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger("load_test_webhook")
+logger.setLevel(logging.INFO)
+
+PAYLOAD_FORMATS = ("ticket_id", "freshdesk_webhook", "ticket")
+DEDUP_WINDOW_SECONDS = 30  # ttl used by _is_duplicate_webhook
+
+
+# ---------------------------------------------------------------------
+# PAYLOADS
+# ---------------------------------------------------------------------
+def build_payload(ticket_id: str, fmt: str, updated_at: str) -> Dict[str, Any]:
+    """One webhook body in the given shape (Format 1 carries no updated_at)."""
+    if fmt == "ticket_id":
+        return {"ticket_id": ticket_id}
+    if fmt == "freshdesk_webhook":
+        return {"freshdesk_webhook": {"ticket_id": ticket_id, "ticket_updated_at": updated_at}}
+    return {"ticket": {"id": ticket_id, "updated_at": updated_at, "subject": "Load test"}}
+
+
+class EventSource:
+    """Hands out (ticket_id, payload format, updated_at) for fresh ticket events."""
+
+    def __init__(self, ticket_ids: Optional[List[str]] = None, base: Optional[int] = None):
+        self.ticket_ids = ticket_ids
+        self._next = base or int(time.time()) % 1_000_000 * 1000
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def next_event(self) -> Dict[str, str]:
+        with self._lock:
+            self._count += 1
+            if self.ticket_ids:
+                ticket_id = self.ticket_ids[self._count % len(self.ticket_ids)]
+            else:
+                self._next += 1
+                ticket_id = str(self._next)
+            fmt = PAYLOAD_FORMATS[self._count % len(PAYLOAD_FORMATS)]
+            updated_at = f"{datetime.utcnow().isoformat()}Z#{self._count}"
+        return {"ticket_id": ticket_id, "format": fmt, "updated_at": updated_at}
+
+
+# ---------------------------------------------------------------------
+# SCENARIOS (open-loop: sends are scheduled, not gated on responses)
+# ---------------------------------------------------------------------
+async def _send(client: httpx.AsyncClient, url: str, event: Dict[str, str], scenario: str,
+                results: List[Dict[str, Any]]):
+    payload = build_payload(event["ticket_id"], event["format"], event["updated_at"])
+    start = time.perf_counter()
+    entry = {"scenario": scenario, "sent_at": time.time(), **event}
+    try:
+        response = await client.post(url, json=payload)
+        entry["http_status"] = response.status_code
+        try:
+            entry["outcome"] = response.json().get("status") or response.json().get("error", "unknown")
+        except ValueError:
+            entry["outcome"] = "non_json"
+    except httpx.HTTPError as e:
+        entry["http_status"] = 0
+        entry["outcome"] = f"client_error:{type(e).__name__}"
+    entry["latency"] = time.perf_counter() - start
+    results.append(entry)
+
+
+async def _schedule(client, url, scenario, plan, results):
+    """plan: list of (offset_seconds, event); each send starts at t0 + offset."""
+    t0 = time.perf_counter()
+    tasks = []
+    for offset, event in plan:
+        delay = offset - (time.perf_counter() - t0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_send(client, url, event, scenario, results)))
+    await asyncio.gather(*tasks)
+
+
+def plan_steady(events: EventSource, rate: float, duration: float):
+    count = max(1, int(rate * duration))
+    return [(i / rate, events.next_event()) for i in range(count)]
+
+
+def plan_burst(events: EventSource, size: int, bursts: int, interval: float):
+    return [(b * interval, events.next_event()) for b in range(bursts) for _ in range(size)]
+
+
+def plan_drip(events: EventSource, interval: float, duration: float):
+    return [(i * interval, events.next_event()) for i in range(max(1, int(duration / interval)))]
+
+
+def plan_duplicates(events: EventSource, unique: int, factor: int, spread: float):
+    """Each event re-sent `factor` times within `spread` seconds (inside the dedup window)."""
+    plan = []
+    for i in range(unique):
+        event = events.next_event()
+        base = i * (spread / max(unique, 1))
+        plan.extend((base + random.uniform(0, spread), dict(event, duplicate_group=str(i))) for _ in range(factor))
+    return sorted(plan, key=lambda item: item[0])
+
+
+# ---------------------------------------------------------------------
+# SERVER (in-process target)
+# ---------------------------------------------------------------------
+class StubGraph:
+    """Stands in for the compiled graph: sleeps like a workflow would."""
+
+    def __init__(self, mean_ms: float, jitter_ms: float):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+
+    def invoke(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        time.sleep(max(0.0, random.gauss(self.mean_ms, self.jitter_ms)) / 1000.0)
+        return {**state, "resolution_decision": "stub", "react_status": "finished", "react_total_iterations": 0}
+
+
+def start_server(mode: str, port: int, stub_ms: float, stub_jitter_ms: float,
+                 coalesce_window: Optional[float] = None) -> str:
+    import uvicorn
+    from app.config.settings import settings
+    import app.main_react as main_react
+
+    settings.enable_centralized_logging = False
+    if coalesce_window is not None:
+        settings.ticket_coalesce_window_seconds = coalesce_window
+    if mode == "stub":
+        main_react.build_react_graph = lambda: StubGraph(stub_ms, stub_jitter_ms)
+        main_react.init_policy_service = lambda: None
+    else:
+        settings.replay_mode = "replay"
+        settings.tracing_exporter = "none"
+
+    server = uvicorn.Server(uvicorn.Config(main_react.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True, name="load-test-server").start()
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2.0).json().get("graph_ready"):
+                logger.info(f"✅ In-process server ({mode}) ready on {base_url}")
+                return base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("In-process server did not become ready")
+
+
+# ---------------------------------------------------------------------
+# MONITORING
+# ---------------------------------------------------------------------
+async def _sample_server(client: httpx.AsyncClient, base_url: str, samples: List[Dict[str, Any]],
+                         interval: float, stop: asyncio.Event):
+    t0 = time.time()
+    while not stop.is_set():
+        try:
+            stats = (await client.get(f"{base_url}/debug/ingest-stats")).json()
+            samples.append({
+                "t": round(time.time() - t0, 1),
+                "rss_mb": stats.get("rss_mb"),
+                "threads": stats.get("threads"),
+                "queued": stats.get("queued"),
+                "running": stats.get("running"),
+            })
+        except (httpx.HTTPError, ValueError):
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _drain(client: httpx.AsyncClient, base_url: str, since: float, timeout: float) -> Dict[str, Any]:
+    """Wait until no accepted webhook is queued/running (or timeout); return stats with records."""
+    deadline = time.time() + timeout
+    stats: Dict[str, Any] = {}
+    while time.time() < deadline:
+        try:
+            stats = (await client.get(f"{base_url}/debug/ingest-stats",
+                                      params={"since": since, "records": "true"})).json()
+            if stats.get("pending", 0) == 0:
+                return stats
+            logger.info(f"⏳ Draining: {stats.get('queued')} queued, {stats.get('running')} running")
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning(f"⚠️ ingest-stats unavailable: {e}")
+        await asyncio.sleep(2.0)
+    stats["drain_timed_out"] = True
+    return stats
+
+
+# ---------------------------------------------------------------------
+# REPORT
+# ---------------------------------------------------------------------
+def _scenario_report(results: List[Dict[str, Any]], records: List[Dict[str, Any]], wall: float) -> Dict[str, Any]:
+    outcomes: Dict[str, int] = {}
+    for r in results:
+        outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+
+    report = {
+        "sent": len(results),
+        "send_rate": round(len(results) / wall, 2) if wall > 0 else 0.0,
+        "outcomes": outcomes,
+        "accept_latency_seconds": latency_stats([r["latency"] for r in results]),
+        "accept_latency_by_format": {
+            fmt: latency_stats([r["latency"] for r in results if r["format"] == fmt])
+            for fmt in PAYLOAD_FORMATS
+        },
+    }
+
+    if records:
+        ok = [r for r in records if r.get("status") == "ok"]
+        span = max(r["finished_at"] for r in records) - min(r["accepted_at"] for r in records)
+        superseded = sum(1 for r in records if r.get("status") == "superseded")
+        report["completed"] = len(ok)
+        report["superseded"] = superseded
+        report["failed"] = len(records) - len(ok) - superseded
+        report["completion_throughput"] = round(len(ok) / span, 3) if span > 0 else 0.0
+        report["queue_delay_seconds"] = latency_stats([r["queue_delay"] for r in records])
+        report["completion_seconds"] = latency_stats([r["completion_seconds"] for r in records])
+
+    groups: Dict[str, List[str]] = {}
+    for r in results:
+        if "duplicate_group" in r:
+            groups.setdefault(r["duplicate_group"], []).append(r["outcome"])
+    if groups:
+        report["dedup"] = {
+            "groups": len(groups),
+            "copies_sent": sum(len(v) for v in groups.values()),
+            "accepted": sum(v.count("accepted") for v in groups.values()),
+            "leaked_duplicates": sum(max(0, v.count("accepted") - 1) for v in groups.values()),
+            "groups_never_accepted": sum(1 for v in groups.values() if "accepted" not in v),
+        }
+    return report
+
+
+def _memory_report(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    rss = [s["rss_mb"] for s in samples if s.get("rss_mb") is not None]
+    if not rss:
+        return {"samples": samples}
+    return {
+        "start_mb": rss[0],
+        "peak_mb": max(rss),
+        "end_mb": rss[-1],
+        "growth_mb": round(rss[-1] - rss[0], 1),
+        "peak_threads": max((s.get("threads") or 0) for s in samples),
+        "peak_queued": max((s.get("queued") or 0) for s in samples),
+        "samples": samples,
+    }
+
+
+async def run_load_test(args, base_url: str, ticket_ids: Optional[List[str]]) -> Dict[str, Any]:
+    events = EventSource(ticket_ids)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    report: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(),
+        "target": base_url,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output",)},
+        "scenarios": {},
+    }
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        samples: List[Dict[str, Any]] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_server(client, base_url, samples, args.sample_interval, stop))
+        webhook_url = f"{base_url}/webhook"
+
+        for scenario in args.scenario:
+            if scenario == "steady":
+                plan = plan_steady(events, args.rate, args.duration)
+            elif scenario == "burst":
+                plan = plan_burst(events, args.burst_size, args.bursts, args.burst_interval)
+            elif scenario == "drip":
+                plan = plan_drip(events, args.drip_interval, args.duration)
+            else:
+                plan = plan_duplicates(events, args.dup_unique, args.dup_factor, args.dup_spread)
+
+            logger.info(f"🚀 {scenario}: {len(plan)} webhooks over ~{plan[-1][0]:.1f}s")
+            since = time.time()
+            results: List[Dict[str, Any]] = []
+            start = time.perf_counter()
+            await _schedule(client, webhook_url, scenario, plan, results)
+            wall = time.perf_counter() - start
+
+            stats = await _drain(client, base_url, since, args.drain_timeout)
+            sent_ids = {r["ticket_id"] for r in results}
+            records = [r for r in stats.get("records", []) if r["ticket_id"] in sent_ids]
+            report["scenarios"][scenario] = _scenario_report(results, records, wall)
+            if stats.get("drain_timed_out"):
+                report["scenarios"][scenario]["drain_timed_out"] = True
+
+            if args.cooldown:
+                await asyncio.sleep(args.cooldown)
+
+        stop.set()
+        await sampler
+
+    report["memory"] = _memory_report(samples)
+    return report
+
+
+def _print_summary(report: Dict[str, Any]):
+    print(f"\n📊 Load test against {report['target']}")
+    for name, s in report["scenarios"].items():
+        accept = s["accept_latency_seconds"]
+        print(f"\n  {name}: sent {s['sent']} ({s['send_rate']}/s)  outcomes {s['outcomes']}")
+        print(f"    accept      p50 {accept['p50']:.3f}s  p95 {accept['p95']:.3f}s  p99 {accept['p99']:.3f}s")
+        if "queue_delay_seconds" in s:
+            q, c = s["queue_delay_seconds"], s["completion_seconds"]
+            print(f"    queue delay p50 {q['p50']:.3f}s  p95 {q['p95']:.3f}s  p99 {q['p99']:.3f}s")
+            print(f"    completion  p50 {c['p50']:.3f}s  p95 {c['p95']:.3f}s  p99 {c['p99']:.3f}s"
+                  f"  ({s['completion_throughput']}/s, {s['superseded']} superseded, {s['failed']} failed)")
+        if "dedup" in s:
+            d = s["dedup"]
+            print(f"    dedup       {d['accepted']}/{d['groups']} accepted, {d['leaked_duplicates']} leaked duplicates")
+    mem = report["memory"]
+    if "peak_mb" in mem:
+        print(f"\n  memory: {mem['start_mb']} -> {mem['end_mb']} MB (peak {mem['peak_mb']}, "
+              f"growth {mem['growth_mb']:+}), peak threads {mem['peak_threads']}, peak queued {mem['peak_queued']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load/capacity test for POST /webhook")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:8000", help="Running server to test")
+    target.add_argument("--serve", choices=["stub", "replay"], help="Start the app in-process instead")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve")
+    parser.add_argument("--stub-ms", type=float, default=2000.0, help="Stub workflow duration")
+    parser.add_argument("--stub-jitter-ms", type=float, default=500.0)
+    parser.add_argument("--coalesce-window", type=float, default=None,
+                        help="Override TICKET_COALESCE_WINDOW_SECONDS for --serve (0 = run immediately)")
+
+    parser.add_argument("--scenario", nargs="+", default=["steady"],
+                        choices=["steady", "burst", "drip", "duplicates"])
+    parser.add_argument("--rate", type=float, default=10.0, help="steady: webhooks/sec")
+    parser.add_argument("--duration", type=float, default=30.0, help="steady/drip: seconds")
+    parser.add_argument("--burst-size", type=int, default=100)
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--burst-interval", type=float, default=10.0)
+    parser.add_argument("--drip-interval", type=float, default=2.0)
+    parser.add_argument("--dup-unique", type=int, default=20, help="duplicates: distinct events")
+    parser.add_argument("--dup-factor", type=int, default=10, help="duplicates: copies per event")
+    parser.add_argument("--dup-spread", type=float, default=5.0, help="duplicates: seconds copies are spread over")
+
+    parser.add_argument("--tickets", nargs="*", help="Ticket ids to use (default: synthetic, or cassettes with --serve replay)")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request client timeout")
+    parser.add_argument("--drain-timeout", type=float, default=900.0, help="Max wait for queued workflows after sending")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="Pause between scenarios")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Memory/queue sampling interval")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if args.dup_spread >= DEDUP_WINDOW_SECONDS:
+        logger.warning(f"⚠️ --dup-spread {args.dup_spread}s exceeds the {DEDUP_WINDOW_SECONDS}s dedup window; late copies are expected to be accepted")
+
+    ticket_ids = args.tickets
+    if args.serve:
+        base_url = start_server(args.serve, args.port, args.stub_ms, args.stub_jitter_ms, args.coalesce_window)
+        if args.serve == "replay" and not ticket_ids:
+            from app.utils.replay import list_cassettes
+            ticket_ids = list_cassettes()
+            if not ticket_ids:
+                logger.error("No cassettes recorded - see Local_Testing/benchmark_replay.py record")
+                sys.exit(1)
+    else:
+        base_url = args.url.rstrip("/")
+
+    report = asyncio.run(run_load_test(args, base_url, ticket_ids))
+    _print_summary(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"📁 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
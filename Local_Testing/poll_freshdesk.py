@@ -1,34 +1,34 @@
 """
-Freshdesk Ticket Poller - Local Development (ReACT Agent)
-Continuously polls Freshdesk for new tickets and processes them through the ReACT workflow.
+Freshdesk Ticket Poller - Local Development / Standalone Ingress (ReACT Agent)
+Polls Freshdesk for new/updated tickets and processes them through the ReACT workflow.
 
 Usage:
-    python poll_freshdesk.py
+    python Local_Testing/poll_freshdesk.py                 # continuous
+    python Local_Testing/poll_freshdesk.py --once          # single poll, wait for the runs
+    python Local_Testing/poll_freshdesk.py --workers 8 --interval 15
 
-This script:
-1. Checks for new/updated tickets every 30 seconds
-2. Automatically runs the ReACT agent workflow for each new ticket
-3. Tracks processed tickets to avoid duplicates
+This script (see app/services/freshdesk_poller.py):
+1. Lists tickets updated since a persisted cursor (paginated)
+2. Runs new/changed tickets on a worker pool
+3. Tracks processed ticket versions in SQLite (POLLER_DB_PATH), compacted after POLLER_PROCESSED_TTL_DAYS
 """
 
 import sys
 import os
 import time
-import json
-import hashlib
+import argparse
 import logging
-from datetime import datetime, timedelta
-from pathlib import Path
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 load_dotenv()
 
-import requests
 from app.config.settings import settings
 from app.graph.graph_builder_react import build_react_graph
-from app.graph.state import TicketState as ReactAgentState
+from app.services.freshdesk_poller import FreshdeskPoller, ProcessedStore
+from app.utils.retry import deadline_scope
+from app.utils.tracing import start_trace
 
 # Configure logging
 logging.basicConfig(
@@ -38,263 +38,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Polling configuration
-POLL_INTERVAL = 30  # seconds
-LOOKBACK_MINUTES = 60  # Check tickets from last hour
-PROCESSED_FILE = ".cache/processed_tickets.json"
-MAX_CONSECUTIVE_ERRORS = 10  # Stop after this many consecutive failures
-MAX_BACKOFF_SECONDS = 300  # Maximum wait time (5 minutes) during backoff
-
-
-class FreshdeskPoller:
-    """Polls Freshdesk for new tickets and processes them"""
-    
-    def __init__(self):
-        self.graph = None
-        self.processed_tickets = self._load_processed()
-        self.freshdesk_url = f"https://{settings.freshdesk_domain}/api/v2"
-        self.auth = (settings.freshdesk_api_key, "X")
-        self.consecutive_errors = 0  # Track consecutive failures
-        
-    def _load_processed(self) -> dict:
-        """Load previously processed ticket IDs"""
-        Path(".cache").mkdir(exist_ok=True)
-        try:
-            if os.path.exists(PROCESSED_FILE):
-                with open(PROCESSED_FILE, 'r') as f:
-                    return json.load(f)
-        except:
-            pass
-        return {}
-    
-    def _save_processed(self):
-        """Save processed ticket IDs"""
-        with open(PROCESSED_FILE, 'w') as f:
-            json.dump(self.processed_tickets, f)
-    
-    def _get_ticket_hash(self, ticket: dict) -> str:
-        """Generate unique hash for ticket state"""
-        key = f"{ticket['id']}:{ticket.get('updated_at', '')}:{ticket.get('status', '')}"
-        return hashlib.sha256(key.encode()).hexdigest()[:16]
-    
-    def initialize(self):
-        """Initialize the ReACT agent workflow graph"""
-        logger.info("🚀 Initializing Flusso ReACT Agent Workflow...")
-        self.graph = build_react_graph()
-        logger.info("✅ ReACT workflow graph ready")
-    
-    def fetch_recent_tickets(self) -> list:
-        """Fetch tickets created/updated in the last hour"""
-        try:
-            # Get tickets updated recently
-            params = {
-                "order_by": "updated_at",
-                "order_type": "desc",
-                "per_page": 30
-            }
-            
-            response = requests.get(
-                f"{self.freshdesk_url}/tickets",
-                auth=self.auth,
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            tickets = response.json()
-            
-            # Filter to recent tickets only
-            cutoff = datetime.utcnow() - timedelta(minutes=LOOKBACK_MINUTES)
-            recent = []
-            
-            for ticket in tickets:
-                updated_at = ticket.get('updated_at', '')
-                if updated_at:
-                    # Parse ISO format
-                    try:
-                        ticket_time = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
-                        if ticket_time.replace(tzinfo=None) > cutoff:
-                            recent.append(ticket)
-                    except:
-                        recent.append(ticket)  # Include if can't parse
-            
-            return recent
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to fetch tickets: {e}")
-            return None  # Return None to signal error (vs empty list for no tickets)
-    
-    def process_ticket(self, ticket: dict) -> dict:
-        """Process a single ticket through the workflow"""
-        ticket_id = ticket['id']
-        
-        logger.info(f"\n{'='*60}")
-        logger.info(f"🎫 Processing Ticket #{ticket_id}")
-        logger.info(f"   Subject: {ticket.get('subject', 'N/A')[:50]}")
-        logger.info(f"   Status: {ticket.get('status', 'N/A')}")
-        logger.info(f"   Priority: {ticket.get('priority', 'N/A')}")
-        logger.info(f"{'='*60}")
-        
-        # Build initial state for ReACT agent
-        initial_state: ReactAgentState = {
-            "ticket_id": str(ticket_id),
-            "audit_events": [{"event": "poller_triggered", "ticket_id": ticket_id}],
-            
-            # ReACT-specific initialization
-            "react_iterations": [],
-            "react_total_iterations": 0,
-            "react_status": "pending",
-            "react_final_reasoning": "",
-            
-            # Product identification
-            "identified_product": None,
-            "product_identification_method": None,
-            "product_confidence": 0.0,
-            
-            # Gathered resources
-            "gathered_documents": [],
-            "gathered_images": [],
-            "gathered_past_tickets": [],
-            "attachment_analysis": {},
-        }
-        
-        try:
-            start_time = time.time()
-            final_state = self.graph.invoke(initial_state)
-            duration = time.time() - start_time
-            
-            logger.info(f"\n✅ Ticket #{ticket_id} completed in {duration:.1f}s")
-            logger.info(f"   Resolution: {final_state.get('resolution_decision', 'N/A')}")
-            logger.info(f"   Category: {final_state.get('ticket_category', 'N/A')}")
-            logger.info(f"   ReACT Iterations: {final_state.get('react_total_iterations', 0)}")
-            logger.info(f"   ReACT Status: {final_state.get('react_status', 'N/A')}")
-            logger.info(f"   Product Identified: {final_state.get('identified_product') is not None}")
-            
-            return {
-                "success": True,
-                "ticket_id": ticket_id,
-                "resolution": final_state.get('resolution_decision'),
-                "category": final_state.get('ticket_category'),
-                "react_iterations": final_state.get('react_total_iterations', 0),
-                "product_identified": final_state.get('identified_product') is not None,
-                "duration": duration
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Error processing ticket #{ticket_id}: {e}")
-            return {
-                "success": False,
-                "ticket_id": ticket_id,
-                "error": str(e)
-            }
-    
-    def poll_once(self) -> int:
-        """
-        Single poll iteration.
-        Returns: count of new tickets processed, or -1 on fetch error
-        """
-        try:
-            tickets = self.fetch_recent_tickets()
-        except Exception as e:
-            logger.error(f"❌ Failed to fetch tickets: {e}")
-            return -1  # Signal error to caller
-        
-        if tickets is None:
-            return -1  # fetch_recent_tickets returned None on error
-        
-        if not tickets:
-            return 0
-        
-        new_count = 0
-        
-        for ticket in tickets:
-            ticket_id = str(ticket['id'])
-            ticket_hash = self._get_ticket_hash(ticket)
-            
-            # Check if already processed this version
-            if self.processed_tickets.get(ticket_id) == ticket_hash:
-                continue
-            
-            # New or updated ticket - process it
-            new_count += 1
-            result = self.process_ticket(ticket)
-            
-            if result.get('success'):
-                # Mark as processed
-                self.processed_tickets[ticket_id] = ticket_hash
-                self._save_processed()
-        
-        return new_count
-    
-    def run_continuous(self):
-        """Run continuous polling loop with error handling and backoff"""
-        logger.info("\n" + "="*60)
-        logger.info("🔄 FLUSSO FRESHDESK POLLER - CONTINUOUS MODE")
-        logger.info("="*60)
-        logger.info(f"📋 Polling interval: {POLL_INTERVAL} seconds")
-        logger.info(f"📋 Lookback window: {LOOKBACK_MINUTES} minutes")
-        logger.info(f"📋 Freshdesk domain: {settings.freshdesk_domain}")
-        logger.info(f"📋 Max consecutive errors: {MAX_CONSECUTIVE_ERRORS}")
-        logger.info("="*60)
-        logger.info("\n⏳ Waiting for new tickets... (Press Ctrl+C to stop)\n")
-        
-        self.initialize()
-        
-        try:
-            while True:
-                try:
-                    new_tickets = self.poll_once()
-                    
-                    if new_tickets > 0:
-                        logger.info(f"\n✨ Processed {new_tickets} new ticket(s)")
-                        self.consecutive_errors = 0  # Reset on success
-                    elif new_tickets == 0:
-                        # Successful poll but no new tickets
-                        self.consecutive_errors = 0  # Reset on success
-                        print(".", end="", flush=True)
-                    else:
-                        # poll_once returns -1 on error
-                        self.consecutive_errors += 1
-                        
-                        if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
-                            logger.critical(
-                                f"🚨 Stopping poller after {MAX_CONSECUTIVE_ERRORS} consecutive errors. "
-                                "Check your API credentials and network connection."
-                            )
-                            break
-                        
-                        # Exponential backoff: 30s, 60s, 120s... up to MAX_BACKOFF_SECONDS
-                        backoff = min(
-                            POLL_INTERVAL * (2 ** (self.consecutive_errors - 1)),
-                            MAX_BACKOFF_SECONDS
-                        )
-                        logger.warning(
-                            f"⚠️ Error #{self.consecutive_errors}/{MAX_CONSECUTIVE_ERRORS}. "
-                            f"Backing off for {backoff}s..."
-                        )
-                        time.sleep(backoff)
-                        continue  # Skip normal sleep
-                    
-                    time.sleep(POLL_INTERVAL)
-                    
-                except Exception as e:
-                    self.consecutive_errors += 1
-                    logger.error(f"❌ Poll loop error: {e}")
-                    
-                    if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
-                        logger.critical(f"🚨 Stopping after {MAX_CONSECUTIVE_ERRORS} errors")
-                        break
-                    
-                    backoff = min(POLL_INTERVAL * (2 ** self.consecutive_errors), MAX_BACKOFF_SECONDS)
-                    time.sleep(backoff)
-                
-        except KeyboardInterrupt:
-            logger.info("\n\n🛑 Poller stopped by user")
-            logger.info(f"📊 Total tickets processed this session: {len(self.processed_tickets)}")
+WORKFLOW_TIMEOUT = 600  # Same per-ticket deadline as the API
 
 
 def main():
     """Entry point"""
+    parser = argparse.ArgumentParser(description="Poll Freshdesk and run the ReACT workflow on new tickets")
+    parser.add_argument("--once", action="store_true", help="Poll once, wait for the runs, exit")
+    parser.add_argument("--workers", type=int, default=settings.poller_workers, help="Concurrent ticket runs")
+    parser.add_argument("--interval", type=int, default=settings.poller_interval_seconds, help="Seconds between polls")
+    parser.add_argument("--db", default=settings.poller_db_path, help="SQLite file for cursor + processed tickets")
+    args = parser.parse_args()
+
+    settings.poller_interval_seconds = args.interval
+
     print("""
     ╔═══════════════════════════════════════════════════════════╗
     ║       🌊 FLUSSO FRESHDESK TICKET POLLER                  ║
@@ -305,9 +62,34 @@ def main():
     ║   Press Ctrl+C to stop                                    ║
     ╚═══════════════════════════════════════════════════════════╝
     """)
-    
-    poller = FreshdeskPoller()
-    poller.run_continuous()
+
+    logger.info("🚀 Initializing Flusso ReACT Agent Workflow...")
+    graph = build_react_graph()
+    logger.info("✅ ReACT workflow graph ready")
+
+    def run_ticket(initial_state):
+        with start_trace("ticket_workflow", ticket_id=initial_state["ticket_id"]), deadline_scope(WORKFLOW_TIMEOUT):
+            return graph.invoke(initial_state)
+
+    poller = FreshdeskPoller(run_ticket=run_ticket, store=ProcessedStore(args.db), workers=args.workers)
+    logger.info(f"📋 Cursor: {poller.store.get_cursor() or 'none (starting from lookback window)'}")
+
+    if args.once:
+        submitted = poller.poll_once()
+        logger.info(f"📋 Submitted {submitted} ticket(s), waiting for them to finish...")
+        poller.stop(wait=True)
+        return
+
+    poller.start()
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"📊 Poller stats: {poller.stats()}")
+    except KeyboardInterrupt:
+        logger.info("\n\n🛑 Poller stopped by user - finishing in-flight tickets...")
+        stats = poller.stats()
+        poller.stop(wait=True)
+        logger.info(f"📊 Session: {stats['succeeded']} succeeded, {stats['failed']} failed runs")
 
 
 if __name__ == "__main__":
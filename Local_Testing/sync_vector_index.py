@@ -0,0 +1,66 @@
+"""
+Sync Pinecone -> Local Vector Index
+Copies the image and/or tickets index into LOCAL_VECTOR_INDEX_DIR so they can be
+served by the local backend (VECTOR_BACKEND=local or IMAGE_INDEX_BACKEND=local).
+
+Usage:
+    python Local_Testing/sync_vector_index.py                 # both indexes
+    python Local_Testing/sync_vector_index.py --index image    # image index only
+    python Local_Testing/sync_vector_index.py --dest /data/vec # custom root dir
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from pinecone import Pinecone
+from app.config.settings import settings
+from app.clients.local_vector_index import sync_from_pinecone
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(message)s',
+    datefmt='%H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy Pinecone indexes to the local vector index")
+    parser.add_argument("--index", choices=["image", "tickets", "all"], default="all")
+    parser.add_argument("--dest", default=settings.local_vector_index_dir, help="Root directory for local indexes")
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    if not settings.pinecone_api_key:
+        logger.error("PINECONE_API_KEY is required to sync from Pinecone")
+        sys.exit(1)
+
+    pc = Pinecone(api_key=settings.pinecone_api_key)
+
+    names = []
+    if args.index in ("image", "all"):
+        names.append(settings.pinecone_image_index)
+    if args.index in ("tickets", "all"):
+        names.append(settings.pinecone_tickets_index)
+
+    for name in names:
+        dest = os.path.join(args.dest, name)
+        logger.info(f"Syncing '{name}' -> {dest}")
+        local = sync_from_pinecone(
+            pc.Index(name),
+            dest,
+            batch_size=args.batch_size,
+            progress=lambda n: logger.info(f"  {n} vectors copied")
+        )
+        logger.info(f"✅ {name}: {len(local)} vectors")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,13 +20,24 @@ from typing import Dict, List, Union, Optional, Protocol
 import numpy as np
 from io import BytesIO
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from abc import ABC, abstractmethod
 
 from app.config.settings import settings
+from app.clients.gemini_pool import get_genai_client, gemini_slot
+from app.utils.tracing import with_context
+from app.utils.replay import recordable
 
 logger = logging.getLogger(__name__)
 
+# Max parallel downloads / remote embedding calls for one image batch
+IMAGE_BATCH_WORKERS = 8
+
+
+def _is_url(source: str) -> bool:
+    return source.startswith('http://') or source.startswith('https://')
+
 
 # =====================================================
 # EMBEDDER INTERFACE (Abstract Base)
@@ -54,6 +65,27 @@ class ImageEmbedderInterface(ABC):
     def get_embedding_dim(self) -> int:
         """Get the dimension of embedding vectors"""
         pass
+    
+    def embed_images(self, image_sources: List[Union[str, Path]]) -> List[Optional[np.ndarray]]:
+        """
+        Embed several images at once. Default: concurrent per-image calls.
+        Failed images come back as None (same position as the input).
+        """
+        def _one(source):
+            try:
+                source_str = str(source)
+                if _is_url(source_str):
+                    return self.embed_image_from_url(source_str)
+                return self.embed_image_from_path(source)
+            except Exception as e:
+                logger.error(f"Failed to embed image {source}: {e}")
+                return None
+        
+        if len(image_sources) <= 1:
+            return [_one(s) for s in image_sources]
+        
+        with ThreadPoolExecutor(max_workers=min(len(image_sources), IMAGE_BATCH_WORKERS)) as pool:
+            return list(pool.map(with_context(_one), image_sources))
 
 
 # =====================================================
@@ -154,6 +186,50 @@ class CLIPEmbedder(ImageEmbedderInterface):
             logger.error(f"Failed to embed image from URL {image_url}: {e}")
             raise
     
+    def embed_images(self, image_sources: List[Union[str, Path]]) -> List[Optional[np.ndarray]]:
+        """
+        Batch embedding: download all images concurrently, then run ONE
+        forward pass over the stacked batch instead of N separate passes.
+        Failed images come back as None (same position as the input).
+        """
+        def _load(source) -> Optional[Image.Image]:
+            try:
+                source_str = str(source)
+                if _is_url(source_str):
+                    response = requests.get(source_str, timeout=10)
+                    response.raise_for_status()
+                    return Image.open(BytesIO(response.content)).convert("RGB")
+                return Image.open(source).convert("RGB")
+            except Exception as e:
+                logger.error(f"Failed to load image {source}: {e}")
+                return None
+        
+        if not image_sources:
+            return []
+        
+        workers = min(len(image_sources), IMAGE_BATCH_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            images = list(pool.map(with_context(_load), image_sources))
+        
+        loaded = [(i, img) for i, img in enumerate(images) if img is not None]
+        results: List[Optional[np.ndarray]] = [None] * len(image_sources)
+        if not loaded:
+            return results
+        
+        try:
+            batch = torch.stack([self.preprocess(img) for _, img in loaded]).to(self.device)
+            with torch.no_grad():
+                embeddings = self.model.encode_image(batch)
+                embeddings = embeddings / embeddings.norm(dim=-1, keepdim=True)
+            embeddings_np = embeddings.cpu().numpy()
+        except Exception as e:
+            logger.error(f"Failed to generate batch embedding: {e}")
+            raise
+        
+        for (i, _), row in zip(loaded, embeddings_np):
+            results[i] = row
+        return results
+    
     def _embed_pil_image(self, image: Image.Image) -> np.ndarray:
         """
         Generate embedding for PIL Image
@@ -409,17 +485,12 @@ def get_image_embedder() -> ImageEmbedderInterface:
 # For text/tickets index
 # =====================================================
 
-_gemini_client: Dict[str, genai.Client] = {}
+GEMINI_EMBED_MODEL = "text-embedding-004"
 
 
 def get_gemini_embed_client() -> genai.Client:
-    """Get or create Gemini client for embeddings"""
-    if 'instance' not in _gemini_client:
-        if not settings.gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not configured for embeddings")
-        _gemini_client['instance'] = genai.Client(api_key=settings.gemini_api_key)
-        logger.info("Gemini embedding client initialized")
-    return _gemini_client['instance']
+    """Get the shared Gemini client (see gemini_pool) for embeddings"""
+    return get_genai_client()
 
 
 def embed_text_gemini(text: str) -> List[float]:
@@ -438,10 +509,11 @@ def embed_text_gemini(text: str) -> List[float]:
         
         # Use Gemini's embedding model
         # text-embedding-004 produces 768-dim vectors by default
-        result = client.models.embed_content(
-            model="text-embedding-004",
-            contents=text
-        )
+        with gemini_slot(GEMINI_EMBED_MODEL):
+            result = client.models.embed_content(
+                model=GEMINI_EMBED_MODEL,
+                contents=text
+            )
         
         # Extract embedding vector
         if hasattr(result, 'embeddings') and result.embeddings:
@@ -457,6 +529,7 @@ def embed_text_gemini(text: str) -> List[float]:
         return [0.0] * 768
 
 
+@recordable("embedding")
 def embed_text(text: str) -> List[float]:
     """
     Generate text embeddings using Gemini (768 dimensions).
@@ -476,6 +549,7 @@ def embed_text(text: str) -> List[float]:
 # Uses CLIP (dev) or Vertex AI (prod) based on config
 # =====================================================
 
+@recordable("embedding")
 def embed_text_clip(text: str) -> List[float]:
     """
     Generate text embeddings for image search (512 dimensions).
@@ -499,6 +573,7 @@ def embed_text_clip(text: str) -> List[float]:
         return [0.0] * 512
 
 
+@recordable("embedding")
 def embed_image(image_source: Union[str, Path]) -> List[float]:
     """
     Embed an image from path or URL.
@@ -537,6 +612,43 @@ def embed_image(image_source: Union[str, Path]) -> List[float]:
         return [0.0] * 512
 
 
+@recordable("embedding")
+def embed_images(image_sources: List[Union[str, Path]]) -> List[Optional[List[float]]]:
+    """
+    Embed several images in one batch (paths or URLs).
+    CLIP: concurrent downloads + a single batched forward pass.
+    Vertex AI: concurrent per-image calls, with CLIP fallback for failures.
+    
+    Args:
+        image_sources: File paths or HTTP URLs
+        
+    Returns:
+        One embedding list (512 dimensions) per input, or None where embedding failed
+    """
+    if not image_sources:
+        return []
+    
+    try:
+        embeddings = get_image_embedder().embed_images(list(image_sources))
+    except Exception as e:
+        logger.error(f"Batch image embedding failed: {e}")
+        embeddings = [None] * len(image_sources)
+    
+    # Fallback to CLIP for anything Vertex AI could not embed
+    failed = [i for i, emb in enumerate(embeddings) if emb is None]
+    if failed and settings.use_vertex_ai_embeddings:
+        logger.warning(f"Vertex AI failed for {len(failed)} image(s), falling back to CLIP")
+        try:
+            retried = get_clip_embedder().embed_images([image_sources[i] for i in failed])
+            for i, emb in zip(failed, retried):
+                embeddings[i] = emb
+        except Exception as fallback_error:
+            logger.error(f"CLIP fallback also failed: {fallback_error}")
+    
+    return [emb.tolist() if emb is not None else None for emb in embeddings]
+
+
+@recordable("embedding")
 def embed_image_for_search(text_query: str) -> List[float]:
     """
     Generate embedding for text-to-image search.
@@ -1,20 +1,93 @@
 """
 Freshdesk API Client
 Clean, Correct & Production-Ready Version
+
+One pooled keep-alive Session per process; request pacing comes from
+Freshdesk's X-RateLimit-* headers (FreshdeskRateLimiter) instead of fixed
+sleeps after writes.
 """
 
 import requests
 import logging
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Any
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 from app.config.settings import settings
-from app.utils.retry import retry_api_call, TRANSIENT_EXCEPTIONS
+from app.config.constants import AI_PROCESSED_TAGS
+from app.utils.retry import retry_freshdesk_call, request_timeout, remaining_time, RateLimitedError, TRANSIENT_EXCEPTIONS
 from app.utils.pii_masker import mask_api_key
+from app.utils.replay import recordable
+from app.utils.tracing import with_context
+from app.utils.metrics import histogram
 
 logger = logging.getLogger(__name__)
 
+# Sideloaded with the ticket (no conversations: nothing reads them)
+TICKET_BUNDLE_INCLUDE = "requester,company,stats"
+
+RATE_LIMIT_WAIT = histogram("flusso_freshdesk_rate_limit_wait_seconds", "Time spent pacing Freshdesk calls")
+
+
+class FreshdeskRateLimiter:
+    """
+    Paces calls from the X-RateLimit-Total / X-RateLimit-Remaining headers.
+    Calls pass freely while the remaining budget is above the reserve; below it,
+    callers wait for the per-minute budget to regenerate (total / 60 per second).
+    """
+
+    def __init__(self, reserve: int):
+        self.reserve = reserve
+        self.total: Optional[int] = None
+        self.remaining: Optional[float] = None
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, headers) -> None:
+        try:
+            total = headers.get("X-RateLimit-Total")
+            remaining = headers.get("X-RateLimit-Remaining")
+            if total is None or remaining is None:
+                return
+            with self._lock:
+                self.total = int(total)
+                self.remaining = float(remaining)
+                self._updated = time.monotonic()
+        except (TypeError, ValueError):
+            return
+
+    def _wait_needed(self) -> float:
+        if self.total is None or self.remaining is None or self.remaining > self.reserve:
+            return 0.0
+        regenerated = (time.monotonic() - self._updated) * self.total / 60.0
+        deficit = self.reserve + 1 - (self.remaining + regenerated)
+        return max(0.0, deficit * 60.0 / max(self.total, 1))
+
+    def acquire(self) -> float:
+        """Block until a call may go out (bounded by the ticket deadline); returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = self._wait_needed()
+                if wait <= 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1  # Optimistic: concurrent callers see the spend
+                    break
+            budget = remaining_time()
+            if budget is not None and budget <= wait:
+                break  # Let the call go; a 429 is handled by the retry layer
+            time.sleep(min(wait, 1.0))
+            waited += min(wait, 1.0)
+        if waited:
+            RATE_LIMIT_WAIT.observe(waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        return {"total": self.total, "remaining": self.remaining, "reserve": self.reserve}
+
 
 class FreshdeskClient:
     """
@@ -37,6 +110,15 @@ class FreshdeskClient:
 
         self.headers = {"Content-Type": "application/json"}
 
+        # Pooled keep-alive connections (no TLS handshake per call)
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=settings.freshdesk_pool_size)
+        self.session.mount("https://", adapter)
+
+        self.rate_limiter = FreshdeskRateLimiter(settings.freshdesk_rate_limit_reserve)
+
         # Log with masked API key for security
         logger.info(f"Freshdesk client initialized → {self.base_url} (key: {mask_api_key(api_key)})")
 
@@ -44,86 +126,125 @@ class FreshdeskClient:
     # Rate Limit Handler
     # --------------------------------------------------------------------
     def _handle_rate_limit(self, response: requests.Response):
+        """
+        Surface 429s to the retry layer instead of sleeping here, so the wait
+        honours Retry-After exactly once and is bounded by the ticket deadline.
+        """
+        self.rate_limiter.update(response.headers)
         if response.status_code == 429:
-            wait = int(response.headers.get("Retry-After", 60))
-            logger.warning(f"[Freshdesk] Rate limited. Waiting {wait}s")
-            time.sleep(wait)
+            wait = float(response.headers.get("Retry-After", 60))
+            logger.warning(f"[Freshdesk] Rate limited (Retry-After: {wait:.0f}s)")
+            raise RateLimitedError(f"Freshdesk rate limited: {response.url}", retry_after=wait)
+
+    def _request(self, method: str, path: str, **kwargs) -> Any:
+        """One paced call on the pooled session; raises for HTTP errors."""
+        self.rate_limiter.acquire()
+        response = self.session.request(
+            method,
+            f"{self.base_url}{path}",
+            timeout=request_timeout(self.timeout),
+            **kwargs
+        )
+        self._handle_rate_limit(response)
+        response.raise_for_status()
+        return response.json()
 
     # --------------------------------------------------------------------
     # GET Ticket (with retry)
     # --------------------------------------------------------------------
-    @retry_api_call
+    @recordable("freshdesk")
+    @retry_freshdesk_call
     def get_ticket(self, ticket_id: int, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Fetch a Freshdesk ticket by ID"""
-        url = f"{self.base_url}/tickets/{ticket_id}"
-        params = params or {}
-
-        response = requests.get(
-            url,
-            auth=self.auth,
-            params=params,
-            headers=self.headers,
-            timeout=self.timeout
-        )
-        self._handle_rate_limit(response)
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", f"/tickets/{ticket_id}", params=params or {})
+
+    def get_ticket_bundle(self, ticket_id: int) -> Dict[str, Any]:
+        """
+        Ticket + requester + company + stats in ONE call.
+        """
+        return self.get_ticket(ticket_id, params={"include": TICKET_BUNDLE_INCLUDE})
+
+    # --------------------------------------------------------------------
+    # LIST Tickets updated since (with retry) - used by the poller
+    # --------------------------------------------------------------------
+    @recordable("freshdesk")
+    @retry_freshdesk_call
+    def list_tickets_updated_since(self, updated_since: str, page: int = 1, per_page: int = 100) -> List[Dict[str, Any]]:
+        """One page of tickets updated at/after `updated_since` (ISO 8601), oldest first."""
+        params = {
+            "updated_since": updated_since,
+            "order_by": "updated_at",
+            "order_type": "asc",
+            "per_page": per_page,
+            "page": page,
+        }
+        return self._request("GET", "/tickets", params=params)
 
     # --------------------------------------------------------------------
     # GET Conversations (with retry)
     # --------------------------------------------------------------------
-    @retry_api_call
+    @recordable("freshdesk")
+    @retry_freshdesk_call
     def get_ticket_conversations(self, ticket_id: int) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/tickets/{ticket_id}/conversations"
-
-        response = requests.get(
-            url,
-            auth=self.auth,
-            headers=self.headers,
-            timeout=self.timeout
-        )
-        self._handle_rate_limit(response)
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", f"/tickets/{ticket_id}/conversations")
 
     # --------------------------------------------------------------------
     # Add Note (with retry)
     # --------------------------------------------------------------------
-    @retry_api_call
+    @recordable("freshdesk")
+    @retry_freshdesk_call
     def add_note(self, ticket_id: int, body: str, private: bool = True) -> Dict[str, Any]:
-        url = f"{self.base_url}/tickets/{ticket_id}/notes"
-        payload = {"body": body, "private": private}
-
-        response = requests.post(
-            url,
-            json=payload,
-            auth=self.auth,
-            headers=self.headers,
-            timeout=self.timeout,
-        )
-        self._handle_rate_limit(response)
-        response.raise_for_status()
-        time.sleep(0.4)
-        return response.json()
+        return self._request("POST", f"/tickets/{ticket_id}/notes", json={"body": body, "private": private})
 
     # --------------------------------------------------------------------
     # Update Ticket (with retry)
     # --------------------------------------------------------------------
-    @retry_api_call
+    @recordable("freshdesk")
+    @retry_freshdesk_call
     def update_ticket(self, ticket_id: int, **fields) -> Dict[str, Any]:
-        url = f"{self.base_url}/tickets/{ticket_id}"
-
-        response = requests.put(
-            url,
-            json=fields,
-            auth=self.auth,
-            headers=self.headers,
-            timeout=self.timeout,
-        )
-        self._handle_rate_limit(response)
-        response.raise_for_status()
-        time.sleep(0.4)
-        return response.json()
+        return self._request("PUT", f"/tickets/{ticket_id}", json=fields)
+
+    # --------------------------------------------------------------------
+    # Note + field update in one round
+    # --------------------------------------------------------------------
+    def add_note_and_update(
+        self,
+        ticket_id: int,
+        note: Optional[str] = None,
+        private: bool = True,
+        **fields
+    ) -> Dict[str, Any]:
+        """
+        Write a note and update ticket fields (e.g. tags).
+        Either part may be omitted.
+
+        When the update adds an AI_PROCESSED_TAGS marker, the note is written
+        first and the tags only after it succeeded: a marked ticket is never
+        re-run, so a failed note must leave it unmarked (retried, not lost).
+        Otherwise the two independent endpoints are called concurrently - the
+        round costs one call's latency - and the first error is raised after
+        both finish.
+        """
+        calls = {}
+        if note:
+            calls["note"] = with_context(lambda: self.add_note(ticket_id, note, private=private))
+        if fields:
+            calls["update"] = with_context(lambda: self.update_ticket(ticket_id, **fields))
+        marks_processed = any(tag in AI_PROCESSED_TAGS for tag in fields.get("tags") or [])
+        if len(calls) < 2 or marks_processed:
+            return {name: call() for name, call in calls.items()}  # note, then update
+
+        with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+            futures = {name: pool.submit(call) for name, call in calls.items()}
+        results, first_error = {}, None
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                first_error = first_error or e
+        if first_error:
+            raise first_error
+        return results
 
     # --------------------------------------------------------------------
     # Extract Ticket Fields (Normalized)
@@ -7,10 +7,12 @@ Enhanced with structured source extraction for citations.
 
 import logging
 from typing import List, Dict, Any, Tuple, Optional
-from google import genai
 from google.genai import types
 
 from app.config.settings import settings
+from app.clients.gemini_pool import get_genai_client, gemini_slot
+from app.utils.metrics import record_llm_usage
+from app.utils.replay import recordable
 from app.graph.state import RetrievalHit
 
 logger = logging.getLogger(__name__)
@@ -29,7 +31,7 @@ class GeminiClient:
         if not api_key:
             raise ValueError("GEMINI_API_KEY not configured")
         
-        self.client = genai.Client(api_key=api_key)
+        self.client = get_genai_client()
         self.model_name = settings.llm_model
         self.file_search_model = getattr(settings, 'llm_file_search_model', settings.llm_model)  # Use dedicated model for file search
         self.store_id = settings.gemini_file_search_store_id
@@ -41,6 +43,7 @@ class GeminiClient:
         logger.info(f"File search model: {self.file_search_model}")
         logger.info(f"File search store: {self.store_id}")
     
+    @recordable("gemini")
     def search_files(self, query: str, top_k: int = 10) -> List[RetrievalHit]:
         """
         Search the file store for relevant documents
@@ -56,20 +59,22 @@ class GeminiClient:
         
         try:
             # CORRECTED: Use proper File Search tool configuration
-            response = self.client.models.generate_content(
-                model=self.file_search_model,  # Use dedicated file search model (gemini-2.5-pro)
-                contents=query,
-                config=types.GenerateContentConfig(
-                    tools=[
-                        types.Tool(
-                            file_search=types.FileSearch(
-                                file_search_store_names=[self.store_id]
+            with gemini_slot(self.file_search_model):
+                response = self.client.models.generate_content(
+                    model=self.file_search_model,  # Use dedicated file search model (gemini-2.5-pro)
+                    contents=query,
+                    config=types.GenerateContentConfig(
+                        tools=[
+                            types.Tool(
+                                file_search=types.FileSearch(
+                                    file_search_store_names=[self.store_id]
+                                )
                             )
-                        )
-                    ],
-                    temperature=0.1,  # Low temperature for factual retrieval
+                        ],
+                        temperature=0.1,  # Low temperature for factual retrieval
+                    )
                 )
-            )
+            record_llm_usage(self.file_search_model, getattr(response, "usage_metadata", None), "search_files")
             
             # Extract answer text
             answer_text = response.text if hasattr(response, 'text') else ""
@@ -183,6 +188,7 @@ class GeminiClient:
             logger.error(f"Error searching Gemini File Search: {e}", exc_info=True)
             return []
     
+    @recordable("gemini")
     def search_files_with_sources(
         self, 
         query: str, 
@@ -225,11 +231,14 @@ class GeminiClient:
                 config_params['system_instruction'] = system_instruction
             
             # Make API call
-            response = self.client.models.generate_content(
-                model=self.file_search_model,  # Use dedicated file search model (gemini-2.5-pro)
-                contents=query,
-                config=types.GenerateContentConfig(**config_params)
-            )
+            with gemini_slot(self.file_search_model):
+                response = self.client.models.generate_content(
+                    model=self.file_search_model,  # Use dedicated file search model (gemini-2.5-pro)
+                    contents=query,
+                    config=types.GenerateContentConfig(**config_params)
+                )
+            usage = getattr(response, "usage_metadata", None)
+            record_llm_usage(self.file_search_model, usage, "search_files_with_sources")
             
             # Extract answer text
             answer_text = response.text if hasattr(response, 'text') else ""
@@ -323,7 +332,8 @@ class GeminiClient:
             return {
                 'hits': hits,
                 'gemini_answer': answer_text,
-                'source_documents': source_documents
+                'source_documents': source_documents,
+                'total_tokens': getattr(usage, 'total_token_count', 0) or 0
             }
             
         except Exception as e:
@@ -334,6 +344,22 @@ class GeminiClient:
                 'source_documents': []
             }
 
+    def get_store_fingerprint(self) -> Optional[Tuple]:
+        """
+        (update_time, active document count) of the file search store - changes
+        whenever documents are added/removed. None if the store can't be read.
+        """
+        try:
+            store = self.client.file_search_stores.get(name=self.store_id)
+        except Exception as e:
+            logger.debug(f"Could not read file search store metadata: {e}")
+            return None
+        return (
+            str(getattr(store, 'update_time', '') or ''),
+            getattr(store, 'active_documents_count', None),
+            getattr(store, 'pending_documents_count', None),
+        )
+
 
 # Global client instance
 _client: Dict[str, GeminiClient] = {}
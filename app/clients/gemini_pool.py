@@ -0,0 +1,205 @@
+"""
+Shared Gemini Client Pool
+One process-wide genai.Client (connection reuse) plus a per-model-tier limiter.
+
+Each tier (flash / pro / embedding) gets:
+- a token bucket sized from <TIER>_RPM settings, so bursts queue locally
+  instead of hitting 429s and falling into retry_gemini_call's long sleeps
+- a concurrency cap (max in-flight requests per tier)
+
+Wait time spent in the limiter is tracked per tier so quota pressure is
+visible (see get_limiter_stats / /health/deep) rather than showing up as
+retry storms.
+
+Usage:
+    client = get_genai_client()
+    with gemini_slot(model_name):
+        response = client.models.generate_content(model=model_name, ...)
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Iterator
+
+from google import genai
+
+from app.config.settings import settings
+from app.utils.metrics import histogram, observe_upstream, register_collector
+from app.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+LIMITER_WAIT = histogram("flusso_gemini_limiter_wait_seconds", "Time spent waiting for a Gemini quota slot")
+
+TIERS = ("flash", "pro", "embedding")
+
+
+def tier_for_model(model_name: str) -> str:
+    """Map a Gemini model name to its quota tier."""
+    name = (model_name or "").lower()
+    if "embed" in name:
+        return "embedding"
+    if "pro" in name:
+        return "pro"
+    return "flash"
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate_per_minute` sustained, `burst` capacity."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = max(rate_per_minute, 1) / 60.0  # tokens per second
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                sleep_for = (1 - self.tokens) / self.rate
+            time.sleep(sleep_for)
+            waited += sleep_for
+
+
+class TierLimiter:
+    """Rate + concurrency limiter for one model tier, with wait statistics."""
+
+    def __init__(self, tier: str, rpm: int, max_concurrency: int):
+        self.tier = tier
+        self.rpm = rpm
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rpm, burst=max(1, max_concurrency))
+        self.semaphore = threading.BoundedSemaphore(max(1, max_concurrency))
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        start = time.monotonic()
+        self.semaphore.acquire()
+        try:
+            self.bucket.acquire()
+            waited = time.monotonic() - start
+            self._record_acquire(waited)
+            try:
+                yield waited
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+        finally:
+            self.semaphore.release()
+
+    def _record_acquire(self, waited: float) -> None:
+        with self._stats_lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            if waited >= 0.05:
+                self.throttled += 1
+        if waited >= 1.0:
+            logger.warning(f"[GEMINI_POOL] {self.tier} limiter waited {waited:.2f}s (quota pressure)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "rpm": self.rpm,
+                "max_concurrency": self.max_concurrency,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "in_flight": self.in_flight,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "avg_wait_seconds": round(self.total_wait_seconds / self.requests, 4) if self.requests else 0.0,
+            }
+
+
+# =====================================================
+# GLOBAL REGISTRY
+# =====================================================
+
+_client: Dict[str, genai.Client] = {}
+_limiters: Dict[str, TierLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_genai_client() -> genai.Client:
+    """Get or create the shared genai.Client (reuses its HTTP connection pool)."""
+    if 'instance' not in _client:
+        with _registry_lock:
+            if 'instance' not in _client:
+                if not settings.gemini_api_key:
+                    raise ValueError("GEMINI_API_KEY not configured")
+                _client['instance'] = genai.Client(api_key=settings.gemini_api_key)
+                logger.info("[GEMINI_POOL] Shared Gemini client initialized")
+    return _client['instance']
+
+
+def get_limiter(model_name: str) -> TierLimiter:
+    """Get the limiter for the tier a model belongs to."""
+    tier = tier_for_model(model_name)
+    if tier not in _limiters:
+        with _registry_lock:
+            if tier not in _limiters:
+                rpm = getattr(settings, f"gemini_{tier}_rpm")
+                concurrency = getattr(settings, f"gemini_{tier}_max_concurrency")
+                _limiters[tier] = TierLimiter(tier, rpm, concurrency)
+                logger.info(f"[GEMINI_POOL] {tier} limiter: {rpm} rpm, {concurrency} concurrent")
+    return _limiters[tier]
+
+
+@contextmanager
+def gemini_slot(model_name: str) -> Iterator[float]:
+    """
+    Hold a rate-limited slot for one Gemini request on `model_name`.
+    Yields the seconds spent waiting for the slot.
+    """
+    tier = tier_for_model(model_name)
+    if settings.gemini_rate_limit_enabled:
+        limiter_ctx = get_limiter(model_name).slot()
+    else:
+        limiter_ctx = nullcontext(0.0)
+
+    with limiter_ctx as waited, span("gemini.generate", kind="client", model=model_name, tier=tier) as active:
+        LIMITER_WAIT.observe(waited, tier=tier)
+        if active is not None:
+            active.set_attribute("limiter_wait_seconds", round(waited, 4))
+        start = time.perf_counter()
+        status = "error"
+        try:
+            yield waited
+            status = "ok"
+        finally:
+            observe_upstream(f"gemini_{tier}", time.perf_counter() - start, status)
+
+
+def get_limiter_stats() -> Dict[str, Any]:
+    """Per-tier limiter statistics (requests, throttled count, wait time)."""
+    return {tier: limiter.stats() for tier, limiter in _limiters.items()}
+
+
+def _collect_limiter_metrics():
+    for tier, stats in get_limiter_stats().items():
+        labels = {"tier": tier}
+        yield ("flusso_gemini_limiter_requests_total", "counter", "Requests admitted by the Gemini limiter", labels, stats["requests"])
+        yield ("flusso_gemini_limiter_throttled_total", "counter", "Requests that had to wait for a quota slot", labels, stats["throttled"])
+        yield ("flusso_gemini_limiter_in_flight", "gauge", "Gemini requests currently in flight", labels, stats["in_flight"])
+
+
+register_collector(_collect_limiter_metrics)
@@ -1,20 +1,293 @@
 """
 LLM Client for Gemini API Calls
 Handles structured LLM requests with JSON responses
+
+Streaming mode (stream_json / stream_sections):
+- stream_json parses the JSON object incrementally and returns as soon as the
+  required top-level keys (e.g. action + action_input) are complete, closing
+  the stream instead of waiting for the full generation
+- stream_sections emits "## " sections of a long markdown draft as they finish
+
+Model routing (task=...):
+- callers declare a task class (routing, verify, plan, react_step, draft); the
+  router starts at the cheapest tier MODEL_ROUTER_POLICY allows for it
+  (lite = LLM_MODEL_LITE, flash = LLM_MODEL, pro = LLM_MODEL_PRO)
+- complex tickets start one tier up for MODEL_ROUTER_COMPLEX_TASKS
+- a parse failure or a "confidence" below MODEL_ROUTER_MIN_CONFIDENCE is
+  retried one tier up (at most MODEL_ROUTER_MAX_ESCALATIONS times)
+- latency, estimated cost and escalations are recorded per task and tier
+  (flusso_llm_router_* metrics, get_router_stats())
+Calls without a task use LLM_MODEL, as before.
+
+Response cache: every attempt of a task whose call site has a TTL in
+LLM_CACHE_TTLS goes through llm_response_cache first (see that module).
 """
 
 import logging
 import json
-from typing import Dict, Any, Optional
-from google import genai
+import time
+import threading
+from typing import Dict, Any, Optional, Callable, Iterable, List, Tuple
 from google.genai import types
 
 from app.config.settings import settings
+from app.clients.gemini_pool import get_genai_client, gemini_slot
 from app.utils.retry import retry_gemini_call
+from app.utils.metrics import record_llm_usage, counter, histogram
+from app.utils.replay import recordable
+from app.clients.llm_response_cache import get_llm_response_cache, cache_key
 
 logger = logging.getLogger(__name__)
 
 
+class IncrementalJSONParser:
+    """
+    Incremental parser for a single top-level JSON object.
+    
+    feed() text chunks as they stream in; every top-level field whose value is
+    syntactically complete is decoded into `fields` immediately, so callers
+    can act on e.g. "action" / "action_input" before the object is closed.
+    """
+    
+    def __init__(self):
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._expect_key = True
+    
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Consume a chunk and return the fields completed so far."""
+        self.buffer += chunk
+        buf = self.buffer
+        
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key and self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:self._pos + 1])
+                        self._key_start = None
+                    elif self._depth == 1 and self._value_start is not None:
+                        self._complete_value(self._pos + 1)
+                self._pos += 1
+                continue
+            
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = self._pos
+                elif self._depth == 1 and self._value_start is None:
+                    self._value_start = self._pos
+            elif ch in "{[":
+                if self._depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = self._pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._complete_value(self._pos + 1)
+                elif self._depth == 0 and self._value_start is not None:
+                    self._complete_value(self._pos)  # primitive value closed by "}"
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    if self._value_start is not None:
+                        self._complete_value(self._pos)
+                    self._expect_key = True
+                elif not ch.isspace() and not self._expect_key and self._value_start is None:
+                    self._value_start = self._pos  # number / true / false / null
+            self._pos += 1
+        
+        return self.fields
+    
+    def _complete_value(self, end: int) -> None:
+        raw = self.buffer[self._value_start:end].strip()
+        self._value_start = None
+        if self._key is None or not raw:
+            return
+        try:
+            self.fields[self._key] = json.loads(raw)
+        except json.JSONDecodeError:
+            pass
+        self._key = None
+    
+    def has(self, keys: Iterable[str]) -> bool:
+        return all(k in self.fields for k in keys)
+
+
+def split_markdown_sections(text: str) -> List[Tuple[str, str]]:
+    """Split markdown into (header, body) pairs on "## " headers."""
+    sections: List[Tuple[str, str]] = []
+    header, body = "", []
+    for line in text.splitlines():
+        if line.startswith("## "):
+            if header or any(l.strip() for l in body):
+                sections.append((header, "\n".join(body).strip()))
+            header, body = line[3:].strip(), []
+        else:
+            body.append(line)
+    if header or any(l.strip() for l in body):
+        sections.append((header, "\n".join(body).strip()))
+    return sections
+
+
+def _replay_sections(result: Tuple[str, Dict[str, Any]], args: tuple, kwargs: dict) -> None:
+    """Replay of stream_sections: deliver the recorded sections to on_section."""
+    on_section = kwargs.get("on_section") or (args[3] if len(args) > 3 else None)
+    if not on_section:
+        return
+    for header, body in split_markdown_sections(result[0]):
+        try:
+            on_section(header, body)
+        except Exception as cb_error:
+            logger.warning(f"on_section callback failed: {cb_error}")
+
+
+# =====================================================
+# MODEL ROUTER
+# =====================================================
+TASK_CLASSES = ("routing", "verify", "plan", "react_step", "draft")
+MODEL_TIERS = ("lite", "flash", "pro")
+
+# USD per 1M tokens (input, output) - list prices, only used for cost reporting
+TIER_PRICES_PER_MTOK = {"lite": (0.10, 0.40), "flash": (0.30, 2.50), "pro": (1.25, 10.00)}
+
+LLM_ROUTER_CALLS = counter("flusso_llm_router_calls_total", "Routed LLM calls by task, tier and outcome")
+LLM_ROUTER_SECONDS = histogram("flusso_llm_router_seconds", "Routed LLM call latency by task and tier")
+LLM_ROUTER_COST = counter("flusso_llm_router_cost_usd_total", "Estimated routed LLM cost by task and tier")
+LLM_ROUTER_ESCALATIONS = counter("flusso_llm_router_escalations_total", "Escalations to a stronger tier by task and reason")
+
+# usage_metadata of the last generate call on this thread (for per-tier cost)
+_usage_local = threading.local()
+
+
+def _parse_task_list(spec: str) -> Dict[str, str]:
+    """"routing=lite,plan=flash" -> {"routing": "lite", "plan": "flash"}; bare names map to ""."""
+    parsed = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip():
+            parsed[name.strip()] = value.strip().lower()
+    return parsed
+
+
+def _response_confidence(response: Dict[str, Any]) -> Optional[float]:
+    """Lowest self-reported confidence in a JSON answer (top level or one section down)."""
+    values = []
+    for section in [response] + [v for v in response.values() if isinstance(v, dict)]:
+        for key in ("confidence", "overall_confidence"):
+            value = section.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values.append(float(value))
+    return min(values) if values else None
+
+
+def _escalation_reason(result: Any, kind: str, required: Tuple[str, ...] = ()) -> Optional[str]:
+    """Why a tier's answer is not good enough, or None."""
+    if kind in ("json", "stream_json"):
+        fields = result[0] if kind == "stream_json" and isinstance(result, tuple) else result
+        if not isinstance(fields, dict) or not fields or any(k not in fields for k in required):
+            return "parse_failure"
+        confidence = _response_confidence(fields)
+        if confidence is not None and confidence < settings.model_router_min_confidence:
+            return "low_confidence"
+        return None
+    text = result[0] if isinstance(result, tuple) else result
+    if not isinstance(text, str) or not text.strip() or text.startswith("Error:"):
+        return "parse_failure"
+    return None
+
+
+class ModelRouter:
+    """Picks the model tier per task class and keeps per-tier latency / cost / escalation stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def model_for(tier: str) -> str:
+        return {"lite": settings.llm_model_lite, "pro": settings.llm_model_pro}.get(tier, settings.llm_model)
+
+    @staticmethod
+    def next_tier(tier: str) -> Optional[str]:
+        index = MODEL_TIERS.index(tier)
+        return MODEL_TIERS[index + 1] if index + 1 < len(MODEL_TIERS) else None
+
+    def start_tier(self, task: str, complexity: Optional[str] = None) -> Tuple[str, str]:
+        """(tier, why) for the first attempt."""
+        tier = _parse_task_list(settings.model_router_policy).get(task) or "flash"
+        if tier not in MODEL_TIERS:
+            tier = "flash"
+        if complexity == "complex" and task in _parse_task_list(settings.model_router_complex_tasks):
+            return self.next_tier(tier) or tier, "complex"
+        return tier, "policy"
+
+    def record(self, task: str, tier: str, seconds: float, usage: Any, outcome: str) -> None:
+        cost = 0.0
+        if usage is not None:
+            prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+            output_tokens = (getattr(usage, "candidates_token_count", 0) or 0) + (getattr(usage, "thoughts_token_count", 0) or 0)
+            price_in, price_out = TIER_PRICES_PER_MTOK.get(tier, (0.0, 0.0))
+            cost = (prompt_tokens * price_in + output_tokens * price_out) / 1_000_000
+        LLM_ROUTER_CALLS.inc(task=task, tier=tier, outcome=outcome)
+        LLM_ROUTER_SECONDS.observe(seconds, task=task, tier=tier)
+        if cost:
+            LLM_ROUTER_COST.inc(cost, task=task, tier=tier)
+        with self._lock:
+            stats = self._stats.setdefault(f"{task}:{tier}", {"calls": 0, "seconds": 0.0, "cost_usd": 0.0, "escalated": 0, "errors": 0})
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["cost_usd"] += cost
+            stats["escalated"] += outcome == "escalated"
+            stats["errors"] += outcome == "error"
+
+    def stats(self) -> Dict[str, Any]:
+        """Per task:tier calls, mean latency, cost and escalation rate (for tuning the policy)."""
+        with self._lock:
+            return {
+                key: {
+                    "calls": int(s["calls"]),
+                    "mean_seconds": round(s["seconds"] / s["calls"], 3) if s["calls"] else 0.0,
+                    "cost_usd": round(s["cost_usd"], 5),
+                    "escalation_rate": round(s["escalated"] / s["calls"], 4) if s["calls"] else 0.0,
+                    "errors": int(s["errors"]),
+                }
+                for key, s in sorted(self._stats.items())
+            }
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Get or create the model router singleton."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
+
+
+def get_router_stats() -> Dict[str, Any]:
+    return get_model_router().stats() if _router is not None else {}
+
+
 class LLMClient:
     """
     Client for Google Gemini LLM API.
@@ -26,21 +299,89 @@ class LLMClient:
         if not settings.gemini_api_key:
             raise ValueError("GEMINI_API_KEY not configured")
         
-        self.client = genai.Client(api_key=settings.gemini_api_key)
+        self.client = get_genai_client()
         self.model_name = settings.llm_model
         self.temperature = settings.llm_temperature
         self.max_tokens = settings.llm_max_tokens
         
         logger.info(f"LLM client initialized with model: {self.model_name}, max_tokens: {self.max_tokens}")
     
-    @retry_gemini_call
+    def _routed(
+        self,
+        task: Optional[str],
+        complexity: Optional[str],
+        attempt: Callable[[str], Any],
+        kind: str,
+        required: Tuple[str, ...] = (),
+        cache_inputs: Optional[Tuple[Any, ...]] = None,
+        bypass_cache: bool = False,
+        on_cache_hit: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """
+        Run attempt(model) on the routed tier, escalating one tier at a time on a bad answer.
+        With cache_inputs (temperature, system_prompt, user_prompt, variant) each
+        attempt goes through the LLM response cache for the task's call site.
+        """
+        cache = get_llm_response_cache()
+        if cache_inputs is not None and cache.active(task, bypass_cache):
+            uncached = attempt
+            
+            def attempt(model: str) -> Any:
+                key = cache_key(task, model, *cache_inputs)
+                hit, cached = cache.get(task, key)
+                if hit:
+                    return on_cache_hit(cached) if on_cache_hit else cached
+                start = time.perf_counter()
+                answer = uncached(model)
+                # Streams return (result, timing); a truncated stream is never cached
+                truncated = isinstance(answer, tuple) and bool(answer[-1].get("truncated"))
+                if not truncated and _escalation_reason(answer, kind, required) != "parse_failure":
+                    cache.put(task, key, answer, time.perf_counter() - start)
+                return answer
+        
+        if not task or not settings.model_router_enabled:
+            return attempt(self.model_name)
+        
+        router = get_model_router()
+        tier, why = router.start_tier(task, complexity)
+        result = None
+        for escalations in range(settings.model_router_max_escalations + 1):
+            _usage_local.usage = None
+            start = time.perf_counter()
+            try:
+                answer = attempt(router.model_for(tier))
+            except Exception as e:
+                router.record(task, tier, time.perf_counter() - start, _usage_local.usage, "error")
+                if result is None:
+                    raise
+                logger.warning(f"⚠️ Router: {task} escalation to {tier} failed, keeping previous answer: {e}")
+                return result
+            seconds = time.perf_counter() - start
+            
+            result = answer
+            reason = _escalation_reason(answer, kind, required)
+            stronger = router.next_tier(tier)
+            if reason and stronger and escalations < settings.model_router_max_escalations:
+                router.record(task, tier, seconds, _usage_local.usage, "escalated")
+                LLM_ROUTER_ESCALATIONS.inc(task=task, reason=reason, to_tier=stronger)
+                logger.info(f"🔼 Router: {task} {tier} → {stronger} ({reason})")
+                tier = stronger
+                continue
+            router.record(task, tier, seconds, _usage_local.usage, "unresolved" if reason else "ok")
+            logger.debug(f"Router: {task} answered by {tier} ({why}, {escalations} escalation(s))")
+            break
+        return result
+    
     def call_llm(
         self,
         system_prompt: str,
         user_prompt: str,
         response_format: Optional[str] = None,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        task: Optional[str] = None,
+        complexity: Optional[str] = None,
+        bypass_cache: bool = False
     ) -> Any:
         """
         Call the LLM with prompts
@@ -51,17 +392,42 @@ class LLMClient:
             response_format: If "json", expects and parses JSON response
             temperature: Override default temperature
             max_tokens: Override default max tokens
+            task: Task class for model routing (routing, verify, plan, react_step, draft)
+            complexity: Ticket complexity from the plan ("complex" may start a tier up)
+            bypass_cache: Skip the LLM response cache for this call
             
         Returns:
             Parsed JSON dict if response_format="json", otherwise raw text
         """
         temp = temperature if temperature is not None else self.temperature
+        return self._routed(
+            task, complexity,
+            lambda model: self._call_llm(system_prompt, user_prompt, response_format, temperature, max_tokens, model=model),
+            "json" if response_format == "json" else "text",
+            cache_inputs=(temp, system_prompt, user_prompt, (response_format, max_tokens or self.max_tokens)),
+            bypass_cache=bypass_cache,
+        )
+    
+    @recordable("gemini", operation="call_llm")
+    @retry_gemini_call
+    def _call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        response_format: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> Any:
+        """One generate_content call on `model` (default LLM_MODEL)."""
+        temp = temperature if temperature is not None else self.temperature
         max_tok = max_tokens if max_tokens is not None else self.max_tokens
+        model_name = model or self.model_name
         
         # Combine prompts
         full_prompt = f"{system_prompt}\n\n{user_prompt}"
         
-        logger.info(f"📤 LLM Request: model={self.model_name}, temperature={temp}, max_tokens={max_tok}")
+        logger.info(f"📤 LLM Request: model={model_name}, temperature={temp}, max_tokens={max_tok}")
         logger.debug(f"📤 Prompt length: {len(full_prompt)} chars")
         
         try:
@@ -76,12 +442,13 @@ class LLMClient:
             if response_format == "json":
                 config.response_mime_type = "application/json"
             
-            # Generate content
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=full_prompt,
-                config=config
-            )
+            # Generate content (rate-limited per model tier)
+            with gemini_slot(model_name):
+                response = self.client.models.generate_content(
+                    model=model_name,
+                    contents=full_prompt,
+                    config=config
+                )
             
             # === DETAILED RESPONSE DEBUGGING ===
             finish_reason = None
@@ -107,6 +474,8 @@ class LLMClient:
             if hasattr(response, 'usage_metadata'):
                 usage = response.usage_metadata
                 if usage:
+                    _usage_local.usage = usage
+                    record_llm_usage(model_name, usage, "call_llm")
                     prompt_tokens = getattr(usage, 'prompt_token_count', 'N/A')
                     output_tokens = getattr(usage, 'candidates_token_count', 'N/A')
                     total_tokens = getattr(usage, 'total_token_count', 'N/A')
@@ -178,6 +547,257 @@ class LLMClient:
                 return {}
             return f"Error: {str(e)}"
     
+    # ---------------------------------------------------------
+    # Streaming
+    # ---------------------------------------------------------
+    def _build_config(self, temperature: float, max_tokens: int, response_format: Optional[str]):
+        config = types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            top_p=0.95,
+        )
+        if response_format == "json":
+            config.response_mime_type = "application/json"
+        return config
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        try:
+            return chunk.text or ""
+        except (ValueError, AttributeError):
+            return ""
+    
+    def stream_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        required_keys: Iterable[str] = ("action", "action_input"),
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        task: Optional[str] = None,
+        complexity: Optional[str] = None,
+        bypass_cache: bool = False
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Stream a JSON response and return as soon as `required_keys` are complete.
+        task / complexity / bypass_cache as in call_llm; a cache hit returns
+        zero timings with timing["cached"] = True.
+        
+        Returns:
+            (parsed_fields, timing) where timing has time_to_first_token,
+            time_to_first_action (required keys complete), total and early_stop.
+            parsed_fields is {} if the stream never produced valid JSON.
+        """
+        required = tuple(required_keys)
+        temp = temperature if temperature is not None else self.temperature
+        return self._routed(
+            task, complexity,
+            lambda model: self._stream_json(system_prompt, user_prompt, required, temperature, max_tokens, model=model),
+            "stream_json", required,
+            cache_inputs=(temp, system_prompt, user_prompt, ("stream_json", required, max_tokens or self.max_tokens)),
+            bypass_cache=bypass_cache,
+            on_cache_hit=lambda cached: (cached[0], {
+                "time_to_first_token": 0.0, "time_to_first_action": 0.0, "total": 0.0, "early_stop": False, "cached": True,
+            }),
+        )
+    
+    @recordable("gemini", operation="stream_json")
+    @retry_gemini_call
+    def _stream_json(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        required_keys: Iterable[str] = ("action", "action_input"),
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        temp = temperature if temperature is not None else self.temperature
+        max_tok = max_tokens if max_tokens is not None else self.max_tokens
+        required = tuple(required_keys)
+        model_name = model or self.model_name
+        
+        logger.info(f"📤 LLM Stream Request: model={model_name}, temperature={temp}, wait_for={list(required)}")
+        
+        parser = IncrementalJSONParser()
+        timing: Dict[str, Any] = {
+            "time_to_first_token": None,
+            "time_to_first_action": None,
+            "total": None,
+            "early_stop": False,
+        }
+        start = time.time()
+        
+        usage = None
+        try:
+            with gemini_slot(model_name):
+                stream = self.client.models.generate_content_stream(
+                    model=model_name,
+                    contents=f"{system_prompt}\n\n{user_prompt}",
+                    config=self._build_config(temp, max_tok, "json")
+                )
+                try:
+                    for chunk in stream:
+                        usage = getattr(chunk, "usage_metadata", None) or usage
+                        text = self._chunk_text(chunk)
+                        if not text:
+                            continue
+                        if timing["time_to_first_token"] is None:
+                            timing["time_to_first_token"] = time.time() - start
+                        parser.feed(text)
+                        if required and parser.has(required):
+                            timing["time_to_first_action"] = time.time() - start
+                            timing["early_stop"] = True
+                            break
+                finally:
+                    # Closing the generator drops the HTTP stream early
+                    close = getattr(stream, "close", None)
+                    if close:
+                        close()
+                    _usage_local.usage = usage
+                    record_llm_usage(model_name, usage, "stream_json")
+        except Exception as e:
+            error_str = str(e).lower()
+            logger.error(f"❌ Error streaming LLM: {e}", exc_info=True)
+            if any(indicator in error_str for indicator in ["429", "503", "resource_exhausted", "quota", "rate", "overloaded", "unavailable"]):
+                raise
+            timing["total"] = time.time() - start
+            return {}, timing
+        
+        timing["total"] = time.time() - start
+        fields = dict(parser.fields)
+        
+        if not timing["early_stop"]:
+            # Stream ended without the keys completing incrementally - parse whole buffer
+            try:
+                parsed = json.loads(parser.buffer) if parser.buffer.strip() else {}
+                if isinstance(parsed, dict):
+                    fields = parsed
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse streamed JSON: {e}")
+                logger.error(f"Raw response: {parser.buffer}")
+            if required and all(k in fields for k in required):
+                timing["time_to_first_action"] = timing["total"]
+        
+        logger.info(
+            f"📥 LLM Stream: first_token={timing['time_to_first_token'] or 0:.2f}s, "
+            f"first_action={timing['time_to_first_action'] or 0:.2f}s, total={timing['total']:.2f}s, "
+            f"early_stop={timing['early_stop']}"
+        )
+        return fields, timing
+    
+    def stream_sections(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        on_section: Optional[Callable[[str, str], None]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        task: Optional[str] = None,
+        complexity: Optional[str] = None,
+        bypass_cache: bool = False
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Stream a long markdown response, calling on_section(header, body) as each
+        "## " section completes (the next header arrives or the stream ends).
+        task / complexity / bypass_cache as in call_llm. Rate-limit errors are
+        retried only until the first section was emitted; after that the partial
+        text is returned (timing["truncated"] = True) so sections are never
+        emitted twice. Only a failed, empty stream escalates. A cache hit
+        delivers the cached sections to on_section.
+        
+        Returns:
+            (full_text, timing) with time_to_first_token, time_to_first_section and total
+        """
+        temp = temperature if temperature is not None else self.temperature
+        
+        def _cached_sections(cached: Tuple[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+            _replay_sections(cached, (), {"on_section": on_section})
+            return cached[0], {"time_to_first_token": 0.0, "time_to_first_section": 0.0, "total": 0.0, "cached": True}
+        
+        return self._routed(
+            task, complexity,
+            lambda model: self._stream_sections(system_prompt, user_prompt, on_section, temperature, max_tokens, model=model),
+            "text",
+            cache_inputs=(temp, system_prompt, user_prompt, ("sections", max_tokens or self.max_tokens)),
+            bypass_cache=bypass_cache,
+            on_cache_hit=_cached_sections,
+        )
+    
+    @recordable("gemini", operation="stream_sections", on_replay=_replay_sections)
+    @retry_gemini_call
+    def _stream_sections(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        on_section: Optional[Callable[[str, str], None]] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        model: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        temp = temperature if temperature is not None else self.temperature
+        max_tok = max_tokens if max_tokens is not None else self.max_tokens
+        model_name = model or self.model_name
+        
+        logger.info(f"📤 LLM Stream Request (sections): model={model_name}, temperature={temp}")
+        
+        timing: Dict[str, Any] = {"time_to_first_token": None, "time_to_first_section": None, "total": None}
+        start = time.time()
+        text = ""
+        emitted = 0
+        
+        def _emit(sections: List[Tuple[str, str]]) -> None:
+            if timing["time_to_first_section"] is None and sections:
+                timing["time_to_first_section"] = time.time() - start
+            if on_section:
+                for header, body in sections:
+                    try:
+                        on_section(header, body)
+                    except Exception as cb_error:
+                        logger.warning(f"on_section callback failed: {cb_error}")
+        
+        usage = None
+        try:
+            with gemini_slot(model_name):
+                for chunk in self.client.models.generate_content_stream(
+                    model=model_name,
+                    contents=f"{system_prompt}\n\n{user_prompt}",
+                    config=self._build_config(temp, max_tok, None)
+                ):
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    piece = self._chunk_text(chunk)
+                    if not piece:
+                        continue
+                    if timing["time_to_first_token"] is None:
+                        timing["time_to_first_token"] = time.time() - start
+                    text += piece
+                    
+                    # Every section except the last one is final
+                    sections = split_markdown_sections(text)
+                    if len(sections) - 1 > emitted:
+                        _emit(sections[emitted:-1])
+                        emitted = len(sections) - 1
+        except Exception as e:
+            error_str = str(e).lower()
+            logger.error(f"❌ Error streaming LLM: {e}", exc_info=True)
+            # A retry replays the whole stream: only safe before any section reached on_section
+            if not emitted and any(indicator in error_str for indicator in ["429", "503", "resource_exhausted", "quota", "rate", "overloaded", "unavailable"]):
+                raise
+            if not text:
+                timing["total"] = time.time() - start
+                return f"Error: {str(e)}", timing
+            timing["truncated"] = True
+        
+        _usage_local.usage = usage
+        record_llm_usage(model_name, usage, "stream_sections")
+        _emit(split_markdown_sections(text)[emitted:])
+        timing["total"] = time.time() - start
+        logger.info(
+            f"📥 LLM Stream: {len(text)} chars, first_token={timing['time_to_first_token'] or 0:.2f}s, "
+            f"first_section={timing['time_to_first_section'] or 0:.2f}s, total={timing['total']:.2f}s"
+        )
+        return text, timing
+    
     def generate_with_context(
         self,
         system_prompt: str,
@@ -226,7 +846,9 @@ def call_llm(
     system_prompt: str,
     user_prompt: str,
     response_format: Optional[str] = None,
-    temperature: Optional[float] = None
+    temperature: Optional[float] = None,
+    task: Optional[str] = None,
+    complexity: Optional[str] = None
 ) -> Any:
     """
     Convenience function to call LLM
@@ -236,9 +858,37 @@ def call_llm(
         user_prompt: User content
         response_format: "json" for JSON response
         temperature: Override default temperature
+        task: Task class for model routing
+        complexity: Ticket complexity ("complex" may start a tier up)
         
     Returns:
         LLM response
     """
     client = get_llm_client()
-    return client.call_llm(system_prompt, user_prompt, response_format, temperature)
+    return client.call_llm(system_prompt, user_prompt, response_format, temperature, task=task, complexity=complexity)
+
+
+def stream_sections(
+    system_prompt: str,
+    user_prompt: str,
+    on_section: Optional[Callable[[str, str], None]] = None,
+    temperature: Optional[float] = None,
+    task: Optional[str] = None,
+    complexity: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Convenience function to stream a sectioned (markdown) LLM response
+    
+    Args:
+        system_prompt: System instructions
+        user_prompt: User content
+        on_section: Called with (header, body) as each "## " section completes
+        temperature: Override default temperature
+        task: Task class for model routing
+        complexity: Ticket complexity ("complex" may start a tier up)
+        
+    Returns:
+        (full_text, timing)
+    """
+    client = get_llm_client()
+    return client.stream_sections(system_prompt, user_prompt, on_section, temperature, task=task, complexity=complexity)
@@ -0,0 +1,200 @@
+"""
+LLM Response Cache - disk-backed cache for repeatable LLM calls
+Many calls are pure functions of their prompt: routing of templated
+auto-replies / POs, fact verification of the same extracted codes, ReACT
+steps and drafts when a ticket is reprocessed with unchanged state
+(/debug/process, dry runs).
+
+Key:   call site (task class) + model + temperature + response format /
+       required keys + max_tokens + sha256(system prompt) + sha256(user prompt)
+Store: diskcache (SQLite) in LLM_CACHE_DIR with least-recently-used eviction
+       at LLM_CACHE_SIZE_MB - shared by the workers of one pod
+TTL:   per call site from LLM_CACHE_TTLS; call sites without a TTL are never
+       cached (opt-in)
+
+Bypass:
+- bypass_cache=True on the call
+- `with llm_cache_bypass():` for everything in the block (/debug/process?no_cache=true)
+- always in RECORD mode, so every call lands in the cassette
+
+Only usable answers are stored (no empty / unparseable / "Error:" results).
+Store errors fail open: the call goes to Gemini.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, Iterator
+
+from app.config.settings import settings
+from app.utils.metrics import counter, register_collector
+from app.utils.replay import replay_mode
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_LOOKUPS = counter("flusso_llm_cache_lookups_total", "LLM response cache lookups by call site and result")
+LLM_CACHE_SAVED_SECONDS = counter("flusso_llm_cache_saved_seconds_total", "LLM latency avoided by response cache hits")
+
+_MISSING = object()
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def llm_cache_bypass(enabled: bool = True) -> Iterator[None]:
+    """Skip the response cache (lookups and stores) for calls made inside the block."""
+    token = _bypass.set(enabled or _bypass.get())
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def cache_key(call_site: str, model: str, temperature: Any, system_prompt: str, user_prompt: str, variant: Any = None) -> str:
+    """Stable key; `variant` covers output-shaping args (response format, required keys, max_tokens)."""
+    blob = json.dumps([model, temperature, variant, _sha(system_prompt), _sha(user_prompt)], sort_keys=True, default=str)
+    return f"llm:{call_site}:{hashlib.sha256(blob.encode('utf-8')).hexdigest()}"
+
+
+class LLMResponseCache:
+    """diskcache-backed LRU of LLM results with per-call-site TTLs."""
+
+    def __init__(self, directory: str, size_limit_mb: int):
+        self.directory = directory
+        self.size_limit_mb = size_limit_mb
+        self._cache = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _store(self):
+        if self._cache is None and not self._failed:
+            with self._lock:
+                if self._cache is None and not self._failed:
+                    try:
+                        from diskcache import Cache
+                        self._cache = Cache(
+                            self.directory,
+                            size_limit=self.size_limit_mb * 1024 * 1024,
+                            eviction_policy="least-recently-used",
+                        )
+                        logger.info(f"[LLM_CACHE] Using {self.directory} ({self.size_limit_mb} MB LRU)")
+                    except Exception as e:
+                        self._failed = True
+                        logger.warning(f"[LLM_CACHE] Disabled - cannot open {self.directory}: {e}")
+        return self._cache
+
+    @staticmethod
+    def ttl_for(call_site: Optional[str]) -> Optional[float]:
+        """TTL in seconds for a call site, or None when it is not cached."""
+        if not call_site:
+            return None
+        for item in (settings.llm_cache_ttls or "").split(","):
+            name, _, value = item.partition("=")
+            if name.strip() == call_site:
+                try:
+                    ttl = float(value)
+                except ValueError:
+                    return None
+                return ttl if ttl > 0 else None
+        return None
+
+    def active(self, call_site: Optional[str], bypass: bool = False) -> bool:
+        return (
+            settings.llm_cache_enabled
+            and not bypass
+            and not _bypass.get()
+            and replay_mode() != "record"
+            and self.ttl_for(call_site) is not None
+        )
+
+    def _count(self, call_site: str, result: str, saved: float = 0.0) -> None:
+        if result != "stored":
+            LLM_CACHE_LOOKUPS.inc(call_site=call_site, result=result)
+        if saved:
+            LLM_CACHE_SAVED_SECONDS.inc(saved, call_site=call_site)
+        with self._lock:
+            stats = self._stats.setdefault(call_site, {"hit": 0, "miss": 0, "stored": 0, "saved_seconds": 0.0})
+            stats[result] = stats.get(result, 0) + 1
+            stats["saved_seconds"] += saved
+
+    def get(self, call_site: str, key: str) -> Tuple[bool, Any]:
+        """(hit, result)."""
+        store = self._store()
+        if store is None:
+            return False, None
+        try:
+            entry = store.get(key, default=_MISSING)
+        except Exception as e:
+            logger.warning(f"[LLM_CACHE] Lookup failed, calling the model: {e}")
+            return False, None
+        if entry is _MISSING:
+            self._count(call_site, "miss")
+            return False, None
+        self._count(call_site, "hit", entry.get("latency", 0.0))
+        logger.info(f"[LLM_CACHE] ⚡ {call_site} hit - saved ~{entry.get('latency', 0.0):.1f}s")
+        return True, entry["result"]
+
+    def put(self, call_site: str, key: str, result: Any, latency: float) -> None:
+        ttl = self.ttl_for(call_site)
+        store = self._store()
+        if store is None or ttl is None:
+            return
+        try:
+            store.set(key, {"result": result, "latency": latency}, expire=ttl)
+            self._count(call_site, "stored")
+        except Exception as e:
+            logger.warning(f"[LLM_CACHE] Store failed: {e}")
+
+    def clear(self) -> int:
+        store = self._store()
+        if store is None:
+            return 0
+        removed = store.clear()
+        logger.info(f"[LLM_CACHE] 🧹 Cleared {removed} entries")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        store = self._store() if settings.llm_cache_enabled else self._cache
+        with self._lock:
+            per_site = {site: dict(s) for site, s in sorted(self._stats.items())}
+        for s in per_site.values():
+            lookups = s.get("hit", 0) + s.get("miss", 0)
+            s["hit_rate"] = round(s.get("hit", 0) / lookups, 4) if lookups else 0.0
+            s["saved_seconds"] = round(s["saved_seconds"], 2)
+        return {
+            "enabled": settings.llm_cache_enabled,
+            "directory": self.directory,
+            "entries": len(store) if store is not None else 0,
+            "volume_bytes": store.volume() if store is not None else 0,
+            "call_sites": per_site,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Get or create the LLM response cache singleton."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(settings.llm_cache_dir, settings.llm_cache_size_mb)
+    return _cache
+
+
+def _collect_llm_cache_metrics():
+    if _cache is None or _cache._cache is None:
+        return []
+    return [("flusso_llm_cache_entries", "gauge", "LLM response cache entries", {}, len(_cache._cache))]
+
+
+register_collector(_collect_llm_cache_metrics)
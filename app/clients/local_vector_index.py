@@ -0,0 +1,476 @@
+"""
+Local Vector Index - Offline stand-in for Pinecone
+Memory-mapped NumPy matrices with exact (BLAS) search for small corpora and an
+optional HNSW index (hnswlib) for large ones.
+
+Exposes the same `.query(vector, top_k, include_metadata, filter)` surface as a
+Pinecone `Index`, so PineconeClient can swap it in per index:
+  - as a latency-optimized on-pod cache of the image index
+  - as the test double for benchmarks / offline runs
+
+On-disk layout (one directory per index):
+    <root>/<index_name>/vectors.npy     float32 [N, D], L2-normalized (memory-mapped)
+    <root>/<index_name>/records.json    {"dimension": D, "metric": "cosine",
+                                         "ids": [...], "metadata": [...]}
+    <root>/<index_name>/hnsw.bin        optional, built lazily when N >= ann_threshold
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.json"
+HNSW_FILE = "hnsw.bin"
+
+# ANN results are post-filtered, so over-fetch to keep enough survivors
+ANN_OVERFETCH = 4
+
+# upsert() writes into a preallocated matrix that grows geometrically
+# (amortized O(rows added) instead of copying all N rows per call)
+GROWTH_FACTOR = 1.5
+MIN_CAPACITY = 1024
+
+
+@dataclass
+class LocalMatch:
+    """Mirrors pinecone ScoredVector (id / score / metadata)"""
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LocalQueryResponse:
+    """Mirrors pinecone QueryResponse (.matches)"""
+    matches: List[LocalMatch] = field(default_factory=list)
+    namespace: str = ""
+
+
+# ---------------------------------------------------------
+# Metadata filtering (Pinecone filter_dict semantics)
+# ---------------------------------------------------------
+def _match_condition(value: Any, condition: Any) -> bool:
+    """Evaluate one field condition, e.g. {"$in": [...]} or a bare value ($eq)."""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+
+    for op, expected in condition.items():
+        if op == "$eq":
+            # Pinecone matches list-valued metadata if any element equals
+            ok = expected in value if isinstance(value, list) else value == expected
+        elif op == "$ne":
+            ok = expected not in value if isinstance(value, list) else value != expected
+        elif op == "$in":
+            ok = (any(v in expected for v in value) if isinstance(value, list)
+                  else value in expected)
+        elif op == "$nin":
+            ok = (not any(v in expected for v in value) if isinstance(value, list)
+                  else value not in expected)
+        elif op == "$exists":
+            ok = (value is not None) == bool(expected)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return False
+            ok = {
+                "$gt": value > expected,
+                "$gte": value >= expected,
+                "$lt": value < expected,
+                "$lte": value <= expected,
+            }[op]
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+
+        if not ok:
+            return False
+    return True
+
+
+def matches_filter(metadata: Dict[str, Any], filter_dict: Optional[Dict[str, Any]]) -> bool:
+    """Return True if metadata satisfies a Pinecone-style filter_dict."""
+    if not filter_dict:
+        return True
+
+    for key, condition in filter_dict.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        else:
+            if not _match_condition(metadata.get(key), condition):
+                return False
+    return True
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (or a single vector) so dot product == cosine."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """
+    Pinecone-compatible index backed by a memory-mapped NumPy matrix.
+
+    Small corpora use exact search (one matrix-vector product).
+    At or above `ann_threshold` vectors, an HNSW index is used when hnswlib is
+    installed; otherwise exact search is kept (still correct, just slower).
+    """
+
+    def __init__(self, path: str, ann_threshold: int = 50000, ef_search: int = 128):
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.ann_threshold = ann_threshold
+        self.ef_search = ef_search
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None   # [N, D] view (mmap or the first N rows of _buffer)
+        self._buffer: Optional[np.ndarray] = None    # writable [capacity, D], allocated on first upsert
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._dimension: Optional[int] = None
+        self._ann = None
+        self._ann_checked = False
+
+        self._load()
+
+    # ---------------------------------------------------------
+    # Loading / persistence
+    # ---------------------------------------------------------
+    def _load(self) -> None:
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        records_path = os.path.join(self.path, RECORDS_FILE)
+
+        if not (os.path.exists(vectors_path) and os.path.exists(records_path)):
+            logger.info(f"[LocalIndex] No data at {self.path} - starting empty")
+            return
+
+        with open(records_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        # mmap keeps RSS low and lets multiple workers share the page cache
+        self._vectors = np.load(vectors_path, mmap_mode="r")
+        self._buffer = None
+        self._ids = list(records.get("ids", []))
+        self._metadata = list(records.get("metadata", [{}] * len(self._ids)))
+        self._dimension = records.get("dimension") or int(self._vectors.shape[1])
+        self._id_to_row = {vid: i for i, vid in enumerate(self._ids)}
+
+        if len(self._ids) != self._vectors.shape[0]:
+            raise ValueError(
+                f"Local index {self.name} is corrupt: {len(self._ids)} ids vs "
+                f"{self._vectors.shape[0]} vectors"
+            )
+
+        logger.info(f"[LocalIndex] Loaded {self.name}: {len(self._ids)} vectors, dim={self._dimension}")
+
+    def save(self) -> None:
+        """Persist vectors + records to disk (atomic replace)."""
+        os.makedirs(self.path, exist_ok=True)
+        vectors = self._vectors if self._vectors is not None else np.zeros((0, self._dimension or 0), dtype=np.float32)
+
+        tmp_vectors = os.path.join(self.path, VECTORS_FILE + ".tmp.npy")
+        tmp_records = os.path.join(self.path, RECORDS_FILE + ".tmp")
+
+        np.save(tmp_vectors, np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            json.dump({
+                "dimension": self._dimension,
+                "metric": "cosine",
+                "ids": self._ids,
+                "metadata": self._metadata,
+            }, f)
+
+        os.replace(tmp_vectors, os.path.join(self.path, VECTORS_FILE))
+        os.replace(tmp_records, os.path.join(self.path, RECORDS_FILE))
+
+        # Any persisted ANN graph is stale now
+        hnsw_path = os.path.join(self.path, HNSW_FILE)
+        if os.path.exists(hnsw_path):
+            os.remove(hnsw_path)
+        self._ann = None
+        self._ann_checked = False
+
+        logger.info(f"[LocalIndex] Saved {self.name}: {len(self._ids)} vectors")
+
+    def _reserve(self, rows: int) -> np.ndarray:
+        """Writable buffer with room for `rows` rows (copies the mmap / grows only when needed)."""
+        if self._buffer is not None and self._buffer.shape[0] >= rows:
+            return self._buffer
+        capacity = max(rows, MIN_CAPACITY, int((self._buffer.shape[0] if self._buffer is not None else 0) * GROWTH_FACTOR))
+        buffer = np.empty((capacity, self._dimension), dtype=np.float32)
+        if self._vectors is not None and len(self._vectors):
+            buffer[:len(self._vectors)] = self._vectors
+        self._buffer = buffer
+        return buffer
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Insert or replace vectors: [{"id": str, "values": [...], "metadata": {...}}].
+        Changes live in memory until save() is called.
+        """
+        if not vectors:
+            return {"upserted_count": 0}
+
+        with self._lock:
+            new_values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+            if self._dimension is None:
+                self._dimension = int(new_values.shape[1])
+            elif new_values.shape[1] != self._dimension:
+                raise ValueError(f"Dimension mismatch: expected {self._dimension}, got {new_values.shape[1]}")
+
+            new_values = _normalize(new_values)
+            new_ids = {v["id"] for v in vectors if v["id"] not in self._id_to_row}
+            buffer = self._reserve(len(self._ids) + len(new_ids))
+
+            for v, row in zip(vectors, new_values):
+                existing = self._id_to_row.get(v["id"])
+                if existing is not None:
+                    buffer[existing] = row
+                    self._metadata[existing] = v.get("metadata") or {}
+                else:
+                    self._id_to_row[v["id"]] = len(self._ids)
+                    buffer[len(self._ids)] = row
+                    self._ids.append(v["id"])
+                    self._metadata.append(v.get("metadata") or {})
+
+            self._vectors = buffer[:len(self._ids)]
+            self._ann = None
+            self._ann_checked = False
+
+        return {"upserted_count": len(vectors)}
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        return {
+            "dimension": self._dimension,
+            "total_vector_count": len(self._ids),
+            "ann_enabled": self._get_ann() is not None,
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ---------------------------------------------------------
+    # ANN (optional hnswlib)
+    # ---------------------------------------------------------
+    def _get_ann(self):
+        """Lazily build or load the HNSW graph when the corpus is large enough."""
+        if self._ann_checked:
+            return self._ann
+
+        with self._lock:
+            if self._ann_checked:
+                return self._ann
+            self._ann_checked = True
+
+            if len(self._ids) < self.ann_threshold:
+                return None
+
+            try:
+                import hnswlib
+            except ImportError:
+                logger.warning(
+                    f"[LocalIndex] {self.name} has {len(self._ids)} vectors but hnswlib "
+                    f"is not installed - using exact search"
+                )
+                return None
+
+            ann = hnswlib.Index(space="ip", dim=self._dimension)
+            hnsw_path = os.path.join(self.path, HNSW_FILE)
+
+            if os.path.exists(hnsw_path):
+                ann.load_index(hnsw_path, max_elements=len(self._ids))
+                logger.info(f"[LocalIndex] Loaded HNSW graph for {self.name}")
+            else:
+                logger.info(f"[LocalIndex] Building HNSW graph for {self.name} ({len(self._ids)} vectors)...")
+                ann.init_index(max_elements=len(self._ids), ef_construction=200, M=16)
+                ann.add_items(np.asarray(self._vectors), np.arange(len(self._ids)))
+                try:
+                    ann.save_index(hnsw_path)
+                except OSError as e:
+                    logger.warning(f"[LocalIndex] Could not persist HNSW graph: {e}")
+
+            ann.set_ef(self.ef_search)
+            self._ann = ann
+            return ann
+
+    # ---------------------------------------------------------
+    # Query
+    # ---------------------------------------------------------
+    def _candidate_rows(self, filter_dict: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row indices passing the metadata filter (None = all rows)."""
+        if not filter_dict:
+            return None
+        rows = [i for i, md in enumerate(self._metadata) if matches_filter(md, filter_dict)]
+        return np.asarray(rows, dtype=np.int64)
+
+    def _exact_search(self, q: np.ndarray, top_k: int, rows: Optional[np.ndarray]):
+        matrix = self._vectors if rows is None else self._vectors[rows]
+        if matrix.shape[0] == 0:
+            return [], []
+
+        scores = matrix @ q
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        if rows is not None:
+            return rows[top].tolist(), scores[top].tolist()
+        return top.tolist(), scores[top].tolist()
+
+    def _ann_search(self, ann, q: np.ndarray, top_k: int, filter_dict: Optional[Dict[str, Any]]):
+        fetch_k = min(len(self._ids), top_k * (ANN_OVERFETCH if filter_dict else 1))
+        labels, distances = ann.knn_query(q, k=fetch_k)
+
+        rows, scores = [], []
+        for label, dist in zip(labels[0], distances[0]):
+            row = int(label)
+            if filter_dict and not matches_filter(self._metadata[row], filter_dict):
+                continue
+            rows.append(row)
+            scores.append(1.0 - float(dist))  # hnswlib "ip" distance = 1 - dot
+            if len(rows) >= top_k:
+                break
+        return rows, scores
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        filter: Optional[Dict[str, Any]] = None,
+        **_: Any
+    ) -> LocalQueryResponse:
+        """Pinecone-compatible query (cosine similarity, highest first)."""
+        if self._vectors is None or not self._ids:
+            return LocalQueryResponse()
+
+        q = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if q.shape[0] != self._dimension:
+            raise ValueError(f"Query dimension {q.shape[0]} != index dimension {self._dimension}")
+
+        ann = self._get_ann()
+        rows, scores = ([], [])
+        if ann is not None:
+            rows, scores = self._ann_search(ann, q, top_k, filter)
+
+        # Exact search when small, no ANN, or a selective filter starved the ANN results
+        if ann is None or len(rows) < top_k:
+            rows, scores = self._exact_search(q, top_k, self._candidate_rows(filter))
+
+        return LocalQueryResponse(matches=[
+            LocalMatch(
+                id=self._ids[row],
+                score=float(score),
+                metadata=dict(self._metadata[row]) if include_metadata else {},
+            )
+            for row, score in zip(rows, scores)
+        ])
+
+    def query_many(
+        self,
+        vectors: List[List[float]],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[LocalQueryResponse]:
+        """
+        Batched query: one [Q, D] x [D, N] product for exact search instead of Q
+        separate passes. ANN indexes fall back to per-vector queries.
+        """
+        if not vectors:
+            return []
+        if self._vectors is None or not self._ids or self._get_ann() is not None:
+            return [self.query(v, top_k, include_metadata, filter) for v in vectors]
+
+        queries = _normalize(np.asarray(vectors, dtype=np.float32))
+        if queries.shape[1] != self._dimension:
+            raise ValueError(f"Query dimension {queries.shape[1]} != index dimension {self._dimension}")
+
+        rows = self._candidate_rows(filter)
+        matrix = self._vectors if rows is None else self._vectors[rows]
+        if matrix.shape[0] == 0:
+            return [LocalQueryResponse() for _ in vectors]
+
+        scores = queries @ matrix.T
+        k = min(top_k, scores.shape[1])
+
+        responses = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            responses.append(LocalQueryResponse(matches=[
+                LocalMatch(
+                    id=self._ids[int(rows[i]) if rows is not None else int(i)],
+                    score=float(row_scores[i]),
+                    metadata=(dict(self._metadata[int(rows[i]) if rows is not None else int(i)])
+                              if include_metadata else {}),
+                )
+                for i in top
+            ]))
+        return responses
+
+
+# ---------------------------------------------------------
+# Sync from Pinecone (build an on-pod cache / benchmark fixture)
+# ---------------------------------------------------------
+def sync_from_pinecone(
+    pinecone_index,
+    dest_dir: str,
+    batch_size: int = 100,
+    progress: Optional[Callable[[int], None]] = None
+) -> LocalVectorIndex:
+    """
+    Copy every vector from a Pinecone index into a local index directory.
+    Uses `list()` + `fetch()` (serverless indexes).
+    """
+    local = LocalVectorIndex(dest_dir)
+    total = 0
+
+    for id_page in pinecone_index.list(limit=batch_size):
+        ids = list(id_page)
+        if not ids:
+            continue
+
+        fetched = pinecone_index.fetch(ids=ids)
+        batch = [
+            {"id": vid, "values": list(vec.values), "metadata": dict(vec.metadata or {})}
+            for vid, vec in fetched.vectors.items()
+        ]
+        local.upsert(batch)
+        total += len(batch)
+        if progress:
+            progress(total)
+
+    local.save()
+    logger.info(f"[LocalIndex] Synced {total} vectors into {dest_dir}")
+    return local
+
+
+# Singleton registry (one instance per index directory)
+_indexes: Dict[str, LocalVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_local_index(index_name: str, root_dir: Optional[str] = None) -> LocalVectorIndex:
+    """Return the shared LocalVectorIndex for an index name."""
+    from app.config.settings import settings
+
+    root = root_dir or settings.local_vector_index_dir
+    path = os.path.join(root, index_name)
+
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = LocalVectorIndex(path, ann_threshold=settings.local_vector_ann_threshold)
+        return _indexes[path]
@@ -4,49 +4,68 @@ Compatible with CLIP (now) and Gemini Multimodal (future)
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone
 
 from app.config.settings import settings
 from app.graph.state import RetrievalHit
-from app.utils.retry import retry_api_call
+from app.clients.local_vector_index import get_local_index
+from app.utils.retry import retry_pinecone_call
+from app.utils.tracing import with_context
+from app.utils.replay import recordable, replay_mode
 from app.utils.pii_masker import mask_api_key
 
 logger = logging.getLogger(__name__)
 
+# Max concurrent Pinecone queries for one multi-image search
+QUERY_BATCH_WORKERS = 8
+
 
 class PineconeClient:
 
     def __init__(self):
-        api_key = settings.pinecone_api_key
-        if not api_key:
-            raise ValueError("PINECONE_API_KEY missing")
-
-        self.pc = Pinecone(api_key=api_key)
-
         # Index names
         self.image_index_name = settings.pinecone_image_index
         self.tickets_index_name = settings.pinecone_tickets_index
 
+        # Remote client only when at least one index lives in Pinecone
+        self.pc = None
+        
+        # Replayed runs never open the indexes (responses come from cassettes)
+        if replay_mode() == "replay":
+            self.image_index = self.tickets_index = None
+            return
+        
+        if settings.uses_remote_pinecone():
+            api_key = settings.pinecone_api_key
+            if not api_key:
+                raise ValueError("PINECONE_API_KEY missing")
+            self.pc = Pinecone(api_key=api_key)
+
         # Connect + handle errors gracefully
-        try:
-            self.image_index = self.pc.Index(self.image_index_name)
-            logger.info(f"[Pinecone] Connected image index: {self.image_index_name}")
-        except Exception as e:
-            logger.error(f"[Pinecone] Image index unavailable: {e}")
-            self.image_index = None
+        self.image_index = self._connect_index("image", self.image_index_name)
+        self.tickets_index = self._connect_index("tickets", self.tickets_index_name)
 
+    def _connect_index(self, kind: str, index_name: str):
+        """Open an index on the configured backend (Pinecone or local mmap index)."""
+        backend = settings.index_backend(kind)
         try:
-            self.tickets_index = self.pc.Index(self.tickets_index_name)
-            logger.info(f"[Pinecone] Connected tickets index: {self.tickets_index_name}")
+            if backend == "local":
+                index = get_local_index(index_name)
+                logger.info(f"[Pinecone] Using LOCAL {kind} index: {index_name} ({len(index)} vectors)")
+            else:
+                index = self.pc.Index(index_name)
+                logger.info(f"[Pinecone] Connected {kind} index: {index_name}")
+            return index
         except Exception as e:
-            logger.error(f"[Pinecone] Tickets index unavailable: {e}")
-            self.tickets_index = None
+            logger.error(f"[Pinecone] {kind.capitalize()} index unavailable: {e}")
+            return None
 
     # ---------------------------------------------------------
     # Image Search (with retry)
     # ---------------------------------------------------------
-    @retry_api_call
+    @retry_pinecone_call
     def _query_image_index(self, vector: List[float], top_k: int, filter_dict: Optional[Dict[str, Any]]):
         """Internal method for querying image index with retry logic."""
         return self.image_index.query(
@@ -56,6 +75,7 @@ class PineconeClient:
             filter=filter_dict
         )
 
+    @recordable("pinecone")
     def query_images(
         self,
         vector: List[float],
@@ -76,36 +96,77 @@ class PineconeClient:
             
             results = self._query_image_index(vector, top_k, filter_dict)
 
-            hits: List[RetrievalHit] = []
+            return self._format_image_hits(results)
 
-            for match in results.matches:
-                metadata = match.metadata or {}
+        except Exception as e:
+            logger.error(f"[Pinecone] Error querying images: {e}", exc_info=True)
+            return []
+
+    @recordable("pinecone")
+    def query_images_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int = 5,
+        filter_dict: Optional[Dict[str, Any]] = None
+    ) -> List[List[RetrievalHit]]:
+        """
+        Query the image index for several vectors in one round.
+        Local index: a single batched matmul. Pinecone: concurrent queries,
+        so latency stays flat in the number of images.
+        Returns one hit list per input vector (empty list on failure).
+        """
+        if not vectors:
+            return []
+        if not self.image_index:
+            logger.warning("[Pinecone] Image index not available")
+            return [[] for _ in vectors]
 
-                # readable content summary
-                parts = []
-                for key in ["product_title", "model_no", "finish", "product_category"]:
-                    if key in metadata:
-                        parts.append(f"{key.capitalize()}: {metadata[key]}")
+        vectors = [v.tolist() if hasattr(v, 'tolist') else list(v) for v in vectors]
 
-                content = " | ".join(parts) if parts else "Product Match"
+        if hasattr(self.image_index, "query_many"):
+            try:
+                responses = self.image_index.query_many(
+                    vectors, top_k=top_k, include_metadata=True, filter=filter_dict
+                )
+                return [self._format_image_hits(r) for r in responses]
+            except Exception as e:
+                logger.error(f"[Pinecone] Batched image query failed: {e}", exc_info=True)
+                return [[] for _ in vectors]
 
-                hits.append({
-                    "id": match.id,
-                    "score": match.score,
-                    "metadata": metadata,
-                    "content": content,
-                })
+        if len(vectors) == 1:
+            return [self.query_images(vectors[0], top_k, filter_dict)]
 
-            return hits
+        with ThreadPoolExecutor(max_workers=min(len(vectors), QUERY_BATCH_WORKERS)) as pool:
+            return list(pool.map(with_context(lambda v: self.query_images(v, top_k, filter_dict)), vectors))
 
-        except Exception as e:
-            logger.error(f"[Pinecone] Error querying images: {e}", exc_info=True)
-            return []
+    @staticmethod
+    def _format_image_hits(results) -> List[RetrievalHit]:
+        hits: List[RetrievalHit] = []
+
+        for match in results.matches:
+            metadata = match.metadata or {}
+
+            # readable content summary
+            parts = []
+            for key in ["product_title", "model_no", "finish", "product_category"]:
+                if key in metadata:
+                    parts.append(f"{key.capitalize()}: {metadata[key]}")
+
+            content = " | ".join(parts) if parts else "Product Match"
+
+            hits.append({
+                "id": match.id,
+                "score": match.score,
+                "metadata": metadata,
+                "content": content,
+            })
+
+        return hits
 
     # ---------------------------------------------------------
     # Past Tickets Search (with retry)
     # ---------------------------------------------------------
-    @retry_api_call
+    @retry_pinecone_call
     def _query_tickets_index(self, vector: List[float], top_k: int, filter_dict: Optional[Dict[str, Any]]):
         """Internal method for querying tickets index with retry logic."""
         return self.tickets_index.query(
@@ -115,6 +176,7 @@ class PineconeClient:
             filter=filter_dict
         )
 
+    @recordable("pinecone")
     def query_past_tickets(
         self,
         vector: List[float],
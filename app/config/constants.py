@@ -107,6 +107,11 @@ NON_PRODUCT_CATEGORIES = [
 ]
 
 
+# Tags written by freshdesk_update once a ticket was handled. A ticket carrying
+# any of them is never run again (pre_triage and the Freshdesk poller both skip it)
+AI_PROCESSED_TAGS = ("AI_PROCESSED", "AI_UNRESOLVED", "LOW_CONFIDENCE_MATCH")
+
+
 class TicketPriority(int, Enum):
     """Freshdesk ticket priority levels"""
     LOW = 1
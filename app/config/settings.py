@@ -22,21 +22,46 @@ class Settings(BaseSettings):
     # ==========================================
     freshdesk_domain: str
     freshdesk_api_key: str
+    freshdesk_pool_size: int = 20  # Keep-alive connections in the shared HTTP session
+    freshdesk_rate_limit_reserve: int = 10  # Start pacing when X-RateLimit-Remaining drops to this
     
     # ==========================================
     # PINECONE
     # ==========================================
-    pinecone_api_key: str
+    pinecone_api_key: str = ""  # Not needed when both indexes use the local backend
     pinecone_env: str = "us-east-1"
     pinecone_image_index: str
     pinecone_tickets_index: str
     
+    # ==========================================
+    # VECTOR BACKEND (Pinecone or local memory-mapped index)
+    # "local" serves queries from LOCAL_VECTOR_INDEX_DIR/<index_name>
+    # (offline runs, benchmarks, or an on-pod cache of the image index)
+    # ==========================================
+    vector_backend: str = "pinecone"  # Default backend: "pinecone" | "local"
+    image_index_backend: Optional[str] = None  # Per-index override for the image index
+    tickets_index_backend: Optional[str] = None  # Per-index override for the tickets index
+    local_vector_index_dir: str = ".cache/vector_index"  # Root dir for local index data
+    local_vector_ann_threshold: int = 50000  # Use HNSW (hnswlib) at/above this many vectors
+    
     # ==========================================
     # GEMINI
     # ==========================================
     gemini_api_key: str
     gemini_file_search_store_id: str
     
+    # ==========================================
+    # GEMINI QUOTA LIMITER (shared client pool)
+    # Requests per minute + max in-flight calls per model tier
+    # ==========================================
+    gemini_rate_limit_enabled: bool = True  # Queue locally instead of bursting into 429s
+    gemini_flash_rpm: int = 1000  # Flash tier (routing, react loop, drafts, OCR)
+    gemini_flash_max_concurrency: int = 16
+    gemini_pro_rpm: int = 150  # Pro tier (file search)
+    gemini_pro_max_concurrency: int = 4
+    gemini_embedding_rpm: int = 1500  # Embedding tier (text-embedding-004)
+    gemini_embedding_max_concurrency: int = 16
+    
     # ==========================================
     # OPENAI (for embeddings - optional)
     # ==========================================
@@ -72,6 +97,38 @@ class Settings(BaseSettings):
     llm_file_search_model: str = "gemini-2.5-pro"  # More capable model for document search
     llm_temperature: float = 0.2
     llm_max_tokens: int = 8192  # Increased for complete structured responses
+    llm_streaming_enabled: bool = True  # Stream ReACT steps (dispatch on action) and draft sections
+    
+    # ==========================================
+    # MODEL ROUTER (cheapest adequate Gemini model per task class)
+    # Tiers: lite = LLM_MODEL_LITE, flash = LLM_MODEL, pro = LLM_MODEL_PRO
+    # Opt-in: lite-tier routing/verification accuracy has not been evaluated yet
+    # ==========================================
+    model_router_enabled: bool = False  # Off = every call uses LLM_MODEL
+    llm_model_lite: str = "gemini-2.5-flash-lite"
+    llm_model_pro: str = "gemini-2.5-pro"
+    model_router_policy: str = "routing=lite,verify=lite,plan=flash,react_step=flash,draft=flash"  # Starting tier per task class
+    model_router_complex_tasks: str = "draft"  # Task classes that start one tier up for complex tickets (e.g. "plan,react_step,draft")
+    model_router_min_confidence: float = 0.6  # JSON answers reporting a lower "confidence" are retried one tier up
+    model_router_max_escalations: int = 1  # Extra attempts on a stronger tier per call
+    
+    # ==========================================
+    # LLM RESPONSE CACHE (opt-in, keyed by model + temperature + prompt hashes)
+    # ==========================================
+    llm_cache_enabled: bool = False  # Serve repeated identical LLM calls from disk
+    llm_cache_dir: str = ".cache/llm_responses"  # diskcache directory (shared by the pod's workers)
+    llm_cache_size_mb: int = 512  # Least-recently-used entries are evicted beyond this
+    llm_cache_ttls: str = "routing=86400,verify=86400,plan=3600,react_step=3600,draft=3600"  # call_site=seconds; unlisted call sites are never cached
+    
+    # ==========================================
+    # NEAR-DUPLICATE TICKETS (MinHash/LSH over recently resolved tickets)
+    # ==========================================
+    near_dup_enabled: bool = False  # Reuse the resolution of a near-identical ticket resolved recently
+    near_dup_mode: str = "reuse"  # "reuse" (prior evidence, fresh draft) | "short_circuit" (same requester: prior evidence + draft, no LLM calls)
+    near_dup_threshold: float = 0.85  # Estimated Jaccard similarity of subject + description shingles
+    near_dup_window_hours: float = 24  # Resolutions older than this are not reused
+    near_dup_max_entries: int = 5000  # Oldest resolutions are evicted beyond this (per process)
+    near_dup_max_mb: int = 64  # ... or beyond this much stored resolution JSON (per process)
     
     # ==========================================
     # CLIP SETTINGS (for image embeddings - 512 dimensions)
@@ -85,6 +142,8 @@ class Settings(BaseSettings):
     # ==========================================
     vision_min_similarity_threshold: float = 0.75  # Minimum score to consider a match valid
     vision_category_validation: bool = True  # Enable LLM category validation
+    vision_fusion_method: str = "rrf"  # Multi-image fusion: "rrf" (reciprocal rank) | "max" (max-sim per model)
+    vision_rrf_k: int = 60  # RRF damping constant (higher = flatter rank weighting)
     
     # ==========================================
     # PLANNING MODULE SETTINGS (Phase 1)
@@ -94,6 +153,39 @@ class Settings(BaseSettings):
     policy_refresh_interval_hours: int = 6  # How often to refresh policy cache
     planner_max_steps: int = 8  # Maximum steps in execution plan
     planner_llm_temperature: float = 0.1  # Low temp for consistent planning
+    fused_understanding_enabled: bool = True  # One LLM call for routing + fact verification + plan (falls back to separate calls)
+    lite_path_enabled: bool = True  # Simple plan + exact catalog/part hit → fixed lookups instead of the ReACT loop
+    
+    # ==========================================
+    # DOCUMENT SEARCH ANSWER CACHE (semantic cache in front of Gemini File Search)
+    # ==========================================
+    doc_cache_enabled: bool = True
+    doc_cache_similarity_threshold: float = 0.92  # Cosine similarity of normalized query embeddings
+    doc_cache_ttl_seconds: int = 86400  # Entries older than this are re-fetched
+    doc_cache_max_entries: int = 2000  # LRU bound per process
+    doc_cache_store_version: str = ""  # Bump after re-ingesting documents to drop cached answers
+    doc_cache_store_check_seconds: int = 300  # How often to re-read the store's update time / doc count
+    doc_cache_cost_per_call_usd: float = 0.02  # Estimated File Search cost per call (for cost-avoided reporting)
+    
+    # ==========================================
+    # PRODUCT DOCUMENT INDEX (local BM25 retriever in front of File Search)
+    # Build with Local_Testing/build_doc_index.py
+    # ==========================================
+    product_doc_index_enabled: bool = True  # Answer model-scoped parts/dimension lookups from indexed PDF pages
+    product_doc_index_dir: str = ".cache/product_doc_index"  # index.json + dense/ page vectors
+    product_doc_index_min_score: float = 4.0  # BM25 score the top page needs to answer without Gemini
+    product_doc_index_min_coverage: float = 0.6  # Fraction of query terms the top page must contain
+    product_doc_index_dense_enabled: bool = False  # Fuse dense page vectors (built with --dense) into the ranking
+    product_doc_index_auto_reindex: bool = True  # Incremental re-index at startup when catalog document links changed
+    
+    # ==========================================
+    # REACT STOPPING POLICY (evaluated after every tool call)
+    # ==========================================
+    react_early_stop_enabled: bool = True  # Auto-finish once evidence is sufficient / stagnant
+    react_stop_min_iterations: int = 2  # Never policy-stop before this iteration
+    react_stop_min_confidence: float = 0.85  # analyze_evidence confidence needed for product tickets
+    react_stop_min_documents: int = 1  # Docs needed (or a direct Gemini answer) when the category uses text RAG
+    react_stagnation_window: int = 3  # Tool calls in a row with no new evidence before stopping
     
     # ==========================================
     # VERTEX AI SETTINGS (production multimodal embeddings)
@@ -112,6 +204,60 @@ class Settings(BaseSettings):
     log_collector_api_key: Optional[str] = None  # API key for log collector
     enable_centralized_logging: bool = True  # Enable/disable centralized logging
     
+    # ==========================================
+    # TRACING (one trace per ticket)
+    # ==========================================
+    tracing_enabled: bool = True  # Spans for nodes, iterations, tools and upstream calls
+    tracing_exporter: str = "none"  # "none" (memory only) | "file" | "otlp"
+    tracing_file: str = "workflow_logs/traces.jsonl"  # JSON lines, used when exporter is "file"
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"  # OTLP/HTTP collector, used when exporter is "otlp"
+    tracing_service_name: str = "flusso-automation"
+    
+    # ==========================================
+    # PROFILING (sampling profiler, opt-in)
+    # ==========================================
+    profiling_sample_rate: float = 0.0  # Fraction of production tickets to profile (e.g. 0.01 = 1%)
+    profiling_interval_ms: float = 5.0  # Stack sampling interval
+    profiling_dir: str = "workflow_logs/profiles"  # Where .folded / .json profiles are written
+    
+    # ==========================================
+    # RECORD / REPLAY (offline benchmarks)
+    # ==========================================
+    replay_mode: str = "off"  # "off" | "record" (capture upstream calls) | "replay" (serve them offline)
+    replay_dir: str = ".cache/replay"  # Cassettes: ticket_<id>.json + _global.json
+    replay_latency_scale: float = 1.0  # Replayed call sleeps recorded latency * scale (0 = instant)
+    replay_fixed_latency_ms: Optional[float] = None  # Overrides the scale with a fixed per-call latency
+    
+    # ==========================================
+    # WEBHOOK DEDUP / IDEMPOTENCY / COALESCING
+    # Use "redis" when running more than one replica
+    # ==========================================
+    dedup_backend: str = "diskcache"  # "diskcache" (per pod) | "redis" (shared) | "memory" (single worker)
+    dedup_dir: str = ".cache/webhook_dedup"  # diskcache directory
+    dedup_redis_url: Optional[str] = None  # e.g. redis://redis:6379/0
+    dedup_key_prefix: str = "flusso:"  # Namespace for keys in a shared Redis
+    webhook_dedup_ttl_seconds: int = 30  # Same ticket_id:updated_at within this window is a duplicate
+    ticket_lock_ttl_seconds: int = 660  # In-flight lock per ticket (workflow timeout + margin)
+    # Debounce: wait this long for newer events before running (0 = off). A Freshdesk burst
+    # (reply + tag change + attachment webhooks) lands within a few seconds; every second
+    # here is added to each ticket's time-to-note, so keep it just above the burst
+    ticket_coalesce_window_seconds: float = 8.0
+    
+    # ==========================================
+    # FRESHDESK POLLER (alternative ingress to webhooks)
+    # Enable on ONE replica only (or run Local_Testing/poll_freshdesk.py)
+    # ==========================================
+    freshdesk_poller_enabled: bool = False  # Start the poller inside the API process
+    poller_interval_seconds: int = 30  # Time between polls
+    poller_workers: int = 4  # Concurrent ticket runs
+    poller_page_size: int = 100  # Freshdesk max per_page
+    poller_max_pages: int = 10  # Pages per poll (rest follows next poll)
+    poller_initial_lookback_minutes: int = 60  # Start point when no cursor is stored yet
+    poller_cursor_overlap_seconds: int = 60  # Re-read this much before the cursor (clock skew)
+    poller_max_attempts: int = 3  # Give up on a ticket version after this many failed runs
+    poller_db_path: str = ".cache/poller.sqlite3"  # Cursor + processed ticket versions
+    poller_processed_ttl_days: int = 14  # Compact processed rows older than this
+    
     # ==========================================
     # AGENT CONSOLE
     # ==========================================
@@ -129,6 +275,14 @@ class Settings(BaseSettings):
     dealer_domains_sheet_file_id: Optional[str] = None  # Google Drive file ID for dealer domains spreadsheet
     dealer_domains_refresh_hours: int = 24  # How often to refresh dealer domains cache
     
+    def index_backend(self, index: str) -> str:
+        """Resolve the vector backend for 'image' or 'tickets'"""
+        override = self.image_index_backend if index == "image" else self.tickets_index_backend
+        return (override or self.vector_backend).lower()
+    
+    def uses_remote_pinecone(self) -> bool:
+        return "pinecone" in (self.index_backend("image"), self.index_backend("tickets"))
+    
     def validate_all(self) -> None:
         """Validate critical settings with comprehensive checks"""
         errors = []
@@ -142,8 +296,12 @@ class Settings(BaseSettings):
             
         if not self.freshdesk_api_key:
             errors.append("FRESHDESK_API_KEY is required")
-        if not self.pinecone_api_key:
+        if not self.pinecone_api_key and self.uses_remote_pinecone():
             errors.append("PINECONE_API_KEY is required")
+        if any(b not in ("pinecone", "local") for b in (
+            self.vector_backend.lower(), self.index_backend("image"), self.index_backend("tickets")
+        )):
+            errors.append("VECTOR_BACKEND / *_INDEX_BACKEND must be 'pinecone' or 'local'")
         if not self.gemini_api_key:
             errors.append("GEMINI_API_KEY is required")
         if not self.gemini_file_search_store_id:
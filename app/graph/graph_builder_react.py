@@ -1,19 +1,22 @@
 """
 LangGraph Builder with ReACT Agent
-Simplified workflow: Fetch → Ticket Extractor → Routing → ReACT Agent → Response → Update
+Simplified workflow: Fetch → Pre-Triage → Attachments → Ticket Extractor → Routing →
+(ReACT Agent || Customer Context) → Response → Update
 """
 
 import logging
-from typing import Literal
+from typing import List, Literal, Union
 from langgraph.graph import StateGraph, END
 
 from app.graph.state import TicketState
 
 # Import nodes
-from app.nodes.fetch_ticket import fetch_ticket_from_freshdesk
+from app.nodes.fetch_ticket import fetch_ticket_from_freshdesk, extract_ticket_attachments
+from app.nodes.pre_triage import pre_triage_ticket, route_after_pre_triage
 from app.nodes.ticket_extractor import extract_ticket_facts  # NEW: Ticket facts extraction
 from app.nodes.routing_agent import classify_ticket_category
 from app.nodes.react_agent import react_agent_loop  # NEW
+from app.nodes.near_duplicate import near_duplicate_handler
 from app.nodes.customer_lookup import identify_customer_type
 from app.nodes.customer_rules import load_customer_rules
 # REMOVED: hallucination_guard, confidence_check, vip_compliance (obsolete - using customer_rules now)
@@ -22,10 +25,18 @@ from app.nodes.response.resolution_logic import decide_tags_and_resolution
 from app.nodes.freshdesk_update import update_freshdesk_ticket
 from app.nodes.audit_log import write_audit_log
 from app.utils.audit import add_audit_event
+from app.utils.metrics import instrument_node
+from app.utils.tracing import trace_node
+from app.utils.profiling import profile_node
 
 logger = logging.getLogger(__name__)
 
 
+def _instrumented(name: str, fn):
+    """Node with metrics, a tracing span and profiler hooks."""
+    return instrument_node(name, trace_node(name, profile_node(name, fn)))
+
+
 # ---------------------------------------------------------------------
 #  SKIP TICKET HANDLER (unchanged)
 # ---------------------------------------------------------------------
@@ -85,12 +96,27 @@ def skip_ticket_handler(state: TicketState) -> dict:
     }
 
 
+# ---------------------------------------------------------------------
+#  CUSTOMER CONTEXT (runs in parallel with the ReACT agent)
+# ---------------------------------------------------------------------
+def load_customer_context(state: TicketState) -> dict:
+    """
+    Dealer lookup + customer rules as ONE branch node.
+    Both depend only on requester_email, so the branch finishes within the
+    same graph step as react_agent instead of adding two steps after it.
+    """
+    lookup = identify_customer_type(state)
+    rules = load_customer_rules({**state, **lookup})
+    return {**lookup, **rules}
+
+
 # ---------------------------------------------------------------------
 #  ROUTING AFTER CLASSIFICATION
 # ---------------------------------------------------------------------
-def route_after_routing(state: TicketState) -> Literal["skip_handler", "react_agent"]:
+def route_after_routing(state: TicketState) -> Union[Literal["skip_handler"], List[str]]:
     """
-    Route to skip handler or ReACT agent based on classification
+    Route to skip handler, or fan out to the ReACT agent AND customer context
+    (joined again at draft_response)
     """
     should_skip = state.get("should_skip", False)
     if should_skip:
@@ -98,8 +124,8 @@ def route_after_routing(state: TicketState) -> Literal["skip_handler", "react_ag
         logger.info(f"[ROUTER] Skipping workflow for category: {category}")
         return "skip_handler"
     
-    logger.info(f"[ROUTER] Proceeding to ReACT agent")
-    return "react_agent"
+    logger.info(f"[ROUTER] Proceeding to ReACT agent (customer context in parallel)")
+    return ["react_agent", "customer_context"]
 
 
 # ---------------------------------------------------------------------
@@ -116,65 +142,88 @@ def build_react_graph() -> StateGraph:
     Build LangGraph workflow with ReACT agent.
     
     Simplified flow:
-    fetch_ticket → ticket_extractor → routing → [skip_handler OR react_agent] → 
-    customer_lookup → customer_rules → draft_response → 
-    resolution_logic → freshdesk_update → audit_log
+    fetch_ticket → pre_triage → [skip_handler OR extract_attachments] →
+    ticket_extractor → routing → [skip_handler OR (react_agent || customer_context)] →
+    draft_response → resolution_logic → freshdesk_update → audit_log
+    
+    Near-duplicates of a recently resolved ticket in short_circuit mode:
+    pre_triage → near_duplicate → resolution_logic → freshdesk_update → audit_log
+    
+    customer_context = customer_lookup + customer_rules; it runs in the same
+    step as react_agent and draft_response waits for both (fan-out/fan-in).
     """
     logger.info("[GRAPH_BUILDER] Building ReACT-based workflow...")
     
     graph = StateGraph(TicketState)
     
     # ------------------- ADD NODES -------------------
-    graph.add_node("fetch_ticket", fetch_ticket_from_freshdesk)
+    graph.add_node("fetch_ticket", _instrumented("fetch_ticket", fetch_ticket_from_freshdesk))
+    
+    # Metadata-only skip detection, then (actionable tickets only) attachment extraction
+    graph.add_node("pre_triage", _instrumented("pre_triage", pre_triage_ticket))
+    graph.add_node("extract_attachments", _instrumented("extract_attachments", extract_ticket_attachments))
     
     # NEW: Ticket Facts Extractor (deterministic extraction before planning)
-    graph.add_node("ticket_extractor", extract_ticket_facts)
+    graph.add_node("ticket_extractor", _instrumented("ticket_extractor", extract_ticket_facts))
     
-    graph.add_node("routing", classify_ticket_category)
-    graph.add_node("skip_handler", skip_ticket_handler)
+    graph.add_node("routing", _instrumented("routing", classify_ticket_category))
+    graph.add_node("skip_handler", _instrumented("skip_handler", skip_ticket_handler))
+    
+    # Near-duplicate of a recently resolved ticket (short_circuit mode): reuse its resolution
+    graph.add_node("near_duplicate", _instrumented("near_duplicate", near_duplicate_handler))
     
     # NEW: ReACT Agent (replaces vision/text_rag/past_tickets/orchestration/context_builder)
-    graph.add_node("react_agent", react_agent_loop)
+    graph.add_node("react_agent", _instrumented("react_agent", react_agent_loop))
     
-    graph.add_node("customer_lookup", identify_customer_type)
-    graph.add_node("customer_rules", load_customer_rules)
+    # Dealer lookup + customer rules, in parallel with react_agent
+    graph.add_node("customer_context", _instrumented("customer_context", load_customer_context))
     
     # REMOVED: hallucination_guard, confidence_check, vip_compliance
     # customer_rules now handles DEALER vs END_CUSTOMER rules directly in draft_response
     
-    graph.add_node("draft_response", draft_final_response)
-    graph.add_node("resolution_logic", decide_tags_and_resolution)
-    graph.add_node("freshdesk_update", update_freshdesk_ticket)
-    graph.add_node("audit_log", write_audit_log)
+    graph.add_node("draft_response", _instrumented("draft_response", draft_final_response))
+    graph.add_node("resolution_logic", _instrumented("resolution_logic", decide_tags_and_resolution))
+    graph.add_node("freshdesk_update", _instrumented("freshdesk_update", update_freshdesk_ticket))
+    graph.add_node("audit_log", _instrumented("audit_log", write_audit_log))
     
     # ------------------- ENTRY POINT -------------------
     graph.set_entry_point("fetch_ticket")
     
     # ------------------- BASE FLOW -------------------
-    # NEW: fetch_ticket → ticket_extractor → routing
-    graph.add_edge("fetch_ticket", "ticket_extractor")
+    # fetch_ticket → pre_triage → [skip_handler | near_duplicate | extract_attachments → ticket_extractor → routing]
+    graph.add_edge("fetch_ticket", "pre_triage")
+    graph.add_conditional_edges(
+        "pre_triage",
+        route_after_pre_triage,
+        {
+            "skip_handler": "skip_handler",
+            "near_duplicate": "near_duplicate",
+            "extract_attachments": "extract_attachments"
+        }
+    )
+    graph.add_edge("extract_attachments", "ticket_extractor")
     graph.add_edge("ticket_extractor", "routing")
     
-    # Route to skip or react agent
+    # Route to skip, or fan out to react agent + customer context
     graph.add_conditional_edges(
         "routing",
         route_after_routing,
         {
             "skip_handler": "skip_handler",
-            "react_agent": "react_agent"
+            "react_agent": "react_agent",
+            "customer_context": "customer_context"
         }
     )
     
     # Skip handler → directly to freshdesk_update
     graph.add_edge("skip_handler", "freshdesk_update")
     
-    # ReACT agent → customer lookup (gather customer context)
-    graph.add_edge("react_agent", "customer_lookup")
-    graph.add_edge("customer_lookup", "customer_rules")
+    # Reused resolution → resolution_logic (status + tags from the copied evidence)
+    graph.add_edge("near_duplicate", "resolution_logic")
     
-    # After customer rules → generate response (simplified flow)
-    # customer_rules contains DEALER/END_CUSTOMER rules used by draft_response
-    graph.add_edge("customer_rules", "draft_response")
+    # Fan-in: draft_response starts once BOTH branches are done
+    # customer_context provides the DEALER/END_CUSTOMER rules used by draft_response
+    graph.add_edge(["react_agent", "customer_context"], "draft_response")
     
     # After response generation → resolution logic (REMOVED: vip_compliance node)
     graph.add_edge("draft_response", "resolution_logic")
@@ -4,7 +4,9 @@ Defines the complete state structure for ticket processing
 Enhanced with ReACT agent fields for intelligent tool orchestration
 """
 
-from typing import TypedDict, List, Dict, Any, Optional
+from typing import TypedDict, List, Dict, Any, Optional, NotRequired, Annotated
+
+from app.utils.audit import merge_audit_events
 
 
 class RetrievalHit(TypedDict):
@@ -25,6 +27,7 @@ class ReACTIteration(TypedDict):
     tool_output: Dict[str, Any]          # Full tool result
     timestamp: float                      # When this happened
     duration: float                       # How long tool took
+    time_to_first_action: NotRequired[float]  # LLM latency until action + action_input were parsed
 
 
 class TicketState(TypedDict, total=False):
@@ -133,8 +136,10 @@ class TicketState(TypedDict, total=False):
     # ==========================================
     react_iterations: List[ReACTIteration]      # Full reasoning chain
     react_total_iterations: int                  # Count of iterations
-    react_status: str                            # "pending" | "running" | "finished" | "max_iterations"
+    react_status: str                            # "pending" | "running" | "finished" | "max_iterations" | "lite"
     react_final_reasoning: str                   # Why agent stopped
+    react_stop_reason: Optional[str]             # "finish_tool" | "sufficient" | "stagnation" | "heuristic" | "max_iterations" | "lite" | "error"
+    react_stop_saved_seconds: Optional[float]    # Estimated loop time saved by a policy stop
     
     # Product Identification (from ReACT)
     identified_product: Optional[Dict[str, Any]]  # {model, name, category, confidence}
@@ -271,7 +276,21 @@ class TicketState(TypedDict, total=False):
     workflow_error_node: Optional[str]         # Which node failed
     is_system_error: bool                       # True = system failure, False = legitimate need-more-info
     
+    # ==========================================
+    # TICKET COALESCING (rapid successive updates)
+    # ==========================================
+    coalesce_generation: Optional[int]         # Event generation this run was started for
+    workflow_superseded: bool                  # True = newer update arrived, Freshdesk writes skipped
+    skip_freshdesk_update: bool                # /debug/process dry run
+    
+    # ==========================================
+    # NEAR-DUPLICATE TICKETS (reuse of a recent resolution)
+    # ==========================================
+    attachment_fingerprint: str                   # sha256 of attachment name/size/type ("" = none)
+    near_duplicate_key: Optional[Dict[str, Any]]  # MinHash signature + codes + attachment fingerprint
+    near_duplicate_match: Optional[Dict[str, Any]]  # Prior ticket id, similarity, age and its resolution
+    
     # ==========================================
     # AUDIT TRAIL
     # ==========================================
-    audit_events: List[Dict[str, Any]]
+    audit_events: Annotated[List[Dict[str, Any]], merge_audit_events]  # Reducer: parallel branches each append
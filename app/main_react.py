@@ -3,18 +3,40 @@ FastAPI Main Application with ReACT Agent
 Webhook endpoint for Freshdesk ticket automation using intelligent ReACT loop
 """
 
+import time
+import asyncio
 import logging
 import hashlib
+from typing import Optional, Tuple
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, Response, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from diskcache import Cache
 
+from app.config.settings import settings
 from app.graph.graph_builder_react import build_react_graph
 from app.graph.state import TicketState
 from app.utils.pii_masker import mask_email, mask_name
 from app.services.policy_service import init_policy_service
+from app.services.dedup_store import get_dedup_store, close_dedup_store
+from app.services.freshdesk_poller import FreshdeskPoller
+from app.services.ticket_coalescer import (
+    register_event, acquire_turn, acquire_turn_async, release_turn, WorkflowSuperseded,
+)
+from app.clients.gemini_pool import get_limiter_stats
+from app.clients.llm_client import get_router_stats
+from app.clients.llm_response_cache import get_llm_response_cache, llm_cache_bypass
+from app.utils.retry import deadline_scope, get_retry_stats
+from app.utils.log_shipper import shutdown_log_shipper, get_log_shipper_stats
+from app.utils.metrics import render_metrics, WORKFLOWS_IN_FLIGHT
+from app.utils.tracing import start_trace, get_trace, summarize_trace, critical_path
+from app.utils.profiling import profile_workflow, should_profile
+from app.utils.replay import cassette_scope
+from app.utils.detailed_logger import discard_workflow_log
+from app.utils.ingest_tracker import get_ingest_tracker
+from app.services.doc_answer_cache import get_doc_answer_cache
+from app.services.product_doc_index import reindex_if_catalog_changed
+from app.services.near_duplicate_index import get_near_duplicate_index
 
 # ---------------------------------------------------
 # LOGGING CONFIG
@@ -27,7 +49,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 graph = None  # Global graph instance
-webhook_cache = None  # Deduplication cache
+webhook_cache = None  # Dedup / idempotency store (see DEDUP_BACKEND)
+poller = None  # Polling ingress (FRESHDESK_POLLER_ENABLED)
 
 # ReACT agent has more iterations, so longer timeout
 WORKFLOW_TIMEOUT = 600  # 10 minutes
@@ -38,12 +61,12 @@ WORKFLOW_TIMEOUT = 600  # 10 minutes
 # ---------------------------------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global graph, webhook_cache
+    global graph, webhook_cache, poller
     logger.info("🚀 Starting Flusso Workflow Automation (ReACT Agent Mode)...")
 
-    # Initialize deduplication cache
-    webhook_cache = Cache(".cache/webhook_dedup")
-    logger.info("✅ Webhook deduplication cache initialized")
+    # Initialize deduplication store (shared across replicas with DEDUP_BACKEND=redis)
+    webhook_cache = get_dedup_store()
+    logger.info(f"✅ Webhook deduplication store initialized ({webhook_cache.backend})")
 
     # Initialize policy service (fetches from Google Docs)
     init_policy_service()
@@ -52,11 +75,26 @@ async def lifespan(app: FastAPI):
     graph = build_react_graph()
     logger.info("✅ LangGraph ReACT workflow initialized")
 
+    # Local product document index: catch up with catalog document changes in the background
+    try:
+        if reindex_if_catalog_changed():
+            logger.info("✅ Product document index re-index started (catalog changed)")
+    except Exception as e:
+        logger.warning(f"⚠️ Product document index check failed: {e}")
+
+    if settings.freshdesk_poller_enabled:
+        poller = FreshdeskPoller(run_ticket=_run_polled_ticket)
+        poller.start()
+        logger.info("✅ Freshdesk poller started (polling ingress)")
+
     yield
 
     # Cleanup
+    if poller:
+        poller.stop(wait=False)
+    shutdown_log_shipper(timeout=5.0)  # Flush queued logs (leftovers spill to disk)
     if webhook_cache:
-        webhook_cache.close()
+        close_dedup_store()
     logger.info("🛑 Shutting down Flusso Workflow Automation...")
 
 
@@ -123,6 +161,10 @@ async def deep_health_check():
         }
     }
     
+    if webhook_cache:
+        status["components"]["dedup_backend"] = webhook_cache.backend
+        status["components"]["dedup_store_reachable"] = webhook_cache.ping()
+    
     # Check if graph has expected nodes
     if graph:
         try:
@@ -132,9 +174,31 @@ async def deep_health_check():
             status["components"]["graph_nodes"] = False
             status["components"]["graph_error"] = str(e)
     
+    # Gemini quota pressure (limiter wait time per model tier)
+    status["gemini_limiter"] = get_limiter_stats()
+    
+    # Model router: calls, latency, cost and escalation rate per task class and tier
+    status["model_router"] = get_router_stats()
+    
+    # Retries, backoff time and circuit state per upstream
+    status["retry"] = get_retry_stats()
+    
+    # Centralized log pipeline (backlog / dropped / spilled)
+    status["log_shipper"] = get_log_shipper_stats()
+    
+    # Polling ingress (cursor, in-flight, failures)
+    if poller:
+        status["poller"] = poller.stats()
+    
     return status
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (node/tool/upstream latency, LLM tokens, limiter and retry stats)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ---------------------------------------------------
 # WEBHOOK DEDUPLICATION HELPERS
 # ---------------------------------------------------
@@ -145,43 +209,139 @@ def _create_webhook_key(ticket_id: str, updated_at: str = None) -> str:
 
 
 def _is_duplicate_webhook(key: str, ttl_seconds: int = 30) -> bool:
-    """Check if this webhook was recently processed."""
-    if key in webhook_cache:
-        return True
-    webhook_cache.set(key, True, expire=ttl_seconds)
-    return False
+    """Check if this webhook was recently processed (atomic across workers/replicas)."""
+    return not webhook_cache.set_if_absent(f"webhook:{key}", ttl_seconds)
 
 
 # ---------------------------------------------------
 # BACKGROUND PROCESSING FUNCTION
 # ---------------------------------------------------
-def process_ticket_workflow(ticket_id: str, initial_state: dict):
+def _invoke_with_deadline(initial_state: dict, profile: Optional[bool] = None) -> Tuple[dict, Optional[dict]]:
     """
-    Process ticket workflow in the background.
-    This runs asynchronously after responding to Freshdesk.
+    Run the graph with a per-ticket deadline so retries never sleep past WORKFLOW_TIMEOUT.
+    The whole run is one trace (see /debug/trace/{ticket_id}).
+    
+    profile=None profiles a PROFILING_SAMPLE_RATE fraction of tickets.
+    With REPLAY_MODE=record every upstream call is captured to the ticket's cassette.
+    Returns (final_state, profile summary or None).
     """
+    ticket_id = initial_state.get("ticket_id")
+    if profile is None:
+        profile = should_profile()
+    
+    WORKFLOWS_IN_FLIGHT.inc()
     try:
-        logger.info(f"🎫 Background processing started for ticket #{ticket_id}")
-        
-        # Run the ReACT workflow
-        final_state = graph.invoke(initial_state)
-        
-        # Extract key results
-        resolution = final_state.get("resolution_decision", "unknown")
-        react_iterations = final_state.get("react_total_iterations", 0)
-        react_status = final_state.get("react_status", "unknown")
-        product_identified = final_state.get("identified_product") is not None
-        
-        # Log PII-masked summary
-        requester = final_state.get("requester_email", "")
-        masked_email = mask_email(requester) if requester else "N/A"
-        logger.info(
-            f"✅ Ticket #{ticket_id} completed: {resolution} | "
-            f"ReACT: {react_iterations} iterations | Requester: {masked_email}"
-        )
-        
+        with start_trace("ticket_workflow", ticket_id=ticket_id), \
+                deadline_scope(WORKFLOW_TIMEOUT), \
+                cassette_scope(ticket_id), \
+                profile_workflow(ticket_id, enabled=profile) as workflow_profile:
+            try:
+                final_state = graph.invoke(initial_state)
+            finally:
+                discard_workflow_log()  # runs that never reached audit_log
+    finally:
+        WORKFLOWS_IN_FLIGHT.dec()
+    
+    return final_state, workflow_profile.summary() if workflow_profile else None
+
+
+def _run_workflow(ticket_id: str, initial_state: dict) -> dict:
+    """Run the ReACT workflow for a ticket whose turn was acquired; logs a PII-masked summary."""
+    logger.info(f"🎫 Background processing started for ticket #{ticket_id}")
+    
+    # Run the ReACT workflow
+    final_state, _ = _invoke_with_deadline(initial_state)
+    
+    # Extract key results
+    resolution = final_state.get("resolution_decision", "unknown")
+    react_iterations = final_state.get("react_total_iterations", 0)
+    
+    # Log PII-masked summary
+    requester = final_state.get("requester_email", "")
+    masked_email = mask_email(requester) if requester else "N/A"
+    logger.info(
+        f"✅ Ticket #{ticket_id} completed: {resolution} | "
+        f"ReACT: {react_iterations} iterations | Requester: {masked_email}"
+    )
+    return final_state
+
+
+def process_ticket_workflow(
+    ticket_id: str,
+    initial_state: dict,
+    ingest_id: Optional[int] = None,
+    raise_errors: bool = False,
+) -> Optional[dict]:
+    """
+    Process a ticket on the calling (dedicated worker) thread, e.g. a poller worker.
+    
+    Waits out the coalescing window and the ticket's in-flight lock first, so a
+    burst of updates to one ticket runs once, on the newest event.
+    Returns the final state (None when superseded); errors are logged, and
+    re-raised with raise_errors=True.
+    """
+    tracker = get_ingest_tracker()
+    tracker.started(ingest_id)
+    status = "error"
+    lock_token = None
+    final_state = None
+    try:
+        lock_token = acquire_turn(ticket_id, initial_state.get("coalesce_generation"))
+        final_state = _run_workflow(ticket_id, initial_state)
+        status = "superseded" if final_state.get("workflow_superseded") else "ok"
+    except WorkflowSuperseded as e:
+        logger.info(f"⏭️ {e} - skipping")
+        status = "superseded"
+    except Exception as e:
+        logger.error(f"❌ Background processing error for ticket #{ticket_id}: {e}", exc_info=True)
+        if raise_errors:
+            raise
+    finally:
+        release_turn(ticket_id, lock_token)
+        tracker.finished(ingest_id, status)
+    return final_state
+
+
+async def process_ticket_workflow_async(
+    ticket_id: str,
+    initial_state: dict,
+    ingest_id: Optional[int] = None,
+) -> None:
+    """
+    Webhook background task: runs after responding to Freshdesk.
+    
+    The coalescing window and lock wait happen on the event loop (store calls
+    in short to_thread hops); a worker thread is only held for the whole run
+    once this event owns the ticket's turn.
+    """
+    tracker = get_ingest_tracker()
+    tracker.started(ingest_id)
+    status = "error"
+    lock_token = None
+    try:
+        lock_token = await acquire_turn_async(ticket_id, initial_state.get("coalesce_generation"))
+        final_state = await asyncio.to_thread(_run_workflow, ticket_id, initial_state)
+        status = "superseded" if final_state.get("workflow_superseded") else "ok"
+    except WorkflowSuperseded as e:
+        logger.info(f"⏭️ {e} - skipping")
+        status = "superseded"
     except Exception as e:
         logger.error(f"❌ Background processing error for ticket #{ticket_id}: {e}", exc_info=True)
+    finally:
+        await asyncio.to_thread(release_turn, ticket_id, lock_token)
+        tracker.finished(ingest_id, status)
+
+
+def _run_polled_ticket(initial_state: dict) -> Optional[dict]:
+    """
+    Poller ingress: same path as /webhook (new generation, coalescing window,
+    per-ticket lock, ingest tracking), so a ticket seen by both runs once.
+    Errors propagate so the poller can retry.
+    """
+    ticket_id = initial_state["ticket_id"]
+    initial_state["coalesce_generation"] = register_event(ticket_id)
+    ingest_id = get_ingest_tracker().accepted(ticket_id, 0.0)
+    return process_ticket_workflow(ticket_id, initial_state, ingest_id, raise_errors=True)
 
 
 # ---------------------------------------------------
@@ -209,6 +369,9 @@ async def freshdesk_webhook(request: Request, background_tasks: BackgroundTasks)
     """
     global graph
 
+    handler_start = time.perf_counter()
+    tracker = get_ingest_tracker()
+
     if not graph:
         logger.error("Graph not initialized!")
         raise HTTPException(status_code=503, detail="Workflow graph not ready")
@@ -237,6 +400,7 @@ async def freshdesk_webhook(request: Request, background_tasks: BackgroundTasks)
 
         if not ticket_id:
             logger.warning("No ticket_id found in webhook payload")
+            tracker.outcome("invalid", time.perf_counter() - handler_start)
             return JSONResponse(
                 status_code=400,
                 content={"error": "Missing ticket_id in payload"}
@@ -244,13 +408,18 @@ async def freshdesk_webhook(request: Request, background_tasks: BackgroundTasks)
 
         # Deduplication check
         webhook_key = _create_webhook_key(ticket_id, updated_at)
-        if _is_duplicate_webhook(webhook_key, ttl_seconds=30):
+        # Store calls (Redis/diskcache) run off the event loop
+        if await asyncio.to_thread(_is_duplicate_webhook, webhook_key, settings.webhook_dedup_ttl_seconds):
             logger.info(f"🔄 Duplicate webhook for ticket {ticket_id}, skipping")
+            tracker.outcome("duplicate", time.perf_counter() - handler_start)
             return JSONResponse(
                 status_code=200,
                 content={"status": "skipped", "reason": "duplicate_webhook", "ticket_id": ticket_id}
             )
 
+        # Newer events supersede queued/running ones for the same ticket
+        generation = await asyncio.to_thread(register_event, ticket_id)
+
         # Initialize state
         initial_state: TicketState = {
             "ticket_id": ticket_id,
@@ -262,10 +431,12 @@ async def freshdesk_webhook(request: Request, background_tasks: BackgroundTasks)
             "gathered_documents": [],
             "gathered_images": [],
             "gathered_past_tickets": [],
+            "coalesce_generation": generation,
         }
 
         # Add workflow processing to background tasks
-        background_tasks.add_task(process_ticket_workflow, ticket_id, initial_state)
+        ingest_id = tracker.accepted(ticket_id, time.perf_counter() - handler_start)
+        background_tasks.add_task(process_ticket_workflow_async, ticket_id, initial_state, ingest_id)
         
         logger.info(f"✅ Ticket #{ticket_id} queued for processing")
         
@@ -281,6 +452,7 @@ async def freshdesk_webhook(request: Request, background_tasks: BackgroundTasks)
 
     except Exception as e:
         logger.error(f"❌ Webhook processing error: {e}", exc_info=True)
+        tracker.outcome("error", time.perf_counter() - handler_start)
         return JSONResponse(
             status_code=500,
             content={"error": "Internal processing error", "detail": str(e)}
@@ -291,10 +463,13 @@ async def freshdesk_webhook(request: Request, background_tasks: BackgroundTasks)
 # DEBUG ENDPOINTS
 # ---------------------------------------------------
 @app.post("/debug/process/{ticket_id}")
-async def debug_process_ticket(ticket_id: str, dry_run: bool = False):
+async def debug_process_ticket(ticket_id: str, dry_run: bool = False, profile: bool = False, no_cache: bool = False):
     """
     Debug endpoint to manually process a ticket.
     Set dry_run=True to test without updating Freshdesk.
+    Set no_cache=True to skip the LLM response cache (fresh model answers).
+    Set profile=True to run under the sampling profiler; the response then
+    includes the per-node CPU vs wall breakdown and the folded-stack file path.
     """
     global graph
 
@@ -319,11 +494,11 @@ async def debug_process_ticket(ticket_id: str, dry_run: bool = False):
         initial_state["skip_freshdesk_update"] = True
 
     try:
-        import asyncio
-        final_state = await asyncio.wait_for(
-            asyncio.to_thread(graph.invoke, initial_state),
-            timeout=WORKFLOW_TIMEOUT
-        )
+        with llm_cache_bypass(no_cache):  # to_thread copies the context, so the flag reaches every node
+            final_state, profile_summary = await asyncio.wait_for(
+                asyncio.to_thread(_invoke_with_deadline, initial_state, profile),
+                timeout=WORKFLOW_TIMEOUT
+            )
 
         # Extract ReACT reasoning chain for debugging
         react_chain = []
@@ -350,6 +525,7 @@ async def debug_process_ticket(ticket_id: str, dry_run: bool = False):
             "resolution_decision": final_state.get("resolution_decision"),
             "generated_reply": final_state.get("generated_reply", "")[:500] if final_state.get("generated_reply") else None,
             "audit_events_count": len(final_state.get("audit_events", [])),
+            "profile": profile_summary,
         }
 
     except asyncio.TimeoutError:
@@ -377,6 +553,73 @@ async def get_react_iterations(ticket_id: str):
     }
 
 
+@app.get("/debug/trace/{ticket_id}")
+async def get_ticket_trace(ticket_id: str):
+    """
+    Get the most recent trace for a ticket (kept in memory for recent tickets).
+    The `tree` view shows where the workflow time went, span by span.
+    """
+    spans = get_trace(ticket_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"No trace in memory for ticket #{ticket_id}")
+    return {
+        "ticket_id": ticket_id,
+        "span_count": len(spans),
+        "tree": summarize_trace(spans),
+        "critical_path": critical_path(spans),
+        "spans": spans,
+    }
+
+
+@app.get("/debug/ingest-stats")
+async def get_ingest_stats(since: Optional[float] = None, records: bool = False):
+    """
+    Webhook ingestion stats: outcomes, queued/running workflows, memory (RSS).
+    With records=true, per-webhook accept/queue/completion timings for webhooks
+    accepted at or after `since` (unix time) - used by Local_Testing/load_test_webhook.py.
+    """
+    return get_ingest_tracker().stats(since=since, include_records=records)
+
+
+@app.get("/debug/doc-cache")
+async def get_doc_cache_stats():
+    """Document search answer cache: entries, hit rate, latency / tokens / cost avoided."""
+    return get_doc_answer_cache().stats()
+
+
+@app.post("/debug/doc-cache/invalidate")
+async def invalidate_doc_cache():
+    """Drop all cached document answers (call after updating the file search store)."""
+    removed = get_doc_answer_cache().invalidate("api")
+    return {"status": "invalidated", "removed": removed}
+
+
+@app.get("/debug/llm-cache")
+async def get_llm_cache_stats():
+    """LLM response cache: entries, size, hit rate and latency avoided per call site."""
+    return get_llm_response_cache().stats()
+
+
+@app.post("/debug/llm-cache/clear")
+async def clear_llm_cache():
+    """Drop all cached LLM responses (e.g. after a prompt change with the same wording)."""
+    removed = get_llm_response_cache().clear()
+    return {"status": "cleared", "removed": removed}
+
+
+@app.get("/debug/near-duplicates")
+async def get_near_duplicate_stats():
+    """Near-duplicate ticket index: entries, window, hit rate and rejected matches."""
+    return get_near_duplicate_index().stats()
+
+
+@app.post("/debug/near-duplicates/clear")
+async def clear_near_duplicates():
+    """Forget all indexed resolutions (e.g. after a policy change that makes prior replies stale)."""
+    removed = get_near_duplicate_index().clear()
+    return {"status": "cleared", "removed": removed}
+
+
 # ---------------------------------------------------
 # COMPARISON ENDPOINT (Sequential vs ReACT)
 # ---------------------------------------------------
@@ -398,10 +641,11 @@ async def get_workflow_info():
         ],
         "workflow_flow": [
             "fetch_ticket",
+            "pre_triage (skips PO/auto-reply/already processed)",
+            "extract_attachments",
+            "ticket_extractor",
             "routing",
-            "react_agent (loops with evidence_resolver)",
-            "customer_lookup",
-            "customer_rules",
+            "react_agent (loops with evidence_resolver) || customer_context (customer_lookup + customer_rules)",
             "draft_response",
             "resolution_logic",
             "freshdesk_update",
@@ -127,10 +127,10 @@ def write_audit_log(state: TicketState) -> Dict[str, Any]:
                 workflow_version="v1.0"
             )
             
-            # Ship the log (fire-and-forget)
+            # Queue the log (shipped in background batches, never blocks the graph)
             ship_log(log_payload)
             
-            logger.info(f"{STEP_NAME} | ✅ Centralized log sent to collector")
+            logger.info(f"{STEP_NAME} | ✅ Centralized log queued for collector")
             
         except Exception as ship_error:
             # Logging should NEVER break the workflow
@@ -59,7 +59,7 @@ def identify_customer_type(state: TicketState) -> Dict[str, Any]:
     logger.info(f"{STEP_NAME} | 🎯 Decision: customer_type='{customer_type}' (reason: {detection_reason})")
     logger.info(f"{STEP_NAME} | ✅ Complete in {duration:.2f}s")
 
-    audit_events = state.get("audit_events", []) or []
+    audit_events = list(state.get("audit_events", []) or [])
     audit_events.append(
         {
             "event": "identify_customer_type",
@@ -2,6 +2,8 @@
 Fetch Ticket Node - FIXED VERSION
 Now properly stores BOTH attachment metadata AND full attachment objects
 Enhanced with workflow start time tracking for centralized logging
+Attachment text extraction is a separate node (extract_ticket_attachments),
+run only after pre_triage confirms the ticket is actionable
 """
 
 import logging
@@ -11,6 +13,7 @@ from typing import Dict, Any
 from app.graph.state import TicketState
 from app.utils.audit import add_audit_event
 from app.utils.attachment_processor import process_all_attachments
+from app.services.near_duplicate_index import attachment_fingerprint
 from app.clients.freshdesk_client import get_freshdesk_client
 from app.utils.pii_masker import mask_email, mask_name
 from app.utils.detailed_logger import (
@@ -46,69 +49,22 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
 
     try:
         client = get_freshdesk_client()
-        # Include "requester" to get email for dealer domain matching
-        ticket = client.get_ticket(ticket_id, params={"include": "requester,company,stats"})
+        # One round trip: ticket + requester (email for dealer domain matching)
+        ticket = client.get_ticket_bundle(ticket_id)
         data = client.extract_ticket_data(ticket)
 
-        # Check if already processed
-        existing_tags = data.get("tags", [])
-        ai_processed_tags = ["AI_PROCESSED", "AI_UNRESOLVED", "LOW_CONFIDENCE_MATCH"]
-        
-        already_processed = any(tag in existing_tags for tag in ai_processed_tags)
-        if already_processed:
-            logger.warning(f"{STEP_NAME} | ⚠️ Ticket #{ticket_id} already has AI tags: {existing_tags}")
-            return {
-                "ticket_subject": data.get("subject", ""),
-                "ticket_text": data.get("description", ""),
-                "ticket_images": [],
-                "requester_email": data.get("requester_email", ""),
-                "requester_name": data.get("requester_name", "Unknown"),
-                "tags": existing_tags,
-                "has_text": False,
-                "has_image": False,
-                "ran_vision": True,
-                "ran_text_rag": True,
-                "ran_past_tickets": True,
-                "should_skip": True,
-                "skip_reason": f"Already processed (has tag: {[t for t in existing_tags if t in ai_processed_tags]})",
-                "ticket_category": "already_processed",
-                "audit_events": add_audit_event(
-                    state,
-                    event="fetch_ticket",
-                    event_type="SKIP",
-                    details={"ticket_id": ticket_id, "reason": "Already has AI processing tags", "existing_tags": existing_tags}
-                )["audit_events"],
-            }
-
+        # AI-tag / PO / auto-reply checks happen in pre_triage (metadata only)
         description = data.get("description", "")
         has_text = bool(description.strip())
 
         # ============================================================
-        # CRITICAL FIX: Store BOTH processed content AND raw attachments
+        # Attachment METADATA only - downloads/extraction are deferred to
+        # extract_ticket_attachments (runs only for actionable tickets)
         # ============================================================
         raw_attachments = data.get("attachments", [])
         logger.info(f"{STEP_NAME} | 📎 Found {len(raw_attachments)} attachment(s)")
-        
-        # Process attachments for text extraction
-        attachment_result = process_all_attachments(raw_attachments)
-        
-        images = attachment_result["images"]
-        has_image = len(images) > 0
-        attachment_text = attachment_result["extracted_content"]
-        attachment_summary = attachment_result["attachment_summary"]
-        attachment_stats = attachment_result["stats"]
-        
-        # Combine ticket description with attachment content
-        if attachment_text:
-            combined_text = f"{description}\n\n{'='*60}\n📎 ATTACHMENT CONTENT\n{'='*60}\n{attachment_text}"
-            logger.info(f"{STEP_NAME} | 📄 Extracted {attachment_stats['total_chars']} chars from {attachment_stats['processed']} document(s)")
-        else:
-            combined_text = description
 
-        # ============================================================
-        # NEW: Store full attachment objects for tools
-        # Filter to keep only document attachments (not images)
-        # ============================================================
+        images = []
         document_attachments = []
         for att in raw_attachments:
             # Skip None or invalid attachment entries (Freshdesk API quirk)
@@ -116,7 +72,12 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
                 logger.warning(f"{STEP_NAME} | ⚠️ Skipping invalid attachment entry (None or not dict)")
                 continue
             content_type = str(att.get("content_type", "")).lower()
-            if not content_type.startswith("image/"):
+            if content_type.startswith("image/"):
+                # Image URLs for the vision pipeline
+                url = att.get("attachment_url") or att.get("url")
+                if url:
+                    images.append(url)
+            else:
                 # Keep full attachment object with URL
                 document_attachments.append({
                     "name": att.get("name", "unknown"),
@@ -124,17 +85,16 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
                     "content_type": content_type,
                     "size": att.get("size", 0)
                 })
-        
+        has_image = len(images) > 0
+
         logger.info(f"{STEP_NAME} | 📎 Prepared {len(document_attachments)} document attachment(s) for tools")
 
         updates = {
             "ticket_subject": data.get("subject", ""),
-            "ticket_text": combined_text,
+            "ticket_text": description,  # Attachment text appended by extract_ticket_attachments
             "ticket_images": images,
-            
-            # Store BOTH for different purposes:
-            "attachment_summary": attachment_summary,  # Metadata for display
             "ticket_attachments": document_attachments,  # Full objects for tools ✅ NEW
+            "attachment_fingerprint": attachment_fingerprint(raw_attachments),  # Images included - for near-duplicate matching
             
             "requester_email": data.get("requester_email", ""),
             "requester_name": data.get("requester_name", "Unknown"),
@@ -143,7 +103,7 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
             "tags": data.get("tags", []),
             "created_at": data.get("created_at"),
             "updated_at": data.get("updated_at"),
-            "has_text": has_text or bool(attachment_text),
+            "has_text": has_text,
             "has_image": has_image,
             "ran_vision": False,
             "ran_text_rag": False,
@@ -159,7 +119,6 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
                 "has_text": updates["has_text"],
                 "has_image": has_image,
                 "image_count": len(images),
-                "attachment_stats": attachment_stats,
                 "document_attachments": len(document_attachments),  # ✅ NEW
                 "tags": updates["tags"],
             }
@@ -173,7 +132,7 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
         
         if workflow_log:
             workflow_log.ticket_subject = updates['ticket_subject']
-            workflow_log.ticket_text = combined_text
+            workflow_log.ticket_text = description
             workflow_log.ticket_images = images
             workflow_log.attachment_count = len(raw_attachments)
         
@@ -181,11 +140,10 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
             node_log,
             output_summary={
                 "subject": updates['ticket_subject'][:100],
-                "text_length": len(combined_text),
+                "text_length": len(description),
                 "has_images": has_image,
                 "image_count": len(images),
                 "document_count": len(document_attachments),
-                "attachment_stats": attachment_stats,
                 "tags": updates['tags']
             }
         )
@@ -215,4 +173,65 @@ def fetch_ticket_from_freshdesk(state: TicketState) -> Dict[str, Any]:
                 event_type="ERROR",
                 details={"error": str(e)}
             )["audit_events"],
-        }
\ No newline at end of file
+        }
+
+def extract_ticket_attachments(state: TicketState) -> Dict[str, Any]:
+    """
+    Download + parse document attachments (PDF/DOCX/XLSX/...) and append their
+    text to ticket_text. Runs after pre_triage, so skipped tickets never pay for it.
+    """
+    start_time = time.time()
+    documents = state.get("ticket_attachments", []) or []
+    description = state.get("ticket_text", "") or ""
+
+    if not documents:
+        return {"attachment_summary": []}
+
+    node_log = log_node_start("extract_attachments", {"documents": len(documents)})
+
+    try:
+        attachment_result = process_all_attachments(documents)
+    except Exception as e:
+        logger.error(f"{STEP_NAME} | ❌ Attachment extraction failed: {e}", exc_info=True)
+        return {
+            "attachment_summary": [],
+            "audit_events": add_audit_event(
+                state,
+                event="extract_attachments",
+                event_type="ERROR",
+                details={"error": str(e)}
+            )["audit_events"],
+        }
+
+    attachment_text = attachment_result["extracted_content"]
+    attachment_stats = attachment_result["stats"]
+
+    # Combine ticket description with attachment content
+    if attachment_text:
+        combined_text = f"{description}\n\n{'='*60}\n📎 ATTACHMENT CONTENT\n{'='*60}\n{attachment_text}"
+        logger.info(f"{STEP_NAME} | 📄 Extracted {attachment_stats['total_chars']} chars from {attachment_stats['processed']} document(s)")
+    else:
+        combined_text = description
+
+    workflow_log = get_current_log()
+    if workflow_log:
+        workflow_log.ticket_text = combined_text
+
+    duration = time.time() - start_time
+    logger.info(f"{STEP_NAME} | 📎 Attachment extraction done in {duration:.2f}s")
+    log_node_complete(
+        node_log,
+        output_summary={"text_length": len(combined_text), "attachment_stats": attachment_stats}
+    )
+
+    return {
+        "ticket_text": combined_text,
+        "attachment_summary": attachment_result["attachment_summary"],  # Metadata for display
+        "has_text": bool(state.get("has_text")) or bool(attachment_text),
+        "audit_events": add_audit_event(
+            state,
+            event="extract_attachments",
+            event_type="SUCCESS",
+            details={"attachment_stats": attachment_stats}
+        )["audit_events"],
+    }
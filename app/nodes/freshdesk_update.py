@@ -11,6 +11,8 @@ from app.graph.state import TicketState
 from app.utils.audit import add_audit_event
 from app.clients.freshdesk_client import get_freshdesk_client
 from app.config.constants import ResolutionStatus
+from app.services.ticket_coalescer import is_superseded
+from app.services.near_duplicate_index import remember_resolution
 
 logger = logging.getLogger(__name__)
 STEP_NAME = "1️⃣6️⃣ FRESHDESK_UPDATE"
@@ -52,25 +54,22 @@ def _handle_skipped_ticket(state: TicketState, ticket_id: int, start_time: float
     client = get_freshdesk_client()
     
     try:
-        # Add private note explaining why skipped
-        if private_note:
-            logger.info(f"{STEP_NAME} | 📝 Adding skip private note")
-            note_start = time.time()
-            client.add_note(ticket_id, private_note, private=True)
-            logger.info(f"{STEP_NAME} | ✓ Private note added in {time.time() - note_start:.2f}s")
-        
         # Update tags (merge with existing)
         old_tags = state.get("tags") or []
         merged_tags = sorted(list(set(old_tags + suggested_tags)))
         
-        # Only update if there are new tags to add
+        # Private note explaining why skipped + tags (only if there are new ones), in one round
+        fields = {"tags": merged_tags} if suggested_tags else {}
+        if private_note:
+            logger.info(f"{STEP_NAME} | 📝 Adding skip private note")
         if suggested_tags:
             logger.info(f"{STEP_NAME} | 🏷 Updating tags: {old_tags} + {suggested_tags} → {merged_tags}")
-            tags_start = time.time()
-            client.update_ticket(ticket_id, tags=merged_tags)
-            logger.info(f"{STEP_NAME} | ✓ Tags updated in {time.time() - tags_start:.2f}s")
         else:
             logger.info(f"{STEP_NAME} | 🏷 No new tags to add, skipping tag update")
+        if private_note or fields:
+            write_start = time.time()
+            client.add_note_and_update(ticket_id, note=private_note, private=True, **fields)
+            logger.info(f"{STEP_NAME} | ✓ Freshdesk writes done in {time.time() - write_start:.2f}s")
         
         duration = time.time() - start_time
         logger.info(f"{STEP_NAME} | ✅ SKIPPED: ticket #{ticket_id} updated (no public response) in {duration:.2f}s")
@@ -117,6 +116,20 @@ def update_freshdesk_ticket(state: TicketState) -> Dict[str, Any]:
     except Exception:
         raise ValueError("Invalid ticket_id in state")
 
+    # A newer update for this ticket is queued - its run writes instead
+    generation = state.get("coalesce_generation")
+    if is_superseded(state.get("ticket_id"), generation):
+        logger.info(f"{STEP_NAME} | ⏭️ Ticket #{ticket_id} superseded by a newer update - skipping Freshdesk writes")
+        return {
+            "workflow_superseded": True,
+            "audit_events": add_audit_event(
+                state,
+                "update_freshdesk_ticket",
+                "SKIP",
+                {"ticket_id": ticket_id, "reason": "superseded", "generation": generation},
+            )["audit_events"],
+        }
+
     # Check if this is a skipped ticket (PO, auto-reply, spam)
     skip_workflow_applied = state.get("skip_workflow_applied", False)
     
@@ -147,9 +160,6 @@ def update_freshdesk_ticket(state: TicketState) -> Dict[str, Any]:
             note_text = reply_text if reply_text else "🤖 AI processing completed - see tags for status."
             logger.info(f"{STEP_NAME} | 📝 Adding PRIVATE note (AI draft for agent review)")
 
-        note_start = time.time()
-        client.add_note(ticket_id, note_text, private=True)
-        logger.info(f"{STEP_NAME} | ✓ Private note added in {time.time() - note_start:.2f}s")
         note_type = "private"
 
         # ---------------------- UPDATE TAGS ----------------------
@@ -158,9 +168,19 @@ def update_freshdesk_ticket(state: TicketState) -> Dict[str, Any]:
         merged_tags = sorted(list(set(old_tags + extra_tags)))
 
         logger.info(f"{STEP_NAME} | 🏷 Updating tags: {old_tags} + {extra_tags} → {merged_tags}")
-        tags_start = time.time()
-        client.update_ticket(ticket_id, tags=merged_tags)
-        logger.info(f"{STEP_NAME} | ✓ Tags updated in {time.time() - tags_start:.2f}s")
+
+        # Note first; tags (AI_* marker) only once the note is written
+        write_start = time.time()
+        client.add_note_and_update(ticket_id, note=note_text, private=True, tags=merged_tags)
+        logger.info(f"{STEP_NAME} | ✓ Private note + tags written in {time.time() - write_start:.2f}s")
+
+        # Only a resolution that actually reached Freshdesk may be reused for near-duplicates
+        if status == ResolutionStatus.RESOLVED.value and not state.get("skip_freshdesk_update"):
+            try:
+                if remember_resolution(state):
+                    logger.info(f"{STEP_NAME} | ♻️ Indexed for near-duplicate reuse")
+            except Exception as e:
+                logger.warning(f"{STEP_NAME} | ⚠️ Near-duplicate indexing failed: {e}")
 
         duration = time.time() - start_time
         logger.info(f"{STEP_NAME} | ✅ Complete: ticket #{ticket_id} updated ({note_type} note) in {duration:.2f}s")
@@ -0,0 +1,298 @@
+"""
+Lite Path - deterministic fast path for simple tickets
+Runs inside react_agent after the planning phase, in place of the ReACT loop.
+
+Selected when:
+- the plan says complexity == "simple" and the policy lets us proceed
+- the plan needs no customer-evidence tools (attachments, OCR, vision) and
+  no retrieval (document / past-ticket search) - the fixed lookups can't
+  replace either, so those plans keep the full ReACT loop
+- ticket_extractor found an EXACT catalog model or spare part number
+
+Fixed lookups (no LLM): product_catalog_tool per exact model,
+spare_parts_pricing_tool per exact part, get_product_resources for the
+identified model. The result has the same shape as a ReACT run, so
+draft_response needs no changes. When no lookup succeeds the caller falls
+back to the full ReACT loop.
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from app.graph.state import TicketState, ReACTIteration
+from app.config.settings import settings
+from app.utils.audit import add_audit_event
+from app.utils.metrics import counter
+from app.nodes.react_agent_helpers import _execute_tool, _populate_legacy_fields
+from app.nodes.stopping_policy import record_loop_outcome
+
+logger = logging.getLogger(__name__)
+STEP_NAME = "⚡ LITE_PATH"
+
+# Plans that need these tools depend on customer evidence the fixed lookups can't read
+LITE_BLOCKING_TOOLS = {
+    "attachment_analyzer_tool",
+    "attachment_type_classifier_tool",
+    "multimodal_document_analyzer_tool",
+    "ocr_image_analyzer_tool",
+    "vision_search_tool",
+}
+# Plans that ask for retrieval would lose it: the lite result has no searched documents / past tickets
+LITE_RETRIEVAL_TOOLS = {
+    "document_search_tool",
+    "past_tickets_search_tool",
+}
+LITE_MAX_LOOKUPS = 3  # Per kind (models / parts) - simple tickets mention one or two
+
+# outcome: selected | fallback | ineligible  (coverage = selected / all)
+LITE_PATH_CALLS = counter("flusso_lite_path_total", "Lite path decisions by outcome and reason")
+
+
+def _exact_models(ticket_facts: Dict[str, Any]) -> List[str]:
+    """Extracted models (full SKU first) that hit the catalog exactly."""
+    from app.services.product_catalog import ensure_catalog_loaded
+
+    candidates: List[str] = []
+    for code in ticket_facts.get("raw_product_codes", []) or []:
+        for key in ("full_sku", "model"):
+            value = code.get(key) if isinstance(code, dict) else None
+            if value and value not in candidates:
+                candidates.append(value)
+    for model in ticket_facts.get("planner_verified_models", []) or []:
+        if model and model not in candidates:
+            candidates.append(model)
+
+    catalog = ensure_catalog_loaded()
+    exact: List[str] = []
+    for candidate in candidates:
+        product = catalog.search_exact_model(candidate)
+        if product and product["model_no"] not in exact:
+            exact.append(product["model_no"])
+    return exact[:LITE_MAX_LOOKUPS]
+
+
+def _exact_parts(ticket_facts: Dict[str, Any]) -> List[str]:
+    """Extracted part numbers that hit the spare parts sheet exactly."""
+    from app.services.spare_parts_pricing_service import find_spare_part_pricing
+
+    exact: List[str] = []
+    for part in ticket_facts.get("raw_part_numbers", []) or []:
+        if not part or part in exact:
+            continue
+        result = find_spare_part_pricing(part, allow_fuzzy=False, limit=1)
+        if result.get("success") and result.get("search_method") == "exact_match":
+            exact.append(part)
+    return exact[:LITE_MAX_LOOKUPS]
+
+
+def select_lite_path(state: TicketState, ticket_facts: Dict[str, Any], execution_plan: Optional[Dict[str, Any]]) -> Optional[Dict[str, List[str]]]:
+    """
+    Decide whether this ticket can take the lite path.
+    Returns {"models": [...], "parts": [...]} with the exact hits, or None.
+    """
+    if not settings.lite_path_enabled:
+        return None
+
+    reason = None
+    if not execution_plan:
+        reason = "no_plan"
+    elif execution_plan.get("complexity") != "simple":
+        reason = "not_simple"
+    elif not execution_plan.get("policy_applicable", {}).get("can_proceed", True):
+        reason = "policy_blocked"
+    elif state.get("ticket_images"):
+        reason = "has_images"
+    else:
+        planned_tools = {s.get("tool") for s in execution_plan.get("execution_plan", []) if isinstance(s, dict)}
+        if planned_tools & LITE_BLOCKING_TOOLS:
+            reason = "needs_evidence_tools"
+        elif planned_tools & LITE_RETRIEVAL_TOOLS:
+            reason = "needs_retrieval"
+
+    if reason:
+        LITE_PATH_CALLS.inc(outcome="ineligible", reason=reason)
+        return None
+
+    try:
+        hits = {"models": _exact_models(ticket_facts), "parts": _exact_parts(ticket_facts)}
+    except Exception as e:
+        logger.warning(f"{STEP_NAME} | ⚠️ Exact-hit check failed: {e}")
+        LITE_PATH_CALLS.inc(outcome="ineligible", reason="lookup_error")
+        return None
+
+    if not hits["models"] and not hits["parts"]:
+        LITE_PATH_CALLS.inc(outcome="ineligible", reason="no_exact_hit")
+        return None
+
+    logger.info(f"{STEP_NAME} | ✅ Eligible: simple plan, exact models={hits['models']}, parts={hits['parts']}")
+    return hits
+
+
+def _resource_documents(model_no: str) -> List[Dict[str, Any]]:
+    """Spec sheet / manual / parts diagram links for the model, as gathered documents."""
+    from app.services.resource_links_service import get_product_resources
+
+    resources = get_product_resources(model_no)
+    if not resources:
+        return []
+    labels = {
+        "spec_sheet_url": "Spec Sheet",
+        "install_manual_url": "Installation Manual",
+        "parts_diagram_url": "Parts Diagram",
+        "install_video_url": "Installation Video",
+    }
+    docs = []
+    for attr, label in labels.items():
+        url = getattr(resources, attr, None)
+        if url:
+            docs.append({
+                "id": f"{model_no}_{attr}",
+                "title": f"{model_no} {label}",
+                "content_preview": f"{label} for {model_no} ({resources.product_title}): {url}",
+                "relevance_score": 1.0,
+            })
+    return docs
+
+
+def run_lite_path(
+    state: TicketState,
+    hits: Dict[str, List[str]],
+    start_time: float,
+    planning_updates: Dict[str, Any],
+    ticket_facts_updates: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """
+    Run the fixed lookups and build a react_agent result.
+    Returns None when nothing was found - the caller then runs the full ReACT loop.
+    """
+    attachments = state.get("ticket_attachments", []) or []
+    tool_results: Dict[str, Any] = {}
+    iterations: List[ReACTIteration] = []
+    identified_product = None
+    product_confidence = 0.0
+    gathered_documents: List[Dict[str, Any]] = []
+
+    def _lookup(action: str, action_input: Dict[str, Any]) -> Dict[str, Any]:
+        tool_start = time.time()
+        output, observation = _execute_tool(action, action_input, [], attachments, tool_results, None)
+        iterations.append({
+            "iteration": len(iterations) + 1,
+            "thought": f"Lite path: fixed {action} lookup",
+            "action": action,
+            "action_input": action_input,
+            "observation": observation,
+            "tool_output": output,
+            "timestamp": time.time(),
+            "duration": time.time() - tool_start,
+        })
+        return output
+
+    for model in hits.get("models", []):
+        output = _lookup("product_catalog_tool", {"model_number": model})
+        products = output.get("products", []) if output.get("success") else []
+        if products and not identified_product:
+            top = products[0]
+            identified_product = {
+                "model": top.get("model_no"),
+                "name": top.get("title"),
+                "category": top.get("category"),
+                "confidence": 1.0 if output.get("search_method") == "exact" else 0.8,
+            }
+            product_confidence = identified_product["confidence"]
+
+    # _execute_tool keeps only the latest result per tool; keep every part's pricing
+    priced_parts: List[Dict[str, Any]] = []
+    for part in hits.get("parts", []):
+        output = _lookup("spare_parts_pricing_tool", {"part_number": part})
+        if output.get("success"):
+            priced_parts.extend(output.get("parts", []))
+    spare_parts_pricing = tool_results.get("spare_parts_pricing")
+    if spare_parts_pricing and len(hits.get("parts", [])) > 1:
+        spare_parts_pricing = {**spare_parts_pricing, "success": bool(priced_parts), "parts": priced_parts}
+
+    if identified_product:
+        try:
+            gathered_documents = _resource_documents(identified_product["model"])
+        except Exception as e:
+            logger.warning(f"{STEP_NAME} | ⚠️ Resource lookup failed: {e}")
+
+    if not identified_product and not priced_parts:
+        logger.info(f"{STEP_NAME} | ↩️ Lookups found nothing - falling back to full ReACT loop")
+        LITE_PATH_CALLS.inc(outcome="fallback", reason="lookups_empty")
+        return None
+
+    total_duration = time.time() - start_time
+    LITE_PATH_CALLS.inc(outcome="selected", reason="exact_hit")
+    record_loop_outcome(len(iterations), "lite")
+    logger.info(
+        f"{STEP_NAME} | ✅ Done in {total_duration:.2f}s: {len(iterations)} lookups, "
+        f"product={identified_product['model'] if identified_product else None}, "
+        f"parts={len(priced_parts)}, resources={len(gathered_documents)}"
+    )
+
+    legacy_updates = _populate_legacy_fields(
+        gathered_documents=gathered_documents,
+        gathered_images=[],
+        gathered_past_tickets=[],
+        identified_product=identified_product,
+        product_confidence=product_confidence,
+        gemini_answer="",
+        vision_products=[],
+        spare_parts_pricing=spare_parts_pricing,
+    )
+
+    audit_events = add_audit_event(
+        state,
+        event="react_agent_loop",
+        event_type="SUCCESS",
+        details={
+            "iterations": len(iterations),
+            "status": "lite",
+            "duration_seconds": total_duration,
+            "product_identified": identified_product is not None,
+            "documents_found": len(gathered_documents),
+            "parts_priced": len(priced_parts),
+            "ticket_complexity": planning_updates.get("ticket_complexity"),
+            "lite_models": hits.get("models", []),
+            "lite_parts": hits.get("parts", []),
+        }
+    )["audit_events"]
+
+    result = {
+        "react_iterations": iterations,
+        "react_total_iterations": len(iterations),
+        "react_status": "lite",
+        "react_stop_reason": "lite",
+        "react_final_reasoning": f"Lite path: {len(iterations)} fixed lookup(s) for exact catalog/part hits",
+        "identified_product": identified_product,
+        "product_confidence": product_confidence,
+        "gathered_documents": gathered_documents,
+        "gathered_images": [],
+        "gathered_past_tickets": [],
+        "gemini_answer": "",
+        "vision_match_quality": "NO_MATCH",
+        "vision_relevance_reason": "",
+        "missing_requirements": [],
+        "image_analysis_insights": [],
+        # Exact hits - nothing to resolve
+        "evidence_analysis": {
+            "resolution_action": "proceed",
+            "final_confidence": product_confidence or 0.9,
+            "has_conflict": False,
+            "conflict_reason": None,
+            "evidence_summary": "Exact catalog/part match from ticket text (lite path)",
+            "primary_product": identified_product,
+        },
+        "needs_more_info": False,
+        "info_request_response": None,
+        "workflow_error": None,
+        "workflow_error_type": None,
+        "workflow_error_node": None,
+        "is_system_error": False,
+        **legacy_updates,
+        "audit_events": audit_events,
+    }
+    result.update(planning_updates)
+    result.update(ticket_facts_updates)
+    return result
@@ -0,0 +1,150 @@
+"""
+Near-Duplicate Reuse
+Uses the resolution of a near-identical ticket resolved recently
+(pre_triage sets near_duplicate_match, see app/services/near_duplicate_index.py).
+
+NEAR_DUP_MODE:
+- reuse:         react_agent returns the prior evidence bundle instead of
+                 planning + ReACT loop; draft_response writes a fresh reply
+                 with the prior draft as a starting point
+- short_circuit: for the SAME requester, pre_triage routes to
+                 near_duplicate_handler, which copies the prior evidence,
+                 customer type and draft (no attachment extraction, routing,
+                 ReACT or draft LLM calls) → resolution_logic. Other
+                 requesters fall back to reuse: the prior draft names that
+                 customer and followed their DEALER / END_CUSTOMER rules.
+
+freshdesk_update indexes a ticket only after its RESOLVED note was written
+(not superseded, not a dry run). resolution_logic tags reused resolutions
+NEAR_DUPLICATE; they are never indexed again, so the time window stays
+anchored to a real resolution.
+"""
+
+import html
+import logging
+import re
+import time
+from typing import Dict, Any, Optional
+
+from app.graph.state import TicketState
+from app.utils.audit import add_audit_event
+from app.services.near_duplicate_index import NEAR_DUP_REUSED
+
+logger = logging.getLogger(__name__)
+STEP_NAME = "♻️ NEAR_DUPLICATE"
+
+NEAR_DUPLICATE_TAG = "NEAR_DUPLICATE"
+PRIOR_DRAFT_PROMPT_CHARS = 3000
+
+# Fields of the prior resolution that are not part of the ReACT output
+_NON_EVIDENCE_FIELDS = {"ticket_category", "customer_type", "draft_response", "overall_confidence"}
+
+
+def _evidence(match: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in match.get("resolution", {}).items() if k not in _NON_EVIDENCE_FIELDS}
+
+
+def reuse_prior_evidence(state: TicketState, start_time: float) -> Optional[Dict[str, Any]]:
+    """react_agent result built from the prior ticket's evidence bundle, or None."""
+    match = state.get("near_duplicate_match")
+    if not match or not match.get("resolution"):
+        return None
+
+    evidence = _evidence(match)
+    NEAR_DUP_REUSED.inc(mode="evidence")
+    duration = time.time() - start_time
+    logger.info(
+        f"{STEP_NAME} | ✅ Reusing evidence of #{match['ticket_id']} (sim={match['similarity']:.2f}) - "
+        f"product={(evidence.get('identified_product') or {}).get('model')}, "
+        f"documents={len(evidence.get('source_documents') or [])}"
+    )
+
+    return {
+        **evidence,
+        "react_iterations": [],
+        "react_total_iterations": 0,
+        "react_status": "near_duplicate",
+        "react_stop_reason": "near_duplicate",
+        "react_final_reasoning": f"Evidence reused from near-duplicate ticket #{match['ticket_id']}",
+        "ran_vision": True,
+        "ran_text_rag": True,
+        "ran_past_tickets": True,
+        "workflow_error": None,
+        "workflow_error_type": None,
+        "workflow_error_node": None,
+        "is_system_error": False,
+        "audit_events": add_audit_event(
+            state,
+            event="react_agent_loop",
+            event_type="SUCCESS",
+            details={
+                "iterations": 0,
+                "status": "near_duplicate",
+                "duration_seconds": duration,
+                "prior_ticket_id": match["ticket_id"],
+                "similarity": match["similarity"],
+                "product_identified": evidence.get("identified_product") is not None,
+                "documents_found": len(evidence.get("source_documents") or []),
+            }
+        )["audit_events"],
+    }
+
+
+def _reuse_banner(match: Dict[str, Any]) -> str:
+    return f"""<div style="background: #ecfeff; border: 1px solid #67e8f9; border-radius: 8px; padding: 12px; margin-bottom: 16px; font-family: Arial, sans-serif;">
+    <strong>♻️ Reused from near-duplicate ticket #{match['ticket_id']}</strong>
+    <span style="font-size: 13px; color: #155e75;"> (same requester, similarity {match['similarity']:.0%}, resolved {match['age_seconds'] / 3600:.1f}h ago)</span>
+</div>
+"""
+
+
+def near_duplicate_handler(state: TicketState) -> Dict[str, Any]:
+    """Short-circuit (same requester only): copy the prior resolution and go to resolution_logic."""
+    start_time = time.time()
+    match = state["near_duplicate_match"]
+    resolution = match.get("resolution", {})
+
+    NEAR_DUP_REUSED.inc(mode="short_circuit")
+    logger.info(f"{STEP_NAME} | ⚡ Short-circuit: reusing resolution of #{match['ticket_id']} (sim={match['similarity']:.2f})")
+
+    return {
+        **_evidence(match),
+        "ticket_category": resolution.get("ticket_category"),
+        "customer_type": resolution.get("customer_type"),
+        "draft_response": _reuse_banner(match) + (resolution.get("draft_response") or ""),
+        "overall_confidence": resolution.get("overall_confidence"),
+        "react_status": "near_duplicate",
+        "audit_events": add_audit_event(
+            state,
+            event="near_duplicate_handler",
+            event_type="SUCCESS",
+            details={
+                "prior_ticket_id": match["ticket_id"],
+                "similarity": match["similarity"],
+                "age_seconds": match["age_seconds"],
+                "same_requester": match.get("same_requester"),
+                "duration_seconds": time.time() - start_time,
+            }
+        )["audit_events"],
+    }
+
+
+def prior_draft_prompt_section(state: TicketState) -> str:
+    """Prompt section with the prior ticket's reply as a starting point ("" when not a near-duplicate)."""
+    match = state.get("near_duplicate_match")
+    draft = (match or {}).get("resolution", {}).get("draft_response")
+    if not draft:
+        return ""
+    text = html.unescape(re.sub(r"<[^>]+>", " ", draft))
+    text = re.sub(r"\s+", " ", text).strip()[:PRIOR_DRAFT_PROMPT_CHARS]
+    return f"""
+═══════════════════════════════════════════════════════════════════════
+♻️ PRIOR REPLY TO A NEAR-IDENTICAL TICKET (#{match['ticket_id']}, similarity {match['similarity']:.0%})
+═══════════════════════════════════════════════════════════════════════
+Use it as a starting point. Keep what still applies, but address THIS
+customer and correct anything that differs in this ticket (names, dates,
+quantities, addresses).
+
+{text}
+═══════════════════════════════════════════════════════════════════════
+"""
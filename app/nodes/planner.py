@@ -8,6 +8,7 @@ Integrates with constraint_validator for requirement enforcement.
 
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 
 from app.graph.state import TicketState
@@ -15,6 +16,7 @@ from app.clients.llm_client import get_llm_client
 from app.services.policy_service import get_relevant_policy, get_policy_for_category
 from app.config.settings import settings
 from app.utils.audit import add_audit_event
+from app.utils.tracing import with_context
 from app.nodes.ticket_extractor import update_ticket_facts, get_model_candidates_from_facts
 
 # Import constraint validator
@@ -475,6 +477,56 @@ Respond ONLY with valid JSON:
 """
 
 
+def _format_extracted_codes(raw_codes: List[Dict[str, Any]]) -> str:
+    """Render raw_product_codes for the verification prompt."""
+    extracted_codes_str = "\n".join([
+        f"  - Full SKU: {c.get('full_sku', 'N/A')}, Model: {c.get('model', 'N/A')}, "
+        f"Finish Code: {c.get('finish_code', 'None')}, Finish Name: {c.get('finish_name', 'None')}"
+        for c in raw_codes
+    ])
+    return extracted_codes_str or "  (No codes extracted)"
+
+
+def _apply_verification_response(ticket_facts: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a VERIFY_FACTS_PROMPT-shaped response into ticket_facts (TIER 2 fields)."""
+    # Extract verified models
+    verified_models = response.get("verified_models", [])
+    verified_model_numbers = [m.get("model") for m in verified_models if m.get("model")]
+    verified_finishes = [m.get("finish_code") for m in verified_models if m.get("finish_code")]
+
+    # Include corrections
+    corrections = {
+        c.get("original"): c.get("corrected")
+        for c in response.get("corrections", [])
+        if c.get("original") and c.get("corrected")
+    }
+
+    # Include any missed models
+    missed_models = response.get("missing_models", [])
+    for missed in missed_models:
+        if isinstance(missed, str) and missed not in verified_model_numbers:
+            # Extract just the model number from "PBV2105 - mentioned in text"
+            model_part = missed.split(" - ")[0].split(" ")[0].strip()
+            if model_part:
+                verified_model_numbers.append(model_part)
+
+    # Update ticket_facts
+    updated_facts = update_ticket_facts(
+        ticket_facts,
+        {
+            "planner_verified": True,
+            "planner_verified_models": verified_model_numbers,
+            "planner_verified_finishes": list(set(verified_finishes)),
+            "planner_corrections": corrections,
+            "planner_finish_preferences": response.get("finish_preferences", []),
+            "planner_verification_confidence": response.get("overall_confidence", 0.5),
+            "planner_notes": response.get("notes", "")
+        },
+        updated_by="planner"
+    )
+    return updated_facts
+
+
 def verify_ticket_facts(state: TicketState) -> Dict[str, Any]:
     """
     Use LLM to verify and enhance the raw extractions from ticket_extractor.
@@ -524,16 +576,10 @@ def verify_ticket_facts(state: TicketState) -> Dict[str, Any]:
     subject = state.get("ticket_subject", "") or ""
     text = state.get("ticket_text", "") or ""
     
-    extracted_codes_str = "\n".join([
-        f"  - Full SKU: {c.get('full_sku', 'N/A')}, Model: {c.get('model', 'N/A')}, "
-        f"Finish Code: {c.get('finish_code', 'None')}, Finish Name: {c.get('finish_name', 'None')}"
-        for c in raw_codes
-    ])
-    
     prompt = VERIFY_FACTS_PROMPT.format(
         subject=subject,
         text=text[:2000],  # Limit text
-        extracted_codes=extracted_codes_str or "  (No codes extracted)"
+        extracted_codes=_format_extracted_codes(raw_codes)
     )
     
     try:
@@ -546,48 +592,18 @@ def verify_ticket_facts(state: TicketState) -> Dict[str, Any]:
             user_prompt=prompt,
             response_format="json",
             temperature=0.1,
-            max_tokens=2048
+            max_tokens=2048,
+            task="verify"
         )
         
         if not isinstance(response, dict):
             logger.warning(f"{STEP_NAME} | Invalid verification response")
             response = {}
         
-        # Extract verified models
-        verified_models = response.get("verified_models", [])
-        verified_model_numbers = [m.get("model") for m in verified_models if m.get("model")]
-        verified_finishes = [m.get("finish_code") for m in verified_models if m.get("finish_code")]
-        
-        # Include corrections
-        corrections = {
-            c.get("original"): c.get("corrected")
-            for c in response.get("corrections", [])
-            if c.get("original") and c.get("corrected")
-        }
-        
-        # Include any missed models
-        missed_models = response.get("missing_models", [])
-        for missed in missed_models:
-            if isinstance(missed, str) and missed not in verified_model_numbers:
-                # Extract just the model number from "PBV2105 - mentioned in text"
-                model_part = missed.split(" - ")[0].split(" ")[0].strip()
-                if model_part:
-                    verified_model_numbers.append(model_part)
-        
-        # Update ticket_facts
-        updated_facts = update_ticket_facts(
-            ticket_facts,
-            {
-                "planner_verified": True,
-                "planner_verified_models": verified_model_numbers,
-                "planner_verified_finishes": list(set(verified_finishes)),
-                "planner_corrections": corrections,
-                "planner_finish_preferences": response.get("finish_preferences", []),
-                "planner_verification_confidence": response.get("overall_confidence", 0.5),
-                "planner_notes": response.get("notes", "")
-            },
-            updated_by="planner"
-        )
+        updated_facts = _apply_verification_response(ticket_facts, response)
+        verified_model_numbers = updated_facts.get("planner_verified_models", [])
+        verified_finishes = updated_facts.get("planner_verified_finishes", [])
+        corrections = updated_facts.get("planner_corrections", {})
         
         logger.info(f"{STEP_NAME} | ✅ Verified models: {verified_model_numbers}")
         if verified_finishes:
@@ -615,6 +631,116 @@ def verify_ticket_facts(state: TicketState) -> Dict[str, Any]:
         return {"ticket_facts": updated_facts}
 
 
+# ===============================
+# PLAN CONTEXT / VALIDATION (shared with ticket_understanding)
+# ===============================
+def _planning_context(state: TicketState, category: Optional[str], with_constraints: bool = True) -> Dict[str, Any]:
+    """
+    Policy lookup, ticket_facts summary and constraint validation for planning.
+    with_constraints=False skips validation for callers that only learn the
+    category later (they add _constraint_context() themselves).
+    """
+    text = state.get("ticket_text", "") or ""
+    
+    # Step 1: Quick classify for policy lookup
+    quick_category = _quick_classify(state)
+    logger.info(f"{STEP_NAME} | Quick classification: {quick_category}")
+    
+    # Step 3.5 (constraint validation) only needs ticket_facts - run it alongside the policy lookup
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        constraints_future = None
+        if with_constraints:
+            constraints_future = pool.submit(with_context(_constraint_context), state, category or quick_category)
+        
+        # Step 2: Get relevant policy
+        policy_result = get_relevant_policy(
+            ticket_category=category or quick_category,
+            ticket_text=text,
+            keywords=_extract_model_numbers(text)
+        )
+        constraint_ctx = constraints_future.result() if constraints_future else {}
+    
+    policy_section = policy_result.get("primary_section", "")[:2000]  # Limit for prompt
+    policy_requirements = policy_result.get("policy_requirements", [])
+    
+    logger.info(f"{STEP_NAME} | Policy section: {policy_result.get('primary_section_name', 'N/A')}")
+    logger.info(f"{STEP_NAME} | Policy requirements: {policy_requirements}")
+    
+    # Step 3: Format ticket_facts summary for prompt
+    ticket_facts_summary = _format_ticket_facts_for_planner(state)
+    logger.info(f"{STEP_NAME} | Ticket facts available: {bool(state.get('ticket_facts'))}")
+    
+    ctx = {
+        "quick_category": quick_category,
+        "policy_result": policy_result,
+        "policy_section": policy_section,
+        "policy_requirements_text": "\n".join(f"- {req}" for req in policy_requirements) if policy_requirements else "No specific requirements",
+        "ticket_facts_summary": ticket_facts_summary,
+    }
+    ctx.update(constraint_ctx)
+    return ctx
+
+
+def _constraint_context(state: TicketState, category: str) -> Dict[str, Any]:
+    """Step 3.5: Run constraint validation (NEW)"""
+    constraint_result = None
+    constraints_prompt = ""
+    if CONSTRAINT_VALIDATOR_AVAILABLE:
+        try:
+            ticket_facts = state.get("ticket_facts", {}) or {}
+            constraint_result = validate_constraints(
+                ticket_facts=ticket_facts,
+                ticket_category=category,
+                product_text=(state.get("ticket_text", "") or "")[:500]  # Pass some ticket text for product keyword matching
+            )
+            constraints_prompt = format_constraints_for_prompt(constraint_result)
+            logger.info(f"{STEP_NAME} | 🔒 Constraints: {format_constraints_summary(constraint_result)}")
+        except Exception as e:
+            logger.warning(f"{STEP_NAME} | ⚠️ Constraint validation failed: {e}")
+            constraint_result = None
+            constraints_prompt = ""
+    return {"constraint_result": constraint_result, "constraints_prompt": constraints_prompt}
+
+
+def _is_valid_plan(response: Any) -> bool:
+    """Same shape check the planner has always applied to PLANNING_PROMPT output."""
+    return isinstance(response, dict) and isinstance(response.get("execution_plan"), list)
+
+
+def _finalize_plan(response: Dict[str, Any], ctx: Dict[str, Any], start_time: float, llm_duration: float) -> Dict[str, Any]:
+    """Ensure finish_tool, attach planning metadata and constraint results."""
+    # Ensure finish_tool is in plan
+    plan_tools = [step.get("tool") for step in response.get("execution_plan", []) if isinstance(step, dict)]
+    if "finish_tool" not in plan_tools:
+        response["execution_plan"].append({
+            "step": len(response["execution_plan"]) + 1,
+            "tool": "finish_tool",
+            "reason": "Complete information gathering",
+            "input_hint": None
+        })
+    
+    duration = time.time() - start_time
+    logger.info(f"{STEP_NAME} | ✅ Planning complete in {duration:.2f}s")
+    logger.info(f"{STEP_NAME} | Complexity: {response.get('complexity', 'unknown')}")
+    logger.info(f"{STEP_NAME} | Plan steps: {len(response.get('execution_plan', []))}")
+    
+    # Add metadata
+    response["_planning_metadata"] = {
+        "duration_seconds": duration,
+        "llm_duration_seconds": llm_duration,
+        "policy_section_used": ctx["policy_result"].get("primary_section_name"),
+        "quick_category": ctx["quick_category"]
+    }
+    
+    # Add constraint validation results (NEW)
+    constraint_result = ctx.get("constraint_result")
+    if constraint_result:
+        response["_constraint_result"] = constraint_result.to_dict()
+        response["_constraints_prompt"] = ctx.get("constraints_prompt", "")
+    
+    return response
+
+
 # ===============================
 # MAIN PLANNING FUNCTION
 # ===============================
@@ -657,44 +783,8 @@ def create_execution_plan(state: TicketState) -> Dict[str, Any]:
     logger.info(f"{STEP_NAME} | Ticket: '{subject[:50]}...', Category: {category}")
     logger.info(f"{STEP_NAME} | Images: {len(images)}, Attachments: {len(attachments)}")
     
-    # Step 1: Quick classify for policy lookup
-    quick_category = _quick_classify(state)
-    logger.info(f"{STEP_NAME} | Quick classification: {quick_category}")
-    
-    # Step 2: Get relevant policy
-    policy_result = get_relevant_policy(
-        ticket_category=category or quick_category,
-        ticket_text=text,
-        keywords=_extract_model_numbers(text)
-    )
-    
-    policy_section = policy_result.get("primary_section", "")[:2000]  # Limit for prompt
-    policy_requirements = policy_result.get("policy_requirements", [])
-    
-    logger.info(f"{STEP_NAME} | Policy section: {policy_result.get('primary_section_name', 'N/A')}")
-    logger.info(f"{STEP_NAME} | Policy requirements: {policy_requirements}")
-    
-    # Step 3: Format ticket_facts summary for prompt
-    ticket_facts_summary = _format_ticket_facts_for_planner(state)
-    logger.info(f"{STEP_NAME} | Ticket facts available: {bool(state.get('ticket_facts'))}")
-    
-    # Step 3.5: Run constraint validation (NEW)
-    constraint_result = None
-    constraints_prompt = ""
-    if CONSTRAINT_VALIDATOR_AVAILABLE:
-        try:
-            ticket_facts = state.get("ticket_facts", {}) or {}
-            constraint_result = validate_constraints(
-                ticket_facts=ticket_facts,
-                ticket_category=category or quick_category,
-                product_text=text[:500]  # Pass some ticket text for product keyword matching
-            )
-            constraints_prompt = format_constraints_for_prompt(constraint_result)
-            logger.info(f"{STEP_NAME} | 🔒 Constraints: {format_constraints_summary(constraint_result)}")
-        except Exception as e:
-            logger.warning(f"{STEP_NAME} | ⚠️ Constraint validation failed: {e}")
-            constraint_result = None
-            constraints_prompt = ""
+    ctx = _planning_context(state, category)
+    quick_category = ctx["quick_category"]
     
     # Step 4: Build prompt
     prompt = PLANNING_PROMPT.format(
@@ -706,9 +796,9 @@ def create_execution_plan(state: TicketState) -> Dict[str, Any]:
         has_attachments="Yes" if attachments else "No",
         attachment_count=len(attachments),
         attachment_types=_get_attachment_types(attachments),
-        ticket_facts_summary=ticket_facts_summary,
-        policy_section=policy_section or "No specific policy found",
-        policy_requirements="\n".join(f"- {req}" for req in policy_requirements) if policy_requirements else "No specific requirements"
+        ticket_facts_summary=ctx["ticket_facts_summary"],
+        policy_section=ctx["policy_section"] or "No specific policy found",
+        policy_requirements=ctx["policy_requirements_text"]
     )
     
     # Step 5: Call LLM for planning
@@ -723,44 +813,19 @@ def create_execution_plan(state: TicketState) -> Dict[str, Any]:
             user_prompt=prompt,
             response_format="json",
             temperature=0.1,  # Low temperature for consistent planning
-            max_tokens=4096  # Increased from 2048 to avoid truncation
+            max_tokens=4096,  # Increased from 2048 to avoid truncation
+            task="plan"
         )
         
         llm_duration = time.time() - llm_start
         logger.info(f"{STEP_NAME} | ✓ LLM response in {llm_duration:.2f}s")
         
         # Validate response
-        if not isinstance(response, dict) or "execution_plan" not in response:
+        if not _is_valid_plan(response):
             logger.warning(f"{STEP_NAME} | Invalid LLM response, using default plan")
             response = _build_default_plan(state, quick_category)
         
-        # Ensure finish_tool is in plan
-        plan_tools = [step.get("tool") for step in response.get("execution_plan", [])]
-        if "finish_tool" not in plan_tools:
-            response["execution_plan"].append({
-                "step": len(response["execution_plan"]) + 1,
-                "tool": "finish_tool",
-                "reason": "Complete information gathering",
-                "input_hint": None
-            })
-        
-        duration = time.time() - start_time
-        logger.info(f"{STEP_NAME} | ✅ Planning complete in {duration:.2f}s")
-        logger.info(f"{STEP_NAME} | Complexity: {response.get('complexity', 'unknown')}")
-        logger.info(f"{STEP_NAME} | Plan steps: {len(response.get('execution_plan', []))}")
-        
-        # Add metadata
-        response["_planning_metadata"] = {
-            "duration_seconds": duration,
-            "llm_duration_seconds": llm_duration,
-            "policy_section_used": policy_result.get("primary_section_name"),
-            "quick_category": quick_category
-        }
-        
-        # Add constraint validation results (NEW)
-        if constraint_result:
-            response["_constraint_result"] = constraint_result.to_dict()
-            response["_constraints_prompt"] = constraints_prompt
+        response = _finalize_plan(response, ctx, start_time, llm_duration)
         
         return response
         
@@ -0,0 +1,145 @@
+"""
+Pre-Triage Node
+Cheap rule-based skip detection BEFORE attachment extraction.
+
+Runs on Freshdesk metadata only (subject, description, tags, attachment names):
+- AI processing tags  → already_processed
+- Purchase orders     → purchase_order (these usually carry large PDFs)
+- Auto-reply / OOO    → auto_reply
+
+Skipped tickets go straight to skip_handler, so their attachments are never
+downloaded or parsed. Everything else continues to extract_attachments.
+
+Near-duplicates of a recently resolved ticket (MinHash over subject +
+description, same attachments) are flagged with near_duplicate_match; in
+short_circuit mode, near-duplicates from the same requester go to
+near_duplicate instead.
+"""
+
+import logging
+import time
+from typing import Dict, Any, Literal, Optional
+
+from app.graph.state import TicketState
+from app.utils.audit import add_audit_event
+from app.nodes.routing_agent import _detect_purchase_order, _detect_auto_reply
+from app.config.constants import PURCHASE_ORDER_NOTE, AI_PROCESSED_TAGS
+from app.config.settings import settings
+from app.services.near_duplicate_index import find_near_duplicate
+
+logger = logging.getLogger(__name__)
+STEP_NAME = "🚦 PRE_TRIAGE"
+
+
+def _skip_update(state: TicketState, category: str, skip_reason: str, skip_note: str, reason: str) -> Dict[str, Any]:
+    return {
+        "ticket_category": category,
+        "should_skip": True,
+        "skip_reason": skip_reason,
+        "skip_private_note": skip_note,
+        "category_requires_vision": False,
+        "category_requires_text_rag": False,
+        "audit_events": add_audit_event(
+            state,
+            event="pre_triage",
+            event_type="SKIP",
+            details={"category": category, "reason": reason, "should_skip": True}
+        )["audit_events"]
+    }
+
+
+def _can_short_circuit(match: Optional[Dict[str, Any]]) -> bool:
+    """
+    The prior draft is copied verbatim only for the same requester: it names
+    that customer and was written under their customer-type rules. Other
+    requesters get evidence reuse with a fresh draft.
+    """
+    return bool(match) and settings.near_dup_mode == "short_circuit" and bool(match.get("same_requester"))
+
+
+def pre_triage_ticket(state: TicketState) -> Dict[str, Any]:
+    """Skip obvious non-actionable tickets using metadata only (no downloads, no LLM)."""
+    start_time = time.time()
+
+    subject = state.get("ticket_subject", "") or ""
+    text = state.get("ticket_text", "") or ""  # Description only - attachments not extracted yet
+    tags = state.get("tags", []) or []
+    attachments = state.get("ticket_attachments", []) or []
+
+    # Already processed by AI - nothing to do (not even tags)
+    matched_tags = [t for t in tags if t in AI_PROCESSED_TAGS]
+    if matched_tags:
+        logger.warning(f"{STEP_NAME} | ⚠️ Ticket already has AI tags: {tags}")
+        update = _skip_update(
+            state,
+            "already_processed",
+            f"Already processed (has tag: {matched_tags})",
+            "",
+            "Already has AI processing tags",
+        )
+        update.update({"has_text": False, "has_image": False, "ran_vision": True, "ran_text_rag": True, "ran_past_tickets": True})
+        return update
+
+    if _detect_purchase_order(subject, text, attachments):
+        logger.info(f"{STEP_NAME} | ⚡ Purchase Order - skipping attachment extraction ({len(attachments)} doc(s)) in {time.time() - start_time:.3f}s")
+        return _skip_update(
+            state,
+            "purchase_order",
+            "Purchase Order - no customer response needed",
+            PURCHASE_ORDER_NOTE,
+            "fast_po_detection",
+        )
+
+    if _detect_auto_reply(subject, text):
+        logger.info(f"{STEP_NAME} | ⚡ Auto-reply/Out of Office - skipping attachment extraction in {time.time() - start_time:.3f}s")
+        return _skip_update(
+            state,
+            "auto_reply",
+            "Auto-reply/Out of Office message",
+            "🤖 Auto-reply detected - no action needed",
+            "fast_auto_reply_detection",
+        )
+
+    # Near-identical ticket resolved recently → reuse its resolution
+    try:
+        fingerprint, match = find_near_duplicate(state)
+    except Exception as e:
+        logger.warning(f"{STEP_NAME} | ⚠️ Near-duplicate lookup failed: {e}")
+        fingerprint, match = None, None
+
+    if match:
+        mode = "short_circuit" if _can_short_circuit(match) else "reuse"
+        logger.info(
+            f"{STEP_NAME} | ♻️ Near-duplicate of #{match['ticket_id']} "
+            f"(sim={match['similarity']:.2f}, {match['age_seconds'] / 60:.0f} min ago) - mode={mode}"
+        )
+        return {
+            "should_skip": False,
+            "near_duplicate_key": fingerprint,
+            "near_duplicate_match": match,
+            "audit_events": add_audit_event(
+                state,
+                event="pre_triage",
+                event_type="NEAR_DUPLICATE",
+                details={
+                    "prior_ticket_id": match["ticket_id"],
+                    "similarity": match["similarity"],
+                    "age_seconds": match["age_seconds"],
+                    "same_requester": match["same_requester"],
+                    "mode": mode,
+                }
+            )["audit_events"]
+        }
+
+    logger.info(f"{STEP_NAME} | ✅ Actionable - continuing to attachment extraction")
+    return {"should_skip": False, "near_duplicate_key": fingerprint}
+
+
+def route_after_pre_triage(state: TicketState) -> Literal["skip_handler", "near_duplicate", "extract_attachments"]:
+    if state.get("should_skip", False):
+        logger.info(f"[ROUTER] Pre-triage skip for category: {state.get('ticket_category', 'unknown')}")
+        return "skip_handler"
+    if _can_short_circuit(state.get("near_duplicate_match")):
+        logger.info(f"[ROUTER] Near-duplicate of #{state['near_duplicate_match']['ticket_id']} - reusing prior resolution")
+        return "near_duplicate"
+    return "extract_attachments"
@@ -15,6 +15,8 @@ from app.graph.state import TicketState, ReACTIteration
 from app.clients.llm_client import get_llm_client
 from app.utils.audit import add_audit_event
 from app.config.settings import settings
+from app.utils.tracing import start_span
+from app.services.ticket_coalescer import ensure_current
 
 from app.nodes.react_agent_helpers import (
     _build_agent_context,
@@ -22,6 +24,15 @@ from app.nodes.react_agent_helpers import (
     _populate_legacy_fields,
 
 )
+from app.nodes.lite_path import select_lite_path, run_lite_path
+from app.nodes.near_duplicate import reuse_prior_evidence
+from app.nodes.stopping_policy import (
+    StoppingPolicy,
+    StopDecision,
+    catalog_products,
+    estimate_saved_seconds,
+    record_loop_outcome,
+)
 
 # Planning module import
 try:
@@ -552,6 +563,13 @@ def react_agent_loop(state: TicketState) -> Dict[str, Any]:
     
     logger.info(f"{STEP_NAME} | Ticket #{ticket_id}: {len(ticket_text)} chars, {len(ticket_images)} images, {len(attachments)} attachments")
     
+    # ========================================
+    # NEAR-DUPLICATE: reuse the evidence of a near-identical resolved ticket
+    # ========================================
+    reused_result = reuse_prior_evidence(state, start_time)
+    if reused_result:
+        return reused_result
+    
     # ========================================
     # PHASE 1: PLANNING MODULE + TICKET FACTS VERIFICATION
     # ========================================
@@ -582,8 +600,12 @@ def react_agent_loop(state: TicketState) -> Dict[str, Any]:
                     if verified_models:
                         logger.info(f"{STEP_NAME} | ✅ Verified models: {verified_models}")
             
-            # Then create execution plan
-            execution_plan = create_execution_plan(state)
+            # Then create execution plan (already in state when routing's fused call produced one)
+            execution_plan = state.get("execution_plan")
+            if execution_plan:
+                logger.info(f"{STEP_NAME} | 🧩 Using execution plan from fused understanding call")
+            else:
+                execution_plan = create_execution_plan(state)
             
             if execution_plan and execution_plan.get("execution_plan"):
                 plan_context = get_plan_context_for_agent(execution_plan, current_plan_step)
@@ -653,7 +675,16 @@ def react_agent_loop(state: TicketState) -> Dict[str, Any]:
             logger.info(f"{STEP_NAME} | 📄 Receipt/invoice detected in ticket")
         if ticket_facts.get("has_photos"):
             logger.info(f"{STEP_NAME} | 📷 Photos attached to ticket")
-    
+
+    # ========================================
+    # LITE PATH: simple plan + exact catalog/part hit → fixed lookups, no ReACT loop
+    # ========================================
+    lite_hits = select_lite_path(state, ticket_facts, execution_plan)
+    if lite_hits:
+        lite_result = run_lite_path(state, lite_hits, start_time, planning_updates, ticket_facts_updates)
+        if lite_result:
+            return lite_result
+
     # ========================================
     # INITIALIZE AGENT STATE
     # ========================================
@@ -672,6 +703,9 @@ def react_agent_loop(state: TicketState) -> Dict[str, Any]:
         "ocr_image_analysis": None
     }
     
+    # Complex tickets may start on a stronger model (MODEL_ROUTER_COMPLEX_TASKS)
+    ticket_complexity = (execution_plan or {}).get("complexity")
+    
     identified_product = None
     gathered_documents = []
     gathered_images = []
@@ -694,12 +728,34 @@ def react_agent_loop(state: TicketState) -> Dict[str, Any]:
     # Track what we've tried to avoid repetition
     tools_used = set()
     
+    # Evidence-driven stopping (evaluated after every tool call)
+    stopping_policy = StoppingPolicy(
+        ticket_category=state.get("ticket_category", "general"),
+        ticket_facts=ticket_facts,
+        constraint_result=constraint_result,
+        has_attachments=bool(attachments),
+        has_images=bool(ticket_images),
+        requires_text_rag=state.get("category_requires_text_rag", True),
+    )
+    stop_reason = "loop_exit"  # Overwritten by whatever ends the loop
+    stop_saved_seconds = 0.0
+    
+    # One tracing span per iteration (ended at the top of the next one / after the loop)
+    iteration_span = None
+    
     for iteration_num in range(1, MAX_ITERATIONS + 1):
+        if iteration_span is not None:
+            iteration_span.end()
+            iteration_span = None
+        # Stop spending LLM calls on stale state once a newer update for this ticket arrived
+        ensure_current(state)
+        iteration_span = start_span("react.iteration", iteration=iteration_num)
         logger.info(f"\n{STEP_NAME} | ═══ ITERATION {iteration_num}/{MAX_ITERATIONS} ═══")
         
         # CRITICAL: Force finish if approaching limit
         if iteration_num >= MAX_ITERATIONS - 1:
             logger.warning(f"{STEP_NAME} | ⚠️ FORCING FINISH - max iterations reached!")
+            stop_reason = "max_iterations"
             
             # Build finish tool input from what we have
             finish_input = {
@@ -794,16 +850,35 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             iteration_start = time.time()
             
             logger.info(f"{STEP_NAME} | 🧠 Calling Gemini for reasoning...")
-            response = llm.call_llm(
-                system_prompt=REACT_SYSTEM_PROMPT,
-                user_prompt=agent_context,
-                response_format="json",
-                temperature=0.2,  # Lower temperature for more consistent decisions
-                max_tokens=settings.llm_max_tokens
-            )
+            if settings.llm_streaming_enabled:
+                # Stream and dispatch as soon as every key used below is complete
+                # (thought comes first in the response format, so this rarely waits longer)
+                response, llm_timing = llm.stream_json(
+                    system_prompt=REACT_SYSTEM_PROMPT,
+                    user_prompt=agent_context,
+                    required_keys=("thought", "action", "action_input"),
+                    temperature=0.2,
+                    max_tokens=settings.llm_max_tokens,
+                    task="react_step",
+                    complexity=ticket_complexity
+                )
+                time_to_first_action = llm_timing.get("time_to_first_action") or llm_timing.get("total") or 0.0
+            else:
+                response = llm.call_llm(
+                    system_prompt=REACT_SYSTEM_PROMPT,
+                    user_prompt=agent_context,
+                    response_format="json",
+                    temperature=0.2,  # Lower temperature for more consistent decisions
+                    max_tokens=settings.llm_max_tokens,
+                    task="react_step",
+                    complexity=ticket_complexity
+                )
+                time_to_first_action = time.time() - iteration_start
+            logger.info(f"{STEP_NAME} | ⏱️ Time to first action: {time_to_first_action:.2f}s")
             
             if not isinstance(response, dict):
                 logger.error(f"{STEP_NAME} | Invalid response format: {response}")
+                stop_reason = "invalid_response"
                 break
             
             thought = response.get("thought", "")
@@ -812,11 +887,15 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             
             logger.info(f"{STEP_NAME} | 💭 Thought: {thought}")
             logger.info(f"{STEP_NAME} | 🔧 Action: {action}")
+            if iteration_span is not None:
+                iteration_span.set_attribute("action", action)
+                iteration_span.set_attribute("time_to_first_action", round(time_to_first_action, 3))
             logger.info(f"{STEP_NAME} | 📥 Input: {json.dumps(action_input, indent=2)[:200]}")
             
             # Check if trying to repeat a failed tool
             tool_key = f"{action}:{json.dumps(action_input, sort_keys=True)}"
-            if tool_key in tools_used and action != "finish_tool":
+            is_duplicate = tool_key in tools_used and action != "finish_tool"
+            if is_duplicate:
                 logger.warning(f"{STEP_NAME} | ⚠️ Agent trying to repeat tool: {action}")
                 observation = "This search was already attempted. Try a different approach or call finish_tool."
                 tool_output = {"error": "Duplicate search attempt"}
@@ -889,7 +968,8 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
                 "observation": observation,
                 "tool_output": tool_output,
                 "timestamp": time.time(),
-                "duration": iteration_duration
+                "duration": iteration_duration,
+                "time_to_first_action": round(time_to_first_action, 3)
             }
             iterations.append(iteration_record)
             
@@ -1040,57 +1120,30 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             # ========================================
             # EARLY TERMINATION CHECK - Stop when answer is found
             # ========================================
-            # Detect when we have sufficient evidence to answer the question
-            # This prevents redundant iterations after finding the answer
-            should_early_terminate = False
-            early_terminate_reason = ""
-            
-            if action != "finish_tool" and iteration_num >= 4:  # Only after a few iterations
-                # Count high-quality spec documents
-                spec_doc_count = 0
-                spec_indicators = [
-                    "spec", "specification", "manual", "diagram", "parts",
-                    "installation", "output", "diverter", "valve", "cartridge",
-                    "pressure", "flow", "gpm", "dimensions"
-                ]
-                
-                for doc in gathered_documents:
-                    if isinstance(doc, dict):
-                        doc_title = (doc.get("title", "") or "").lower()
-                        doc_content = (doc.get("content_preview", "") or "").lower()
-                        doc_score = doc.get("relevance_score", 0.5)
-                        
-                        # Count as spec doc if it contains technical indicators
-                        has_specs = any(ind in doc_title or ind in doc_content for ind in spec_indicators)
-                        if has_specs and doc_score >= 0.7:
-                            spec_doc_count += 1
-                
-                # Condition 1: Multiple spec documents found for a product inquiry
-                # (Agent already has technical specs to answer the question)
-                if spec_doc_count >= 3 and identified_product:
-                    should_early_terminate = True
-                    early_terminate_reason = f"Found {spec_doc_count} specification documents for {identified_product.get('model', 'product')}"
-                
-                # Condition 2: Document search returned a direct answer (gemini_answer)
-                # and we have product context
-                elif gemini_answer and len(gemini_answer) > 200 and identified_product:
-                    should_early_terminate = True
-                    early_terminate_reason = f"Gemini provided comprehensive answer ({len(gemini_answer)} chars) with product context"
-                
-                # Condition 3: Multiple spec docs found even without catalog match
-                # (Product may exist in docs but not in catalog - e.g., PBV.2105)
-                elif spec_doc_count >= 4 and len(gathered_documents) >= 5:
-                    should_early_terminate = True
-                    early_terminate_reason = f"Found {spec_doc_count} specification documents - sufficient for technical inquiry"
-                
-                # Condition 4: Agent is repeating searches (detected by duplicate attempts)
-                # and we already have useful information
-                elif "Duplicate search attempt" in str(tool_output) and (spec_doc_count >= 2 or gemini_answer):
-                    should_early_terminate = True
-                    early_terminate_reason = "Agent repeating searches - proceeding with gathered information"
+            # Stopping policy: evidence sufficiency, stagnation, spec-doc heuristics
+            decision = StopDecision()
+            if action != "finish_tool":
+                decision = stopping_policy.evaluate(
+                    iteration_num=iteration_num,
+                    action=action,
+                    duplicate=is_duplicate,
+                    iterations=iterations,
+                    identified_product=identified_product,
+                    product_confidence=product_confidence,
+                    gathered_documents=gathered_documents,
+                    gathered_images=gathered_images,
+                    gathered_past_tickets=gathered_past_tickets,
+                    gemini_answer=gemini_answer,
+                    tool_results=tool_results,
+                )
+            should_early_terminate = decision.stop
+            early_terminate_reason = decision.reason
             
             if should_early_terminate:
-                logger.info(f"{STEP_NAME} | 🎯 EARLY TERMINATION: {early_terminate_reason}")
+                logger.info(f"{STEP_NAME} | 🎯 EARLY TERMINATION ({decision.kind}): {early_terminate_reason}")
+                plan_steps_remaining = max(0, len(execution_plan.get("execution_plan", [])) - 1 - current_plan_step) if execution_plan else 0
+                stop_saved_seconds = estimate_saved_seconds(iterations, plan_steps_remaining)
+                stop_reason = decision.kind
                 
                 # Build finish tool input with gathered data
                 finish_input = {
@@ -1099,7 +1152,7 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
                     "relevant_documents": gathered_documents,
                     "relevant_images": gathered_images,
                     "past_tickets": gathered_past_tickets,
-                    "confidence": max(product_confidence, 0.7) if spec_doc_count >= 3 else product_confidence,
+                    "confidence": decision.confidence,
                     "reasoning": f"Early termination: {early_terminate_reason}. Gathered {len(gathered_documents)} docs, {len(gathered_past_tickets)} past tickets."
                 }
                 
@@ -1133,6 +1186,7 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             # Check if finished
             if action == "finish_tool" and tool_output.get("finished"):
                 logger.info(f"{STEP_NAME} | ✅ Agent called finish_tool - stopping loop")
+                stop_reason = "finish_tool"
                 
                 # Update from finish tool output
                 identified_product = tool_output.get("product_details", identified_product)
@@ -1224,10 +1278,16 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             workflow_error_type = error_type
             workflow_error_node = "react_agent"
             is_system_error = True
+            stop_reason = "error"
             
             logger.error(f"{STEP_NAME} | Error type classified as: {error_type}")
+            if iteration_span is not None:
+                iteration_span.record_exception(e)
             break
     
+    if iteration_span is not None:
+        iteration_span.end()
+    
     # Initialize error tracking variables if not set
     workflow_error = locals().get("workflow_error")
     workflow_error_type = locals().get("workflow_error_type")
@@ -1247,10 +1307,13 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
     
     logger.info(f"\n{STEP_NAME} | ═══ REACT LOOP COMPLETE ═══")
     logger.info(f"{STEP_NAME} | Iterations: {final_iteration_count}/{MAX_ITERATIONS}")
-    logger.info(f"{STEP_NAME} | Status: {status}")
+    logger.info(f"{STEP_NAME} | Status: {status} (stop: {stop_reason})")
     logger.info(f"{STEP_NAME} | Duration: {total_duration:.2f}s")
     logger.info(f"{STEP_NAME} | Product: {identified_product is not None}")
     logger.info(f"{STEP_NAME} | Docs: {len(gathered_documents)}, Images: {len(gathered_images)}, Tickets: {len(gathered_past_tickets)}")
+    if stop_saved_seconds:
+        logger.info(f"{STEP_NAME} | Early stop saved ~{stop_saved_seconds:.1f}s")
+    record_loop_outcome(final_iteration_count, stop_reason, stop_saved_seconds)
     
     # ========================================
     # SYSTEM ERROR - SKIP ALL DOWNSTREAM PROCESSING
@@ -1268,6 +1331,7 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             details={
                 "iterations": final_iteration_count,
                 "status": status,
+                "stop_reason": stop_reason,
                 "duration_seconds": total_duration,
                 "workflow_error": workflow_error,
                 "workflow_error_type": workflow_error_type,
@@ -1291,6 +1355,7 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
             "react_iterations": iterations,
             "react_total_iterations": final_iteration_count,
             "react_status": status,
+            "react_stop_reason": stop_reason,
             "react_final_reasoning": f"System error: {workflow_error}",
             "identified_product": identified_product,
             "product_confidence": product_confidence,
@@ -1346,25 +1411,8 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
         # Prepare evidence data from tool results
         ocr_result = tool_results.get("ocr_image_analysis")
         vision_result = tool_results.get("vision_search")
-        product_results = []
-        
         # Collect all product search results from iterations
-        for iteration in iterations:
-            # Check both product_search_tool and product_catalog_tool
-            action = iteration.get("action", "")
-            if action in ["product_search_tool", "product_catalog_tool"]:
-                output = iteration.get("tool_output", {})
-                if output.get("success") and output.get("products"):
-                    # Get the source at top level (catalog_cache = exact match)
-                    source = output.get("source", "unknown")
-                    is_exact = source in ["catalog_cache", "exact", "group"]
-                    
-                    # Tag each product with the source info so evidence resolver can use it
-                    for product in output.get("products", []):
-                        product_with_source = product.copy()
-                        product_with_source["source"] = source
-                        product_with_source["exact_match"] = is_exact
-                        product_results.append(product_with_source)
+        product_results = catalog_products(iterations)
         
         # Analyze evidence - now includes ticket_facts to close the "Split Brain" gap
         ticket_facts = state.get("ticket_facts")
@@ -1439,6 +1487,8 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
         details={
             "iterations": final_iteration_count,
             "status": status,
+            "stop_reason": stop_reason,
+            "stop_saved_seconds": round(stop_saved_seconds, 3),
             "duration_seconds": total_duration,
             "product_identified": identified_product is not None,
             "documents_found": len(gathered_documents),
@@ -1458,6 +1508,8 @@ NOTE: You may deviate from the plan based on tool results. The plan is a guide,
         "react_iterations": iterations,
         "react_total_iterations": final_iteration_count,
         "react_status": status,
+        "react_stop_reason": stop_reason,
+        "react_stop_saved_seconds": stop_saved_seconds,
         "react_final_reasoning": final_reasoning,
         "identified_product": identified_product,
         "product_confidence": product_confidence,
@@ -13,7 +13,8 @@ from typing import Dict, Any, List
 
 from app.graph.state import TicketState
 from app.utils.audit import add_audit_event
-from app.clients.llm_client import call_llm
+from app.clients.llm_client import call_llm, stream_sections
+from app.config.settings import settings
 from app.config.constants import ENHANCED_DRAFT_RESPONSE_PROMPT
 from app.utils.detailed_logger import (
     log_node_start, log_node_complete, log_llm_interaction
@@ -26,6 +27,7 @@ from app.utils.html_formatters import (
 )
 from app.services.resource_links_service import get_resource_links_for_response
 from app.services.policy_service import get_relevant_policy, format_category_tips_for_prompt
+from app.nodes.near_duplicate import prior_draft_prompt_section
 
 # Constraint validator import (NEW)
 try:
@@ -804,12 +806,16 @@ that the customer has NOT provided, you MUST ask for it before proceeding.
             logger.warning(f"{STEP_NAME} | ⚠️ Constraint formatting failed: {e}")
             constraints_prompt_section = ""
 
+    # Near-duplicate of a recently resolved ticket: its reply is the starting point
+    prior_draft_section = prior_draft_prompt_section(state)
+
     user_prompt = f"""CUSTOMER TICKET:
 Subject: {subject}
 Description: {ticket_text}
 
 TICKET CATEGORY: {ticket_category}
 {attachment_facts_section}
+{prior_draft_section}
 {policy_prompt_section}
 {constraints_prompt_section}
 RETRIEVED CONTEXT:
@@ -823,11 +829,27 @@ RETRIEVED CONTEXT:
         llm_start = time.time()
         
         # Use enhanced prompt for structured response
-        raw_response = call_llm(
-            system_prompt=ENHANCED_DRAFT_RESPONSE_PROMPT,
-            user_prompt=user_prompt,
-            response_format=None,  # plain text
-        )
+        time_to_first_section = None
+        if settings.llm_streaming_enabled:
+            def _on_section(header: str, body: str) -> None:
+                logger.info(f"{STEP_NAME} | 📝 Section ready: {header or '(preamble)'} ({len(body)} chars)")
+            
+            raw_response, stream_timing = stream_sections(
+                system_prompt=ENHANCED_DRAFT_RESPONSE_PROMPT,
+                user_prompt=user_prompt,
+                on_section=_on_section,
+                task="draft",
+                complexity=state.get("ticket_complexity"),
+            )
+            time_to_first_section = stream_timing.get("time_to_first_section")
+        else:
+            raw_response = call_llm(
+                system_prompt=ENHANCED_DRAFT_RESPONSE_PROMPT,
+                user_prompt=user_prompt,
+                response_format=None,  # plain text
+                task="draft",
+                complexity=state.get("ticket_complexity"),
+            )
         
         llm_duration = time.time() - llm_start
         logger.info(f"{STEP_NAME} | ✓ LLM response in {llm_duration:.2f}s")
@@ -1047,6 +1069,7 @@ RETRIEVED CONTEXT:
                 details={
                     "response_length": len(response_text),
                     "llm_duration_seconds": llm_duration,
+                    "time_to_first_section_seconds": time_to_first_section,
                     "overall_confidence": overall_confidence,
                     "confidence_label": confidence_label,
                     "source_documents_count": len(source_documents),
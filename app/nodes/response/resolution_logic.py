@@ -12,6 +12,7 @@ from app.graph.state import TicketState
 from app.utils.audit import add_audit_event
 from app.config.constants import ResolutionStatus
 from app.config.settings import settings
+from app.nodes.near_duplicate import NEAR_DUPLICATE_TAG
 
 logger = logging.getLogger(__name__)
 STEP_NAME = "1️⃣5️⃣ RESOLUTION_LOGIC"
@@ -119,6 +120,10 @@ def decide_tags_and_resolution(state: TicketState) -> Dict[str, Any]:
         decision_reason = "all checks passed (evidence confirmed, low risk, high confidence)"
         logger.info(f"{STEP_NAME} | ✅ Status: RESOLVED - {decision_reason}")
 
+    # Resolution reused from a near-identical ticket (evidence, or evidence + draft)
+    if state.get("near_duplicate_match"):
+        tags.append(NEAR_DUPLICATE_TAG)
+
     # Remove duplicates
     tags = list(set(tags))
 
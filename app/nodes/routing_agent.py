@@ -13,6 +13,8 @@ from typing import Dict, Any
 from app.graph.state import TicketState
 from app.utils.audit import add_audit_event
 from app.clients.llm_client import call_llm
+from app.config.settings import settings
+from app.nodes.ticket_understanding import understand_ticket
 from app.config.constants import (
     ROUTING_SYSTEM_PROMPT, 
     SKIP_CATEGORIES,
@@ -134,6 +136,62 @@ def _determine_rag_requirements(category: str, has_images: bool) -> tuple:
         return False, True
 
 
+def _classification_update(
+    state: TicketState,
+    category: str,
+    confidence: float,
+    reasoning: str,
+    tags: list,
+    ticket_type,
+    start_time: float,
+    extra_details: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """State update for an LLM-classified category (separate routing call or fused understanding call)."""
+    duration = time.time() - start_time
+    logger.info(f"{STEP_NAME} | ✅ Classified as '{category}' (confidence={confidence:.2f})")
+    logger.info(f"{STEP_NAME} | Reasoning: {reasoning[:150]}..." if reasoning else f"{STEP_NAME} | No reasoning provided")
+    logger.info(f"{STEP_NAME} | Completed in {duration:.2f}s")
+
+    # Check if this category should skip the workflow
+    should_skip, skip_reason, skip_note = _check_skip_category(category)
+
+    # Determine RAG requirements based on category
+    # Check has_image flag (set by fetch_ticket) or ticket_images list
+    has_images = state.get("has_image", False) or bool(state.get("ticket_images"))
+    requires_vision, requires_text = _determine_rag_requirements(category, has_images)
+
+    if should_skip:
+        logger.info(f"{STEP_NAME} | 🚀 SKIP WORKFLOW: {skip_reason}")
+    else:
+        logger.info(f"{STEP_NAME} | 📋 RAG Requirements: vision={requires_vision}, text={requires_text}")
+
+    return {
+        "ticket_category": category,
+        "should_skip": should_skip,
+        "skip_reason": skip_reason,
+        "skip_private_note": skip_note,
+        "category_requires_vision": requires_vision,
+        "category_requires_text_rag": requires_text,
+        "audit_events": add_audit_event(
+            state,
+            event="classify_ticket_category",
+            event_type="CLASSIFICATION",
+            details={
+                "category": category,
+                "confidence": confidence,
+                "reasoning": reasoning,
+                "tags_used": len(tags) > 0,
+                "ticket_type_used": ticket_type is not None,
+                "should_skip": should_skip,
+                "skip_reason": skip_reason,
+                "requires_vision": requires_vision,
+                "requires_text_rag": requires_text,
+                **(extra_details or {})
+            }
+        )["audit_events"]
+    }
+
+
 def classify_ticket_category(state: TicketState) -> Dict[str, Any]:
     """
     Classify the ticket category using LLM.
@@ -147,7 +205,7 @@ def classify_ticket_category(state: TicketState) -> Dict[str, Any]:
     logger.info(f"{'='*60}")
 
     # -------------------------------------------
-    # CHECK IF ALREADY MARKED FOR SKIP (by fetch_ticket)
+    # CHECK IF ALREADY MARKED FOR SKIP (by pre_triage)
     # This handles tickets with existing AI tags
     # -------------------------------------------
     if state.get("should_skip") and state.get("ticket_category") == "already_processed":
@@ -253,6 +311,25 @@ def classify_ticket_category(state: TicketState) -> Dict[str, Any]:
             )["audit_events"]
         }
 
+    # -------------------------------------------
+    # FUSED UNDERSTANDING: routing + fact verification + plan in one call
+    # (sections that fail validation fall back to their separate calls)
+    # -------------------------------------------
+    if settings.fused_understanding_enabled and settings.enable_planner:
+        fused = understand_ticket(state)
+        if fused and fused["routing"]:
+            routing = fused["routing"]
+            update = _classification_update(
+                state, routing["category"], routing["confidence"], routing["reasoning"],
+                tags, ticket_type, start_time, extra_details={"fused_understanding": True}
+            )
+            if fused["ticket_facts"]:
+                update["ticket_facts"] = fused["ticket_facts"]
+            if fused["execution_plan"]:
+                update["execution_plan"] = fused["execution_plan"]
+            return update
+        logger.info(f"{STEP_NAME} | Fused routing unavailable, using separate routing call")
+
     # -------------------------------------------
     # Build prompt content
     # -------------------------------------------
@@ -274,7 +351,8 @@ def classify_ticket_category(state: TicketState) -> Dict[str, Any]:
             system_prompt=ROUTING_SYSTEM_PROMPT,
             user_prompt=content,
             response_format="json",
-            temperature=0.1
+            temperature=0.1,
+            task="routing"
         )
         
         llm_duration = time.time() - llm_start
@@ -293,48 +371,7 @@ def classify_ticket_category(state: TicketState) -> Dict[str, Any]:
 
         category = category.lower().strip().replace(" ", "_")
 
-        duration = time.time() - start_time
-        logger.info(f"{STEP_NAME} | ✅ Classified as '{category}' (confidence={confidence:.2f})")
-        logger.info(f"{STEP_NAME} | Reasoning: {reasoning[:150]}..." if reasoning else f"{STEP_NAME} | No reasoning provided")
-        logger.info(f"{STEP_NAME} | Completed in {duration:.2f}s")
-
-        # Check if this category should skip the workflow
-        should_skip, skip_reason, skip_note = _check_skip_category(category)
-        
-        # Determine RAG requirements based on category
-        # Check has_image flag (set by fetch_ticket) or ticket_images list
-        has_images = state.get("has_image", False) or bool(state.get("ticket_images"))
-        requires_vision, requires_text = _determine_rag_requirements(category, has_images)
-        
-        if should_skip:
-            logger.info(f"{STEP_NAME} | 🚀 SKIP WORKFLOW: {skip_reason}")
-        else:
-            logger.info(f"{STEP_NAME} | 📋 RAG Requirements: vision={requires_vision}, text={requires_text}")
-
-        return {
-            "ticket_category": category,
-            "should_skip": should_skip,
-            "skip_reason": skip_reason,
-            "skip_private_note": skip_note,
-            "category_requires_vision": requires_vision,
-            "category_requires_text_rag": requires_text,
-            "audit_events": add_audit_event(
-                state,
-                event="classify_ticket_category",
-                event_type="CLASSIFICATION",
-                details={
-                    "category": category,
-                    "confidence": confidence,
-                    "reasoning": reasoning,
-                    "tags_used": len(tags) > 0,
-                    "ticket_type_used": ticket_type is not None,
-                    "should_skip": should_skip,
-                    "skip_reason": skip_reason,
-                    "requires_vision": requires_vision,
-                    "requires_text_rag": requires_text
-                }
-            )["audit_events"]
-        }
+        return _classification_update(state, category, confidence, reasoning, tags, ticket_type, start_time)
 
     except Exception as e:
         duration = time.time() - start_time
@@ -0,0 +1,248 @@
+"""
+ReACT Stopping Policy
+Evidence-driven early stopping, evaluated after every tool call.
+
+The loop used to stop only when the LLM chose finish_tool or at
+MAX_ITERATIONS - 1, plus a few spec-document heuristics. This policy adds:
+
+1. SUFFICIENT - every configured criterion holds:
+   - product: identified by analyze_evidence with resolution "proceed" and
+     confidence >= REACT_STOP_MIN_CONFIDENCE (skipped for NON_PRODUCT_CATEGORIES)
+   - knowledge: >= REACT_STOP_MIN_DOCUMENTS documents or a direct Gemini answer
+     (skipped when routing said the category needs no text RAG)
+   - constraints: customer attachments/images were examined whenever the
+     constraint validator still has blocking fields missing
+2. STAGNATION - no new evidence for REACT_STAGNATION_WINDOW tool calls, or a
+   repeated identical action that added nothing.
+3. HEURISTIC - the original spec-document rules (kept unchanged).
+
+react_agent then auto-invokes finish_tool with the gathered evidence.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.config.constants import NON_PRODUCT_CATEGORIES
+from app.utils.metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+STEP_NAME = "🛑 STOPPING_POLICY"
+
+ATTACHMENT_TOOLS = {"attachment_analyzer_tool", "multimodal_document_analyzer_tool", "attachment_type_classifier_tool"}
+IMAGE_TOOLS = {"ocr_image_analyzer_tool", "vision_search_tool"}
+
+SPEC_INDICATORS = [
+    "spec", "specification", "manual", "diagram", "parts",
+    "installation", "output", "diverter", "valve", "cartridge",
+    "pressure", "flow", "gpm", "dimensions"
+]
+
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 12, 15)
+
+REACT_ITERATIONS = histogram("flusso_react_iterations", "ReACT iterations per ticket by stop reason", buckets=ITERATION_BUCKETS)
+REACT_STOPS = counter("flusso_react_stops_total", "ReACT loop exits by stop reason")
+REACT_STOP_SAVED = histogram("flusso_react_stop_saved_seconds", "Estimated loop time saved by policy stops")
+
+
+@dataclass
+class StopDecision:
+    """Outcome of one policy evaluation"""
+    stop: bool = False
+    kind: str = ""                 # "sufficient" | "stagnation" | "heuristic"
+    reason: str = ""
+    confidence: float = 0.0        # Confidence to pass to finish_tool
+
+
+def catalog_products(iterations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Products from every successful product search, tagged with source / exact_match for analyze_evidence."""
+    product_results = []
+    for iteration in iterations:
+        if iteration.get("action", "") not in ["product_search_tool", "product_catalog_tool"]:
+            continue
+        output = iteration.get("tool_output", {}) or {}
+        if output.get("success") and output.get("products"):
+            # Get the source at top level (catalog_cache = exact match)
+            source = output.get("source", "unknown")
+            is_exact = source in ["catalog_cache", "exact", "group"]
+            for product in output.get("products", []):
+                product_with_source = product.copy()
+                product_with_source["source"] = source
+                product_with_source["exact_match"] = is_exact
+                product_results.append(product_with_source)
+    return product_results
+
+
+def _spec_doc_count(gathered_documents: List[Any]) -> int:
+    count = 0
+    for doc in gathered_documents:
+        if isinstance(doc, dict):
+            doc_title = (doc.get("title", "") or "").lower()
+            doc_content = (doc.get("content_preview", "") or "").lower()
+            has_specs = any(ind in doc_title or ind in doc_content for ind in SPEC_INDICATORS)
+            if has_specs and doc.get("relevance_score", 0.5) >= 0.7:
+                count += 1
+    return count
+
+
+class StoppingPolicy:
+    """
+    One instance per react_agent_loop run. Call evaluate() after each
+    non-finish tool call with the loop's current evidence.
+    """
+
+    def __init__(
+        self,
+        ticket_category: str,
+        ticket_facts: Optional[Dict[str, Any]],
+        constraint_result: Optional[Dict[str, Any]],
+        has_attachments: bool,
+        has_images: bool,
+        requires_text_rag: bool = True,
+    ):
+        self.ticket_category = ticket_category or "general"
+        self.ticket_facts = ticket_facts or {}
+        self.blocking_missing = (constraint_result or {}).get("blocking_missing", []) or []
+        self.has_attachments = has_attachments
+        self.has_images = has_images
+        self.requires_text_rag = requires_text_rag
+        self.no_progress = 0
+        self._last_fingerprint: Optional[Tuple] = None
+        self.tools_run: set = set()
+
+    @staticmethod
+    def _fingerprint(identified_product, gathered_documents, gathered_images, gathered_past_tickets, gemini_answer, tool_results) -> Tuple:
+        """Everything that counts as evidence - a tool call that leaves this unchanged added nothing."""
+        doc_titles = frozenset((d.get("title", "") or "").lower() for d in gathered_documents if isinstance(d, dict))
+        pricing = tool_results.get("spare_parts_pricing") or {}
+        ocr = tool_results.get("ocr_image_analysis") or {}
+        return (
+            (identified_product or {}).get("model"),
+            doc_titles,
+            len(gathered_images),
+            len(gathered_past_tickets),
+            bool(gemini_answer),
+            len(pricing.get("parts", []) or []) if pricing.get("success") else 0,
+            tuple(ocr.get("model_numbers", []) or []),
+        )
+
+    def _customer_evidence_examined(self) -> bool:
+        if not self.blocking_missing:
+            return True
+        if self.has_attachments and not (self.tools_run & ATTACHMENT_TOOLS):
+            return False
+        if self.has_images and not (self.tools_run & IMAGE_TOOLS):
+            return False
+        return True
+
+    def _product_sufficient(self, iterations, identified_product, product_confidence, gathered_documents, gathered_past_tickets, tool_results) -> Tuple[bool, float]:
+        if self.ticket_category in NON_PRODUCT_CATEGORIES:
+            return True, max(product_confidence, 0.5)
+        pricing = tool_results.get("spare_parts_pricing") or {}
+        if pricing.get("success") and pricing.get("search_method") == "exact_match":
+            return True, max(product_confidence, 0.9)
+
+        product_results = catalog_products(iterations)
+        if not identified_product and not product_results and not tool_results.get("ocr_image_analysis") and not tool_results.get("vision_search"):
+            return False, 0.0
+
+        from app.nodes.evidence_resolver import analyze_evidence
+        bundle = analyze_evidence(
+            ocr_result=tool_results.get("ocr_image_analysis"),
+            vision_result=tool_results.get("vision_search"),
+            product_search_results=product_results,
+            document_results=gathered_documents,
+            past_ticket_results=gathered_past_tickets,
+            agent_identified_product=identified_product,
+            agent_confidence=product_confidence,
+            ticket_facts=self.ticket_facts,
+        )
+        ok = (
+            bundle.resolution_action == "proceed"
+            and not bundle.has_conflict
+            and bundle.final_confidence >= settings.react_stop_min_confidence
+        )
+        return ok, bundle.final_confidence
+
+    def evaluate(
+        self,
+        iteration_num: int,
+        action: str,
+        duplicate: bool,
+        iterations: List[Dict[str, Any]],
+        identified_product: Optional[Dict[str, Any]],
+        product_confidence: float,
+        gathered_documents: List[Any],
+        gathered_images: List[Any],
+        gathered_past_tickets: List[Any],
+        gemini_answer: str,
+        tool_results: Dict[str, Any],
+    ) -> StopDecision:
+        self.tools_run.add(action)
+
+        fingerprint = self._fingerprint(identified_product, gathered_documents, gathered_images, gathered_past_tickets, gemini_answer, tool_results)
+        self.no_progress = self.no_progress + 1 if fingerprint == self._last_fingerprint else 0
+        self._last_fingerprint = fingerprint
+        has_evidence = bool(identified_product or gathered_documents or gemini_answer or gathered_past_tickets)
+
+        if settings.react_early_stop_enabled and iteration_num >= settings.react_stop_min_iterations:
+            # 1. Sufficiency
+            knowledge_ok = (
+                not self.requires_text_rag
+                or len(gathered_documents) >= settings.react_stop_min_documents
+                or bool(gemini_answer)
+            )
+            if knowledge_ok and self._customer_evidence_examined():
+                product_ok, confidence = self._product_sufficient(
+                    iterations, identified_product, product_confidence, gathered_documents, gathered_past_tickets, tool_results
+                )
+                if product_ok:
+                    model = (identified_product or {}).get("model")
+                    return StopDecision(
+                        True, "sufficient",
+                        f"Evidence sufficient: product={model or 'n/a'} ({confidence:.0%}), {len(gathered_documents)} docs",
+                        confidence,
+                    )
+
+            # 2. Stagnation
+            if self.no_progress >= settings.react_stagnation_window:
+                return StopDecision(True, "stagnation", f"No new evidence in {self.no_progress} tool calls", product_confidence)
+            if duplicate and self.no_progress >= 1 and has_evidence:
+                return StopDecision(True, "stagnation", f"Repeated {action} with no new evidence", product_confidence)
+
+        # 3. Original spec-document heuristics
+        if iteration_num >= 4:
+            spec_doc_count = _spec_doc_count(gathered_documents)
+            heuristic_confidence = max(product_confidence, 0.7) if spec_doc_count >= 3 else product_confidence
+            if spec_doc_count >= 3 and identified_product:
+                return StopDecision(True, "heuristic", f"Found {spec_doc_count} specification documents for {identified_product.get('model', 'product')}", heuristic_confidence)
+            if gemini_answer and len(gemini_answer) > 200 and identified_product:
+                return StopDecision(True, "heuristic", f"Gemini provided comprehensive answer ({len(gemini_answer)} chars) with product context", heuristic_confidence)
+            if spec_doc_count >= 4 and len(gathered_documents) >= 5:
+                return StopDecision(True, "heuristic", f"Found {spec_doc_count} specification documents - sufficient for technical inquiry", heuristic_confidence)
+            if duplicate and (spec_doc_count >= 2 or gemini_answer):
+                return StopDecision(True, "heuristic", "Agent repeating searches - proceeding with gathered information", heuristic_confidence)
+
+        return StopDecision()
+
+
+def estimate_saved_seconds(iterations: List[Dict[str, Any]], plan_steps_remaining: int) -> float:
+    """
+    Loop time a policy stop saved: at least the LLM turn that would have chosen
+    finish_tool, plus one turn per plan step still pending, at the average
+    iteration cost so far.
+    """
+    timed = [it for it in iterations if it.get("action") != "finish_tool"]
+    if not timed:
+        return 0.0
+    avg = sum(it.get("duration", 0.0) or 0.0 for it in timed) / len(timed)  # LLM turn + tool
+    return avg * max(1, plan_steps_remaining)
+
+
+def record_loop_outcome(iteration_count: int, stop_reason: str, saved_seconds: float = 0.0) -> None:
+    """Iteration-count distribution and saved time, labelled by why the loop ended."""
+    REACT_ITERATIONS.observe(iteration_count, reason=stop_reason)
+    REACT_STOPS.inc(reason=stop_reason)
+    if saved_seconds > 0:
+        REACT_STOP_SAVED.observe(saved_seconds, reason=stop_reason)
@@ -0,0 +1,222 @@
+"""
+Ticket Understanding - fused pre-agent LLM call
+One structured-JSON request returns what used to take three sequential calls:
+  1. routing        (classify_ticket_category)
+  2. fact check     (planner.verify_ticket_facts)
+  3. execution plan (planner.create_execution_plan)
+
+Each section is validated with the same checks as the separate calls. A
+section that fails validation is simply left out, and its owner falls back
+to the existing separate call (routing LLM call / react_agent planner phase).
+"""
+
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from app.graph.state import TicketState
+from app.clients.llm_client import get_llm_client
+from app.config.constants import ROUTING_SYSTEM_PROMPT
+from app.nodes.planner import (
+    _planning_context,
+    _constraint_context,
+    _is_valid_plan,
+    _finalize_plan,
+    _format_extracted_codes,
+    _apply_verification_response,
+    _get_attachment_types,
+)
+
+logger = logging.getLogger(__name__)
+STEP_NAME = "🧩 TICKET_UNDERSTANDING"
+
+# Category list + detection rules, without the routing-only response format
+_CATEGORY_GUIDE = ROUTING_SYSTEM_PROMPT.rsplit("Respond ONLY with valid JSON:", 1)[0].rstrip()
+
+FUSED_UNDERSTANDING_PROMPT = """Complete THREE tasks for this customer ticket in ONE JSON response.
+
+═══════════════════════════════════════════════════════════════════════
+📋 TICKET INFORMATION
+═══════════════════════════════════════════════════════════════════════
+Subject: {subject}
+Description: {text}
+Tags: {tags}
+Ticket Type: {ticket_type}
+Has Images: {has_images} ({image_count} images)
+Has Attachments: {has_attachments} ({attachment_count} attachments)
+Attachment Types: {attachment_types}
+
+═══════════════════════════════════════════════════════════════════════
+🔍 PRE-EXTRACTED TICKET FACTS (from intake extractor - HINTS only)
+═══════════════════════════════════════════════════════════════════════
+{ticket_facts_summary}
+
+Product codes found by regex:
+{extracted_codes}
+
+2-letter finish codes: CP=Chrome, BN=Brushed Nickel, PN=Polished Nickel,
+MB=Matte Black, SB=Satin Brass, BB=Brushed Bronze, GM=Gunmetal,
+SS=Stainless Steel, GD=Gold
+
+═══════════════════════════════════════════════════════════════════════
+📜 RELEVANT COMPANY POLICY
+═══════════════════════════════════════════════════════════════════════
+{policy_section}
+
+Policy Requirements:
+{policy_requirements}
+
+═══════════════════════════════════════════════════════════════════════
+🔧 AVAILABLE TOOLS (use exact names in the plan)
+═══════════════════════════════════════════════════════════════════════
+attachment_analyzer_tool  - PDFs, invoices, receipts, docs (proof of purchase, model numbers)
+ocr_image_analyzer_tool   - text in photos (labels, receipts)
+product_search_tool       - verify a model number / find products
+vision_search_tool        - identify product from photos when no model is given
+document_search_tool      - manuals, FAQs, installation, troubleshooting
+past_tickets_search_tool  - similar resolved tickets
+finish_tool               - ALWAYS the last step
+
+═══════════════════════════════════════════════════════════════════════
+📝 TASKS
+═══════════════════════════════════════════════════════════════════════
+TASK 1 - ROUTING: classify the ticket into ONE category from the system instructions.
+
+TASK 2 - FACT VERIFICATION: which regex codes are REAL product models (not dates,
+phone or order numbers)? Correct parsing errors, add models the regex missed,
+note finish preferences.
+
+TASK 3 - PLAN: what the customer needs, which policy applies, and the ordered tool plan.
+- Policy requires proof of purchase → check attachments FIRST
+- Verified product codes → product_search (skip blind vision)
+- Images but no model → OCR first, then vision
+- document_search for troubleshooting/installation; past_tickets for common issues
+
+Respond ONLY with valid JSON in this exact format:
+{{
+    "routing": {{"category": "<category_name>", "confidence": 0.0, "reasoning": "<brief explanation>"}},
+    "fact_verification": {{
+        "verified_models": [{{"model": "100.1170", "finish_code": "CP", "finish_name": "Chrome", "confidence": 0.95, "source": "ticket_text"}}],
+        "rejected_codes": [{{"code": "1234-5678", "reason": "order number"}}],
+        "corrections": [{{"original": "100.1170C", "corrected": "100.1170CP", "reason": "..."}}],
+        "finish_preferences": ["..."],
+        "missing_models": ["PBV2105 - mentioned in text but not extracted"],
+        "overall_confidence": 0.85,
+        "notes": "Brief notes"
+    }},
+    "plan": {{
+        "analysis": {{"customer_need": "...", "mentioned_product": "model or null", "help_type": "warranty|return|parts|installation|troubleshooting|inquiry|general", "urgency": "low|medium|high", "key_details": ["..."]}},
+        "policy_applicable": {{"policy_type": "warranty|return|replacement|missing_parts|none", "requirements_from_policy": ["..."], "can_proceed": true, "missing_for_policy": ["..."]}},
+        "information_needs": {{"product_identification": true, "proof_of_purchase": false, "installation_docs": false, "troubleshooting_info": false, "warranty_info": false, "past_ticket_patterns": true, "customer_photos_analysis": false}},
+        "execution_plan": [
+            {{"step": 1, "tool": "tool_name", "reason": "why", "input_hint": "hint"}},
+            {{"step": N, "tool": "finish_tool", "reason": "compile findings", "input_hint": null}}
+        ],
+        "complexity": "simple|moderate|complex",
+        "estimated_tools": 3,
+        "confidence": 0.85
+    }}
+}}
+"""
+
+
+def _valid_routing(section: Any) -> Optional[Dict[str, Any]]:
+    """Same acceptance rule as classify_ticket_category: a non-empty category string."""
+    if not isinstance(section, dict):
+        return None
+    category = section.get("category")
+    if not isinstance(category, str) or not category.strip():
+        return None
+    confidence = section.get("confidence", 0.0)
+    return {
+        "category": category.lower().strip().replace(" ", "_"),
+        "confidence": confidence if isinstance(confidence, (int, float)) else 0.0,
+        "reasoning": section.get("reasoning", "") or "",
+    }
+
+
+def understand_ticket(state: TicketState) -> Optional[Dict[str, Any]]:
+    """
+    Run the fused call. Returns None when the call or JSON parse fails; otherwise a dict with
+      routing        - {category, confidence, reasoning} or None
+      ticket_facts   - verified ticket_facts or None (react_agent verifies separately)
+      execution_plan - finalized plan or None (react_agent plans separately)
+    """
+    start_time = time.time()
+
+    subject = state.get("ticket_subject", "") or ""
+    text = state.get("ticket_text", "") or ""
+    images = state.get("ticket_images", []) or []
+    attachments = state.get("ticket_attachments", []) or []
+    tags = state.get("tags", []) or []
+    ticket_type = state.get("ticket_type")
+    ticket_facts = state.get("ticket_facts", {}) or {}
+    raw_codes = ticket_facts.get("raw_product_codes", [])
+
+    try:
+        # Policy lookup by keyword category - the real category is what we're asking for.
+        # Constraints are validated once, against the final category, after the call
+        ctx = _planning_context(state, None, with_constraints=False)
+
+        prompt = FUSED_UNDERSTANDING_PROMPT.format(
+            subject=subject,
+            text=text[:2000],  # Same cap as fact verification (planning used 1500)
+            tags=", ".join(tags) if tags else "None",  # Routing inputs, as in classify_ticket_category
+            ticket_type=ticket_type or "Not set",
+            has_images="Yes" if images else "No",
+            image_count=len(images),
+            has_attachments="Yes" if attachments else "No",
+            attachment_count=len(attachments),
+            attachment_types=_get_attachment_types(attachments),
+            ticket_facts_summary=ctx["ticket_facts_summary"],
+            extracted_codes=_format_extracted_codes(raw_codes),
+            policy_section=ctx["policy_section"] or "No specific policy found",
+            policy_requirements=ctx["policy_requirements_text"],
+        )
+
+        logger.info(f"{STEP_NAME} | 🔄 Calling LLM (routing + fact verification + plan)...")
+        llm_start = time.time()
+        response = get_llm_client().call_llm(
+            system_prompt=_CATEGORY_GUIDE,
+            user_prompt=prompt,
+            response_format="json",
+            temperature=0.1,
+            max_tokens=6144,  # Plan (4096) + verification (2048) budgets combined
+            task="plan"  # The plan section needs the planning tier
+        )
+        llm_duration = time.time() - llm_start
+        logger.info(f"{STEP_NAME} | ✓ LLM response in {llm_duration:.2f}s")
+    except Exception as e:
+        logger.warning(f"{STEP_NAME} | ⚠️ Fused call failed, using separate calls: {e}")
+        return None
+
+    if not isinstance(response, dict):
+        logger.warning(f"{STEP_NAME} | ⚠️ Unparseable response, using separate calls")
+        return None
+
+    result: Dict[str, Any] = {"routing": _valid_routing(response.get("routing")), "ticket_facts": None, "execution_plan": None}
+
+    # Fact verification - only when there is something to verify (no-code case needs no LLM)
+    verification = response.get("fact_verification")
+    if raw_codes and not ticket_facts.get("planner_verified"):
+        if isinstance(verification, dict) and isinstance(verification.get("verified_models"), list):
+            result["ticket_facts"] = _apply_verification_response(ticket_facts, verification)
+        else:
+            logger.warning(f"{STEP_NAME} | ⚠️ fact_verification section invalid, react_agent will verify separately")
+
+    plan = response.get("plan")
+    if _is_valid_plan(plan):
+        # Constraints depend on the category - use the one we just got (quick category if none)
+        category = result["routing"]["category"] if result["routing"] else ctx["quick_category"]
+        ctx.update(_constraint_context(state, category))
+        result["execution_plan"] = _finalize_plan(plan, ctx, start_time, llm_duration)
+        result["execution_plan"]["_planning_metadata"]["fused"] = True
+    else:
+        logger.warning(f"{STEP_NAME} | ⚠️ plan section invalid, react_agent will plan separately")
+
+    logger.info(
+        f"{STEP_NAME} | ✅ Sections: routing={bool(result['routing'])}, "
+        f"facts={'n/a' if not raw_codes else bool(result['ticket_facts'])}, plan={bool(result['execution_plan'])} "
+        f"in {time.time() - start_time:.2f}s"
+    )
+    return result
@@ -15,6 +15,7 @@ from functools import lru_cache
 import pandas as pd
 
 from app.config.settings import settings
+from app.utils.replay import recordable
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +68,7 @@ def _get_drive_service():
         return None
 
 
+@recordable("google_drive")
 def _download_sheet_from_drive(file_id: str) -> Optional[pd.DataFrame]:
     """
     Download dealer domains sheet from Google Drive.
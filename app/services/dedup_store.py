@@ -0,0 +1,262 @@
+"""
+Dedup Store - shared idempotency keys and per-ticket in-flight locks
+Replaces the per-pod diskcache so that a Freshdesk retry landing on two pods
+(or two uvicorn workers) is processed once.
+
+Backends (DEDUP_BACKEND):
+- diskcache : local SQLite via diskcache (default; atomic across workers of
+              one pod, NOT across pods)
+- redis     : shared store for all replicas (SET NX PX / compare-and-delete);
+              needs the `redis` package and DEDUP_REDIS_URL
+- memory    : in-process dict (single worker, local runs)
+
+Primitives (all atomic):
+    store.set_if_absent("webhook:<hash>", ttl_seconds=30)  -> True if first
+    token = store.acquire_lock("ticket:123", ttl_seconds=660)  -> token or None
+    store.release_lock("ticket:123", token)
+    store.increment("gen:123", ttl_seconds=86400)  -> new value (ticket coalescing)
+
+Lock TTLs are a safety net for crashed workers; the owner releases explicitly.
+Store errors fail open (the webhook is processed) - a missed ticket is worse
+than a duplicate run.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DedupStore(ABC):
+    """Atomic set-if-absent keys with TTL, plus owner-checked locks built on them."""
+
+    backend = "base"
+
+    @abstractmethod
+    def _add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        """Store `value` under `key` for ttl_seconds unless a live entry exists; True when stored."""
+        pass
+
+    @abstractmethod
+    def _delete_if_value(self, key: str, value: str) -> bool:
+        """Delete `key` only while it still holds `value`; True when deleted."""
+        pass
+
+    @abstractmethod
+    def _incr(self, key: str, ttl_seconds: float) -> int:
+        """Add 1 to the counter at `key` (created at 1) and refresh its TTL; returns the new value."""
+        pass
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        """Current value of `key`, or None when missing / expired."""
+        pass
+
+    def ping(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def set_if_absent(self, key: str, ttl_seconds: float) -> bool:
+        """Claim `key` for ttl_seconds. True when this caller is first (fails open)."""
+        try:
+            return self._add(key, "1", ttl_seconds)
+        except Exception as e:
+            logger.warning(f"[DEDUP] {self.backend} set_if_absent failed for {key}, allowing: {e}")
+            return True
+
+    def acquire_lock(self, name: str, ttl_seconds: float) -> Optional[str]:
+        """Take the lock `name`; returns an owner token, or None when someone else holds it."""
+        token = uuid.uuid4().hex
+        try:
+            return token if self._add(f"lock:{name}", token, ttl_seconds) else None
+        except Exception as e:
+            logger.warning(f"[DEDUP] {self.backend} acquire_lock failed for {name}, proceeding unlocked: {e}")
+            return token
+
+    def release_lock(self, name: str, token: Optional[str]) -> bool:
+        """Release only if still held by `token` (an expired lock may belong to someone else)."""
+        if not token:
+            return False
+        try:
+            return self._delete_if_value(f"lock:{name}", token)
+        except Exception as e:
+            logger.warning(f"[DEDUP] {self.backend} release_lock failed for {name}: {e}")
+            return False
+
+    def increment(self, key: str, ttl_seconds: float) -> Optional[int]:
+        """Atomically add 1 to a counter (created at 1, TTL refreshed). None on store errors."""
+        try:
+            return self._incr(key, ttl_seconds)
+        except Exception as e:
+            logger.warning(f"[DEDUP] {self.backend} increment failed for {key}: {e}")
+            return None
+
+    def get_int(self, key: str) -> Optional[int]:
+        """Current counter value (None when missing or on store errors)."""
+        try:
+            value = self._get(key)
+            return int(value) if value is not None else None
+        except Exception as e:
+            logger.warning(f"[DEDUP] {self.backend} get failed for {key}: {e}")
+            return None
+
+
+class MemoryDedupStore(DedupStore):
+    """In-process store (one worker only)."""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(key)
+            if current and current[1] > now:
+                return False
+            self._entries[key] = (value, now + ttl_seconds)
+            if len(self._entries) > 10000:
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            return True
+
+    def _delete_if_value(self, key: str, value: str) -> bool:
+        with self._lock:
+            current = self._entries.get(key)
+            if current and current[0] == value:
+                del self._entries[key]
+                return True
+            return False
+
+    def _incr(self, key: str, ttl_seconds: float) -> int:
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(key)
+            value = int(current[0]) + 1 if current and current[1] > now else 1
+            self._entries[key] = (str(value), now + ttl_seconds)
+            return value
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            current = self._entries.get(key)
+            return current[0] if current and current[1] > time.monotonic() else None
+
+
+class DiskcacheDedupStore(DedupStore):
+    """SQLite-backed store shared by the workers of one pod (Cache.add is atomic)."""
+
+    backend = "diskcache"
+
+    def __init__(self, directory: str):
+        from diskcache import Cache
+        self._cache = Cache(directory)
+
+    def _add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        return self._cache.add(key, value, expire=ttl_seconds)
+
+    def _delete_if_value(self, key: str, value: str) -> bool:
+        with self._cache.transact():
+            if self._cache.get(key) != value:
+                return False
+            return self._cache.delete(key)
+
+    def _incr(self, key: str, ttl_seconds: float) -> int:
+        with self._cache.transact():
+            value = int(self._cache.get(key, 0)) + 1
+            self._cache.set(key, str(value), expire=ttl_seconds)
+            return value
+
+    def _get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def close(self) -> None:
+        self._cache.close()
+
+
+class RedisDedupStore(DedupStore):
+    """Networked store shared by every pod and worker."""
+
+    backend = "redis"
+
+    _RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+    def __init__(self, url: str, prefix: str):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("DEDUP_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self._client = redis.Redis.from_url(url, socket_timeout=2.0, socket_connect_timeout=2.0)
+        self._prefix = prefix
+        self._release = self._client.register_script(self._RELEASE_SCRIPT)
+
+    def _add(self, key: str, value: str, ttl_seconds: float) -> bool:
+        return bool(self._client.set(self._prefix + key, value, nx=True, px=max(1, int(ttl_seconds * 1000))))
+
+    def _delete_if_value(self, key: str, value: str) -> bool:
+        return bool(self._release(keys=[self._prefix + key], args=[value]))
+
+    def _incr(self, key: str, ttl_seconds: float) -> int:
+        pipe = self._client.pipeline()
+        pipe.incr(self._prefix + key)
+        pipe.pexpire(self._prefix + key, max(1, int(ttl_seconds * 1000)))
+        return int(pipe.execute()[0])
+
+    def _get(self, key: str) -> Optional[str]:
+        value = self._client.get(self._prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def ping(self) -> bool:
+        try:
+            return bool(self._client.ping())
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_dedup_store(backend: Optional[str] = None) -> DedupStore:
+    backend = (backend or settings.dedup_backend).lower()
+    if backend == "redis":
+        if not settings.dedup_redis_url:
+            raise ValueError("DEDUP_REDIS_URL is required when DEDUP_BACKEND=redis")
+        return RedisDedupStore(settings.dedup_redis_url, settings.dedup_key_prefix)
+    if backend == "memory":
+        return MemoryDedupStore()
+    if backend == "diskcache":
+        return DiskcacheDedupStore(settings.dedup_dir)
+    raise ValueError(f"Unknown DEDUP_BACKEND '{backend}' (expected diskcache, redis or memory)")
+
+
+_store: Dict[str, DedupStore] = {}
+_store_lock = threading.Lock()
+
+
+def get_dedup_store() -> DedupStore:
+    if 'instance' not in _store:
+        with _store_lock:
+            if 'instance' not in _store:
+                _store['instance'] = create_dedup_store()
+                logger.info(f"[DEDUP] Using {_store['instance'].backend} dedup store")
+    return _store['instance']
+
+
+def close_dedup_store() -> None:
+    with _store_lock:
+        store = _store.pop('instance', None)
+    if store:
+        store.close()
@@ -0,0 +1,333 @@
+"""
+Document Answer Cache - semantic cache for document_search_tool
+Gemini File Search on gemini-2.5-pro is the slowest and most expensive tool,
+and the questions repeat a lot ("cartridge part number for 100.1170",
+"install manual for HS6270").
+
+Entries are partitioned by (store namespace, model number, search type) and
+matched inside a partition by:
+1. exact normalized query text   - no embedding call at all (dict lookup)
+2. cosine similarity of the normalized query embedding >= DOC_CACHE_SIMILARITY_THRESHOLD
+   (one matrix-vector product over the partition's embedding matrix, rebuilt
+   only after the partition changed)
+
+Freshness:
+- TTL per entry (DOC_CACHE_TTL_SECONDS), LRU bound (DOC_CACHE_MAX_ENTRIES)
+- the namespace includes the store id and DOC_CACHE_STORE_VERSION (bump it
+  after re-ingesting documents)
+- the store's update time / document count is re-checked every
+  DOC_CACHE_STORE_CHECK_SECONDS; any change clears the cache
+- invalidate() for explicit clears (POST /debug/doc-cache/invalidate)
+
+In-process only: each worker warms its own cache.
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.config.settings import settings
+from app.utils.metrics import counter, register_collector
+
+logger = logging.getLogger(__name__)
+
+DOC_CACHE_LOOKUPS = counter("flusso_doc_cache_lookups_total", "Document search cache lookups by result")
+DOC_CACHE_SAVED_SECONDS = counter("flusso_doc_cache_saved_seconds_total", "File Search latency avoided by cache hits")
+DOC_CACHE_SAVED_TOKENS = counter("flusso_doc_cache_saved_tokens_total", "File Search tokens avoided by cache hits")
+DOC_CACHE_SAVED_USD = counter("flusso_doc_cache_cost_avoided_usd_total", "Estimated File Search cost avoided by cache hits")
+
+
+@dataclass
+class _Entry:
+    text: str                       # Normalized query
+    embedding: Optional[np.ndarray] # Unit vector, None if embedding failed
+    result: Dict[str, Any]          # search_files_with_sources() payload
+    top_k: int
+    created_at: float
+    latency: float                  # Seconds the original call took
+    tokens: int                     # Tokens the original call used
+
+
+@dataclass
+class _Partition:
+    entries: Dict[str, _Entry] = field(default_factory=dict)  # normalized text -> entry
+    texts: List[str] = field(default_factory=list)            # rows of `matrix`
+    matrix: Optional[np.ndarray] = None                       # [n, D] unit embeddings
+    dirty: bool = False
+
+    def index(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """Texts + embedding matrix of the entries that have an embedding (rebuilt when dirty)."""
+        if self.dirty:
+            self.texts = [t for t, e in self.entries.items() if e.embedding is not None]
+            self.matrix = np.stack([self.entries[t].embedding for t in self.texts]) if self.texts else None
+            self.dirty = False
+        return self.texts, self.matrix
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, keep model-number punctuation (. -), collapse whitespace."""
+    text = re.sub(r"[^\w\s.\-]", " ", (query or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _unit(vector: Optional[List[float]]) -> Optional[np.ndarray]:
+    if not vector:
+        return None
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    if norm == 0.0:
+        return None  # embed_text returns zeros on failure
+    return arr / norm
+
+
+class DocAnswerCache:
+    """Thread-safe semantic cache of File Search results."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[str, str, str, str], _Entry]" = OrderedDict()  # LRU order
+        self._partitions: Dict[Tuple[str, str, str], _Partition] = {}
+        self._lock = threading.Lock()
+        self._namespace: Optional[str] = None
+        self._store_fingerprint: Optional[Tuple] = None
+        self._last_store_check = 0.0
+        self.stats_counts = {"hit_exact": 0, "hit_semantic": 0, "miss": 0, "stored": 0, "invalidations": 0}
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+    def _current_namespace(self) -> str:
+        return f"{settings.gemini_file_search_store_id}:{settings.doc_cache_store_version}"
+
+    def invalidate(self, reason: str = "manual") -> int:
+        """Drop every entry. Returns the number removed."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._partitions.clear()
+            self.stats_counts["invalidations"] += 1
+        logger.info(f"[DOC_CACHE] 🧹 Invalidated {removed} entr{'y' if removed == 1 else 'ies'} ({reason})")
+        return removed
+
+    def _check_freshness(self, client) -> None:
+        namespace = self._current_namespace()
+        if namespace != self._namespace:
+            if self._namespace is not None:
+                self.invalidate("store_namespace_changed")
+            self._namespace = namespace
+
+        now = time.monotonic()
+        if client is None or now - self._last_store_check < settings.doc_cache_store_check_seconds:
+            return
+        self._last_store_check = now
+        try:
+            fingerprint = client.get_store_fingerprint()
+        except Exception as e:
+            logger.debug(f"[DOC_CACHE] Store check failed: {e}")
+            return
+        if fingerprint is None:
+            return
+        if self._store_fingerprint is not None and fingerprint != self._store_fingerprint:
+            self.invalidate("file_search_store_changed")
+        self._store_fingerprint = fingerprint
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created_at > settings.doc_cache_ttl_seconds
+
+    def _remove(self, key: Tuple[str, str, str, str]) -> None:
+        """Drop one entry from the LRU and its partition (caller holds the lock)."""
+        self._entries.pop(key, None)
+        partition = self._partitions.get(key[:3])
+        if partition is not None and partition.entries.pop(key[3], None) is not None:
+            partition.dirty = True
+            if not partition.entries:
+                del self._partitions[key[:3]]
+
+    def lookup(
+        self,
+        model_number: Optional[str],
+        search_type: str,
+        text: str,
+        embedding: Optional[np.ndarray],
+        top_k: int,
+    ) -> Optional[Tuple[_Entry, float]]:
+        """Best fresh entry in the partition with similarity >= threshold, as (entry, similarity)."""
+        key = (self._namespace or "", (model_number or "").upper(), search_type)
+        now = time.time()
+        best: Optional[Tuple[_Entry, float]] = None
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                return None
+
+            entry = partition.entries.get(text)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key + (text,))
+                partition = self._partitions.get(key)
+            elif entry is not None and entry.top_k >= top_k:
+                best = (entry, 1.0)
+
+            if best is None and embedding is not None and partition is not None:
+                texts, matrix = partition.index()
+                if matrix is not None:
+                    scores = matrix @ embedding
+                    # Highest first; skip (and drop) expired rows, skip smaller top_k
+                    for row in np.argsort(-scores):
+                        similarity = float(scores[row])
+                        if similarity < settings.doc_cache_similarity_threshold:
+                            break
+                        candidate = partition.entries.get(texts[row])
+                        if candidate is None:
+                            continue
+                        if self._expired(candidate, now):
+                            self._remove(key + (texts[row],))
+                            continue
+                        if candidate.top_k >= top_k:
+                            best = (candidate, similarity)
+                            break
+
+            if best:
+                self._entries.move_to_end(key + (best[0].text,))
+        return best
+
+    def store(self, model_number: Optional[str], search_type: str, entry: _Entry) -> None:
+        key = (self._namespace or "", (model_number or "").upper(), search_type, entry.text)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            partition = self._partitions.setdefault(key[:3], _Partition())
+            partition.entries[entry.text] = entry
+            partition.dirty = True
+            while len(self._entries) > settings.doc_cache_max_entries:
+                self._remove(next(iter(self._entries)))
+            self.stats_counts["stored"] += 1
+
+    # ------------------------------------------------------------------
+    # Main entry point
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        client,
+        search_query: str,
+        cache_query: str,
+        model_number: Optional[str],
+        search_type: str,
+        top_k: int,
+        system_instruction: Optional[str],
+    ) -> Dict[str, Any]:
+        """
+        client.search_files_with_sources() behind the cache. `cache_query` is
+        the customer-facing question (not the prompt template around it).
+        Cached results carry a `cache` dict: {hit, similarity, age_seconds}.
+        """
+        if not settings.doc_cache_enabled:
+            return client.search_files_with_sources(query=search_query, top_k=top_k, system_instruction=system_instruction)
+
+        self._check_freshness(client)
+        text = normalize_query(cache_query)
+
+        # Exact text first - no embedding call
+        found = self.lookup(model_number, search_type, text, None, top_k)
+        embedding = None
+        if not found:
+            try:
+                from app.clients.embeddings import embed_text
+                embedding = _unit(embed_text(text))
+            except Exception as e:
+                logger.warning(f"[DOC_CACHE] Query embedding failed, exact matching only: {e}")
+            if embedding is not None:
+                found = self.lookup(model_number, search_type, text, embedding, top_k)
+
+        if found:
+            entry, similarity = found
+            kind = "hit_exact" if entry.text == text else "hit_semantic"
+            with self._lock:
+                self.stats_counts[kind] += 1
+                self.saved_seconds += entry.latency
+                self.saved_tokens += entry.tokens
+            DOC_CACHE_LOOKUPS.inc(result=kind)
+            DOC_CACHE_SAVED_SECONDS.inc(entry.latency)
+            if entry.tokens:
+                DOC_CACHE_SAVED_TOKENS.inc(entry.tokens)
+            DOC_CACHE_SAVED_USD.inc(settings.doc_cache_cost_per_call_usd)
+            logger.info(
+                f"[DOC_CACHE] ⚡ {kind} (sim={similarity:.3f}, model={model_number}, type={search_type}) "
+                f"- saved ~{entry.latency:.1f}s"
+            )
+            return {
+                **entry.result,
+                "cache": {"hit": True, "similarity": round(similarity, 4), "age_seconds": round(time.time() - entry.created_at, 1)},
+            }
+
+        with self._lock:
+            self.stats_counts["miss"] += 1
+        DOC_CACHE_LOOKUPS.inc(result="miss")
+        start = time.perf_counter()
+        result = client.search_files_with_sources(query=search_query, top_k=top_k, system_instruction=system_instruction)
+        latency = time.perf_counter() - start
+
+        # Only cache real answers - an empty result may be a transient failure
+        if result.get("gemini_answer") or result.get("source_documents"):
+            self.store(model_number, search_type, _Entry(
+                text=text,
+                embedding=embedding,
+                result=result,
+                top_k=top_k,
+                created_at=time.time(),
+                latency=latency,
+                tokens=int(result.get("total_tokens") or 0),
+            ))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.stats_counts["hit_exact"] + self.stats_counts["hit_semantic"]
+        lookups = hits + self.stats_counts["miss"]
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "enabled": settings.doc_cache_enabled,
+            "namespace": self._namespace,
+            "entries": size,
+            **self.stats_counts,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 2),
+            "saved_tokens": self.saved_tokens,
+            "cost_avoided_usd": round(hits * settings.doc_cache_cost_per_call_usd, 4),
+        }
+
+
+_cache: Optional[DocAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_doc_answer_cache() -> DocAnswerCache:
+    """Get or create the document answer cache singleton."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DocAnswerCache()
+    return _cache
+
+
+def _collect_doc_cache_metrics():
+    if _cache is None:
+        return []
+    stats = _cache.stats()
+    return [
+        ("flusso_doc_cache_entries", "gauge", "Document search cache entries", {}, stats["entries"]),
+        ("flusso_doc_cache_hit_ratio", "gauge", "Document search cache hit rate since start", {}, stats["hit_rate"]),
+    ]
+
+
+register_collector(_collect_doc_cache_metrics)
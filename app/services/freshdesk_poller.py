@@ -0,0 +1,336 @@
+"""
+Freshdesk Poller - polling ingress for deployments where webhooks are unreliable
+Incrementally lists tickets updated since a persisted cursor, runs new/changed
+ones on a worker pool, and remembers what was processed in SQLite.
+
+- Cursor     : `updated_since` stored in SQLite, advanced to the newest ticket
+               seen - but never past a ticket that is still running or waiting
+               for a retry (so nothing is lost on crash/restart). Retries stop
+               holding it once the ticket is marked processed or leaves the
+               listing. Each poll re-reads POLLER_CURSOR_OVERLAP_SECONDS before it.
+- Pagination : oldest first, POLLER_PAGE_SIZE per page, at most
+               POLLER_MAX_PAGES per poll (the rest is picked up next poll).
+- Workers    : POLLER_WORKERS concurrent ticket runs; a ticket is never
+               submitted twice while in flight.
+- Processed  : (ticket_id -> version) rows with a timestamp; rows older than
+               POLLER_PROCESSED_TTL_DAYS are compacted away.
+
+Enabled in the API with FRESHDESK_POLLER_ENABLED=true (run it on ONE replica),
+or standalone with Local_Testing/poll_freshdesk.py.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Callable
+
+from app.config.settings import settings
+from app.config.constants import AI_PROCESSED_TAGS
+from app.clients.freshdesk_client import get_freshdesk_client
+
+logger = logging.getLogger(__name__)
+
+COMPACT_EVERY_SECONDS = 3600
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _format_ts(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def ticket_version(ticket: Dict[str, Any]) -> str:
+    """What makes a ticket 'changed' for the poller."""
+    return f"{ticket.get('updated_at', '')}:{ticket.get('status', '')}"
+
+
+# =====================================================
+# PROCESSED STORE (SQLite)
+# =====================================================
+
+class ProcessedStore:
+    """Processed ticket versions + the poll cursor, in one SQLite file."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " ticket_id TEXT PRIMARY KEY, version TEXT NOT NULL,"
+            " status TEXT NOT NULL, processed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_at ON processed(processed_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cursor (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def is_processed(self, ticket_id: str, version: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM processed WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        return row is not None and row[0] == version
+
+    def mark_processed(self, ticket_id: str, version: str, status: str = "ok") -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed (ticket_id, version, status, processed_at) VALUES (?, ?, ?, ?)",
+                (ticket_id, version, status, time.time()),
+            )
+
+    def get_cursor(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cursor WHERE name = 'updated_since'").fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cursor (name, value) VALUES ('updated_since', ?)", (value,))
+
+    def compact(self, ttl_seconds: float) -> int:
+        """Drop processed rows older than the TTL; returns rows removed."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM processed WHERE processed_at < ?", (time.time() - ttl_seconds,))
+        return cur.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# =====================================================
+# POLLER
+# =====================================================
+
+def build_initial_state(ticket_id: str) -> Dict[str, Any]:
+    return {
+        "ticket_id": ticket_id,
+        "audit_events": [{"event": "poller_triggered", "ticket_id": ticket_id}],
+        "react_iterations": [],
+        "react_total_iterations": 0,
+        "react_status": "pending",
+        "gathered_documents": [],
+        "gathered_images": [],
+        "gathered_past_tickets": [],
+    }
+
+
+class FreshdeskPoller:
+    """Cursor-based Freshdesk poller feeding a worker pool."""
+
+    def __init__(
+        self,
+        run_ticket: Callable[[Dict[str, Any]], Dict[str, Any]],
+        store: Optional[ProcessedStore] = None,
+        workers: Optional[int] = None,
+    ):
+        """
+        run_ticket(initial_state) -> final_state runs one ticket (coalescing,
+        deadline, tracing etc. are the caller's); None when it was superseded.
+        """
+        self.run_ticket = run_ticket
+        self.store = store or ProcessedStore(settings.poller_db_path)
+        self.workers = workers or settings.poller_workers
+        self.client = get_freshdesk_client()
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="poller-worker")
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, str] = {}           # ticket_id -> updated_at
+        self._retry: Dict[str, Dict[str, Any]] = {}    # ticket_id -> {attempts, updated_at}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_compact = 0.0
+        self.stats_counters = {"polls": 0, "poll_errors": 0, "fetched": 0, "submitted": 0,
+                               "succeeded": 0, "failed": 0, "gave_up": 0, "skipped_ai_tagged": 0}
+
+    # ---------------------------------------------------------
+    # Fetch
+    # ---------------------------------------------------------
+    def _initial_cursor(self) -> str:
+        start = datetime.now(timezone.utc) - timedelta(minutes=settings.poller_initial_lookback_minutes)
+        return _format_ts(start)
+
+    def fetch_updated(self, cursor: str) -> List[Dict[str, Any]]:
+        """All pages (up to POLLER_MAX_PAGES) of tickets updated since cursor - overlap."""
+        since = _format_ts(_parse_ts(cursor) - timedelta(seconds=settings.poller_cursor_overlap_seconds))
+        tickets: List[Dict[str, Any]] = []
+        for page in range(1, settings.poller_max_pages + 1):
+            batch = self.client.list_tickets_updated_since(since, page=page, per_page=settings.poller_page_size)
+            tickets.extend(batch)
+            if len(batch) < settings.poller_page_size:
+                break
+        else:
+            logger.info(f"[POLLER] Hit {settings.poller_max_pages} pages; remaining tickets follow next poll")
+        return tickets
+
+    # ---------------------------------------------------------
+    # Run
+    # ---------------------------------------------------------
+    def _run(self, ticket_id: str, version: str, updated_at: str) -> None:
+        start = time.time()
+        try:
+            final_state = self.run_ticket(build_initial_state(ticket_id)) or {}  # {} = superseded by a newer event
+            if final_state.get("workflow_error"):
+                raise RuntimeError(final_state.get("workflow_error"))
+            self.store.mark_processed(ticket_id, version, "ok")
+            with self._lock:
+                self._retry.pop(ticket_id, None)
+                self.stats_counters["succeeded"] += 1
+            logger.info(
+                f"[POLLER] ✅ Ticket #{ticket_id} done in {time.time() - start:.1f}s "
+                f"({final_state.get('resolution_decision', 'N/A')})"
+            )
+        except Exception as e:
+            with self._lock:
+                entry = self._retry.setdefault(ticket_id, {"attempts": 0, "updated_at": updated_at})
+                entry["attempts"] += 1
+                attempts = entry["attempts"]
+                self.stats_counters["failed"] += 1
+                if attempts >= settings.poller_max_attempts:
+                    self._retry.pop(ticket_id, None)
+                    self.stats_counters["gave_up"] += 1
+            if attempts >= settings.poller_max_attempts:
+                self.store.mark_processed(ticket_id, version, "failed")
+                logger.error(f"[POLLER] ❌ Ticket #{ticket_id} failed {attempts}x, giving up: {e}")
+            else:
+                logger.warning(f"[POLLER] ⚠️ Ticket #{ticket_id} failed (attempt {attempts}), will retry: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(ticket_id, None)
+
+    def _release_retry(self, ticket_id: str) -> None:
+        """A ticket marked processed no longer holds the cursor back."""
+        with self._lock:
+            self._retry.pop(ticket_id, None)
+
+    def _drop_unlisted_retries(self, tickets: List[Dict[str, Any]]) -> None:
+        """
+        Drop retries for tickets missing from a listing that covers their
+        updated_at (deleted, merged, moved out of view) - they would hold the
+        cursor forever. Entries past the last listed ticket (page cap) stay.
+        """
+        listed = {str(t["id"]) for t in tickets}
+        listed_until = max((_parse_ts(t["updated_at"]) for t in tickets if t.get("updated_at")), default=None)
+        if listed_until is None:
+            return
+        with self._lock:
+            gone = [
+                ticket_id for ticket_id, entry in self._retry.items()
+                if ticket_id not in listed and ticket_id not in self._in_flight
+                and entry.get("updated_at") and _parse_ts(entry["updated_at"]) <= listed_until
+            ]
+            for ticket_id in gone:
+                self._retry.pop(ticket_id, None)
+        for ticket_id in gone:
+            logger.warning(f"[POLLER] Ticket #{ticket_id} no longer listed - dropping its retry")
+
+    def _next_cursor(self, current: str, tickets: List[Dict[str, Any]]) -> str:
+        """Newest updated_at seen, held back to the oldest ticket still running or awaiting retry."""
+        newest = max((t["updated_at"] for t in tickets if t.get("updated_at")), key=_parse_ts, default=current)
+        with self._lock:
+            held = list(self._in_flight.values()) + [r["updated_at"] for r in self._retry.values()]
+        candidates = [newest] + [h for h in held if h]
+        cursor = min(candidates, key=_parse_ts)
+        return max(cursor, current, key=_parse_ts)
+
+    def poll_once(self) -> int:
+        """One poll: fetch, submit new/changed tickets, advance the cursor. Returns tickets submitted."""
+        cursor = self.store.get_cursor() or self._initial_cursor()
+        tickets = self.fetch_updated(cursor)
+        with self._lock:
+            self.stats_counters["polls"] += 1
+            self.stats_counters["fetched"] += len(tickets)
+
+        submitted = 0
+        for ticket in tickets:
+            ticket_id = str(ticket["id"])
+            version = ticket_version(ticket)
+            if self.store.is_processed(ticket_id, version):
+                self._release_retry(ticket_id)
+                continue
+            if any(tag in (ticket.get("tags") or []) for tag in AI_PROCESSED_TAGS):
+                self.store.mark_processed(ticket_id, version, "ai_tagged")
+                self._release_retry(ticket_id)
+                with self._lock:
+                    self.stats_counters["skipped_ai_tagged"] += 1
+                continue
+            with self._lock:
+                if ticket_id in self._in_flight:
+                    continue
+                self._in_flight[ticket_id] = ticket.get("updated_at") or cursor
+                self.stats_counters["submitted"] += 1
+            self._pool.submit(self._run, ticket_id, version, ticket.get("updated_at") or cursor)
+            submitted += 1
+
+        self._drop_unlisted_retries(tickets)
+        self.store.set_cursor(self._next_cursor(cursor, tickets))
+
+        if time.time() - self._last_compact > COMPACT_EVERY_SECONDS:
+            removed = self.store.compact(settings.poller_processed_ttl_days * 86400)
+            self._last_compact = time.time()
+            if removed:
+                logger.info(f"[POLLER] Compacted {removed} processed rows")
+        return submitted
+
+    # ---------------------------------------------------------
+    # Loop
+    # ---------------------------------------------------------
+    def run_forever(self) -> None:
+        consecutive_errors = 0
+        logger.info(
+            f"[POLLER] Started: every {settings.poller_interval_seconds}s, {self.workers} workers, "
+            f"store {self.store.path}"
+        )
+        while not self._stop.is_set():
+            wait = settings.poller_interval_seconds
+            with self._lock:
+                busy = len(self._in_flight)
+            if busy >= self.workers * 2:
+                logger.info(f"[POLLER] {busy} tickets in flight - skipping fetch this round")
+            else:
+                try:
+                    submitted = self.poll_once()
+                    consecutive_errors = 0
+                    if submitted:
+                        logger.info(f"[POLLER] Submitted {submitted} ticket(s)")
+                except Exception as e:
+                    consecutive_errors += 1
+                    with self._lock:
+                        self.stats_counters["poll_errors"] += 1
+                    wait = min(settings.poller_interval_seconds * (2 ** consecutive_errors), 300)
+                    logger.error(f"[POLLER] Poll failed ({consecutive_errors} in a row), next try in {wait}s: {e}")
+            self._stop.wait(wait)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run_forever, daemon=True, name="freshdesk-poller")
+        self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+        self._pool.shutdown(wait=wait)
+        if wait:
+            self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._in_flight)
+            retrying = len(self._retry)
+            counters = dict(self.stats_counters)
+        return {
+            **counters,
+            "in_flight": in_flight,
+            "awaiting_retry": retrying,
+            "cursor": self.store.get_cursor(),
+            "processed_rows": self.store.count(),
+        }
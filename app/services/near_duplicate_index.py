@@ -0,0 +1,361 @@
+"""
+Near-Duplicate Ticket Index - MinHash/LSH over recently resolved tickets
+Campaign-style floods (near-identical dealer emails, repeated auto-generated
+notifications, the same customer writing three times) would otherwise each
+run the full pipeline.
+
+Fingerprint (computed in pre_triage, before attachments are downloaded):
+- MinHash signature over 3-word shingles of subject + description
+- product-like codes in the text (100.1170, HS6270, RP70823) - must match exactly
+- attachment fingerprint (name + size + content type of every attachment,
+  images included; Freshdesk exposes no content hash)
+
+A match needs estimated Jaccard >= NEAR_DUP_THRESHOLD, identical codes and
+identical attachments. Only RESOLVED tickets whose note reached Freshdesk
+are remembered, together with their ReACT evidence bundle and draft
+(REUSABLE_FIELDS).
+
+Bounds: entries older than NEAR_DUP_WINDOW_HOURS are dropped, and the oldest
+entries are evicted beyond NEAR_DUP_MAX_ENTRIES or NEAR_DUP_MAX_MB. Entries
+keep only what draft_response reads (the raw gathered_* / *_results lists
+are dropped, multimodal_context is capped) and are stored as frozen JSON,
+so every match gets its own deep copy.
+
+In-process only: each worker keeps its own index.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config.settings import settings
+from app.utils.metrics import counter, register_collector
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUP_LOOKUPS = counter("flusso_near_duplicate_lookups_total", "Near-duplicate ticket lookups by result")
+NEAR_DUP_REUSED = counter("flusso_near_duplicate_reused_total", "Prior resolutions reused by mode (evidence / short_circuit)")
+
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: candidate pairs from Jaccard ~0.7 up
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_WORDS = 3
+MAX_CONTEXT_CHARS = 20000  # multimodal_context kept per entry
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.\-]*[a-z0-9]|[a-z0-9]")
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd)\s*:\s*)+", re.IGNORECASE)
+
+# Copied from the prior ticket's final state (react_agent output + draft).
+# Raw retrieval lists (gathered_*, *_retrieval_results) are left out: draft_response
+# reads multimodal_context and the source_* summaries built from them.
+REUSABLE_FIELDS = (
+    "ticket_category",
+    "customer_type",
+    "ticket_complexity",
+    "identified_product",
+    "product_confidence",
+    "gemini_answer",
+    "vision_match_quality",
+    "vision_relevance_reason",
+    "missing_requirements",
+    "image_analysis_insights",
+    "evidence_analysis",
+    "needs_more_info",
+    "info_request_response",
+    "react_final_reasoning",
+    "multimodal_context",
+    "source_documents",
+    "source_products",
+    "source_tickets",
+    "enough_information",
+    "product_match_confidence",
+    "overall_confidence",
+    "hallucination_risk",
+    "spare_parts_pricing_found",
+    "spare_parts_pricing_data",
+    "draft_response",
+)
+
+
+# ----------------------------------------------------------------------
+# Fingerprinting
+# ----------------------------------------------------------------------
+def attachment_fingerprint(attachments: List[Dict[str, Any]]) -> str:
+    """sha256 over (name, size, content type) of every attachment; "" when there are none."""
+    items = sorted(
+        (str(a.get("name", "")).strip().lower(), int(a.get("size") or 0), str(a.get("content_type", "")).lower())
+        for a in attachments or []
+        if isinstance(a, dict)
+    )
+    if not items:
+        return ""
+    return hashlib.sha256(repr(items).encode("utf-8")).hexdigest()
+
+
+def _tokens(subject: str, text: str) -> List[str]:
+    subject = _SUBJECT_PREFIX.sub("", subject or "")
+    return _TOKEN_PATTERN.findall(f"{subject}\n{text or ''}".lower())
+
+
+def _is_code(token: str) -> bool:
+    """Product-like code: digits plus letters or . / - (plain numbers are dates, order ids, phones)."""
+    return len(token) >= 4 and any(c.isdigit() for c in token) and not token.isdigit()
+
+
+def _signature(shingles: Set[str]) -> np.ndarray:
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # Universal hashing (a*x + b) mod p, one row per permutation; uint64 overflow only wraps
+    permuted = np.bitwise_and((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE, _MAX_HASH)
+    return permuted.min(axis=0)
+
+
+def ticket_fingerprint(subject: str, text: str, attachments_fp: str = "") -> Optional[Dict[str, Any]]:
+    """{signature, codes, attachments} for the ticket, or None when it has no text."""
+    tokens = _tokens(subject, text)
+    if not tokens:
+        return None
+    if len(tokens) < SHINGLE_WORDS:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)}
+    return {
+        "signature": _signature(shingles).tolist(),
+        "codes": sorted({t for t in tokens if _is_code(t)}),
+        "attachments": attachments_fp or "",
+    }
+
+
+# ----------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------
+@dataclass
+class _Entry:
+    ticket_id: str
+    signature: np.ndarray
+    codes: Tuple[str, ...]
+    attachments: str
+    requester_email: str
+    payload: str                    # Resolution as JSON - immutable, decoded per match
+    size: int                       # Bytes of payload
+    created_at: float
+
+
+def _bands(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()) for band in range(LSH_BANDS)]
+
+
+class NearDuplicateIndex:
+    """Thread-safe, time- and size-bounded MinHash/LSH index of resolved tickets."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # Oldest first
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats_counts = {"hit": 0, "miss": 0, "codes_differ": 0, "attachments_differ": 0, "stored": 0, "evicted": 0}
+
+    def _remove(self, ticket_id: str) -> None:
+        entry = self._entries.pop(ticket_id, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for band in _bands(entry.signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(ticket_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _evict(self, now: float) -> None:
+        window = settings.near_dup_window_hours * 3600
+        max_bytes = settings.near_dup_max_mb * 1024 * 1024
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if (
+                now - oldest.created_at <= window
+                and len(self._entries) <= settings.near_dup_max_entries
+                and self._bytes <= max_bytes
+            ):
+                break
+            self._remove(oldest.ticket_id)
+            self.stats_counts["evicted"] += 1
+
+    def add(self, ticket_id: str, fingerprint: Dict[str, Any], requester_email: str, resolution: Dict[str, Any]) -> None:
+        payload = json.dumps(resolution, default=str)
+        entry = _Entry(
+            ticket_id=str(ticket_id),
+            signature=np.asarray(fingerprint["signature"], dtype=np.uint64),
+            codes=tuple(fingerprint.get("codes", [])),
+            attachments=fingerprint.get("attachments", ""),
+            requester_email=(requester_email or "").lower(),
+            payload=payload,
+            size=len(payload.encode("utf-8")),
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._remove(entry.ticket_id)  # Re-resolved ticket moves to the newest end
+            self._entries[entry.ticket_id] = entry
+            self._bytes += entry.size
+            for band in _bands(entry.signature):
+                self._buckets.setdefault(band, set()).add(entry.ticket_id)
+            self.stats_counts["stored"] += 1
+            self._evict(entry.created_at)
+
+    def find(self, ticket_id: str, fingerprint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Most similar fresh entry passing the code and attachment checks, as
+        {ticket_id, similarity, age_seconds, same_requester, requester_email, resolution}.
+        """
+        signature = np.asarray(fingerprint["signature"], dtype=np.uint64)
+        codes = tuple(fingerprint.get("codes", []))
+        attachments = fingerprint.get("attachments", "")
+        now = time.time()
+
+        best: Optional[Tuple[_Entry, float]] = None
+        rejected: Optional[Tuple[str, float]] = None
+        with self._lock:
+            self._evict(now)
+            candidates: Set[str] = set()
+            for band in _bands(signature):
+                candidates |= self._buckets.get(band, set())
+            candidates.discard(str(ticket_id))  # Reprocessing a ticket never matches itself
+
+            for candidate in candidates:
+                entry = self._entries[candidate]
+                similarity = float(np.mean(entry.signature == signature))
+                if similarity < settings.near_dup_threshold:
+                    continue
+                reason = None
+                if entry.codes != codes:
+                    reason = "codes_differ"
+                elif entry.attachments != attachments:
+                    reason = "attachments_differ"
+                if reason:
+                    if rejected is None or similarity > rejected[1]:
+                        rejected = (reason, similarity)
+                elif best is None or similarity > best[1]:
+                    best = (entry, similarity)
+
+            result = "hit" if best else (rejected[0] if rejected else "miss")
+            self.stats_counts[result] += 1
+        NEAR_DUP_LOOKUPS.inc(result=result)
+
+        if not best:
+            if rejected:
+                logger.info(f"[NEAR_DUP] Similar ticket found (sim={rejected[1]:.2f}) but {rejected[0]} - not reused")
+            return None
+        entry, similarity = best
+        return {
+            "ticket_id": entry.ticket_id,
+            "similarity": round(similarity, 4),
+            "age_seconds": round(now - entry.created_at, 1),
+            "same_requester": bool(entry.requester_email) and entry.requester_email == (fingerprint.get("requester_email") or "").lower(),
+            "requester_email": entry.requester_email,
+            "resolution": json.loads(entry.payload),
+        }
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._buckets.clear()
+            self._bytes = 0
+        logger.info(f"[NEAR_DUP] 🧹 Cleared {removed} entr{'y' if removed == 1 else 'ies'}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+            size_bytes = self._bytes
+            oldest = next(iter(self._entries.values())).created_at if self._entries else None
+            counts = dict(self.stats_counts)
+        lookups = counts["hit"] + counts["miss"] + counts["codes_differ"] + counts["attachments_differ"]
+        return {
+            "enabled": settings.near_dup_enabled,
+            "mode": settings.near_dup_mode,
+            "entries": size,
+            "size_mb": round(size_bytes / (1024 * 1024), 2),
+            "oldest_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+            **counts,
+            "hit_rate": round(counts["hit"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Get or create the near-duplicate index singleton."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
+
+
+# ----------------------------------------------------------------------
+# Workflow hooks
+# ----------------------------------------------------------------------
+def find_near_duplicate(state: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """(fingerprint, match) for a ticket at pre_triage; both None when disabled."""
+    if not settings.near_dup_enabled:
+        return None, None
+    fingerprint = ticket_fingerprint(
+        state.get("ticket_subject", ""),
+        state.get("ticket_text", ""),
+        state.get("attachment_fingerprint", ""),
+    )
+    if fingerprint is None:
+        return None, None
+    match = get_near_duplicate_index().find(
+        state.get("ticket_id", ""),
+        {**fingerprint, "requester_email": state.get("requester_email", "")},
+    )
+    return fingerprint, match
+
+
+def remember_resolution(state: Dict[str, Any]) -> bool:
+    """Index a RESOLVED ticket's evidence bundle + draft. Reused resolutions are not re-indexed."""
+    fingerprint = state.get("near_duplicate_key")
+    if not settings.near_dup_enabled or not fingerprint or state.get("near_duplicate_match"):
+        return False
+    resolution = {field: state.get(field) for field in REUSABLE_FIELDS if field in state}
+    if not resolution.get("draft_response"):
+        return False
+    if resolution.get("multimodal_context"):
+        resolution["multimodal_context"] = resolution["multimodal_context"][:MAX_CONTEXT_CHARS]
+    get_near_duplicate_index().add(state.get("ticket_id", ""), fingerprint, state.get("requester_email", ""), resolution)
+    return True
+
+
+def _collect_near_duplicate_metrics():
+    if _index is None:
+        return []
+    stats = _index.stats()
+    return [
+        ("flusso_near_duplicate_entries", "gauge", "Resolved tickets in the near-duplicate index", {}, stats["entries"]),
+        ("flusso_near_duplicate_size_mb", "gauge", "Stored resolution size in the near-duplicate index", {}, stats["size_mb"]),
+    ]
+
+
+register_collector(_collect_near_duplicate_metrics)
@@ -11,6 +11,8 @@ import logging
 import re
 from typing import Dict, Any, List, Optional
 
+from app.utils.replay import recordable
+
 logger = logging.getLogger(__name__)
 
 # ===============================
@@ -538,6 +540,7 @@ Standard resolution:
 # ===============================
 # HELPERS
 # ===============================
+@recordable("google_drive")
 def _download_policy_doc() -> str:
     """Download policy document from Google Docs."""
     logger.info("[POLICY_SERVICE] Downloading policy document...")
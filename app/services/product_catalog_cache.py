@@ -4,6 +4,8 @@ import threading
 import logging
 from typing import Dict, Any, List
 
+from app.utils.replay import recordable
+
 logger = logging.getLogger(__name__)
 
 # ===============================
@@ -27,6 +29,7 @@ LOCK = threading.Lock()
 # ===============================
 # HELPERS
 # ===============================
+@recordable("google_drive")
 def _download_sheet() -> pd.DataFrame:
     """Download CSV from Google Sheets and return DataFrame."""
     logger.info("[PRODUCT_CACHE] Downloading product sheet...")
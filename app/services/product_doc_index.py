@@ -0,0 +1,688 @@
+"""
+Product Document Index - local first-stage retriever for document_search_tool
+Page-level BM25 index (optional dense vectors) over the spec sheets, install
+manuals and parts diagrams linked from the product catalog manifest.
+
+Model-scoped lookups ("cartridge part number for 100.1170", "rough-in
+dimensions of HS6270") are answered from the indexed pages in milliseconds.
+Anything that needs synthesis (troubleshooting, how-to, policy), has no model
+scope, or scores below PRODUCT_DOC_INDEX_MIN_SCORE / MIN_COVERAGE escalates
+to Gemini File Search as before.
+
+Built offline with Local_Testing/build_doc_index.py:
+- one entry per document URL, shared by every model / group that links it
+- re-runs are incremental: unchanged URLs (ETag / Last-Modified / content
+  hash) are not re-extracted, removed URLs are dropped
+- --dense adds page embeddings (embed_text) in a LocalVectorIndex; the two
+  rankings are fused with reciprocal rank fusion when
+  PRODUCT_DOC_INDEX_DENSE_ENABLED is on
+
+At startup the catalog's document-URL fingerprint is compared with the one the
+index was built from; a mismatch triggers an incremental re-index in the
+background (PRODUCT_DOC_INDEX_AUTO_REINDEX). Every worker runs that check, so
+builds take a lock shared by all processes using the index directory: the
+first worker re-indexes, the others wait, reload its result and skip.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
+
+from app.config.settings import settings
+from app.services.dedup_store import DiskcacheDedupStore
+from app.utils.metrics import counter, histogram, register_collector
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+DENSE_DIR = "dense"
+BUILD_LOCK_DIR = ".build_lock"
+
+# Cross-process build lock (TTL frees it if the builder dies)
+BUILD_LOCK_TTL_SECONDS = 3600
+BUILD_LOCK_POLL_SECONDS = 5.0
+
+# Catalog field -> doc_type
+DOC_FIELDS = {
+    "spec_sheet_url": "spec_sheet",
+    "install_manual_url": "install_manual",
+    "parts_diagram_url": "parts_diagram",
+}
+DOC_LABELS = {
+    "spec_sheet": "Spec Sheet",
+    "install_manual": "Installation Manual",
+    "parts_diagram": "Parts Diagram",
+}
+# Same vocabulary as document_search._infer_document_type
+DOC_SOURCE_TYPES = {
+    "spec_sheet": "specifications",
+    "install_manual": "installation_guide",
+    "parts_diagram": "parts_list",
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+CHUNK_MAX_CHARS = 2000    # Longer pages are split into overlapping windows
+CHUNK_OVERLAP_CHARS = 200
+MAX_PAGES_PER_DOC = 40
+SNIPPET_CHARS = 500
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "this", "to", "what",
+    "which", "with", "you", "your", "model", "product", "need", "find", "please",
+}
+
+# Lookups the pages answer directly; anything with a synthesis cue escalates
+LOCAL_SEARCH_TYPES = {"parts_inquiry", "specifications"}
+LOOKUP_PATTERN = re.compile(
+    r"\b(part\s*(?:no|number|#)s?|parts?\s*list|parts?\s*diagram|dimensions?|measurements?|"
+    r"rough[\s-]?in|height|width|depth|length|clearance|gpm|flow\s*rate|cartridge|"
+    r"spec(?:ification)?s?|size)\b",
+    re.IGNORECASE,
+)
+SYNTHESIS_PATTERN = re.compile(
+    r"\b(how|why|troubleshoot\w*|leak\w*|drip\w*|not working|broken|steps?|warranty|return|"
+    r"compatible|compare|difference)\b",
+    re.IGNORECASE,
+)
+
+DOC_INDEX_LOOKUPS = counter("flusso_product_doc_index_lookups_total", "Local product document index lookups by result")
+DOC_INDEX_SECONDS = histogram(
+    "flusso_product_doc_index_seconds", "Local product document index search latency",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms; model numbers (100.1170, HS-6270) are kept whole and also split."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "." in token or "-" in token:
+            tokens.extend(part for part in re.split(r"[.\-]", token) if part and part not in STOPWORDS)
+    return tokens
+
+
+def is_lookup_query(query: str, search_type: str) -> bool:
+    """A parts / dimensions style lookup the indexed pages can answer without synthesis."""
+    if SYNTHESIS_PATTERN.search(query or ""):
+        return False
+    return search_type in LOCAL_SEARCH_TYPES or bool(LOOKUP_PATTERN.search(query or ""))
+
+
+def catalog_fingerprint(products: List[Dict[str, Any]]) -> str:
+    """Hash of every (model, group, document URL) link - changes whenever the catalog's documents do."""
+    digest = hashlib.sha256()
+    for product in sorted(products, key=lambda p: p.get("model_no", "")):
+        urls = [product.get(field) or "" for field in DOC_FIELDS]
+        if any(urls):
+            digest.update("|".join([product.get("model_no", ""), product.get("group_number", "")] + urls).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+
+def _split_page(text: str) -> List[str]:
+    text = re.sub(r"[ \t]+", " ", text or "").strip()
+    if len(text) <= CHUNK_MAX_CHARS:
+        return [text] if text else []
+    step = CHUNK_MAX_CHARS - CHUNK_OVERLAP_CHARS
+    return [text[i:i + CHUNK_MAX_CHARS] for i in range(0, len(text), step)]
+
+
+def extract_pdf_pages(file_bytes: bytes, max_pages: int = MAX_PAGES_PER_DOC) -> List[str]:
+    """Text of each page (PyMuPDF); image-only pages come back empty."""
+    from app.utils.attachment_processor import _import_pymupdf
+
+    fitz = _import_pymupdf()
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        return [doc[i].get_text() for i in range(min(len(doc), max_pages))]
+    finally:
+        doc.close()
+
+
+def fetch_document(url: str, source: Optional[Dict[str, Any]] = None, timeout: int = 30) -> Tuple[str, Optional[bytes], Dict[str, str]]:
+    """
+    Conditional GET for a catalog document.
+    Returns (status, body, validators) with status "unchanged" | "fetched" | "failed".
+    Plain requests (not download_attachment) - these are public site URLs and
+    must never carry Freshdesk credentials.
+    """
+    import requests
+
+    headers = {}
+    if source:
+        if source.get("etag"):
+            headers["If-None-Match"] = source["etag"]
+        if source.get("last_modified"):
+            headers["If-Modified-Since"] = source["last_modified"]
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"[DOC_INDEX] Download failed for {url}: {e}")
+        return "failed", None, {}
+    if response.status_code == 304:
+        return "unchanged", None, {}
+    if response.status_code != 200:
+        logger.warning(f"[DOC_INDEX] HTTP {response.status_code} for {url}")
+        return "failed", None, {}
+    validators = {
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+    }
+    return "fetched", response.content, validators
+
+
+class ProductDocIndex:
+    """
+    Page chunks + BM25 postings for the catalog's product documents.
+    Searches read an immutable snapshot; build() swaps in a new one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.sources: Dict[str, Dict[str, Any]] = {}  # url -> {doc_type, models, groups, sha256, etag, last_modified, chunk_ids}
+        self.chunks: Dict[str, Dict[str, Any]] = {}   # chunk id -> {url, doc_type, page, text}
+        self.catalog_fingerprint: Optional[str] = None
+        self.built_at: Optional[str] = None
+        self._snapshot: Dict[str, Any] = self._build_postings({}, {})
+        self._dense = None
+        self._loaded_mtime: Optional[float] = None
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            logger.info(f"[DOC_INDEX] No index at {self.path} - run Local_Testing/build_doc_index.py")
+            return
+        mtime = os.path.getmtime(index_path)
+        with open(index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        sources = data.get("sources", {})
+        chunks = data.get("chunks", {})
+        snapshot = self._build_postings(sources, chunks)
+        with self._lock:
+            self.sources, self.chunks, self._snapshot = sources, chunks, snapshot
+            self.catalog_fingerprint = data.get("catalog_fingerprint")
+            self.built_at = data.get("built_at")
+            self._dense = None
+            self._loaded_mtime = mtime
+        logger.info(f"[DOC_INDEX] Loaded {len(self.sources)} documents, {len(self.chunks)} page chunks")
+
+    def _reload_if_changed(self) -> None:
+        """Pick up an index another process saved since this one was loaded."""
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if os.path.exists(index_path) and os.path.getmtime(index_path) != self._loaded_mtime:
+            self._load()
+
+    def save(self) -> None:
+        """Write to a per-process temp file, then atomically rename over index.json."""
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "catalog_fingerprint": self.catalog_fingerprint,
+                "built_at": self.built_at,
+                "sources": self.sources,
+                "chunks": self.chunks,
+            }, f)
+        os.replace(tmp_path, index_path)
+        self._loaded_mtime = os.path.getmtime(index_path)
+
+    @contextmanager
+    def _shared_build_lock(self) -> Iterator[None]:
+        """
+        Serialize builds across every process using this index directory
+        (uvicorn workers, the CLI). Waits for a running build; proceeds
+        unlocked after BUILD_LOCK_TTL_SECONDS.
+        """
+        store = DiskcacheDedupStore(os.path.join(self.path, BUILD_LOCK_DIR))
+        token = None
+        try:
+            deadline = time.monotonic() + BUILD_LOCK_TTL_SECONDS
+            while True:
+                token = store.acquire_lock("build", BUILD_LOCK_TTL_SECONDS)
+                if token:
+                    break
+                if time.monotonic() >= deadline:
+                    logger.warning(f"[DOC_INDEX] Build lock still held after {BUILD_LOCK_TTL_SECONDS}s, proceeding")
+                    break
+                logger.info("[DOC_INDEX] ⏳ Another process is building the index - waiting")
+                time.sleep(BUILD_LOCK_POLL_SECONDS)
+            yield
+        finally:
+            store.release_lock("build", token)
+            store.close()
+
+    def _dense_index(self):
+        if self._dense is None:
+            from app.clients.local_vector_index import LocalVectorIndex
+            self._dense = LocalVectorIndex(os.path.join(self.path, DENSE_DIR), ann_threshold=settings.local_vector_ann_threshold)
+        return self._dense
+
+    @staticmethod
+    def _build_postings(sources: Dict[str, Dict[str, Any]], chunks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        lengths: Dict[str, int] = {}
+        for chunk_id, chunk in chunks.items():
+            terms = Counter(tokenize(chunk["text"]))
+            lengths[chunk_id] = sum(terms.values())
+            for term, tf in terms.items():
+                postings[term][chunk_id] = tf
+
+        by_model: Dict[str, set] = defaultdict(set)
+        by_group: Dict[str, set] = defaultdict(set)
+        for source in sources.values():
+            ids = [cid for cid in source.get("chunk_ids", []) if cid in chunks]
+            for model in source.get("models", []):
+                by_model[model.upper()].update(ids)
+            for group in source.get("groups", []):
+                by_group[group.upper()].update(ids)
+
+        return {
+            "postings": dict(postings),
+            "lengths": lengths,
+            "avg_length": (sum(lengths.values()) / len(lengths)) if lengths else 0.0,
+            "by_model": dict(by_model),
+            "by_group": dict(by_group),
+        }
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    def build(
+        self,
+        products: List[Dict[str, Any]],
+        full: bool = False,
+        dense: bool = False,
+        prune: bool = True,
+        fetch: Callable = fetch_document,
+        progress: Optional[Callable[[int, int], None]] = None,
+        only_if_changed: bool = False,
+    ) -> Dict[str, int]:
+        """
+        Index every document URL in `products` (catalog product dicts).
+        Incremental unless full=True. prune=False (partial builds) keeps
+        documents not linked from `products`. Returns counts of added /
+        updated / unchanged / removed / failed documents.
+
+        Starts from the latest saved index (another process may have built
+        while this one waited for the lock). only_if_changed=True skips the
+        build when that index already matches the catalog.
+        """
+        with self._build_lock, self._shared_build_lock():
+            self._reload_if_changed()
+            if only_if_changed and catalog_fingerprint(products) == self.catalog_fingerprint:
+                logger.info("[DOC_INDEX] Index already matches the catalog (built by another process)")
+                return {"added": 0, "updated": 0, "unchanged": len(self.sources), "removed": 0, "failed": 0}
+
+            wanted: Dict[str, Dict[str, Any]] = {}
+            for product in products:
+                for field, doc_type in DOC_FIELDS.items():
+                    url = product.get(field)
+                    if not url:
+                        continue
+                    entry = wanted.setdefault(url, {"doc_type": doc_type, "models": set(), "groups": set()})
+                    entry["models"].add(product.get("model_no", ""))
+                    entry["groups"].add(product.get("group_number") or product.get("model_no", ""))
+
+            sources = {} if full else {url: dict(s) for url, s in self.sources.items()}
+            chunks = {} if full else dict(self.chunks)
+            counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+            new_chunk_ids: List[str] = []
+
+            for url in [u for u in sources if prune and u not in wanted]:
+                for chunk_id in sources.pop(url).get("chunk_ids", []):
+                    chunks.pop(chunk_id, None)
+                counts["removed"] += 1
+
+            for n, (url, entry) in enumerate(wanted.items(), 1):
+                existing = sources.get(url)
+                status, body, validators = fetch(url, existing)
+                sha = hashlib.sha256(body).hexdigest() if body is not None else None
+
+                if status == "fetched" and not (existing and existing.get("sha256") == sha):
+                    try:
+                        pages = extract_pdf_pages(body)
+                    except Exception as e:
+                        logger.warning(f"[DOC_INDEX] PDF extraction failed for {url}: {e}")
+                        status = "failed"
+                    else:
+                        for chunk_id in (existing or {}).get("chunk_ids", []):
+                            chunks.pop(chunk_id, None)
+                        chunk_ids = []
+                        for page_num, page_text in enumerate(pages, 1):
+                            for part, text in enumerate(_split_page(page_text)):
+                                chunk_id = f"{_url_key(url)}:p{page_num}:{part}"
+                                chunks[chunk_id] = {"url": url, "doc_type": entry["doc_type"], "page": page_num, "text": text}
+                                chunk_ids.append(chunk_id)
+                        new_chunk_ids.extend(chunk_ids)
+                        counts["updated" if existing else "added"] += 1
+                        existing = {"chunk_ids": chunk_ids, "sha256": sha, **validators}
+                elif status == "fetched":
+                    existing = {**existing, **validators}  # Same bytes, new validators
+                    counts["unchanged"] += 1
+                elif status == "unchanged":
+                    counts["unchanged"] += 1
+
+                if status == "failed":
+                    counts["failed"] += 1
+                    if not existing:
+                        if progress:
+                            progress(n, len(wanted))
+                        continue  # Keep a previously indexed copy of a document that failed to re-download
+
+                sources[url] = {
+                    **existing,
+                    "doc_type": entry["doc_type"],
+                    "models": sorted(m for m in entry["models"] if m),
+                    "groups": sorted(g for g in entry["groups"] if g),
+                }
+                if progress:
+                    progress(n, len(wanted))
+
+            if dense:
+                self._embed_chunks(chunks, list(chunks) if full else new_chunk_ids)
+
+            snapshot = self._build_postings(sources, chunks)
+            with self._lock:
+                self.sources, self.chunks, self._snapshot = sources, chunks, snapshot
+                if prune:
+                    self.catalog_fingerprint = catalog_fingerprint(products)
+                self.built_at = time.strftime("%Y-%m-%d %H:%M:%S")
+            self.save()
+
+        logger.info(f"[DOC_INDEX] ✅ Build done: {counts}, {len(chunks)} page chunks")
+        return counts
+
+    def _embed_chunks(self, chunks: Dict[str, Dict[str, Any]], chunk_ids: List[str], batch_size: int = 100) -> None:
+        """Page embeddings for the dense side. Vectors of removed chunks stay but are never in scope."""
+        from app.clients.embeddings import embed_text
+
+        dense = self._dense_index()
+        batch = []
+        for chunk_id in chunk_ids:
+            chunk = chunks[chunk_id]
+            values = list(embed_text(chunk["text"][:CHUNK_MAX_CHARS]))
+            if not any(values):
+                continue  # embed_text returns zeros on failure
+            batch.append({"id": chunk_id, "values": values, "metadata": {"chunk_id": chunk_id, "doc_type": chunk["doc_type"]}})
+            if len(batch) >= batch_size:
+                dense.upsert(batch)
+                batch = []
+        dense.upsert(batch)
+        dense.save()
+        logger.info(f"[DOC_INDEX] Embedded {len(chunk_ids)} page chunks")
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        query: str,
+        model_number: Optional[str] = None,
+        group_number: Optional[str] = None,
+        top_k: int = 5,
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25 (+ dense, fused) over the pages of the model's documents, falling
+        back to its group's documents. Unscoped queries search every page.
+        Hits: {chunk_id, url, doc_type, page, text, bm25, coverage, score}.
+        """
+        with self._lock:
+            snapshot, chunks = self._snapshot, self.chunks
+
+        candidates: Optional[set] = None
+        if model_number or group_number:
+            candidates = set(snapshot["by_model"].get((model_number or "").upper(), set()))
+            if not candidates and group_number:
+                candidates = set(snapshot["by_group"].get(group_number.upper(), set()))
+            if not candidates:
+                return []
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        # The model number itself is on every page of its own documents - it says nothing about which page
+        scope_terms = set(tokenize(model_number or "")) | set(tokenize(group_number or ""))
+        content_terms = [t for t in terms if t not in scope_terms] or terms
+        if not content_terms:
+            return []
+
+        n_docs = len(snapshot["lengths"]) or 1
+        avg_length = snapshot["avg_length"] or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, int] = defaultdict(int)
+        for term in content_terms:
+            posting = snapshot["postings"].get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                if candidates is not None and chunk_id not in candidates:
+                    continue
+                length = snapshot["lengths"][chunk_id]
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                matched[chunk_id] += 1
+
+        bm25_ranked = sorted(scores, key=scores.get, reverse=True)
+        fused = {cid: 1.0 / (RRF_K + rank) for rank, cid in enumerate(bm25_ranked, 1)}
+
+        if settings.product_doc_index_dense_enabled:
+            for rank, cid in enumerate(self._dense_search(query, candidates, top_k * 4), 1):
+                fused[cid] = fused.get(cid, 0.0) + 1.0 / (RRF_K + rank)
+
+        hits = []
+        for chunk_id in sorted(fused, key=fused.get, reverse=True)[:top_k]:
+            chunk = chunks.get(chunk_id)
+            if not chunk:
+                continue
+            hits.append({
+                "chunk_id": chunk_id,
+                **chunk,
+                "bm25": round(scores.get(chunk_id, 0.0), 3),
+                "coverage": round(matched.get(chunk_id, 0) / len(content_terms), 3),
+                "score": round(fused[chunk_id], 5),
+                "terms": content_terms,
+            })
+        return hits
+
+    def _dense_search(self, query: str, candidates: Optional[set], top_k: int) -> List[str]:
+        try:
+            from app.clients.embeddings import embed_text
+
+            dense = self._dense_index()
+            if not len(dense):
+                return []
+            vector = list(embed_text(query))
+            if not any(vector):
+                return []
+            flt = {"chunk_id": {"$in": sorted(candidates)}} if candidates is not None else None
+            return [m.id for m in dense.query(vector, top_k=top_k, filter=flt).matches]
+        except Exception as e:
+            logger.warning(f"[DOC_INDEX] Dense search failed, BM25 only: {e}")
+            return []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self.sources),
+                "chunks": len(self.chunks),
+                "models": len(self._snapshot["by_model"]),
+                "built_at": self.built_at,
+                "catalog_fingerprint": self.catalog_fingerprint,
+            }
+
+
+# ----------------------------------------------------------------------
+# document_search_tool integration
+# ----------------------------------------------------------------------
+def _snippet(text: str, terms: List[str]) -> str:
+    lower = text.lower()
+    positions = [lower.find(t) for t in terms if lower.find(t) >= 0]
+    start = max(0, min(positions) - SNIPPET_CHARS // 4) if positions else 0
+    snippet = text[start:start + SNIPPET_CHARS].strip()
+    return ("…" if start else "") + snippet
+
+
+def answer_locally(
+    query: str,
+    model_number: Optional[str],
+    search_type: str,
+    top_k: int = 8,
+) -> Optional[Dict[str, Any]]:
+    """
+    document_search_tool result built from indexed pages, or None to escalate
+    to Gemini File Search. Only model-scoped lookups with a confident top page
+    are answered here.
+    """
+    if not settings.product_doc_index_enabled:
+        return None
+    if not model_number:
+        DOC_INDEX_LOOKUPS.inc(result="unscoped")
+        return None
+    if not is_lookup_query(query, search_type):
+        DOC_INDEX_LOOKUPS.inc(result="needs_synthesis")
+        return None
+
+    index = get_product_doc_index()
+    if not index.chunks:
+        DOC_INDEX_LOOKUPS.inc(result="no_index")
+        return None
+
+    start = time.perf_counter()
+    group_number = None
+    try:
+        from app.services.product_catalog import ensure_catalog_loaded
+        product = ensure_catalog_loaded().search_exact_model(model_number)
+        if product:
+            model_number, group_number = product["model_no"], product.get("group_number")
+    except Exception as e:
+        logger.debug(f"[DOC_INDEX] Catalog lookup failed for {model_number}: {e}")
+
+    hits = index.search(query, model_number=model_number, group_number=group_number, top_k=min(top_k, 5))
+    elapsed = time.perf_counter() - start
+    DOC_INDEX_SECONDS.observe(elapsed)
+
+    top = hits[0] if hits else None
+    if not top or top["bm25"] < settings.product_doc_index_min_score or top["coverage"] < settings.product_doc_index_min_coverage:
+        DOC_INDEX_LOOKUPS.inc(result="escalated")
+        logger.info(
+            f"[DOC_INDEX] ↗️ Escalating '{query}' ({model_number}): "
+            f"top bm25={top['bm25'] if top else 0}, coverage={top['coverage'] if top else 0}"
+        )
+        return None
+
+    documents = []
+    for hit in hits:
+        if hit["coverage"] < settings.product_doc_index_min_coverage / 2:
+            continue
+        label = DOC_LABELS.get(hit["doc_type"], "Document")
+        documents.append({
+            "id": hit["chunk_id"],
+            "title": f"{model_number} {label} (page {hit['page']})",
+            "content_preview": _snippet(hit["text"], hit["terms"]),
+            "relevance_score": round(0.6 + 0.4 * hit["coverage"], 3),
+            "source_type": DOC_SOURCE_TYPES.get(hit["doc_type"], "general_documentation"),
+            "rank": len(documents) + 1,
+            "uri": f"{hit['url']}#page={hit['page']}",
+        })
+
+    DOC_INDEX_LOOKUPS.inc(result="answered")
+    logger.info(f"[DOC_INDEX] ⚡ Answered '{query}' ({model_number}) from {len(documents)} page(s) in {elapsed * 1000:.1f}ms")
+    return {
+        "success": True,
+        "documents": documents,
+        "gemini_answer": "",
+        "local_answer": "\n\n".join(f"[{d['title']}] {d['content_preview']}" for d in documents),
+        "count": len(documents),
+        "message": f"Found {len(documents)} page(s) in the local product document index",
+        "source": "local_index",
+        "source_documents": [],
+        "hits": [],
+    }
+
+
+# ----------------------------------------------------------------------
+# Singleton / catalog-change re-index
+# ----------------------------------------------------------------------
+_index: Optional[ProductDocIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_product_doc_index() -> ProductDocIndex:
+    """Get or create the product document index singleton."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ProductDocIndex(settings.product_doc_index_dir)
+    return _index
+
+
+def reindex_if_catalog_changed(background: bool = True) -> bool:
+    """
+    Incremental re-index when the catalog's document links differ from the ones
+    the index was built from. Only refreshes an existing index - the first
+    build is done offline with the CLI. Returns True if a re-index was started.
+    """
+    if not (settings.product_doc_index_enabled and settings.product_doc_index_auto_reindex):
+        return False
+    index = get_product_doc_index()
+    if not index.sources:
+        return False
+
+    from app.services.product_catalog import ensure_catalog_loaded
+    products = ensure_catalog_loaded().products
+    if not products or catalog_fingerprint(products) == index.catalog_fingerprint:
+        return False
+
+    logger.info("[DOC_INDEX] 🔄 Catalog documents changed - incremental re-index")
+
+    def _run():
+        try:
+            index.build(products, dense=len(index._dense_index()) > 0, only_if_changed=True)
+        except Exception as e:
+            logger.error(f"[DOC_INDEX] Re-index failed: {e}", exc_info=True)
+
+    if background:
+        threading.Thread(target=_run, name="doc-index-reindex", daemon=True).start()
+    else:
+        _run()
+    return True
+
+
+def _collect_doc_index_metrics():
+    if _index is None:
+        return []
+    stats = _index.stats()
+    return [
+        ("flusso_product_doc_index_documents", "gauge", "Documents in the local product document index", {}, stats["documents"]),
+        ("flusso_product_doc_index_chunks", "gauge", "Page chunks in the local product document index", {}, stats["chunks"]),
+    ]
+
+
+register_collector(_collect_doc_index_metrics)
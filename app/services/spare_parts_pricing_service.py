@@ -24,6 +24,8 @@ from difflib import SequenceMatcher
 
 import pandas as pd
 
+from app.utils.replay import recordable
+
 logger = logging.getLogger(__name__)
 
 # =============================================================================
@@ -121,6 +123,7 @@ def _get_drive_service():
         return None
 
 
+@recordable("google_drive")
 def _download_sheet_from_drive(file_id: str) -> Optional[pd.DataFrame]:
     """
     Download spreadsheet from Google Drive as CSV and return DataFrame.
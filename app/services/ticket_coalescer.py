@@ -0,0 +1,133 @@
+"""
+Ticket Coalescer - collapse rapid successive updates of one ticket into one run
+Freshdesk fires several webhooks per ticket within a minute (reply, tag change,
+attachment upload). Each accepted event bumps a per-ticket generation in the
+dedup store; only the newest generation gets to run and write.
+
+Flow:
+1. /webhook            -> register_event(ticket_id) = generation N (kept in state)
+2. background task     -> acquire_turn_async(): debounce TICKET_COALESCE_WINDOW_SECONDS,
+                          then take the per-ticket lock; raises WorkflowSuperseded
+                          as soon as a newer event arrives. Waits on the event
+                          loop, so queued tickets hold no threadpool thread
+                          between checks; each store check is a short
+                          asyncio.to_thread() call (poller workers use the
+                          blocking acquire_turn())
+3. ReACT loop          -> ensure_current(state) each iteration (cancels stale runs)
+4. Freshdesk update    -> is_superseded() checked right before writing
+
+Works across replicas when DEDUP_BACKEND=redis. Store errors fail open
+(the run proceeds as if it were current).
+"""
+
+import time
+import asyncio
+import logging
+from typing import Generator, Optional, Tuple
+
+from app.config.settings import settings
+from app.services.dedup_store import get_dedup_store
+
+logger = logging.getLogger(__name__)
+
+GENERATION_TTL_SECONDS = 24 * 3600
+LOCK_POLL_SECONDS = 1.0
+
+
+class WorkflowSuperseded(Exception):
+    """A newer event for the same ticket arrived; this run should stop."""
+    # Reported by node metrics / spans instead of "error": stopping is the expected outcome
+    outcome = "superseded"
+
+
+def _generation_key(ticket_id: str) -> str:
+    return f"gen:{ticket_id}"
+
+
+def _lock_name(ticket_id: str) -> str:
+    return f"ticket:{ticket_id}"
+
+
+def register_event(ticket_id: str) -> Optional[int]:
+    """Record a new event for the ticket; returns its generation (None if the store is down)."""
+    return get_dedup_store().increment(_generation_key(ticket_id), GENERATION_TTL_SECONDS)
+
+
+def is_superseded(ticket_id: str, generation: Optional[int]) -> bool:
+    """True when a newer event than `generation` was registered (runs without a generation never are)."""
+    if not generation:
+        return False
+    current = get_dedup_store().get_int(_generation_key(ticket_id))
+    return current is not None and current > generation
+
+
+def ensure_current(state: dict) -> None:
+    """Raise WorkflowSuperseded if this run's ticket has a newer event."""
+    ticket_id = state.get("ticket_id")
+    generation = state.get("coalesce_generation")
+    if is_superseded(ticket_id, generation):
+        raise WorkflowSuperseded(f"Ticket #{ticket_id} generation {generation} superseded by a newer update")
+
+
+def _turn(ticket_id: str, generation: Optional[int]) -> Generator[float, None, Optional[str]]:
+    """
+    Debounce, then take the ticket's in-flight lock.
+    Yields the seconds to wait before the next check; returns the lock token
+    (None when proceeding unlocked after waiting out the lock TTL).
+    Raises WorkflowSuperseded when a newer event arrives first.
+    """
+    store = get_dedup_store()
+
+    window_end = time.monotonic() + max(0.0, settings.ticket_coalesce_window_seconds)
+    while time.monotonic() < window_end:
+        if is_superseded(ticket_id, generation):
+            raise WorkflowSuperseded(f"Ticket #{ticket_id} generation {generation} superseded while debouncing")
+        yield min(LOCK_POLL_SECONDS, max(0.0, window_end - time.monotonic()))
+
+    wait_end = time.monotonic() + settings.ticket_lock_ttl_seconds
+    while True:
+        if is_superseded(ticket_id, generation):
+            raise WorkflowSuperseded(f"Ticket #{ticket_id} generation {generation} superseded while waiting for lock")
+        token = store.acquire_lock(_lock_name(ticket_id), settings.ticket_lock_ttl_seconds)
+        if token:
+            return token
+        if time.monotonic() >= wait_end:
+            logger.warning(f"[COALESCE] Lock for ticket #{ticket_id} still held after {settings.ticket_lock_ttl_seconds}s, proceeding")
+            return None
+        yield LOCK_POLL_SECONDS
+
+
+def _advance(steps: Generator[float, None, Optional[str]]) -> Tuple[bool, object]:
+    """One _turn() step: (False, seconds to wait) or (True, lock token)."""
+    try:
+        return False, next(steps)
+    except StopIteration as done:
+        return True, done.value
+
+
+def acquire_turn(ticket_id: str, generation: Optional[int]) -> Optional[str]:
+    """Blocking acquire (dedicated worker threads, e.g. the poller). See _turn()."""
+    steps = _turn(ticket_id, generation)
+    while True:
+        finished, value = _advance(steps)
+        if finished:
+            return value
+        time.sleep(value)
+
+
+async def acquire_turn_async(ticket_id: str, generation: Optional[int]) -> Optional[str]:
+    """
+    Event-loop acquire (webhook background tasks). See _turn().
+    Store round-trips (Redis/diskcache) run in a worker thread, waits on the loop.
+    """
+    steps = _turn(ticket_id, generation)
+    while True:
+        finished, value = await asyncio.to_thread(_advance, steps)
+        if finished:
+            return value
+        await asyncio.sleep(value)
+
+
+def release_turn(ticket_id: str, token: Optional[str]) -> None:
+    if token:
+        get_dedup_store().release_lock(_lock_name(ticket_id), token)
@@ -17,6 +17,10 @@ from app.tools.finish import finish_tool
 from app.tools.multimodal_document_analyzer import multimodal_document_analyzer_tool
 from app.tools.ocr_image_analyzer import ocr_image_analyzer_tool
 from app.tools.attachment_classifier_tool import attachment_type_classifier_tool
+from app.tools.spare_parts_pricing_tool import spare_parts_pricing_tool, spare_parts_variants_tool
+
+from app.utils.metrics import instrument_tool
+from app.utils.tracing import trace_tool
 
 __all__ = [
     "product_catalog_tool",
@@ -28,7 +32,9 @@ __all__ = [
     "finish_tool",
     "multimodal_document_analyzer_tool",
     "ocr_image_analyzer_tool",
-    "attachment_type_classifier_tool"
+    "attachment_type_classifier_tool",
+    "spare_parts_pricing_tool",
+    "spare_parts_variants_tool"
 ]
 
 # AVAILABLE_TOOLS: Maps tool names to actual tool objects
@@ -43,5 +49,13 @@ AVAILABLE_TOOLS = {
     "finish_tool": finish_tool,
     "multimodal_document_analyzer_tool": multimodal_document_analyzer_tool,
     "ocr_image_analyzer_tool": ocr_image_analyzer_tool,
-    "attachment_type_classifier_tool": attachment_type_classifier_tool
-}
\ No newline at end of file
+    "attachment_type_classifier_tool": attachment_type_classifier_tool,
+    "spare_parts_pricing_tool": spare_parts_pricing_tool,
+    "spare_parts_variants_tool": spare_parts_variants_tool
+}
+
+# Tracing span + latency / call / error metrics for every tool (wraps tool.func
+# in place, so direct imports elsewhere - e.g. react_agent_helpers - are covered too)
+for _name, _tool in AVAILABLE_TOOLS.items():
+    instrument_tool(_tool.name, trace_tool(_tool.name, _tool))
+instrument_tool("product_search_tool_legacy", trace_tool("product_search_tool_legacy", product_search_tool_legacy))
\ No newline at end of file
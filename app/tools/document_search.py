@@ -2,6 +2,9 @@
 Document Search Tool - Gemini File Search (PRIMARY KNOWLEDGE BASE)
 The most important tool for product information - contains ALL parts specifications,
 product manuals, installation guides, troubleshooting docs, and technical diagrams.
+
+Model-scoped lookups (parts lists, dimensions) are answered first from the local
+product document index; everything else goes to File Search.
 """
 
 import logging
@@ -9,6 +12,8 @@ from typing import Dict, Any, Optional, List
 from langchain.tools import tool
 
 from app.clients.gemini_client import get_gemini_client
+from app.services.doc_answer_cache import get_doc_answer_cache
+from app.services.product_doc_index import answer_locally
 
 logger = logging.getLogger(__name__)
 
@@ -124,6 +129,16 @@ def document_search_tool(
         # Determine the search strategy based on context
         search_type = _determine_search_type(clean_query)
         
+        # First stage: indexed product PDF pages answer model-scoped lookups without Gemini
+        local_model = _extract_model_number(product_context) if product_context else _extract_model_number(clean_query)
+        try:
+            local_result = answer_locally(clean_query, local_model, search_type, top_k=top_k)
+        except Exception as e:
+            logger.warning(f"[DOCUMENT_SEARCH] Local index lookup failed, using File Search: {e}")
+            local_result = None
+        if local_result:
+            return local_result
+        
         # Build context-aware query with improved formatting for better Gemini results
         if product_context:
             # Extract model number from product context if available
@@ -286,12 +301,22 @@ Help support agents research product information quickly and accurately. Provide
 
 Cite the exact document source for each piece of information."""
         
-        # Execute Gemini File Search with sources
-        result = client.search_files_with_sources(
-            query=search_query,
+        # Execute Gemini File Search with sources (semantic answer cache in front)
+        # Partition by model; fall back to the raw product context so different products never share answers
+        if product_context:
+            cache_model = _extract_model_number(product_context) or str(product_context).strip()
+        else:
+            cache_model = _extract_model_number(clean_query)
+        result = get_doc_answer_cache().search(
+            client,
+            search_query=search_query,
+            cache_query=clean_query,
+            model_number=cache_model,
+            search_type=search_type,
             top_k=top_k,
             system_instruction=system_instruction
         )
+        cache_info = result.get("cache")
         
         hits = result.get('hits', [])
         gemini_answer = result.get('gemini_answer', '')
@@ -314,7 +339,8 @@ Cite the exact document source for each piece of information."""
                     "count": 1,
                     "message": "Returned generated answer (no grounded documents)",
                     "source_documents": [],
-                    "hits": hits
+                    "hits": hits,
+                    "cache": cache_info
                 }
 
             return {
@@ -368,7 +394,8 @@ Cite the exact document source for each piece of information."""
             "message": f"Found {len(documents)} relevant document(s)",
             # Return raw sources/hits for deeper debugging or downstream enrichment
             "source_documents": source_documents,
-            "hits": hits
+            "hits": hits,
+            "cache": cache_info
         }
         
     except Exception as e:
@@ -18,12 +18,13 @@ import requests
 import tempfile
 from typing import Dict, Any, List, Optional, Tuple
 from langchain.tools import tool
-from google import genai
 from google.genai import types
 from requests.auth import HTTPBasicAuth
 
 # Import settings globally
 from app.config.settings import settings
+from app.clients.gemini_pool import get_genai_client, gemini_slot
+from app.utils.replay import recordable
 
 logger = logging.getLogger(__name__)
 
@@ -271,9 +272,10 @@ def _parse_document_response(response_text: str) -> Dict[str, Any]:
         }
 
 
-def _download_attachment(url: str, name: str) -> str:
+@recordable("attachments", key=lambda url: url.split("?")[0])
+def _fetch_attachment_bytes(url: str) -> bytes:
     """
-    Download attachment to temp file and return path.
+    Fetch raw attachment bytes.
     
     IMPORTANT: Freshdesk uses two types of attachment URLs:
     1. Direct Freshdesk API URLs - require Basic Auth with API key
@@ -281,26 +283,31 @@ def _download_attachment(url: str, name: str) -> str:
     
     Adding auth to S3 signed URLs causes HTTP 400 errors!
     """
+    # Detect if this is an S3 signed URL
+    is_s3_signed_url = (
+        "amazonaws.com" in url.lower() or 
+        "X-Amz-Signature" in url or
+        "x-amz-signature" in url.lower()
+    )
+    
+    if is_s3_signed_url:
+        # S3 signed URLs should NOT use authentication
+        logger.info(f"[DOC_ANALYZER] S3 signed URL detected - no auth needed")
+        response = requests.get(url, timeout=30)
+    else:
+        # Direct Freshdesk API URLs require Basic Auth
+        auth = HTTPBasicAuth(settings.freshdesk_api_key, "X")
+        response = requests.get(url, auth=auth, timeout=30)
+    
+    response.raise_for_status()
+    return response.content
+
+
+def _download_attachment(url: str, name: str) -> Tuple[str, float]:
+    """Download attachment to temp file and return (path, size in MB)."""
     try:
         logger.info(f"[DOC_ANALYZER] Downloading: {name}")
-        
-        # Detect if this is an S3 signed URL
-        is_s3_signed_url = (
-            "amazonaws.com" in url.lower() or 
-            "X-Amz-Signature" in url or
-            "x-amz-signature" in url.lower()
-        )
-        
-        if is_s3_signed_url:
-            # S3 signed URLs should NOT use authentication
-            logger.info(f"[DOC_ANALYZER] S3 signed URL detected - no auth needed")
-            response = requests.get(url, timeout=30)
-        else:
-            # Direct Freshdesk API URLs require Basic Auth
-            auth = HTTPBasicAuth(settings.freshdesk_api_key, "X")
-            response = requests.get(url, auth=auth, timeout=30)
-        
-        response.raise_for_status()
+        content = _fetch_attachment_bytes(url)
         
         # Create temp file with proper extension
         suffix = "." + name.split(".")[-1] if "." in name else ".pdf"
@@ -308,9 +315,9 @@ def _download_attachment(url: str, name: str) -> str:
         os.close(fd)
         
         with open(path, "wb") as f:
-            f.write(response.content)
+            f.write(content)
         
-        file_size_mb = len(response.content) / (1024 * 1024)
+        file_size_mb = len(content) / (1024 * 1024)
         logger.info(f"[DOC_ANALYZER] Downloaded to: {path} ({file_size_mb:.2f} MB)")
         return path, file_size_mb
         
@@ -319,6 +326,36 @@ def _download_attachment(url: str, name: str) -> str:
         raise
 
 
+@recordable("gemini", key=lambda client, local_path, name: name)
+def _analyze_document(client, local_path: str, name: str) -> str:
+    """Upload a document to the Gemini Files API and return the analysis JSON text."""
+    file_obj = client.files.upload(file=local_path)
+    
+    with gemini_slot("gemini-2.5-flash"):
+        response = client.models.generate_content(
+            model="gemini-2.5-flash",
+            contents=[
+                types.Content(
+                    parts=[
+                        types.Part(text=DOCUMENT_ANALYSIS_PROMPT),
+                        types.Part(
+                            file_data=types.FileData(
+                                file_uri=file_obj.uri,
+                                mime_type=file_obj.mime_type
+                            )
+                        )
+                    ]
+                )
+            ],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.1
+            )
+        )
+    
+    return response.text if response.text else ""
+
+
 def _check_file_size(file_size_mb: float, filename: str) -> Tuple[bool, str]:
     """
     Check if file size is within acceptable limits.
@@ -426,7 +463,7 @@ def multimodal_document_analyzer_tool(
         if not settings.gemini_api_key:
             return {"success": False, "message": "Missing GEMINI_API_KEY"}
              
-        client = genai.Client(api_key=settings.gemini_api_key)
+        client = get_genai_client()
         
         documents = []
         temp_files = []
@@ -477,36 +514,12 @@ def multimodal_document_analyzer_tool(
                 if file_size_mb > LARGE_FILE_THRESHOLD_MB:
                     logger.warning(f"[DOC_ANALYZER] Large file: {name} ({file_size_mb:.1f}MB, ~{estimated_pages} pages)")
                 
-                # 3. Upload to Gemini Files API
+                # 3-4. Upload to Gemini Files API and analyze
                 logger.info(f"[DOC_ANALYZER] Uploading {name} to Gemini ({file_size_mb:.2f}MB)")
-                file_obj = client.files.upload(file=local_path)
-                
-                # 4. Call Gemini for intelligent analysis
                 logger.info(f"[DOC_ANALYZER] Analyzing {name} with gemini-2.5-flash (~{estimated_pages} pages)")
-                
-                response = client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    contents=[
-                        types.Content(
-                            parts=[
-                                types.Part(text=DOCUMENT_ANALYSIS_PROMPT),
-                                types.Part(
-                                    file_data=types.FileData(
-                                        file_uri=file_obj.uri,
-                                        mime_type=file_obj.mime_type
-                                    )
-                                )
-                            ]
-                        )
-                    ],
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json",
-                        temperature=0.1
-                    )
-                )
+                response_text = _analyze_document(client, local_path, name)
                 
                 # 5. Parse response
-                response_text = response.text if response.text else ""
                 analysis = _parse_document_response(response_text)
                 
                 # 6. Smart truncation of visible_text for large documents
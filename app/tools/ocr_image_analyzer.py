@@ -10,15 +10,16 @@ This tool is NOT just OCR - it's a smart analyzer that:
 """
 
 from langchain.tools import tool
-from google import genai
 from google.genai import types
 import httpx
 import logging
 import json
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from app.config.settings import settings
+from app.clients.gemini_pool import get_genai_client, gemini_slot
+from app.utils.replay import recordable
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -139,6 +140,43 @@ FLUSSO_MODEL_PATTERNS = [
 ]
 
 
+@recordable("attachments", key=lambda url: url.split("?")[0])
+def _download_image(url: str) -> Tuple[bytes, str]:
+    """Fetch image bytes and their content type."""
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+    with httpx.Client(timeout=30.0, follow_redirects=True) as http_client:
+        image_resp = http_client.get(url, headers=headers)
+        image_resp.raise_for_status()
+        return image_resp.content, image_resp.headers.get("content-type", "image/jpeg")
+
+
+@recordable("gemini")
+def _analyze_image(client, image_bytes: bytes, mime_type: str) -> str:
+    """Run the image analysis prompt on gemini-2.5-flash and return the JSON text."""
+    with gemini_slot("gemini-2.5-flash"):
+        response = client.models.generate_content(
+            model="gemini-2.5-flash",
+            contents=[
+                types.Content(
+                    parts=[
+                        types.Part(text=IMAGE_ANALYSIS_PROMPT),
+                        types.Part.from_bytes(
+                            data=image_bytes,
+                            mime_type=mime_type
+                        )
+                    ]
+                )
+            ],
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.1  # Low temp for accurate analysis
+            )
+        )
+    return response.text if response.text else ""
+
+
 def _extract_flusso_model_numbers(text: str) -> List[str]:
     """
     Extract valid Flusso model numbers from text using regex patterns.
@@ -269,7 +307,7 @@ def ocr_image_analyzer_tool(image_urls: List[str]) -> Dict[str, Any]:
         return {"success": False, "error": "Missing GEMINI_API_KEY in settings"}
 
     try:
-        client = genai.Client(api_key=settings.gemini_api_key)
+        client = get_genai_client()
     except Exception as e:
         logger.error(f"[IMAGE_ANALYZER] Failed to initialize Gemini client: {e}")
         return {"success": False, "error": f"Client init failed: {str(e)}"}
@@ -284,41 +322,13 @@ def ocr_image_analyzer_tool(image_urls: List[str]) -> Dict[str, Any]:
         try:
             logger.info(f"[IMAGE_ANALYZER] Processing image {index + 1}/{len(image_urls)}: {url[:80]}...")
             
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-
             # Download image
-            with httpx.Client(timeout=30.0, follow_redirects=True) as http_client:
-                image_resp = http_client.get(url, headers=headers)
-                image_resp.raise_for_status()
-                
-                mime_type = image_resp.headers.get("content-type", "image/jpeg")
-                image_bytes = image_resp.content
+            image_bytes, mime_type = _download_image(url)
 
             # 3. Send to Gemini for intelligent analysis
-            # Using gemini-2.5-flash for better vision capabilities
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[
-                    types.Content(
-                        parts=[
-                            types.Part(text=IMAGE_ANALYSIS_PROMPT),
-                            types.Part.from_bytes(
-                                data=image_bytes,
-                                mime_type=mime_type
-                            )
-                        ]
-                    )
-                ],
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.1  # Low temp for accurate analysis
-                )
-            )
+            response_text = _analyze_image(client, image_bytes, mime_type)
             
             # 4. Parse response
-            response_text = response.text if response.text else ""
             analysis = _parse_analysis_response(response_text)
             
             # 5. Post-process: Apply regex to catch any missed model numbers
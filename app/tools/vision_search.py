@@ -7,7 +7,7 @@ import logging
 from typing import Dict, Any, List
 from langchain.tools import tool
 
-from app.clients.embeddings import embed_image
+from app.clients.embeddings import embed_images
 from app.clients.pinecone_client import get_pinecone_client
 from app.config.settings import settings
 
@@ -68,28 +68,23 @@ def vision_search_tool(
     
     try:
         client = get_pinecone_client()
-        all_matches = []
         
-        # Process each image
-        for idx, img_url in enumerate(image_urls, 1):
-            logger.info(f"[VISION_SEARCH] Processing image {idx}/{len(image_urls)}: {img_url}")
-            
-            try:
-                # Generate CLIP embedding
-                vector = embed_image(img_url)
-                
-                # Query Pinecone
-                results = client.query_images(vector=vector, top_k=top_k)
-                
-                if results:
-                    all_matches.extend(results)
-                    logger.info(f"[VISION_SEARCH] Image {idx}: Found {len(results)} matches")
-                    
-            except Exception as e:
-                logger.error(f"[VISION_SEARCH] Failed to process image {idx}: {e}")
-                continue
+        # Embed all images in one batch, then query the index in one round
+        vectors = embed_images(image_urls)
+        valid = [(idx, vec) for idx, vec in enumerate(vectors, 1) if vec is not None]
+        for idx, vec in enumerate(vectors, 1):
+            if vec is None:
+                logger.error(f"[VISION_SEARCH] Failed to embed image {idx}: {image_urls[idx - 1]}")
+        
+        per_image_results = client.query_images_batch(
+            vectors=[vec for _, vec in valid],
+            top_k=top_k
+        ) if valid else []
         
-        if not all_matches:
+        for (idx, _), results in zip(valid, per_image_results):
+            logger.info(f"[VISION_SEARCH] Image {idx}: Found {len(results)} matches")
+        
+        if not any(per_image_results):
             return {
                 "success": False,
                 "matches": [],
@@ -99,9 +94,13 @@ def vision_search_tool(
                 "message": "Could not find matching products"
             }
         
-        # Sort by similarity score and deduplicate
-        all_matches.sort(key=lambda x: x.get("score", 0), reverse=True)
-        unique_matches = _deduplicate_matches(all_matches, top_k)
+        # Fuse per-image rankings so several photos of one product reinforce it
+        unique_matches = _fuse_matches(
+            per_image_results,
+            top_k,
+            method=settings.vision_fusion_method,
+            rrf_k=settings.vision_rrf_k
+        )
         
         # Assess match quality
         top_score = unique_matches[0].get("score", 0)
@@ -128,7 +127,8 @@ def vision_search_tool(
                 "finish": metadata.get("finish", "N/A"),
                 "similarity_score": round(score * 100),
                 "image_url": metadata.get("image_url", ""),
-                "confidence_level": _score_to_confidence(score)
+                "confidence_level": _score_to_confidence(score),
+                "supporting_images": match.get("supporting_images", 1)
             })
         
         logger.info(f"[VISION_SEARCH] Match quality: {match_quality}, Top score: {top_score:.3f}")
@@ -166,6 +166,49 @@ def vision_search_tool(
         }
 
 
+def _fuse_matches(
+    per_image_results: List[List[Dict]],
+    top_k: int,
+    method: str = "rrf",
+    rrf_k: int = 60
+) -> List[Dict]:
+    """
+    Fuse per-image result lists into one ranking, one entry per model_no.
+    
+    - "rrf": reciprocal rank fusion, sum of 1 / (rrf_k + rank) over images,
+      so a product seen in several photos outranks a one-off hit
+    - "max": max similarity per model (single-image behaviour)
+    
+    The returned "score" stays the best raw similarity for that model so
+    quality thresholds keep their meaning; "fusion_score" carries the rank.
+    """
+    fused: Dict[str, Dict] = {}
+    
+    for results in per_image_results:
+        ranked = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
+        for rank, match in enumerate(_deduplicate_matches(ranked, len(ranked)), 1):
+            model = match.get("metadata", {}).get("model_no")
+            score = match.get("score", 0)
+            entry = fused.get(model)
+            if entry is None:
+                entry = fused[model] = {**match, "fusion_score": 0.0, "supporting_images": 0}
+            elif score > entry.get("score", 0):
+                entry.update(match)
+            
+            entry["supporting_images"] += 1
+            if method == "max":
+                entry["fusion_score"] = max(entry["fusion_score"], score)
+            else:
+                entry["fusion_score"] += 1.0 / (rrf_k + rank)
+    
+    ranked = sorted(
+        fused.values(),
+        key=lambda x: (x["fusion_score"], x.get("score", 0)),
+        reverse=True
+    )
+    return ranked[:top_k]
+
+
 def _deduplicate_matches(matches: List[Dict], top_k: int) -> List[Dict]:
     """Remove duplicate products based on model number"""
     seen_models = set()
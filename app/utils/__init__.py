@@ -2,7 +2,7 @@
 
 from app.utils.audit import add_audit_event
 from app.utils.pii_masker import mask_email, mask_name, mask_phone, mask_ticket_text, mask_api_key
-from app.utils.retry import retry_api_call, retry_external_service, with_retry
+from app.utils.retry import retry_api_call, retry_external_service, deadline_scope, get_retry_stats
 from app.utils.validation import requires_fields, requires_any_field, validate_state_type, NodeValidationError
 
 __all__ = [
@@ -17,7 +17,8 @@ __all__ = [
     # Retry Logic
     "retry_api_call",
     "retry_external_service",
-    "with_retry",
+    "deadline_scope",
+    "get_retry_stats",
     # Validation
     "requires_fields",
     "requires_any_field",
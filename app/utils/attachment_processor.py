@@ -19,6 +19,7 @@ from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 from app.config.settings import settings
+from app.utils.replay import recordable
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +92,7 @@ SUPPORTED_TYPES = {
 }
 
 
+@recordable("attachments", key=lambda url, timeout=30: url.split("?")[0])
 def download_attachment(url: str, timeout: int = 30) -> Tuple[Optional[bytes], Optional[str]]:
     """
     Download attachment from Freshdesk URL.
@@ -3,6 +3,7 @@ Audit Logging Utility
 Adds structured audit events into TicketState.audit_events
 """
 
+import uuid
 import logging
 from typing import Dict, Any, List
 
@@ -35,9 +36,11 @@ def add_audit_event(
 
     details = details or {}
 
-    audit_events: List[Dict[str, Any]] = state.get("audit_events", []) or []
+    # Copy: parallel graph branches share the incoming list (merged by merge_audit_events)
+    audit_events: List[Dict[str, Any]] = list(state.get("audit_events", []) or [])
 
     audit_events.append({
+        "event_id": uuid.uuid4().hex,  # Stable across state copies (merge_audit_events dedups on it)
         "event": event,
         "type": event_type,
         "details": details
@@ -50,3 +53,31 @@ def add_audit_event(
         logger.warning(f"[AUDIT] Truncated {removed_count} old events (limit: {MAX_AUDIT_EVENTS})")
 
     return {"audit_events": audit_events}
+
+
+def merge_audit_events(
+    left: List[Dict[str, Any]],
+    right: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    LangGraph reducer for TicketState.audit_events.
+
+    Nodes return the full list (existing events + their own), so a plain
+    concatenation would duplicate history. Events already present in `left`
+    (same event_id, set by add_audit_event) are dropped from `right`; the rest
+    are appended. This lets branches that run in the same step
+    (react_agent || customer_context) each add their events. Events built
+    without add_audit_event have no event_id and fall back to object identity.
+    """
+    left = left or []
+    if not right:
+        return left
+    seen = {_event_key(e) for e in left}
+    merged = left + [e for e in right if _event_key(e) not in seen]
+    if len(merged) > MAX_AUDIT_EVENTS:
+        merged = merged[-MAX_AUDIT_EVENTS:]
+    return merged
+
+
+def _event_key(event: Dict[str, Any]) -> Any:
+    return event.get("event_id") or id(event)
@@ -11,7 +11,9 @@ This logger captures:
 
 Logs are stored in: workflow_logs/ticket_{id}_{timestamp}.json
 
-Thread-safe implementation using thread-local storage for concurrent webhooks.
+Logs are keyed by the ticket's trace (app.utils.tracing), so they stay attached
+to the workflow when nodes run on different threads or from asyncio. Outside a
+trace they fall back to the current thread id.
 """
 
 import logging
@@ -23,12 +25,19 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, field, asdict
 
+from app.utils.tracing import current_trace_id
+
 logger = logging.getLogger(__name__)
 
-# Thread-safe storage for concurrent workflow logs
-_workflow_logs: Dict[int, "WorkflowLog"] = {}
+# Storage for concurrent workflow logs, keyed by trace id (or thread id)
+_workflow_logs: Dict[Any, "WorkflowLog"] = {}
 _logs_lock = threading.Lock()
 
+
+def _log_key() -> Any:
+    """Key of the current workflow: its trace id, else the thread id."""
+    return current_trace_id() or threading.get_ident()
+
 LOG_DIR = Path("workflow_logs")
 
 
@@ -90,28 +99,28 @@ class WorkflowLog:
 
 def start_workflow_log(ticket_id: str) -> WorkflowLog:
     """Initialize a new workflow log for a ticket (thread-safe)"""
-    thread_id = threading.get_ident()
+    log_key = _log_key()
     
     with _logs_lock:
         log = WorkflowLog(
             ticket_id=ticket_id,
             started_at=datetime.now().isoformat()
         )
-        _workflow_logs[thread_id] = log
-        logger.info(f"📝 Started detailed logging for ticket #{ticket_id} (thread: {thread_id})")
+        _workflow_logs[log_key] = log
+        logger.info(f"📝 Started detailed logging for ticket #{ticket_id} (key: {log_key})")
         return log
 
 
 def get_current_log() -> Optional[WorkflowLog]:
-    """Get the current workflow log for this thread"""
-    thread_id = threading.get_ident()
+    """Get the current workflow log (by trace, else by thread)"""
+    log_key = _log_key()
     with _logs_lock:
-        return _workflow_logs.get(thread_id)
+        return _workflow_logs.get(log_key)
 
 
 def log_node_start(node_name: str, input_summary: Dict[str, Any] = None) -> NodeExecution:
     """Log the start of a node execution (thread-safe)"""
-    thread_id = threading.get_ident()
+    log_key = _log_key()
     
     node = NodeExecution(
         node_name=node_name,
@@ -120,7 +129,7 @@ def log_node_start(node_name: str, input_summary: Dict[str, Any] = None) -> Node
     )
     
     with _logs_lock:
-        current_log = _workflow_logs.get(thread_id)
+        current_log = _workflow_logs.get(log_key)
         if current_log:
             current_log.nodes.append(node)
     
@@ -240,14 +249,14 @@ def complete_workflow_log(
     metrics: Dict[str, Any] = None
 ):
     """Complete the workflow log and save to file (thread-safe)"""
-    thread_id = threading.get_ident()
+    log_key = _log_key()
     
     with _logs_lock:
-        if thread_id not in _workflow_logs:
-            logger.warning("No active workflow log to complete for this thread")
+        if log_key not in _workflow_logs:
+            logger.warning("No active workflow log to complete for this workflow")
             return None
         
-        current_log = _workflow_logs[thread_id]
+        current_log = _workflow_logs[log_key]
         current_log.ended_at = datetime.now().isoformat()
         current_log.resolution_status = resolution_status
         current_log.final_response = final_response
@@ -265,12 +274,20 @@ def complete_workflow_log(
         logger.info(f"   Resolution: {resolution_status}")
         logger.info(f"   Nodes executed: {len(current_log.nodes)}")
         
-        # Remove from thread-local storage
-        del _workflow_logs[thread_id]
+        # Remove from active logs
+        del _workflow_logs[log_key]
         
         return None  # No file path returned
 
 
+def discard_workflow_log() -> None:
+    """Drop the current workflow's log if complete_workflow_log never ran (run raised/was superseded)"""
+    with _logs_lock:
+        dropped = _workflow_logs.pop(_log_key(), None)
+    if dropped:
+        logger.info(f"📝 Discarded unfinished workflow log for ticket #{dropped.ticket_id}")
+
+
 def save_workflow_log(log: WorkflowLog) -> Optional[Path]:
     """
     Save workflow log to JSON file.
@@ -361,8 +378,8 @@ def _save_workflow_log_to_file(log: WorkflowLog) -> Path:
 
 def get_node_summary() -> str:
     """Get a summary of all nodes executed in current workflow (thread-safe)"""
-    thread_id = threading.get_ident()
-    current_log = _workflow_logs.get(thread_id)
+    log_key = _log_key()
+    current_log = _workflow_logs.get(log_key)
     
     if not current_log:
         return "No active workflow"
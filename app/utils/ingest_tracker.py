@@ -0,0 +1,151 @@
+"""
+Ingest Tracker - webhook acceptance / queueing / completion timings
+Follows each accepted webhook from the /webhook handler through the background
+task queue to workflow completion, so capacity can be measured on a live pod
+(see Local_Testing/load_test_webhook.py and /debug/ingest-stats).
+
+Per webhook:
+- accept latency     : handler entry -> response (including dedup check)
+- queueing delay     : accepted -> background task actually starts
+- completion latency : accepted -> workflow finished (ok / superseded / failed)
+
+Also samples process memory (RSS) and thread count so memory growth under
+sustained load is visible without attaching a profiler.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import itertools
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from app.utils.metrics import counter, histogram, register_collector
+
+logger = logging.getLogger(__name__)
+
+RECENT_RECORDS = 5000  # Finished webhooks kept for /debug/ingest-stats
+
+WEBHOOKS = counter("flusso_webhooks_total", "Webhook requests by outcome (accepted/duplicate/invalid/error)")
+WEBHOOK_ACCEPT = histogram("flusso_webhook_accept_seconds", "Webhook handler latency until the response")
+WEBHOOK_QUEUE_DELAY = histogram("flusso_webhook_queue_delay_seconds", "Accepted webhook -> background workflow start")
+WEBHOOK_COMPLETION = histogram("flusso_webhook_completion_seconds", "Accepted webhook -> workflow finished")
+
+
+def process_memory_mb() -> Optional[float]:
+    """Current resident set size in MB (None when it cannot be read)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak RSS (bytes on macOS, KB elsewhere) - best effort when /proc is unavailable
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except Exception:
+        return None
+
+
+class IngestTracker:
+    """Thread-safe bookkeeping for webhooks between acceptance and completion."""
+
+    def __init__(self, max_records: int = RECENT_RECORDS):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._records: deque = deque(maxlen=max_records)
+        self._outcomes: Dict[str, int] = {}
+        self._started_at = time.time()
+
+    def outcome(self, outcome: str, accept_seconds: float) -> None:
+        """Count a handled webhook (accepted / duplicate / invalid / error)."""
+        WEBHOOKS.inc(outcome=outcome)
+        WEBHOOK_ACCEPT.observe(accept_seconds, outcome=outcome)
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def accepted(self, ticket_id: str, accept_seconds: float) -> int:
+        """Register an accepted webhook; returns the id passed to the background task."""
+        self.outcome("accepted", accept_seconds)
+        ingest_id = next(self._ids)
+        with self._lock:
+            self._pending[ingest_id] = {
+                "ingest_id": ingest_id,
+                "ticket_id": ticket_id,
+                "accepted_at": time.time(),
+                "accept_seconds": round(accept_seconds, 4),
+                "started_at": None,
+            }
+        return ingest_id
+
+    def started(self, ingest_id: Optional[int]) -> None:
+        with self._lock:
+            record = self._pending.get(ingest_id)
+            if record is None:
+                return
+            record["started_at"] = time.time()
+            delay = record["started_at"] - record["accepted_at"]
+        WEBHOOK_QUEUE_DELAY.observe(delay)
+
+    def finished(self, ingest_id: Optional[int], status: str) -> None:
+        with self._lock:
+            record = self._pending.pop(ingest_id, None)
+            if record is None:
+                return
+            now = time.time()
+            record["finished_at"] = now
+            record["status"] = status
+            record["queue_delay"] = round((record["started_at"] or now) - record["accepted_at"], 4)
+            record["completion_seconds"] = round(now - record["accepted_at"], 4)
+            self._records.append(record)
+        WEBHOOK_COMPLETION.observe(record["completion_seconds"], status=status)
+
+    def stats(self, since: Optional[float] = None, include_records: bool = False) -> Dict[str, Any]:
+        """Snapshot for /debug/ingest-stats (records filtered to accepted_at >= since)."""
+        with self._lock:
+            records = [r for r in self._records if since is None or r["accepted_at"] >= since]
+            pending = list(self._pending.values())
+            outcomes = dict(self._outcomes)
+
+        stats = {
+            "timestamp": time.time(),
+            "uptime_seconds": round(time.time() - self._started_at, 1),
+            "outcomes": outcomes,
+            "pending": len(pending),
+            "queued": sum(1 for r in pending if r["started_at"] is None),
+            "running": sum(1 for r in pending if r["started_at"] is not None),
+            "finished": len(records),
+            "superseded": sum(1 for r in records if r["status"] == "superseded"),
+            "failed": sum(1 for r in records if r["status"] not in ("ok", "superseded")),
+            "rss_mb": process_memory_mb(),
+            "threads": threading.active_count(),
+        }
+        if include_records:
+            stats["records"] = records
+        return stats
+
+
+_tracker: Dict[str, IngestTracker] = {}
+
+
+def get_ingest_tracker() -> IngestTracker:
+    if 'instance' not in _tracker:
+        _tracker['instance'] = IngestTracker()
+    return _tracker['instance']
+
+
+def _ingest_samples() -> List[tuple]:
+    stats = get_ingest_tracker().stats()
+    return [
+        ("flusso_webhooks_queued", "gauge", "Accepted webhooks waiting for a worker", None, stats["queued"]),
+        ("flusso_process_resident_memory_mb", "gauge", "Resident set size of the process", None, stats["rss_mb"]),
+        ("flusso_process_threads", "gauge", "Live Python threads", None, stats["threads"]),
+    ]
+
+
+register_collector(_ingest_samples)
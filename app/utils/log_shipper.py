@@ -2,20 +2,36 @@
 Workflow Log Shipper
 Sends logs to centralized collector via HTTPS.
 
-FINAL DESIGN PRINCIPLES:
-1. Send logs immediately (reliable in cloud)
-2. Short timeout (never hang request)
-3. Fail silently (logging must not break workflow)
-4. Simple & predictable behavior
+DESIGN PRINCIPLES:
+1. Never block the workflow - ship_log() only enqueues
+2. Bounded memory - ring buffer drops the oldest entry when full
+3. Batch over one persistent connection (HTTP/2 when h2 is installed)
+4. Never lose a batch silently - failures spill to a local JSONL file and
+   are replayed once the collector is reachable again
+5. Graceful flush on shutdown (called from the FastAPI lifespan hook)
+
+Pipeline:
+    ship_log() -> ring buffer -> worker thread -> batch
+        -> LOG_COLLECTOR_BATCH_URL (gzip JSON array), or
+        -> LOG_COLLECTOR_URL (one POST per payload, same connection)
+        -> on failure: LOG_SPILL_FILE
 """
 
+import gzip
+import importlib.util
+import json
 import logging
 import os
-from typing import Dict, Any
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
 
 import httpx
 from dotenv import load_dotenv
 
+from app.utils.metrics import register_collector
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -25,14 +41,320 @@ logger = logging.getLogger(__name__)
 # -------------------------------------------------------------------
 
 LOG_COLLECTOR_URL = os.getenv("LOG_COLLECTOR_URL", "")
+LOG_COLLECTOR_BATCH_URL = os.getenv("LOG_COLLECTOR_BATCH_URL", "")  # Optional: accepts a gzip JSON array
 LOG_COLLECTOR_API_KEY = os.getenv("LOG_COLLECTOR_API_KEY", "")
 CLIENT_ID = os.getenv("CLIENT_ID", "unknown_client")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "production")
 
-# Timeouts (keep short)
+# Timeouts (keep short - these only affect the background worker)
 REQUEST_TIMEOUT = 3.0   # total timeout
 CONNECT_TIMEOUT = 2.0   # connection timeout
 
+# Pipeline sizing
+BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "1000"))        # ring buffer capacity
+BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "20"))            # payloads per batch
+FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2.0")) # max seconds a payload waits
+SPILL_FILE = os.getenv("LOG_SPILL_FILE", ".cache/log_spill.jsonl")
+SPILL_MAX_BYTES = int(os.getenv("LOG_SPILL_MAX_BYTES", str(50 * 1024 * 1024)))
+REPLAY_INTERVAL = 60.0  # seconds between spill replay attempts
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+# -------------------------------------------------------------------
+# Background shipper
+# -------------------------------------------------------------------
+
+class LogShipper:
+    """Ring buffer + worker thread that ships log batches in the background."""
+
+    def __init__(self):
+        self._buffer: deque = deque(maxlen=BUFFER_SIZE)
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._client: Optional[httpx.Client] = None
+        self._stopping = False
+        self._in_flight = 0
+        self._last_replay = 0.0
+
+        self.counters: Dict[str, int] = {
+            "enqueued": 0,
+            "shipped": 0,
+            "dropped": 0,
+            "failed_batches": 0,
+            "spilled": 0,
+            "replayed": 0,
+        }
+
+    # ---------------- producer side ----------------
+
+    def enqueue(self, payload: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.counters["dropped"] += 1  # oldest entry is overwritten
+            self._buffer.append(payload)
+            self.counters["enqueued"] += 1
+            self._ensure_worker()
+            if len(self._buffer) >= BATCH_SIZE:
+                self._cond.notify()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._stopping = False
+            self._worker = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+            self._worker.start()
+
+    # ---------------- worker side ----------------
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._buffer and not self._stopping:
+                    self._cond.wait(timeout=FLUSH_INTERVAL)
+                elif len(self._buffer) < BATCH_SIZE and not self._stopping:
+                    # Give the batch a moment to fill up
+                    self._cond.wait(timeout=FLUSH_INTERVAL)
+
+                batch = [self._buffer.popleft() for _ in range(min(BATCH_SIZE, len(self._buffer)))]
+                self._in_flight = len(batch)
+                stopping = self._stopping
+
+            if batch:
+                delivered = self._send(batch)
+                self.counters["shipped"] += delivered
+                if delivered == len(batch):
+                    self._maybe_replay_spill()
+                else:
+                    self.counters["failed_batches"] += 1
+                    # Spill only what was not delivered
+                    self._spill(batch[delivered:])
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+                if stopping and not self._buffer:
+                    return
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                timeout=httpx.Timeout(timeout=REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=2, max_keepalive_connections=2),
+            )
+        return self._client
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "Flusso-Workflow/log-shipper",
+        }
+        if LOG_COLLECTOR_API_KEY:
+            headers["X-API-Key"] = LOG_COLLECTOR_API_KEY
+        return headers
+
+    def _send(self, batch: List[Dict[str, Any]]) -> int:
+        """Ship one batch. Returns how many payloads were delivered (a prefix of the batch)."""
+        delivered = 0
+        try:
+            client = self._get_client()
+
+            if LOG_COLLECTOR_BATCH_URL:
+                body = gzip.compress(json.dumps(batch, default=str).encode("utf-8"))
+                headers = {**self._headers(), "Content-Encoding": "gzip"}
+                response = client.post(LOG_COLLECTOR_BATCH_URL, content=body, headers=headers)
+                if response.status_code in (200, 201, 202, 204):
+                    logger.info(f"✅ Shipped batch of {len(batch)} log(s)")
+                    return len(batch)
+                logger.warning(f"⚠️ Log collector returned {response.status_code} for batch: {response.text[:200]}")
+                return 0
+
+            # Per-payload contract, but over one kept-alive connection
+            for payload in batch:
+                response = client.post(LOG_COLLECTOR_URL, json=payload, headers=self._headers())
+                if response.status_code not in (200, 201, 204):
+                    logger.warning(
+                        f"⚠️ Log collector returned {response.status_code} "
+                        f"for ticket {payload.get('ticket_id', 'unknown')}: {response.text[:200]}"
+                    )
+                    return delivered
+                delivered += 1
+                logger.info(f"✅ Log shipped successfully for ticket {payload.get('ticket_id', 'unknown')}")
+            return delivered
+
+        except httpx.TimeoutException:
+            logger.warning(f"⏱️ Log shipping timed out ({len(batch) - delivered} log(s) will be spilled)")
+        except httpx.ConnectError as e:
+            logger.warning(f"🔌 Cannot connect to log collector: {e}")
+        except httpx.HTTPError as e:
+            logger.warning(f"📡 HTTP error shipping logs: {e}")
+        except Exception as e:
+            logger.error(f"❌ Unexpected error shipping logs: {e}", exc_info=True)
+        return delivered
+
+    # ---------------- disk spill ----------------
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            with self._spill_lock:
+                os.makedirs(os.path.dirname(SPILL_FILE) or ".", exist_ok=True)
+                if os.path.exists(SPILL_FILE) and os.path.getsize(SPILL_FILE) >= SPILL_MAX_BYTES:
+                    logger.error(f"❌ Log spill file full ({SPILL_MAX_BYTES} bytes) - dropping {len(batch)} log(s)")
+                    self.counters["dropped"] += len(batch)
+                    return
+                with open(SPILL_FILE, "a", encoding="utf-8") as f:
+                    for payload in batch:
+                        f.write(json.dumps(payload, default=str) + "\n")
+            self.counters["spilled"] += len(batch)
+            logger.info(f"💾 Spilled {len(batch)} log(s) to {SPILL_FILE}")
+        except Exception as e:
+            self.counters["dropped"] += len(batch)
+            logger.error(f"❌ Failed to spill logs: {e}")
+
+    def _maybe_replay_spill(self) -> None:
+        """After a successful send, replay spilled logs (rate-limited)."""
+        now = time.monotonic()
+        pending = os.path.exists(SPILL_FILE) or os.path.exists(SPILL_FILE + ".replay")
+        if now - self._last_replay < REPLAY_INTERVAL or not pending:
+            return
+        self._last_replay = now
+        self.replay_spill()
+
+    def replay_spill(self) -> int:
+        """
+        Re-send spilled logs, oldest first.
+
+        The spill file is moved to <LOG_SPILL_FILE>.replay (new failures keep
+        spilling to a fresh file) and <...>.replay.offset records the byte offset
+        delivered so far, updated after every batch. A failed batch or a crash
+        resumes from that offset on the next replay, so nothing is lost or sent
+        twice; the replay file is removed once fully delivered.
+        """
+        replay_file = SPILL_FILE + ".replay"
+        offset_file = replay_file + ".offset"
+        if not self._replay_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._spill_lock:
+                if not os.path.exists(replay_file):
+                    if not os.path.exists(SPILL_FILE):
+                        return 0
+                    os.replace(SPILL_FILE, replay_file)
+                    _write_offset(offset_file, 0)
+
+            offset = _read_offset(offset_file)
+            replayed = 0
+            complete = False
+            with open(replay_file, "rb") as f:
+                f.seek(offset)
+                while True:
+                    batch: List[Dict[str, Any]] = []
+                    ends: List[int] = []  # byte offset after each payload
+                    while len(batch) < BATCH_SIZE:
+                        line = f.readline()
+                        if not line:
+                            break
+                        try:
+                            batch.append(json.loads(line))
+                            ends.append(f.tell())
+                        except json.JSONDecodeError:
+                            continue
+                    if not batch:
+                        complete = True
+                        break
+
+                    delivered = self._send(batch)
+                    replayed += delivered
+                    if delivered:
+                        _write_offset(offset_file, ends[delivered - 1])
+                    if delivered < len(batch):
+                        logger.warning(f"⚠️ Spill replay stopped after {replayed} log(s), resuming later")
+                        break
+
+            if complete:
+                for path in (replay_file, offset_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+        finally:
+            self._replay_lock.release()
+
+        self.counters["replayed"] += replayed
+        if replayed:
+            logger.info(f"♻️ Replayed {replayed} spilled log(s)")
+        return replayed
+
+    # ---------------- lifecycle ----------------
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait for the buffer to drain. Returns True if everything was handed off."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._buffer or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._worker is None or not self._worker.is_alive():
+                    break
+                self._cond.wait(timeout=min(remaining, 0.5))
+            drained = not self._buffer and not self._in_flight
+            leftover = list(self._buffer)
+            self._buffer.clear()
+
+        if leftover:
+            # Out of time: keep them on disk for the next process to replay
+            self._spill(leftover)
+        return drained
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self.flush(timeout)
+        if self._worker is not None:
+            self._worker.join(timeout=1.0)
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        logger.info(f"📝 Log shipper stopped: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            backlog = len(self._buffer) + self._in_flight
+        spill_bytes = os.path.getsize(SPILL_FILE) if os.path.exists(SPILL_FILE) else 0
+        replay_file = SPILL_FILE + ".replay"
+        if os.path.exists(replay_file):
+            spill_bytes += max(0, os.path.getsize(replay_file) - _read_offset(replay_file + ".offset"))
+        return {**self.counters, "backlog": backlog, "spill_bytes": spill_bytes, "http2": HTTP2_AVAILABLE}
+
+
+def _read_offset(path: str) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _write_offset(path: str, offset: int) -> None:
+    """Atomically record the replay offset (survives a crash mid-write)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(offset))
+    os.replace(tmp, path)
+
+
+_shipper: Dict[str, LogShipper] = {}
+_shipper_lock = threading.Lock()
+
+
+def get_log_shipper() -> LogShipper:
+    if 'instance' not in _shipper:
+        with _shipper_lock:
+            if 'instance' not in _shipper:
+                _shipper['instance'] = LogShipper()
+    return _shipper['instance']
+
 
 # -------------------------------------------------------------------
 # Public API
@@ -40,14 +362,13 @@ CONNECT_TIMEOUT = 2.0   # connection timeout
 
 def ship_log(log_payload: Dict[str, Any]) -> None:
     """
-    Send workflow log to centralized collector.
+    Queue workflow log for the centralized collector.
 
-    - Executes synchronously
-    - Uses short timeout
+    - Returns immediately (delivery happens on a background thread)
     - Never raises exceptions
     """
 
-    if not LOG_COLLECTOR_URL:
+    if not LOG_COLLECTOR_URL and not LOG_COLLECTOR_BATCH_URL:
         logger.debug("LOG_COLLECTOR_URL not set - skipping log shipping")
         return
 
@@ -55,55 +376,43 @@ def ship_log(log_payload: Dict[str, Any]) -> None:
         logger.warning("Empty log payload - skipping log shipping")
         return
 
-    ticket_id = log_payload.get("ticket_id", "unknown")
-
     try:
         _enrich_payload(log_payload)
+        get_log_shipper().enqueue(log_payload)
+        logger.info(f"📤 Queued log for ticket {log_payload.get('ticket_id', 'unknown')}")
+    except Exception as e:
+        logger.error(f"❌ Failed to queue log: {e}", exc_info=True)
 
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": f"Flusso-Workflow/{log_payload.get('workflow_version', 'v1.0')}",
-        }
 
-        if LOG_COLLECTOR_API_KEY:
-            headers["X-API-Key"] = LOG_COLLECTOR_API_KEY
+def flush_logs(timeout: float = 5.0) -> bool:
+    """Block until queued logs are shipped or spilled (used by tests/CLIs)."""
+    if 'instance' not in _shipper:
+        return True
+    return _shipper['instance'].flush(timeout)
 
-        timeout = httpx.Timeout(
-            timeout=REQUEST_TIMEOUT,
-            connect=CONNECT_TIMEOUT
-        )
 
-        with httpx.Client(timeout=timeout) as client:
-            logger.info(f"📤 Shipping log for ticket {ticket_id}")
+def shutdown_log_shipper(timeout: float = 5.0) -> None:
+    """Flush and stop the background shipper (FastAPI lifespan shutdown)."""
+    if 'instance' in _shipper:
+        _shipper['instance'].shutdown(timeout)
 
-            response = client.post(
-                LOG_COLLECTOR_URL,
-                json=log_payload,
-                headers=headers
-            )
 
-            if response.status_code in (200, 201, 204):
-                logger.info(f"✅ Log shipped successfully for ticket {ticket_id}")
-            else:
-                logger.warning(
-                    f"⚠️ Log collector returned {response.status_code} "
-                    f"for ticket {ticket_id}: {response.text[:200]}"
-                )
+def get_log_shipper_stats() -> Dict[str, Any]:
+    """Enqueued / shipped / dropped / spilled counters and current backlog."""
+    return get_log_shipper().stats()
 
-    except httpx.TimeoutException:
-        logger.warning(f"⏱️ Log shipping timed out for ticket {ticket_id}")
 
-    except httpx.ConnectError as e:
-        logger.warning(f"🔌 Cannot connect to log collector for ticket {ticket_id}: {e}")
+def _collect_shipper_metrics():
+    if 'instance' not in _shipper:
+        return
+    stats = _shipper['instance'].stats()
+    for key in ("enqueued", "shipped", "dropped", "spilled", "replayed", "failed_batches"):
+        yield (f"flusso_log_shipper_{key}_total", "counter", f"Log shipper {key.replace('_', ' ')}", {}, stats[key])
+    yield ("flusso_log_shipper_backlog", "gauge", "Logs waiting to be shipped", {}, stats["backlog"])
+    yield ("flusso_log_shipper_spill_bytes", "gauge", "Size of the log spill file", {}, stats["spill_bytes"])
 
-    except httpx.HTTPError as e:
-        logger.warning(f"📡 HTTP error shipping log for ticket {ticket_id}: {e}")
 
-    except Exception as e:
-        logger.error(
-            f"❌ Unexpected error shipping log for ticket {ticket_id}: {e}",
-            exc_info=True
-        )
+register_collector(_collect_shipper_metrics)
 
 
 # -------------------------------------------------------------------
@@ -0,0 +1,312 @@
+"""
+Metrics - Prometheus-compatible instrumentation
+Minimal in-process registry (counters, gauges, histograms with labels) rendered
+in the Prometheus text exposition format at /metrics. No extra dependency.
+
+Cheap enough to leave on in production:
+- one lock + a few dict/list updates per observation
+- histograms use fixed buckets (no samples kept)
+- component stats (Gemini limiter, retry, log shipper) are pulled only at
+  scrape time through registered collectors
+
+What is instrumented:
+- every graph node          (instrument_node, in graph_builder_react)
+- every ReACT tool          (instrument_tool, in app/tools/__init__)
+- every upstream call       (gemini via gemini_slot, freshdesk/pinecone via retry)
+- LLM token usage           (usage_metadata read by LLMClient / GeminiClient)
+"""
+
+import logging
+import threading
+import time
+from functools import wraps
+from typing import Dict, Any, List, Tuple, Callable, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds): fast lookups up to multi-minute ReACT loops
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = [
+        f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(10), " ").replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in items
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def dec(self, value: float = 1.0, **labels) -> None:
+        self.inc(-value, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, row in items:
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += row[i]
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+            cumulative += row[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return lines
+
+
+# =====================================================
+# REGISTRY
+# =====================================================
+
+# A collector returns samples: (name, kind, help, labels, value)
+Sample = Tuple[str, str, str, Dict[str, Any], float]
+
+_metrics: Dict[str, _Metric] = {}
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, help_text: str, **kwargs):
+    with _registry_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help_text, **kwargs)
+        return metric
+
+
+def counter(name: str, help_text: str) -> Counter:
+    return _get_or_create(Counter, name, help_text)
+
+
+def gauge(name: str, help_text: str) -> Gauge:
+    return _get_or_create(Gauge, name, help_text)
+
+
+def histogram(name: str, help_text: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, help_text, buckets=buckets)
+
+
+def register_collector(fn: Callable[[], Iterable[Sample]]) -> None:
+    """Register a callback evaluated at scrape time (for component stats)."""
+    with _registry_lock:
+        _collectors.append(fn)
+
+
+def render_metrics() -> str:
+    """Render all metrics in Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+
+    with _registry_lock:
+        metrics = list(_metrics.values())
+        collectors = list(_collectors)
+
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+
+    seen_headers = set()
+    for collect in collectors:
+        try:
+            samples = list(collect())
+        except Exception as e:
+            logger.warning(f"[METRICS] Collector {getattr(collect, '__name__', collect)} failed: {e}")
+            continue
+        for name, kind, help_text, labels, value in samples:
+            if value is None:
+                continue
+            if name not in seen_headers:
+                seen_headers.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(_label_key(labels))} {_format_value(float(value))}")
+
+    return "\n".join(lines) + "\n"
+
+
+# =====================================================
+# STANDARD METRICS
+# =====================================================
+
+NODE_DURATION = histogram("flusso_node_duration_seconds", "Graph node latency")
+NODE_CALLS = counter("flusso_node_calls_total", "Graph node executions by status")
+
+TOOL_DURATION = histogram("flusso_tool_duration_seconds", "ReACT tool latency")
+TOOL_CALLS = counter("flusso_tool_calls_total", "ReACT tool executions by status")
+
+UPSTREAM_DURATION = histogram("flusso_upstream_duration_seconds", "Upstream call latency (Gemini, Freshdesk, Pinecone)")
+UPSTREAM_CALLS = counter("flusso_upstream_calls_total", "Upstream calls by status")
+
+LLM_TOKENS = counter("flusso_llm_tokens_total", "LLM tokens from usage_metadata")
+LLM_CALLS = counter("flusso_llm_calls_total", "LLM calls with usage metadata")
+
+WORKFLOWS_IN_FLIGHT = gauge("flusso_workflows_in_flight", "Ticket workflows currently running")
+
+
+def observe_upstream(upstream: str, seconds: float, status: str = "ok") -> None:
+    UPSTREAM_DURATION.observe(seconds, upstream=upstream)
+    UPSTREAM_CALLS.inc(upstream=upstream, status=status)
+
+
+def record_llm_usage(model: str, usage: Any, call_site: str = "") -> None:
+    """Record token counts from a Gemini `usage_metadata` object (None-safe)."""
+    if usage is None:
+        return
+    labels = {"model": model}
+    if call_site:
+        labels["call_site"] = call_site
+    LLM_CALLS.inc(**labels)
+    for kind, attr in (("prompt", "prompt_token_count"),
+                       ("output", "candidates_token_count"),
+                       ("thinking", "thoughts_token_count"),
+                       ("total", "total_token_count")):
+        value = getattr(usage, attr, None)
+        if isinstance(value, int) and value > 0:
+            LLM_TOKENS.inc(value, kind=kind, **labels)
+
+
+def _tool_status(result: Any) -> str:
+    if isinstance(result, dict) and result.get("success") is False:
+        return "unsuccessful"
+    return "ok"
+
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """Wrap a LangGraph node function with latency/count/error metrics."""
+    @wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return fn(state, *args, **kwargs)
+        except Exception as e:
+            # Expected stops (e.g. WorkflowSuperseded) carry their own outcome
+            status = getattr(e, "outcome", "error")
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - start, node=name)
+            NODE_CALLS.inc(node=name, status=status)
+    return wrapper
+
+
+def instrument_tool(name: str, tool_obj: Any) -> Any:
+    """
+    Instrument a LangChain tool in place by wrapping its underlying function.
+    Idempotent (safe when the same tool object is registered under two names).
+    """
+    func = getattr(tool_obj, "func", None)
+    if func is None or getattr(func, "_metrics_instrumented", False):
+        return tool_obj
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = func(*args, **kwargs)
+            status = _tool_status(result)
+            return result
+        finally:
+            TOOL_DURATION.observe(time.perf_counter() - start, tool=name)
+            TOOL_CALLS.inc(tool=name, status=status)
+
+    wrapper._metrics_instrumented = True
+    tool_obj.func = wrapper
+    return tool_obj
@@ -0,0 +1,240 @@
+"""
+Profiling - opt-in sampling profiler for ticket workflows
+Finds CPU hot spots (ticket_extractor regexes, html_formatters, catalog search,
+attachment parsing) without reproducing a slow ticket by hand.
+
+How it works:
+- profile_workflow() starts one sampler thread for the run
+- each graph node (profile_node, wired in graph_builder_react) registers the
+  thread it runs on and records wall time + thread CPU time
+- every PROFILING_INTERVAL_MS the sampler reads the stacks of registered
+  threads (sys._current_frames) and counts them per node
+
+Output:
+- folded stacks ("node.x;func (file:line);... count") - load into
+  speedscope, flamegraph.pl or any flamegraph viewer
+- per-node breakdown of wall vs CPU time (low CPU share = waiting on I/O)
+
+Triggered by:
+- POST /debug/process/{ticket_id}?profile=true
+- python test_workflow_manual.py 45 --profile
+- PROFILING_SAMPLE_RATE (fraction of production tickets, default 0)
+
+Thread pools started inside a node (image embedding, batched vector queries)
+are not sampled; their time shows up as wall time on the node.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+
+_active_profile: contextvars.ContextVar[Optional["WorkflowProfile"]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class WorkflowProfile:
+    """Samples and per-node timings for one profiled workflow run."""
+
+    def __init__(self, ticket_id: str, interval: float):
+        self.ticket_id = str(ticket_id)
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self.sample_count = 0
+        self.started_at = datetime.now()
+        self.wall_seconds = 0.0
+        self.saved_path: Optional[str] = None
+
+        self._threads: Dict[int, str] = {}  # thread id -> node running on it
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # ---------------- sampler ----------------
+
+    def start(self) -> None:
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.ticket_id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join(timeout=1.0)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = dict(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for tid, node in threads.items():
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(f"node.{node}")
+                with self._lock:
+                    self.samples[";".join(reversed(stack))] += 1
+                    self.sample_count += 1
+
+    # ---------------- node hooks ----------------
+
+    def enter_node(self, node: str) -> None:
+        with self._lock:
+            self._threads[threading.get_ident()] = node
+
+    def exit_node(self, node: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+            entry = self.nodes.setdefault(node, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            entry["calls"] += 1
+            entry["wall_seconds"] += wall
+            entry["cpu_seconds"] += cpu
+
+    # ---------------- results ----------------
+
+    def folded(self) -> str:
+        """Folded-stack text (one 'frame;frame;... count' line per unique stack)."""
+        with self._lock:
+            items = sorted(self.samples.items(), key=lambda kv: kv[1], reverse=True)
+        return "\n".join(f"{stack} {count}" for stack, count in items) + ("\n" if items else "")
+
+    def node_breakdown(self) -> List[Dict[str, Any]]:
+        """Per-node wall vs CPU time, slowest first."""
+        rows = []
+        with self._lock:
+            samples_per_node = Counter()
+            for stack, count in self.samples.items():
+                samples_per_node[stack.split(";", 1)[0][len("node."):]] += count
+            for node, entry in self.nodes.items():
+                wall = entry["wall_seconds"]
+                cpu = entry["cpu_seconds"]
+                rows.append({
+                    "node": node,
+                    "calls": entry["calls"],
+                    "wall_seconds": round(wall, 3),
+                    "cpu_seconds": round(cpu, 3),
+                    "cpu_share": round(cpu / wall, 3) if wall > 0 else 0.0,
+                    "samples": samples_per_node.get(node, 0),
+                })
+        return sorted(rows, key=lambda r: r["wall_seconds"], reverse=True)
+
+    def top_frames(self, limit: int = 15) -> List[Dict[str, Any]]:
+        """Frames most often on top of the stack (self time)."""
+        leaf = Counter()
+        with self._lock:
+            for stack, count in self.samples.items():
+                leaf[stack.rsplit(";", 1)[-1]] += count
+            total = self.sample_count
+        return [
+            {"frame": frame, "samples": count, "percent": round(100 * count / total, 1) if total else 0.0}
+            for frame, count in leaf.most_common(limit)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "ticket_id": self.ticket_id,
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "interval_ms": round(self.interval * 1000, 2),
+            "sample_count": self.sample_count,
+            "nodes": self.node_breakdown(),
+            "top_frames": self.top_frames(),
+            "folded_path": self.saved_path,
+        }
+
+    def save(self, directory: Optional[str] = None) -> str:
+        """Write <dir>/ticket_<id>_<ts>.folded and .json; returns the .folded path."""
+        directory = directory or settings.profiling_dir
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"ticket_{self.ticket_id}_{self.started_at.strftime('%Y%m%d_%H%M%S')}")
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        self.saved_path = base + ".folded"
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return self.saved_path
+
+
+# =====================================================
+# PUBLIC API
+# =====================================================
+
+def should_profile() -> bool:
+    """Sampling decision for production tickets (PROFILING_SAMPLE_RATE)."""
+    rate = settings.profiling_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def profile_workflow(ticket_id: str, enabled: bool = True, save: bool = True) -> Iterator[Optional[WorkflowProfile]]:
+    """Profile everything the graph does inside this block. Yields None when disabled."""
+    if not enabled:
+        yield None
+        return
+
+    profile = WorkflowProfile(ticket_id, interval=max(settings.profiling_interval_ms, 1.0) / 1000.0)
+    token = _active_profile.set(profile)
+    start = time.perf_counter()
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        profile.wall_seconds = time.perf_counter() - start
+        _active_profile.reset(token)
+        if save:
+            try:
+                profile.save()
+            except OSError as e:
+                logger.warning(f"[PROFILING] Could not save profile for ticket #{ticket_id}: {e}")
+        slowest = ", ".join(
+            f"{r['node']}={r['wall_seconds']:.2f}s (cpu {r['cpu_seconds']:.2f}s)" for r in profile.node_breakdown()[:3]
+        )
+        logger.info(
+            f"[PROFILING] Ticket #{ticket_id}: {profile.sample_count} samples in {profile.wall_seconds:.2f}s | "
+            f"slowest: {slowest or 'n/a'}{' | ' + profile.saved_path if profile.saved_path else ''}"
+        )
+
+
+def profile_node(name: str, fn: Callable) -> Callable:
+    """Wrap a LangGraph node so an active profile samples it and times wall vs CPU."""
+    @wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return fn(state, *args, **kwargs)
+        profile.enter_node(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return fn(state, *args, **kwargs)
+        finally:
+            profile.exit_node(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+    return wrapper
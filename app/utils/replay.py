@@ -0,0 +1,329 @@
+"""
+Replay - record/replay layer for outbound calls
+Captures every upstream response of a real ticket run (Freshdesk JSON,
+attachment bytes, LLM responses, vector queries, Drive/Sheet downloads) into
+a per-ticket cassette, then serves them back deterministically so the graph
+can be benchmarked offline (see Local_Testing/benchmark_replay.py).
+
+Modes (REPLAY_MODE):
+- off     : decorator is a pass-through (default)
+- record  : call through, store response + latency in the active cassette
+- replay  : never touch the network; return the recorded response after
+            sleeping recorded_latency * REPLAY_LATENCY_SCALE
+            (or REPLAY_FIXED_LATENCY_MS when set)
+
+Cassettes live in REPLAY_DIR:
+- ticket_<id>.json : calls made inside cassette_scope(ticket_id)
+- _global.json     : calls made outside any ticket (startup sheet/doc caches)
+
+Matching: exact (operation + canonical arguments) first, then the next
+unused recording of the same operation in recorded order, so prompts that
+embed dates or temp paths still replay.
+
+Usage:
+    @recordable("freshdesk", "get_ticket")
+    def get_ticket(self, ticket_id): ...
+
+    with cassette_scope(ticket_id):
+        graph.invoke(state)
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_CASSETTE = "_global"
+
+
+class ReplayMissError(RuntimeError):
+    """No recording matches a call made in replay mode."""
+
+
+class ReplayedError(RuntimeError):
+    """An upstream error that was recorded and is now being replayed."""
+
+
+# =====================================================
+# ENCODING (JSON-safe round trip for bytes, tuples, arrays, frames)
+# =====================================================
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    type_name = type(value).__name__
+    if type_name == "ndarray":
+        return {"__ndarray__": value.tolist(), "dtype": str(value.dtype)}
+    if type_name == "DataFrame":
+        return {"__dataframe__": value.to_json(orient="split", date_format="iso")}
+    logger.warning(f"[REPLAY] Storing {type_name} as string (not JSON serializable)")
+    return str(value)
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    if "__tuple__" in value:
+        return tuple(_decode(v) for v in value["__tuple__"])
+    if "__ndarray__" in value:
+        import numpy as np
+        return np.array(value["__ndarray__"], dtype=value["dtype"])
+    if "__dataframe__" in value:
+        import io
+        import pandas as pd
+        return pd.read_json(io.StringIO(value["__dataframe__"]), orient="split")
+    return {k: _decode(v) for k, v in value.items()}
+
+
+def _canonical_default(obj: Any) -> str:
+    if isinstance(obj, (bytes, bytearray)):
+        return "bytes:" + hashlib.sha1(bytes(obj)).hexdigest()
+    # Clients (self), callables, etc. only contribute their type
+    return type(obj).__name__
+
+
+def _call_key(operation: str, args: tuple, kwargs: dict) -> str:
+    kwargs = {k: v for k, v in kwargs.items() if not callable(v)}
+    args = tuple(a for a in args if not callable(a))
+    blob = json.dumps([operation, args, kwargs], sort_keys=True, default=_canonical_default)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+# =====================================================
+# CASSETTE
+# =====================================================
+
+class Cassette:
+    """Recorded interactions for one ticket (or the global startup calls)."""
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.json" if name == GLOBAL_CASSETTE else f"ticket_{name}.json")
+        self.interactions: List[Dict[str, Any]] = []
+        self.meta: Dict[str, Any] = {}
+        self.stats = {"recorded": 0, "exact": 0, "sequence": 0, "reused": 0, "missed": 0}
+
+        self._consumed: set = set()
+        self._by_key: Dict[str, deque] = defaultdict(deque)
+        self._by_op: Dict[str, deque] = defaultdict(deque)
+        self._last_for_key: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.meta = data.get("meta", {})
+            self.interactions = data.get("interactions", [])
+            for i, item in enumerate(self.interactions):
+                self._by_key[item["key"]].append(i)
+                self._by_op[item["operation"]].append(i)
+
+    def reset(self) -> None:
+        """Drop loaded interactions (re-recording replaces the cassette)."""
+        with self._lock:
+            self.interactions = []
+            self._consumed.clear()
+            self._by_key.clear()
+            self._by_op.clear()
+            self._last_for_key.clear()
+
+    def record(self, upstream: str, operation: str, key: str, elapsed: float,
+               response: Any = None, error: Optional[BaseException] = None) -> None:
+        item = {
+            "upstream": upstream,
+            "operation": operation,
+            "key": key,
+            "elapsed": round(elapsed, 4),
+        }
+        if error is not None:
+            item["error"] = {"type": type(error).__name__, "message": str(error)[:2000]}
+        else:
+            item["response"] = _encode(response)
+        with self._lock:
+            self.interactions.append(item)
+            self.stats["recorded"] += 1
+
+    def take(self, operation: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for source, stat in ((self._by_key[key], "exact"), (self._by_op[operation], "sequence")):
+                while source and source[0] in self._consumed:
+                    source.popleft()
+                if source:
+                    index = source.popleft()
+                    self._consumed.add(index)
+                    self._last_for_key[key] = index
+                    self.stats[stat] += 1
+                    return self.interactions[index]
+            if key in self._last_for_key:
+                self.stats["reused"] += 1
+                return self.interactions[self._last_for_key[key]]
+            self.stats["missed"] += 1
+            return None
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            data = {
+                "meta": {
+                    "cassette": self.name,
+                    "recorded_at": datetime.now().isoformat(),
+                    "interaction_count": len(self.interactions),
+                },
+                "interactions": list(self.interactions),
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+# =====================================================
+# ACTIVE CASSETTE (per ticket via contextvar, global fallback)
+# =====================================================
+
+_active_cassette: contextvars.ContextVar[Optional[Cassette]] = contextvars.ContextVar("active_cassette", default=None)
+_inside_recorded_call: contextvars.ContextVar[bool] = contextvars.ContextVar("inside_recorded_call", default=False)
+_global: Dict[str, Cassette] = {}
+_global_lock = threading.Lock()
+
+
+def replay_mode() -> str:
+    return (settings.replay_mode or "off").lower()
+
+
+def _global_cassette() -> Cassette:
+    if 'instance' not in _global:
+        with _global_lock:
+            if 'instance' not in _global:
+                cassette = Cassette(GLOBAL_CASSETTE, settings.replay_dir)
+                if replay_mode() == "record":
+                    cassette.reset()
+                _global['instance'] = cassette
+    return _global['instance']
+
+
+@contextmanager
+def cassette_scope(ticket_id: str, directory: Optional[str] = None) -> Iterator[Optional[Cassette]]:
+    """Route outbound calls of this ticket run to its cassette (no-op when REPLAY_MODE=off)."""
+    mode = replay_mode()
+    if mode == "off":
+        yield None
+        return
+
+    cassette = Cassette(str(ticket_id), directory or settings.replay_dir)
+    if mode == "record":
+        cassette.reset()
+    elif not cassette.interactions:
+        raise ReplayMissError(f"No cassette recorded for ticket #{ticket_id} at {cassette.path}")
+
+    token = _active_cassette.set(cassette)
+    try:
+        yield cassette
+    finally:
+        _active_cassette.reset(token)
+        if mode == "record":
+            cassette.save()
+            logger.info(f"[REPLAY] Recorded {len(cassette.interactions)} calls for ticket #{ticket_id} -> {cassette.path}")
+        elif cassette.stats["sequence"] or cassette.stats["reused"]:
+            logger.info(f"[REPLAY] Ticket #{ticket_id} replay stats: {cassette.stats}")
+
+
+def _replay_delay(recorded_elapsed: float) -> float:
+    if settings.replay_fixed_latency_ms is not None:
+        return settings.replay_fixed_latency_ms / 1000.0
+    return recorded_elapsed * settings.replay_latency_scale
+
+
+def recordable(
+    upstream: str,
+    operation: Optional[str] = None,
+    key: Optional[Callable[..., Any]] = None,
+    on_replay: Optional[Callable[[Any, tuple, dict], None]] = None,
+):
+    """
+    Make an outbound call recordable/replayable.
+
+    key:       optional fn(*args, **kwargs) returning what identifies the call
+               (default: all non-callable arguments)
+    on_replay: optional fn(result, args, kwargs) for side effects the real call
+               would have had (e.g. streaming callbacks)
+    """
+    def decorator(func: Callable) -> Callable:
+        op = f"{upstream}.{operation or func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            mode = replay_mode()
+            if mode == "off" or _inside_recorded_call.get():
+                return func(*args, **kwargs)
+
+            cassette = _active_cassette.get() or _global_cassette()
+            call_key = _call_key(op, (key(*args, **kwargs),) if key else args, {} if key else kwargs)
+
+            if mode == "replay":
+                item = cassette.take(op, call_key)
+                if item is None:
+                    raise ReplayMissError(f"No recording for {op} in cassette '{cassette.name}'")
+                delay = _replay_delay(item.get("elapsed", 0.0))
+                if delay > 0:
+                    time.sleep(delay)
+                if "error" in item:
+                    raise ReplayedError(f"{item['error']['type']}: {item['error']['message']}")
+                result = _decode(item["response"])
+                if on_replay:
+                    on_replay(result, args, kwargs)
+                return result
+
+            # record
+            token = _inside_recorded_call.set(True)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                cassette.record(upstream, op, call_key, time.perf_counter() - start, error=e)
+                raise
+            finally:
+                _inside_recorded_call.reset(token)
+            cassette.record(upstream, op, call_key, time.perf_counter() - start, response=result)
+            if cassette.name == GLOBAL_CASSETTE:
+                cassette.save()
+            return result
+        return wrapper
+    return decorator
+
+
+def list_cassettes(directory: Optional[str] = None) -> List[str]:
+    """Ticket ids that have a recorded cassette."""
+    directory = directory or settings.replay_dir
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name[len("ticket_"):-len(".json")]
+        for name in os.listdir(directory)
+        if name.startswith("ticket_") and name.endswith(".json")
+    )
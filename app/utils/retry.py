@@ -1,25 +1,33 @@
 """
 Retry Logic Utilities
-Provides retry decorators for external API calls with exponential backoff
+Provides retry decorators for external API calls with exponential backoff.
+
+The pre-configured decorators (retry_gemini_call, retry_freshdesk_call, ...)
+and the retry_api_call(upstream) / retry_external_service(upstream) factories
+are adaptive: jittered backoff, Retry-After aware, bounded by the per-ticket
+deadline (deadline_scope), and guarded by a circuit breaker + retry budget
+per upstream. Counters are available via get_retry_stats().
 """
 
 import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Callable, Type, Tuple, Any
-
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    retry_if_exception,
-    before_sleep_log,
-    after_log,
-)
+from typing import Callable, Type, Tuple, Any, Dict, Iterator, Optional
+
 import requests
 from urllib3.exceptions import SSLError as Urllib3SSLError
 from requests.exceptions import SSLError as RequestsSSLError
 
+from app.utils.metrics import observe_upstream, register_collector
+from app.utils.tracing import span, current_span
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,105 +53,417 @@ def is_gemini_transient_error(exception: Exception) -> bool:
     ])
 
 
-def create_retry_decorator(
-    max_attempts: int = 3,
-    min_wait: float = 1,
-    max_wait: float = 10,
-    exceptions: Tuple[Type[Exception], ...] = TRANSIENT_EXCEPTIONS,
-):
+# =====================================================
+# DEADLINE PROPAGATION
+# A per-ticket deadline set once at the top of the workflow; every retry
+# loop below refuses to sleep past it.
+# =====================================================
+
+_deadline: ContextVar[Optional[float]] = ContextVar("retry_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[float]:
     """
-    Create a retry decorator with configurable parameters.
-    
-    Args:
-        max_attempts: Maximum number of retry attempts
-        min_wait: Minimum wait time between retries (seconds)
-        max_wait: Maximum wait time between retries (seconds)
-        exceptions: Tuple of exception types to retry on
-    
-    Returns:
-        A tenacity retry decorator
+    Set an overall deadline (monotonic) for everything run inside the block.
+    Nested scopes can only tighten the deadline, never extend it.
     """
-    return retry(
-        stop=stop_after_attempt(max_attempts),
-        wait=wait_exponential(multiplier=1, min=min_wait, max=max_wait),
-        retry=retry_if_exception_type(exceptions),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-        after=after_log(logger, logging.DEBUG),
-        reraise=True,
-    )
-
-
-# Pre-configured decorators for different services
-retry_api_call = create_retry_decorator(
-    max_attempts=3,
-    min_wait=1,
-    max_wait=10,
-)
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        new_deadline = min(new_deadline, current)
+    token = _deadline.set(new_deadline)
+    try:
+        yield new_deadline
+    finally:
+        _deadline.reset(token)
 
-retry_external_service = create_retry_decorator(
-    max_attempts=3,
-    min_wait=2,
-    max_wait=30,
-)
 
-retry_embedding = create_retry_decorator(
-    max_attempts=2,
-    min_wait=1,
-    max_wait=5,
-)
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline (None if no deadline is set)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
 
-# Gemini-specific retry for overload/rate limit errors
-retry_gemini_call = retry(
-    stop=stop_after_attempt(5),  # More attempts for transient errors
-    wait=wait_exponential(multiplier=2, min=2, max=60),  # Longer waits for overload
-    retry=retry_if_exception(is_gemini_transient_error),
-    before_sleep=before_sleep_log(logger, logging.WARNING),
-    after=after_log(logger, logging.DEBUG),
-    reraise=True,
-)
 
+def request_timeout(default: float) -> float:
+    """Clamp a per-request timeout to the remaining deadline."""
+    remaining = remaining_time()
+    if remaining is None:
+        return default
+    return max(1.0, min(default, remaining))
+
+
+# =====================================================
+# ERRORS
+# =====================================================
+
+class RateLimitedError(Exception):
+    """Upstream answered 429; carries the server-provided Retry-After (seconds)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Upstream circuit is open; call rejected without hitting the network."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Not enough time left before the workflow deadline to retry."""
+
+
+_RETRY_DELAY_PATTERN = re.compile(r"retry[_ ]?delay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE)
+
+
+def parse_retry_after(exception: Exception) -> Optional[float]:
+    """
+    Extract a server-suggested wait from an exception:
+    RateLimitedError.retry_after, an HTTP Retry-After header, or the Gemini
+    RetryInfo `retryDelay: "17s"` embedded in the error text.
+    """
+    retry_after = getattr(exception, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("Retry-After")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(value)
+                    return max(0.0, retry_at.timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+    match = _RETRY_DELAY_PATTERN.search(str(exception))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def is_retryable_http_error(exception: Exception) -> bool:
+    """429 / 5xx HTTP errors are worth retrying; other 4xx are not."""
+    if isinstance(exception, RateLimitedError):
+        return True
+    response = getattr(exception, "response", None)
+    status = getattr(response, "status_code", None)
+    return status == 429 or (isinstance(status, int) and 500 <= status < 600)
+
+
+def is_transient_api_error(exception: Exception) -> bool:
+    return isinstance(exception, TRANSIENT_EXCEPTIONS) or is_retryable_http_error(exception)
+
+
+# =====================================================
+# CIRCUIT BREAKER + RETRY BUDGET (per upstream)
+# =====================================================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed -> open after `failure_threshold` transient failures;
+    open -> half_open after `recovery_timeout`; one probe decides.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_answer(self) -> None:
+        """
+        The upstream answered with a non-retryable error (4xx, parse error).
+        Ends a closed breaker's failure streak; a half-open probe stays
+        undecided (released by the caller), only a success closes it.
+        """
+        with self._lock:
+            if self.state == "closed":
+                self.failures = 0
+
+    def release_probe(self) -> None:
+        """Let another probe through when this one ended without an outcome."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                    logger.error(f"[RETRY] Circuit opened after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
 
-def with_retry(
+
+class RetryBudget:
+    """
+    Sliding-window retry budget: retries may not exceed `ratio` x requests
+    (plus a small floor) within `window` seconds, so an outage does not get
+    amplified into N-times the load.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 60.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        for q in (self._requests, self._retries):
+            while q and now - q[0] > self.window:
+                q.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            allowed = max(self.min_retries, self.ratio * len(self._requests))
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class UpstreamPolicy:
+    """Breaker, budget and counters for one upstream (gemini, freshdesk, ...)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker()
+        self.budget = RetryBudget()
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "backoff_seconds": 0.0,
+            "circuit_rejections": 0,
+            "budget_exhausted": 0,
+            "deadline_exceeded": 0,
+        }
+
+    def incr(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[key] += value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self.counters)
+        data["backoff_seconds"] = round(data["backoff_seconds"], 3)
+        data["circuit_state"] = self.breaker.state
+        data["circuit_opened"] = self.breaker.times_opened
+        return data
+
+
+_upstreams: Dict[str, UpstreamPolicy] = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream_policy(name: str) -> UpstreamPolicy:
+    if name not in _upstreams:
+        with _upstreams_lock:
+            if name not in _upstreams:
+                _upstreams[name] = UpstreamPolicy(name)
+    return _upstreams[name]
+
+
+def get_retry_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-upstream retry counters, backoff time and circuit state."""
+    return {name: policy.stats() for name, policy in _upstreams.items()}
+
+
+# =====================================================
+# ADAPTIVE RETRY DECORATOR
+# =====================================================
+
+def adaptive_retry(
+    upstream: str,
     max_attempts: int = 3,
-    exceptions: Tuple[Type[Exception], ...] = TRANSIENT_EXCEPTIONS,
-    on_retry: Callable[[Exception, int], None] = None,
+    base_wait: float = 1.0,
+    max_wait: float = 10.0,
+    retry_on: Callable[[Exception], bool] = is_transient_api_error,
+    max_retry_after: float = 120.0,
+    record_latency: bool = True,
 ):
     """
-    Decorator factory for adding retry logic to functions.
+    Retry decorator with:
+    - full-jitter exponential backoff (random 0..min(max_wait, base * 2^n))
+    - Retry-After awareness (server hint wins, capped at max_retry_after)
+    - deadline propagation (never sleeps past the deadline_scope)
+    - per-upstream circuit breaker and retry budget
     
-    Args:
-        max_attempts: Maximum retry attempts
-        exceptions: Exception types to catch
-        on_retry: Optional callback when retry occurs (exception, attempt_number)
-    
-    Usage:
-        @with_retry(max_attempts=3)
-        def my_api_call():
-            ...
+    Non-retryable exceptions propagate immediately and do not trip the breaker:
+    the upstream answered, so they end the failure streak - but a half-open
+    probe needs a real success to close the breaker.
+    Total latency (including backoff) is recorded as an upstream metric and a
+    client tracing span unless record_latency=False (Gemini is measured at the
+    limiter slot instead). Retries show up as events on the span.
     """
+    policy = get_upstream_policy(upstream)
+
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            last_exception = None
+            if not record_latency:
+                return _call(*args, **kwargs)
+            start = time.perf_counter()
+            status = "error"
+            try:
+                with span(f"{upstream}.{func.__name__}", kind="client", upstream=upstream):
+                    result = _call(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                observe_upstream(upstream, time.perf_counter() - start, status)
+
+        def _call(*args, **kwargs) -> Any:
+            policy.incr("calls")
+            if not policy.breaker.allow():
+                policy.incr("circuit_rejections")
+                raise CircuitOpenError(f"{upstream} circuit open - skipping {func.__name__}")
+            policy.budget.record_request()
+
+            try:
+                return _attempts(*args, **kwargs)
+            finally:
+                # No-op unless a half-open probe ended without an outcome
+                policy.breaker.release_probe()
+
+        def _attempts(*args, **kwargs) -> Any:
             for attempt in range(1, max_attempts + 1):
+                policy.incr("attempts")
                 try:
-                    return func(*args, **kwargs)
-                except exceptions as e:
-                    last_exception = e
-                    if attempt < max_attempts:
-                        wait_time = min(2 ** attempt, 10)  # Exponential backoff
-                        logger.warning(
-                            f"[RETRY] {func.__name__} failed (attempt {attempt}/{max_attempts}): {e}. "
-                            f"Retrying in {wait_time}s..."
-                        )
-                        if on_retry:
-                            on_retry(e, attempt)
-                        import time
-                        time.sleep(wait_time)
+                    result = func(*args, **kwargs)
+                    policy.breaker.record_success()
+                    return result
+                except Exception as e:
+                    if not retry_on(e):
+                        # 4xx / parse errors: the upstream is reachable, but not proven healthy
+                        policy.breaker.record_answer()
+                        raise
+
+                    policy.incr("failures")
+                    policy.breaker.record_failure()
+
+                    if attempt >= max_attempts:
+                        logger.error(f"[RETRY] {upstream}.{func.__name__} failed after {attempt} attempts: {e}")
+                        raise
+                    if policy.breaker.state == "open":
+                        raise
+                    if not policy.budget.try_spend():
+                        policy.incr("budget_exhausted")
+                        logger.error(f"[RETRY] {upstream} retry budget exhausted - not retrying {func.__name__}")
+                        raise
+
+                    hinted = parse_retry_after(e)
+                    if hinted is not None:
+                        wait = min(hinted, max_retry_after)
                     else:
-                        logger.error(
-                            f"[RETRY] {func.__name__} failed after {max_attempts} attempts: {e}"
-                        )
-            raise last_exception
+                        wait = random.uniform(0, min(max_wait, base_wait * (2 ** attempt)))
+
+                    remaining = remaining_time()
+                    if remaining is not None and wait >= remaining:
+                        policy.incr("deadline_exceeded")
+                        raise DeadlineExceededError(
+                            f"{upstream}.{func.__name__}: {remaining:.1f}s left, backoff needs {wait:.1f}s"
+                        ) from e
+
+                    logger.warning(
+                        f"[RETRY] {upstream}.{func.__name__} failed (attempt {attempt}/{max_attempts}): {e}. "
+                        f"Retrying in {wait:.1f}s{' (Retry-After)' if hinted is not None else ''}"
+                    )
+                    policy.incr("retries")
+                    policy.incr("backoff_seconds", wait)
+                    active = current_span()
+                    if active is not None:
+                        active.add_event("retry", attempt=attempt, wait_seconds=round(wait, 3), error=str(e)[:200])
+                    time.sleep(wait)
         return wrapper
     return decorator
+
+
+def retry_api_call(upstream: str, **overrides):
+    """Generic API retry for `upstream` (its own breaker + budget), e.g. @retry_api_call("shopify")."""
+    return adaptive_retry(upstream, **{"max_attempts": 3, "base_wait": 1, "max_wait": 10, **overrides})
+
+
+def retry_external_service(upstream: str, **overrides):
+    """Slower-backoff retry for flaky third-party services; one policy per `upstream`."""
+    return adaptive_retry(upstream, **{"max_attempts": 3, "base_wait": 2, "max_wait": 30, **overrides})
+
+
+# Pre-configured decorators for the upstreams this service calls
+
+retry_embedding = adaptive_retry("embedding", max_attempts=2, base_wait=1, max_wait=5)
+
+retry_freshdesk_call = adaptive_retry("freshdesk", max_attempts=3, base_wait=1, max_wait=10)
+
+retry_pinecone_call = adaptive_retry("pinecone", max_attempts=3, base_wait=0.5, max_wait=5)
+
+# Gemini-specific retry for overload/rate limit errors
+# (shorter cap than before: the shared limiter already absorbs bursts)
+retry_gemini_call = adaptive_retry(
+    "gemini",
+    max_attempts=4,
+    base_wait=1,
+    max_wait=20,
+    retry_on=is_gemini_transient_error,
+    record_latency=False,
+)
+
+
+def _collect_retry_metrics():
+    for upstream, stats in get_retry_stats().items():
+        labels = {"upstream": upstream}
+        yield ("flusso_retry_attempts_total", "counter", "Attempts made through the retry layer", labels, stats["attempts"])
+        yield ("flusso_retry_retries_total", "counter", "Retries after a transient failure", labels, stats["retries"])
+        yield ("flusso_retry_backoff_seconds_total", "counter", "Time lost to retry backoff", labels, stats["backoff_seconds"])
+        yield ("flusso_retry_circuit_rejections_total", "counter", "Calls rejected by an open circuit", labels, stats["circuit_rejections"])
+        yield ("flusso_retry_budget_exhausted_total", "counter", "Retries refused by the retry budget", labels, stats["budget_exhausted"])
+        yield ("flusso_retry_circuit_open", "gauge", "1 if the upstream circuit is open", labels, 1 if stats["circuit_state"] == "open" else 0)
+
+
+register_collector(_collect_retry_metrics)
+
@@ -0,0 +1,415 @@
+"""
+Tracing - OpenTelemetry-style spans for ticket workflows
+One trace per ticket, with child spans for graph nodes, ReACT iterations,
+tool calls, Gemini requests and Freshdesk/Pinecone calls.
+
+The active span lives in a contextvar, so it follows the code across
+LangGraph's executor threads and asyncio.to_thread. Plain thread pools do
+not copy context on their own; wrap the submitted callable with
+`with_context(fn)` so spans created inside the pool attach to the caller.
+
+Finished traces are:
+- kept in memory (last TRACE_HISTORY tickets) for /debug/trace/{ticket_id}
+- exported as JSON lines to TRACING_FILE      (TRACING_EXPORTER=file)
+- or posted as OTLP/HTTP JSON to OTLP_ENDPOINT (TRACING_EXPORTER=otlp)
+
+Usage:
+    with start_trace("ticket_workflow", ticket_id="123"):
+        with span("freshdesk.get_ticket", kind="client"):
+            ...
+"""
+
+import os
+import json
+import time
+import logging
+import secrets
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+import httpx
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TRACE_HISTORY = 50  # Finished traces kept in memory for the debug endpoint
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation inside a trace."""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+        "events", "status", "error", "start_ns", "end_ns", "_token", "_trace",
+    )
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], trace: "_Trace", attributes: Dict[str, Any]):
+        self.trace_id = trace.trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._token = None
+        self._trace = trace
+
+    @property
+    def duration(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, exc: BaseException) -> None:
+        # Expected stops (e.g. WorkflowSuperseded) carry their own outcome
+        self.status = getattr(exc, "outcome", "error")
+        self.error = f"{type(exc).__name__}: {exc}"[:500]
+
+    def end(self) -> None:
+        """Finish the span and restore the parent as the current span."""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self._token is not None:
+            try:
+                _current_span.reset(self._token)
+            except ValueError:
+                # Ended from a different context (e.g. another thread); parent is untouched there
+                pass
+            self._token = None
+        self._trace.finish(self)
+
+    def trace_spans(self) -> List[Dict[str, Any]]:
+        """Finished spans of this span's trace (complete once the root has ended)."""
+        with self._trace._lock:
+            spans = list(self._trace.spans)
+        return sorted((s.to_dict() for s in spans), key=lambda s: s["start_ns"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_seconds": round(self.duration, 4),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class _Trace:
+    """Spans of one trace; exported once the root span ends."""
+
+    def __init__(self, ticket_id: Optional[str]):
+        self.trace_id = secrets.token_hex(16)
+        self.ticket_id = ticket_id
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    def finish(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+        if span is self.root:
+            _on_trace_complete(self)
+
+
+# =====================================================
+# PUBLIC API
+# =====================================================
+
+def tracing_enabled() -> bool:
+    return settings.tracing_enabled
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+def start_span(name: str, kind: str = "internal", **attributes) -> Optional[Span]:
+    """
+    Start a child of the current span and make it current. Returns None when
+    tracing is disabled or there is no active trace. Call .end() when done.
+    """
+    parent = _current_span.get()
+    if parent is None or not settings.tracing_enabled:
+        return None
+    new_span = Span(name, kind, parent, parent._trace, attributes)
+    new_span._token = _current_span.set(new_span)
+    return new_span
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes) -> Iterator[Optional[Span]]:
+    """Context manager around start_span(); records exceptions on the span."""
+    active = start_span(name, kind, **attributes)
+    if active is None:
+        yield None
+        return
+    try:
+        yield active
+    except BaseException as e:
+        active.record_exception(e)
+        raise
+    finally:
+        active.end()
+
+
+@contextmanager
+def start_trace(name: str, ticket_id: Optional[str] = None, **attributes) -> Iterator[Optional[Span]]:
+    """Open the root span of a new trace (one per ticket workflow)."""
+    if not settings.tracing_enabled:
+        yield None
+        return
+    trace = _Trace(str(ticket_id) if ticket_id is not None else None)
+    root = Span(name, "server", None, trace, attributes)
+    if ticket_id is not None:
+        root.attributes["ticket_id"] = str(ticket_id)
+    trace.root = root
+    root._token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.record_exception(e)
+        raise
+    finally:
+        root.end()
+
+
+def traced(name: Optional[str] = None, kind: str = "internal") -> Callable:
+    """Decorator form of span(); defaults to the function's qualified name."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def with_context(fn: Callable) -> Callable:
+    """
+    Bind `fn` to the caller's context (active span, deadline) so it can run in
+    a thread pool. Each call runs in its own copy, so concurrent calls are safe.
+    """
+    ctx = contextvars.copy_context()
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def trace_node(name: str, fn: Callable) -> Callable:
+    """Wrap a LangGraph node function in a span."""
+    @wraps(fn)
+    def wrapper(state, *args, **kwargs):
+        with span(f"node.{name}", node=name):
+            return fn(state, *args, **kwargs)
+    return wrapper
+
+
+def trace_tool(name: str, tool_obj: Any) -> Any:
+    """Trace a LangChain tool in place by wrapping its underlying function (idempotent)."""
+    func = getattr(tool_obj, "func", None)
+    if func is None or getattr(func, "_traced", False):
+        return tool_obj
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(f"tool.{name}", tool=name) as active:
+            result = func(*args, **kwargs)
+            if active is not None and isinstance(result, dict) and result.get("success") is False:
+                active.status = "error"
+                active.error = str(result.get("error") or result.get("message") or "unsuccessful")[:500]
+            return result
+
+    wrapper._traced = True
+    tool_obj.func = wrapper
+    return tool_obj
+
+
+# =====================================================
+# TRACE STORE + EXPORTERS
+# =====================================================
+
+_recent_traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_recent_lock = threading.Lock()
+_exporter: Dict[str, ThreadPoolExecutor] = {}
+
+
+def _on_trace_complete(trace: _Trace) -> None:
+    spans = sorted((s.to_dict() for s in trace.spans), key=lambda s: s["start_ns"])
+    key = trace.ticket_id or trace.trace_id
+
+    with _recent_lock:
+        _recent_traces[key] = spans
+        _recent_traces.move_to_end(key)
+        while len(_recent_traces) > TRACE_HISTORY:
+            _recent_traces.popitem(last=False)
+
+    root = trace.root
+    logger.info(
+        f"[TRACING] Trace {trace.trace_id} for ticket #{trace.ticket_id}: "
+        f"{len(spans)} spans, {root.duration:.2f}s"
+    )
+
+    exporter = settings.tracing_exporter.lower()
+    if exporter in ("file", "otlp"):
+        if 'instance' not in _exporter:
+            _exporter['instance'] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trace-export")
+        export = _export_file if exporter == "file" else _export_otlp
+        _exporter['instance'].submit(_safe_export, export, spans)
+
+
+def _safe_export(export: Callable[[List[Dict[str, Any]]], None], spans: List[Dict[str, Any]]) -> None:
+    try:
+        export(spans)
+    except Exception as e:
+        logger.warning(f"[TRACING] Export failed: {e}")
+
+
+def _export_file(spans: List[Dict[str, Any]]) -> None:
+    path = settings.tracing_file
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for s in spans:
+            f.write(json.dumps(s, default=str, ensure_ascii=False) + "\n")
+
+
+_OTLP_KIND = {"internal": 1, "server": 2, "client": 3}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def _export_otlp(spans: List[Dict[str, Any]]) -> None:
+    otlp_spans = []
+    for s in spans:
+        item = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": _OTLP_KIND.get(s["kind"], 1),
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": _otlp_attributes(s["attributes"]),
+            "events": [
+                {"name": e["name"], "timeUnixNano": str(e["time_ns"]), "attributes": _otlp_attributes(e["attributes"])}
+                for e in s["events"]
+            ],
+            "status": {"code": 2, "message": s["error"] or ""} if s["status"] == "error" else {"code": 1},
+        }
+        if s["parent_id"]:
+            item["parentSpanId"] = s["parent_id"]
+        otlp_spans.append(item)
+
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({
+                "service.name": settings.tracing_service_name,
+                "client.id": settings.client_id,
+            })},
+            "scopeSpans": [{"scope": {"name": "flusso.tracing"}, "spans": otlp_spans}],
+        }]
+    }
+    response = httpx.post(settings.otlp_endpoint, json=payload, timeout=5.0)
+    response.raise_for_status()
+
+
+def get_trace(ticket_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Spans of the most recent trace for a ticket (None if not in memory)."""
+    with _recent_lock:
+        spans = _recent_traces.get(str(ticket_id))
+        return list(spans) if spans is not None else None
+
+
+def summarize_trace(spans: List[Dict[str, Any]]) -> List[str]:
+    """Render spans as an indented tree: one line per span with its duration."""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+
+    lines: List[str] = []
+
+    def _walk(parent_id: Optional[str], depth: int) -> None:
+        for s in children.get(parent_id, []):
+            flag = " ❌" if s["status"] == "error" else ""
+            lines.append(f"{'  ' * depth}{s['name']} {s['duration_seconds']:.3f}s{flag}")
+            _walk(s["span_id"], depth + 1)
+
+    _walk(None, 0)
+    return lines
+
+
+def critical_path(spans: List[Dict[str, Any]], prefix: str = "node.") -> Dict[str, Any]:
+    """
+    Critical path through the graph nodes of one trace.
+
+    Walks back from the node that finished last, each time taking the node
+    that finished latest before the current one started. Nodes off that chain
+    ran in parallel with it; serial_seconds - wall_seconds is the time parallel
+    branches saved.
+    """
+    nodes = [s for s in spans if s["name"].startswith(prefix) and s.get("end_ns")]
+    if not nodes:
+        return {"wall_seconds": 0.0, "serial_seconds": 0.0, "parallel_saving_seconds": 0.0, "path": []}
+
+    path = []
+    current = max(nodes, key=lambda s: s["end_ns"])
+    while current is not None:
+        path.append(current)
+        before = [s for s in nodes if s["end_ns"] <= current["start_ns"]]
+        current = max(before, key=lambda s: s["end_ns"]) if before else None
+    path.reverse()
+
+    wall = (max(s["end_ns"] for s in nodes) - min(s["start_ns"] for s in nodes)) / 1e9
+    serial = sum(s["duration_seconds"] for s in nodes)
+    return {
+        "wall_seconds": round(wall, 4),
+        "serial_seconds": round(serial, 4),
+        "parallel_saving_seconds": round(max(0.0, serial - wall), 4),
+        "path": [f"{s['name'][len(prefix):]} {s['duration_seconds']:.3f}s" for s in path],
+    }
@@ -7,6 +7,8 @@ Usage:
     python test_workflow_manual.py 45 --mode react       # Explicitly use ReACT agent
     python test_workflow_manual.py 45 --mode sequential  # Use sequential workflow
     python test_workflow_manual.py --ticket-id 45
+    python test_workflow_manual.py 45 --profile          # Sampling profiler (flamegraph + node CPU/wall)
+    python test_workflow_manual.py 45 --record           # Record upstream calls for offline replay
 """
 
 import asyncio
@@ -94,7 +96,25 @@ def print_gathered_resources(state: dict):
             print(f"      {i}. Unknown (invalid format)")
 
 
-async def run_workflow_on_ticket(ticket_id: int, mode: str = "react"):
+def print_profile(summary: dict):
+    """Print the per-node CPU vs wall breakdown and top frames of a profiled run."""
+    print(f"\n🔥 PROFILE ({summary['sample_count']} samples @ {summary['interval_ms']}ms):")
+    print("-" * 60)
+    print(f"   {'Node':<22}{'Wall':>9}{'CPU':>9}{'CPU %':>8}")
+    for row in summary["nodes"]:
+        print(f"   {row['node']:<22}{row['wall_seconds']:>8.2f}s{row['cpu_seconds']:>8.2f}s{row['cpu_share']:>8.0%}")
+    
+    if summary["top_frames"]:
+        print("\n   Top frames (self time):")
+        for frame in summary["top_frames"][:10]:
+            print(f"      {frame['percent']:>5.1f}%  {frame['frame']}")
+    
+    if summary.get("folded_path"):
+        print(f"\n   📁 Folded stacks: {summary['folded_path']}")
+        print("      (open in https://www.speedscope.app or pipe into flamegraph.pl)")
+
+
+async def run_workflow_on_ticket(ticket_id: int, mode: str = "react", profile: bool = False, record: bool = False):
     """Run the full workflow on a specific ticket."""
     
     print(f"""
@@ -107,6 +127,12 @@ async def run_workflow_on_ticket(ticket_id: int, mode: str = "react"):
     ╚═══════════════════════════════════════════════════════════╝
     """)
 
+    if record:
+        # Capture every upstream call (startup caches + this ticket) for benchmark_replay.py
+        from app.config.settings import settings
+        settings.replay_mode = "record"
+        print(f"\n📼 Recording upstream calls to {settings.replay_dir}")
+
     # 1. Initialize Product Cache (CRITICAL FOR CSV SEARCH)
     print("\n🚀 Initializing Service Cache...")
     try:
@@ -151,7 +177,11 @@ async def run_workflow_on_ticket(ticket_id: int, mode: str = "react"):
         
         # Use sync invoke (graph.invoke) wrapped in thread for async compatibility
         import asyncio
-        final_state = await asyncio.to_thread(workflow.invoke, initial_state)
+        from app.utils.profiling import profile_workflow
+        from app.utils.replay import cassette_scope
+        with cassette_scope(str(ticket_id)), \
+                profile_workflow(str(ticket_id), enabled=profile) as workflow_profile:
+            final_state = await asyncio.to_thread(workflow.invoke, initial_state)
         
         print("=" * 60)
         
@@ -221,6 +251,9 @@ async def run_workflow_on_ticket(ticket_id: int, mode: str = "react"):
         if final_state.get("skip_workflow_applied"):
             print(f"\n⏭️  SKIPPED: {final_state.get('skip_reason', 'Unknown reason')}")
             
+        if workflow_profile:
+            print_profile(workflow_profile.summary())
+        
         print("\n" + "=" * 60)
         print(f"   Workflow completed at {datetime.now().strftime('%H:%M:%S')}")
         print("=" * 60)
@@ -255,6 +288,16 @@ def main():
         default="react",
         help="Workflow mode: 'react' (default) or 'sequential'"
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run under the sampling profiler (writes a folded-stack flamegraph profile)"
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Record all upstream calls to a replay cassette (see Local_Testing/benchmark_replay.py)"
+    )
     
     args = parser.parse_args()
     
@@ -271,7 +314,7 @@ def main():
     
     # Run the workflow
     try:
-        asyncio.run(run_workflow_on_ticket(ticket_id, mode=args.mode))
+        asyncio.run(run_workflow_on_ticket(ticket_id, mode=args.mode, profile=args.profile, record=args.record))
     except KeyboardInterrupt:
         print("\n\n👋 Workflow cancelled by user")
         sys.exit(0)
@@ -0,0 +1,21 @@
+"""
+Shared pytest setup.
+Settings are validated at import time, so the required variables get dummy
+values before any app module is imported.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for _name in (
+    "FRESHDESK_DOMAIN",
+    "FRESHDESK_API_KEY",
+    "PINECONE_IMAGE_INDEX",
+    "PINECONE_TICKETS_INDEX",
+    "GEMINI_API_KEY",
+    "GEMINI_FILE_SEARCH_STORE_ID",
+    "AGENT_CONSOLE_URL",
+):
+    os.environ.setdefault(_name, "test")
@@ -0,0 +1,24 @@
+"""audit_events reducer for parallel graph branches."""
+
+import copy
+
+from app.utils.audit import add_audit_event, merge_audit_events
+
+
+def test_parallel_branches_keep_each_event_once():
+    state = {"audit_events": add_audit_event({}, "fetch_ticket")["audit_events"]}
+    left = add_audit_event(state, "react_agent_loop")["audit_events"]
+    right = add_audit_event(state, "customer_context")["audit_events"]
+
+    merged = merge_audit_events(left, right)
+    assert [e["event"] for e in merged] == ["fetch_ticket", "react_agent_loop", "customer_context"]
+
+
+def test_copied_events_are_not_duplicated():
+    # e.g. state restored from a checkpoint: equal events, new objects
+    history = add_audit_event({}, "fetch_ticket")["audit_events"]
+    restored = copy.deepcopy(history)
+    right = add_audit_event({"audit_events": restored}, "draft_response")["audit_events"]
+
+    merged = merge_audit_events(history, right)
+    assert [e["event"] for e in merged] == ["fetch_ticket", "draft_response"]
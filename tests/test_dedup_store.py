@@ -0,0 +1,60 @@
+"""Dedup store primitives on the in-process and Redis backends."""
+
+import time
+
+import pytest
+
+from app.services import dedup_store as dedup_module
+from app.services.dedup_store import DedupStore, MemoryDedupStore, RedisDedupStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, monkeypatch):
+    if request.param == "memory":
+        return MemoryDedupStore()
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # compare-and-delete release is a Lua script
+    import redis
+    monkeypatch.setattr(redis.Redis, "from_url", staticmethod(lambda url, **kw: fakeredis.FakeRedis()))
+    return RedisDedupStore("redis://fake", "test:")
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        DedupStore()
+
+
+def test_first_seen_then_duplicate(store):
+    assert store.set_if_absent("webhook:abc", ttl_seconds=30) is True
+    assert store.set_if_absent("webhook:abc", ttl_seconds=30) is False
+    assert store.set_if_absent("webhook:def", ttl_seconds=30) is True
+
+
+def test_lock_acquire_and_release(store):
+    token = store.acquire_lock("ticket:1", ttl_seconds=30)
+    assert token
+    assert store.acquire_lock("ticket:1", ttl_seconds=30) is None
+    assert store.release_lock("ticket:1", "someone-else") is False
+    assert store.release_lock("ticket:1", token) is True
+    assert store.acquire_lock("ticket:1", ttl_seconds=30)
+
+
+def test_lock_expires(store, monkeypatch):
+    now = [time.monotonic()]
+    monkeypatch.setattr(dedup_module.time, "monotonic", lambda: now[0])
+    stale = store.acquire_lock("ticket:2", ttl_seconds=0.05)
+    assert stale
+    now[0] += 1.0
+    time.sleep(0.1)  # fakeredis expires on the wall clock
+    fresh = store.acquire_lock("ticket:2", ttl_seconds=30)
+    assert fresh and fresh != stale
+    # The expired owner must not release the new holder's lock
+    assert store.release_lock("ticket:2", stale) is False
+    assert store.acquire_lock("ticket:2", ttl_seconds=30) is None
+
+
+def test_increment_and_get(store):
+    assert store.get_int("gen:3") is None
+    assert store.increment("gen:3", ttl_seconds=60) == 1
+    assert store.increment("gen:3", ttl_seconds=60) == 2
+    assert store.get_int("gen:3") == 2
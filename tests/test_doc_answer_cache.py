@@ -0,0 +1,59 @@
+"""Partitioned lookups of the document answer cache."""
+
+import numpy as np
+import pytest
+
+from app.config.settings import settings
+from app.services import doc_answer_cache as cache_module
+from app.services.doc_answer_cache import DocAnswerCache, _Entry, _unit
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(settings, "doc_cache_similarity_threshold", 0.9)
+    monkeypatch.setattr(settings, "doc_cache_ttl_seconds", 100)
+    monkeypatch.setattr(settings, "doc_cache_max_entries", 3)
+    return DocAnswerCache()
+
+
+def _store(cache, text, vector, model="HS6270", top_k=8, created_at=None):
+    cache.store(model, "installation", _Entry(
+        text=text, embedding=_unit(vector), result={"gemini_answer": text}, top_k=top_k,
+        created_at=created_at if created_at is not None else cache_module.time.time(), latency=1.0, tokens=0,
+    ))
+
+
+def test_exact_then_best_semantic_match(cache):
+    _store(cache, "install manual hs6270", [1, 0, 0])
+    _store(cache, "installation guide hs6270", [0.95, 0.3, 0])
+    _store(cache, "warranty hs6270", [0, 1, 0])
+
+    entry, similarity = cache.lookup("hs6270", "installation", "install manual hs6270", None, 8)
+    assert (entry.text, similarity) == ("install manual hs6270", 1.0)
+
+    entry, similarity = cache.lookup("HS6270", "installation", "manual for hs6270", _unit([0.99, 0.05, 0]), 8)
+    assert entry.text == "install manual hs6270" and similarity > 0.99
+    assert cache.lookup("HS6270", "installation", "x", _unit([0, 0, 1]), 8) is None
+    assert cache.lookup("100.1170", "installation", "install manual hs6270", None, 8) is None
+
+
+def test_skips_smaller_top_k_and_expired_entries(cache):
+    _store(cache, "install manual hs6270", [1, 0, 0], top_k=5)
+    _store(cache, "installation guide hs6270", [0.97, 0.2, 0], created_at=0.0)
+    _store(cache, "install instructions hs6270", [0.93, 0.35, 0])
+
+    entry, _ = cache.lookup("HS6270", "installation", "q", _unit([1, 0, 0]), 8)
+    assert entry.text == "install instructions hs6270"
+    # The expired entry was dropped from both the LRU and the partition matrix
+    assert cache.stats()["entries"] == 2
+    texts, matrix = cache._partitions[("", "HS6270", "installation")].index()
+    assert sorted(texts) == ["install instructions hs6270", "install manual hs6270"] and matrix.shape == (2, 3)
+
+
+def test_lru_eviction_updates_partition(cache):
+    for i in range(4):
+        _store(cache, f"question {i}", np.eye(4)[i].tolist())
+
+    assert cache.stats()["entries"] == 3
+    assert cache.lookup("HS6270", "installation", "question 0", _unit(np.eye(4)[0].tolist()), 8) is None
+    assert cache.lookup("HS6270", "installation", "q", _unit(np.eye(4)[3].tolist()), 8)[0].text == "question 3"
@@ -0,0 +1,63 @@
+"""Poll cursor is not held back by retries of tickets that are done or gone."""
+
+import pytest
+
+from app.services import freshdesk_poller
+from app.services.freshdesk_poller import FreshdeskPoller, ProcessedStore, ticket_version
+
+
+class FakeClient:
+    def __init__(self):
+        self.tickets = []
+
+    def list_tickets_updated_since(self, since, page=1, per_page=100):
+        return list(self.tickets) if page == 1 else []
+
+
+@pytest.fixture
+def poller(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(freshdesk_poller, "get_freshdesk_client", lambda: client)
+    p = FreshdeskPoller(run_ticket=lambda state: {}, store=ProcessedStore(str(tmp_path / "poller.db")), workers=1)
+    p._pool.submit = lambda *args, **kwargs: None  # Keep submitted tickets "in flight" without running them
+    p.store.set_cursor("2026-10-01T10:00:00Z")
+    yield p, client
+    p.stop()
+
+
+def _ticket(ticket_id, updated_at, tags=None):
+    return {"id": ticket_id, "updated_at": updated_at, "status": 2, "tags": tags or []}
+
+
+def test_ai_tagged_ticket_releases_retry(poller):
+    p, client = poller
+    p._retry["1"] = {"attempts": 1, "updated_at": "2026-10-01T10:05:00Z"}
+    client.tickets = [
+        _ticket(1, "2026-10-01T10:05:00Z", tags=["AI_PROCESSED"]),
+        _ticket(2, "2026-10-01T11:00:00Z"),
+    ]
+    p.poll_once()
+    p._in_flight.clear()
+    assert "1" not in p._retry
+    p.poll_once()
+    assert p.store.get_cursor() == "2026-10-01T11:00:00Z"
+
+
+def test_processed_ticket_releases_retry(poller):
+    p, client = poller
+    stale = _ticket(1, "2026-10-01T10:05:00Z")
+    p.store.mark_processed("1", ticket_version(stale))
+    p._retry["1"] = {"attempts": 1, "updated_at": stale["updated_at"]}
+    client.tickets = [stale]
+    p.poll_once()
+    assert "1" not in p._retry
+
+
+def test_unlisted_retry_is_dropped(poller):
+    p, client = poller
+    p._retry["1"] = {"attempts": 1, "updated_at": "2026-10-01T10:05:00Z"}
+    p._retry["3"] = {"attempts": 1, "updated_at": "2026-10-01T12:00:00Z"}  # Past the listing - kept
+    client.tickets = [_ticket(2, "2026-10-01T11:00:00Z")]
+    p.poll_once()
+    assert "1" not in p._retry
+    assert "3" in p._retry
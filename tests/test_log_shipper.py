@@ -0,0 +1,72 @@
+"""Spill replay: delivered payloads are never dropped or re-sent."""
+
+import json
+
+import pytest
+
+from app.utils import log_shipper
+from app.utils.log_shipper import LogShipper
+
+
+@pytest.fixture
+def shipper(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_shipper, "SPILL_FILE", str(tmp_path / "spill.jsonl"))
+    monkeypatch.setattr(log_shipper, "BATCH_SIZE", 3)
+    return LogShipper()
+
+
+def _spilled(n):
+    return [{"ticket_id": i} for i in range(n)]
+
+
+def _collector(shipper, monkeypatch, fail_at=None):
+    """Per-payload collector that rejects the payload with ticket_id == fail_at (and what follows)."""
+    received = []
+
+    def send(batch):
+        for delivered, payload in enumerate(batch):
+            if payload["ticket_id"] == fail_at:
+                return delivered
+            received.append(payload)
+        return len(batch)
+
+    monkeypatch.setattr(shipper, "_send", send)
+    return received
+
+
+def test_replay_delivers_everything_once(shipper, monkeypatch):
+    shipper._spill(_spilled(7))
+    received = _collector(shipper, monkeypatch)
+
+    assert shipper.replay_spill() == 7
+    assert [p["ticket_id"] for p in received] == list(range(7))
+    assert shipper.stats()["spill_bytes"] == 0
+
+
+def test_partial_failure_resumes_after_last_delivered(shipper, monkeypatch):
+    shipper._spill(_spilled(7))
+    received = _collector(shipper, monkeypatch, fail_at=4)
+
+    assert shipper.replay_spill() == 4
+    assert shipper.stats()["spill_bytes"] > 0
+
+    # Newer failures keep spilling separately while the replay is pending
+    shipper._spill([{"ticket_id": 100}])
+    received = _collector(shipper, monkeypatch)
+
+    assert shipper.replay_spill() == 3  # 4, 5, 6 - not 0..3 again
+    assert shipper.replay_spill() == 1  # then the newer spill
+    assert [p["ticket_id"] for p in received] == [4, 5, 6, 100]
+    assert shipper.stats()["spill_bytes"] == 0
+
+
+def test_worker_spills_only_undelivered(shipper, monkeypatch):
+    received = _collector(shipper, monkeypatch, fail_at=1)
+    monkeypatch.setattr(log_shipper, "REPLAY_INTERVAL", 3600.0)
+    for payload in _spilled(3):
+        shipper.enqueue(payload)
+    shipper.shutdown(timeout=5.0)
+
+    assert [p["ticket_id"] for p in received] == [0]
+    with open(log_shipper.SPILL_FILE, encoding="utf-8") as f:
+        assert [json.loads(line)["ticket_id"] for line in f] == [1, 2]
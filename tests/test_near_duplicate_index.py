@@ -0,0 +1,54 @@
+"""MinHash matching, guards and bounds of the near-duplicate index."""
+
+import pytest
+
+from app.config.settings import settings
+from app.services.near_duplicate_index import NearDuplicateIndex, ticket_fingerprint
+
+BODY = (
+    "Hello, we are a dealer and need the replacement cartridge for model 100.1170 faucet. "
+    "The customer reports a drip from the spout after installation. Please advise on the "
+    "part number and price. Thanks, ABC Plumbing Supply"
+)
+
+
+@pytest.fixture(autouse=True)
+def near_dup_settings(monkeypatch):
+    monkeypatch.setattr(settings, "near_dup_threshold", 0.8)
+    monkeypatch.setattr(settings, "near_dup_window_hours", 24)
+    monkeypatch.setattr(settings, "near_dup_max_entries", 100)
+    monkeypatch.setattr(settings, "near_dup_max_mb", 1)
+
+
+def test_near_duplicate_matches_and_guards():
+    index = NearDuplicateIndex()
+    index.add("1", ticket_fingerprint("Cartridge for 100.1170", BODY), "a@x.com", {"draft_response": "<p>Hi</p>"})
+
+    reworded = ticket_fingerprint("RE: Cartridge for 100.1170", BODY.replace("ABC Plumbing Supply", "XYZ Plumbing"))
+    match = index.find("2", {**reworded, "requester_email": "A@x.com"})
+    assert match["ticket_id"] == "1" and match["same_requester"]
+
+    assert index.find("1", reworded) is None  # Never matches itself
+    assert index.find("3", ticket_fingerprint("Cartridge for 100.1170", BODY, "other-attachments")) is None
+    other_model = BODY.replace("100.1170", "100.1180")
+    assert index.find("4", ticket_fingerprint("Cartridge for 100.1180", other_model)) is None
+
+
+def test_match_is_a_deep_copy():
+    index = NearDuplicateIndex()
+    fingerprint = ticket_fingerprint("Cartridge for 100.1170", BODY)
+    index.add("1", fingerprint, "", {"draft_response": "x", "source_documents": [{"id": "doc"}]})
+
+    first = index.find("2", fingerprint)
+    first["resolution"]["source_documents"].append({"id": "injected"})
+    assert index.find("2", fingerprint)["resolution"]["source_documents"] == [{"id": "doc"}]
+
+
+def test_size_bound_evicts_oldest():
+    index = NearDuplicateIndex()
+    big = {"draft_response": "x" * 400_000}
+    for ticket_id in range(4):
+        index.add(str(ticket_id), ticket_fingerprint(f"Ticket {ticket_id}", BODY + f" ref{ticket_id}x"), "", big)
+    stats = index.stats()
+    assert stats["entries"] == 2
+    assert stats["size_mb"] <= 1
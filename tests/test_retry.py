@@ -0,0 +1,103 @@
+"""Circuit breaker transitions through the adaptive_retry wrapper."""
+
+import pytest
+
+from app.utils import retry as retry_module
+from app.utils.retry import CircuitBreaker, CircuitOpenError, adaptive_retry, get_upstream_policy
+
+
+class Transient(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retry_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _flaky(upstream: str, outcome):
+    policy = get_upstream_policy(upstream)
+    policy.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30.0)
+
+    @adaptive_retry(upstream, max_attempts=1, retry_on=lambda e: isinstance(e, Transient), record_latency=False)
+    def call():
+        error = outcome[0]
+        if error:
+            raise error
+        return "ok"
+
+    return policy.breaker, call
+
+
+def test_non_retryable_probe_does_not_close_breaker(clock):
+    outcome = [Transient("503")]
+    breaker, call = _flaky("test-probe-4xx", outcome)
+
+    for _ in range(2):
+        with pytest.raises(Transient):
+            call()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        call()
+
+    clock[0] += 31
+    outcome[0] = BadRequest("400")
+    with pytest.raises(BadRequest):
+        call()  # half_open probe: the upstream answered, but that proves nothing
+    assert breaker.state == "half_open"
+
+    outcome[0] = None
+    assert call() == "ok"  # the probe was released, the next one decides
+    assert breaker.state == "closed"
+
+
+def test_non_retryable_error_ends_failure_streak(clock):
+    outcome = [Transient("503")]
+    breaker, call = _flaky("test-streak-4xx", outcome)
+
+    with pytest.raises(Transient):
+        call()
+    outcome[0] = BadRequest("400")
+    with pytest.raises(BadRequest):
+        call()
+    outcome[0] = Transient("503")
+    with pytest.raises(Transient):
+        call()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_breaker(clock):
+    outcome = [Transient("503")]
+    breaker, call = _flaky("test-probe-503", outcome)
+
+    for _ in range(2):
+        with pytest.raises(Transient):
+            call()
+    clock[0] += 31
+    with pytest.raises(Transient):
+        call()
+    assert breaker.state == "open"
+
+
+def test_probe_without_outcome_is_released(clock):
+    outcome = [Transient("503")]
+    breaker, call = _flaky("test-probe-interrupt", outcome)
+
+    for _ in range(2):
+        with pytest.raises(Transient):
+            call()
+    clock[0] += 31
+    outcome[0] = KeyboardInterrupt()
+    with pytest.raises(KeyboardInterrupt):
+        call()
+    assert breaker.state == "half_open"
+
+    outcome[0] = None
+    assert call() == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,73 @@
+"""Coalescing turns (async webhook path) and how supersession is reported."""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.config.settings import settings
+from app.services import ticket_coalescer
+from app.services.dedup_store import MemoryDedupStore
+from app.services.ticket_coalescer import (
+    WorkflowSuperseded, acquire_turn_async, register_event, release_turn,
+)
+from app.utils.metrics import NODE_CALLS, _label_key, instrument_node
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = MemoryDedupStore()
+    monkeypatch.setattr(ticket_coalescer, "get_dedup_store", lambda: store)
+    monkeypatch.setattr(ticket_coalescer, "LOCK_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "ticket_coalesce_window_seconds", 0.05)
+    return store
+
+
+def test_newer_event_supersedes_queued_run():
+    async def scenario():
+        first = asyncio.create_task(acquire_turn_async("1", register_event("1")))
+        await asyncio.sleep(0.02)
+        second = await acquire_turn_async("1", register_event("1"))
+        with pytest.raises(WorkflowSuperseded):
+            await first
+        return second
+
+    assert asyncio.run(scenario())
+
+
+def test_turn_waits_for_lock_release():
+    async def scenario():
+        token = await acquire_turn_async("2", register_event("2"))
+        waiting = asyncio.create_task(acquire_turn_async("2", None))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        release_turn("2", token)
+        return await asyncio.wait_for(waiting, timeout=1.0)
+
+    assert asyncio.run(scenario())
+
+
+def test_async_turn_keeps_store_calls_off_the_loop(store, monkeypatch):
+    callers = set()
+    for name in ("get_int", "acquire_lock"):
+        call = getattr(store, name)
+        monkeypatch.setattr(store, name, lambda *a, _call=call: callers.add(threading.get_ident()) or _call(*a))
+
+    async def scenario():
+        return threading.get_ident(), await acquire_turn_async("3", register_event("3"))
+
+    loop_thread, token = asyncio.run(scenario())
+    assert token
+    assert callers and loop_thread not in callers
+
+
+def test_superseded_node_is_not_an_error():
+    def node(state):
+        raise WorkflowSuperseded("newer update")
+
+    with pytest.raises(WorkflowSuperseded):
+        instrument_node("test_superseded", node)({})
+
+    key = _label_key({"node": "test_superseded", "status": "superseded"})
+    assert NODE_CALLS._values.get(key) == 1
+    assert _label_key({"node": "test_superseded", "status": "error"}) not in NODE_CALLS._values